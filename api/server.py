@@ -1,12 +1,58 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from core.AIThreatAnalyzer import AIThreatAnalyzer
-from typing import List
+from core.alert_store import MAX_PAGE
+from core.errors import ConfigurationError, InferenceBacklogFull
+from core.inference import InferenceExecutor
+from typing import Any, Dict, List, Optional
 
 app = FastAPI(
     title="Cyber Witness API",
     version="1.0.0"
 )
+# core.metrics.MetricsRegistry ustawiany przy starcie; None = metryki wyłączone
+app.state.metrics = None
+# core.overload.OverloadController; None = degradacja wyłączona
+app.state.overload = None
+# core.memory.MemoryBudget; None = rozliczanie pamięci wyłączone
+app.state.memory = None
+# core.alert_store.AlertStore; None = /alerts zwraca ostatnie alerty z pamięci koordynatora
+app.state.alert_store = None
+app.state.alert_coordinator = None
+# RuleCommandHandler (podmiana reguł przez core.hot_reload.HotReloader); None = /rules zwraca 503
+app.state.rule_handler = None
+# core.inference.InferenceExecutor potoku (wspólna pamięć wyników); None = własny wykonawca API
+app.state.inference = None
+
+class RuleCommandHandler:
+    """Polecenia /rules: walidacja i podmiana reguł działającego potoku przez ``HotReloader``
+
+    Zaakceptowane reguły są zapisywane do pliku reguł, więc przetrwają restart.
+    """
+
+    def __init__(self, reloader):
+        self.reloader = reloader
+
+    def current(self) -> Dict[str, Any]:
+        return {"version": self.reloader.rules_version, "rules": self.reloader.rules}
+
+    async def add_rule(self, rule: Dict[str, Any]) -> Dict[str, Any]:
+        """Dodaj regułę albo zastąp regułę o tej samej nazwie"""
+        version = await self.reloader.add_rule(rule, persist=True)
+        return {"status": "rule added", "version": version, "rules": len(self.reloader.rules)}
+
+    async def replace_rules(self, rules: List[Dict[str, Any]]) -> Dict[str, Any]:
+        version = await self.reloader.reload_rules(rules, persist=True)
+        return {"status": "rules replaced", "version": version, "rules": len(rules)}
+
+def create_app(alert_coordinator, rule_handler=None, alert_store=None, inference=None) -> FastAPI:
+    """Aplikacja API powiązana z działającymi komponentami"""
+    app.state.alert_coordinator = alert_coordinator
+    app.state.rule_handler = rule_handler
+    app.state.alert_store = alert_store
+    app.state.inference = inference
+    return app
 
 # Dotychczasowe endpointy (już istniejące)
 @app.get("/health")
@@ -14,21 +60,64 @@ async def health_check():
     return {"status": "ok"}
 
 @app.get("/alerts")
-async def get_alerts(limit: int = 100):
-    # zakładam, że implementacja istnieje
-    return []
+async def get_alerts(request: Request, limit: int = Query(100, ge=1, le=MAX_PAGE), cursor: Optional[str] = None,
+                     since: Optional[float] = None, until: Optional[float] = None,
+                     src_ip: Optional[str] = None, dst_ip: Optional[str] = None, rule: Optional[str] = None,
+                     type: Optional[str] = None, protocol: Optional[str] = None, dst_port: Optional[int] = None,
+                     min_priority: Optional[int] = None):
+    """Alerty od najnowszych; kolejna strona przez ``cursor=<next_cursor>``"""
+    store = request.app.state.alert_store
+    if store is None:
+        coordinator = request.app.state.alert_coordinator
+        recent = list(coordinator.recent_alerts)[-limit:] if coordinator is not None else []
+        return {"alerts": [{
+            "timestamp": alert.timestamp,
+            "type": str(alert.alert_type),
+            "priority": alert.priority,
+            "rule": alert.message,
+            "count": alert.count,
+            "payload": alert.payload
+        } for alert in reversed(recent)], "next_cursor": None}
+    try:
+        return await asyncio.to_thread(
+            store.query, limit, cursor, since, until, min_priority,
+            src_ip=src_ip, dst_ip=dst_ip, rule=rule, type=type, protocol=protocol, dst_port=dst_port
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _rule_handler(request: Request) -> RuleCommandHandler:
+    handler = request.app.state.rule_handler
+    if handler is None:
+        raise HTTPException(status_code=503, detail="Rule reload is disabled")
+    return handler
+
+@app.get("/rules")
+async def get_rules(request: Request):
+    return _rule_handler(request).current()
 
 @app.post("/rules")
-async def add_rule(rule: dict):
-    # zakładam, że implementacja istnieje
-    return {"status": "rule added"}
+async def add_rule(rule: dict, request: Request):
+    try:
+        return await _rule_handler(request).add_rule(rule)
+    except ConfigurationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/rules")
+async def replace_rules(rules: List[dict], request: Request):
+    """Zastąp cały zestaw reguł"""
+    try:
+        return await _rule_handler(request).replace_rules(rules)
+    except ConfigurationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # NOWY kod dodany poniżej:
 
 # --------------- NOWY ENDPOINT ANALYZE -------------------
 
 router = APIRouter()
-analyzer = AIThreatAnalyzer("models/deepseek.onnx")
+# Sesja tworzona przy pierwszym żądaniu, inferencja w puli wątków poza pętlą zdarzeń
+inference = InferenceExecutor("models/deepseek.onnx")
 
 class ThreatRequest(BaseModel):
     ip: str
@@ -46,13 +135,40 @@ PROTOCOL_MAP = {
 }
 
 @router.post("/analyze", response_model=ThreatResponse)
-async def analyze_threat(request: ThreatRequest):
+async def analyze_threat(request: ThreatRequest, http_request: Request):
     protocol_code = PROTOCOL_MAP.get(request.protocol.upper(), 3)
+    executor = http_request.app.state.inference or inference
     try:
-        score = analyzer.predict(request.ip, request.port, protocol_code)
+        score = await executor.predict(request.ip, request.port, protocol_code)
         return {"threat_score": round(score, 4)}
+    except InferenceBacklogFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --------------- METRYKI -------------------
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    metrics = request.app.state.metrics
+    if metrics is None:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/overload")
+async def get_overload(request: Request):
+    overload = request.app.state.overload
+    if overload is None:
+        return {"level": "normal", "enabled": False}
+    return {**overload.status(), "enabled": True}
+
+@router.get("/memory")
+async def get_memory(request: Request):
+    """Budżet pamięci: bieżący i szczytowy rozmiar podsystemów, usunięte elementy, RSS"""
+    memory = request.app.state.memory
+    if memory is None:
+        return {"enabled": False}
+    return {**memory.status(), "enabled": True}
+
 # Rejestracja nowego routera:
 app.include_router(router)
@@ -0,0 +1,86 @@
+# 📄 Plik: benchmarks/bench_alert_store.py
+"""Zapis i zapytania lokalnej historii alertów (core.alert_store)
+
+Uruchomienie: python -m benchmarks.bench_alert_store [--alerts 2000000] [--path /tmp/alerts.db]
+
+Wypełnia bazę paczkami po 500 alertów (jak handler AlertCoordinator) i mierzy
+czas zapytań typowych dla /alerts: najnowsza strona, filtr po src_ip, reguła
+w przedziale czasu i głęboka strona przez kursor.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from core.AlertCoordinator import AlertPriority, AlertType, QueuedAlert
+from core.alert_store import AlertStore
+
+RULES = ["Large ICMP Packet", "Suspicious Port Activity", "SYN flood", "Port scan", "AI detected threat"]
+
+
+def make_alerts(count: int, start: float, seed: int = 1):
+    rnd = random.Random(seed)
+    for i in range(count):
+        yield QueuedAlert(rnd.choice(list(AlertPriority)).value, start + i * 0.01, rnd.choice(list(AlertType)),
+                          rnd.choice(RULES), {
+                              "src_ip": f"10.{rnd.randrange(4)}.{rnd.randrange(256)}.{rnd.randrange(256)}",
+                              "dst_ip": f"192.168.0.{rnd.randrange(256)}", "protocol": "TCP",
+                              "src_port": rnd.randrange(1024, 65536), "dst_port": rnd.choice([22, 80, 443, 4444]),
+                              "packet_size": rnd.randrange(40, 1500), "metadata": {}
+                          })
+
+
+def timed(func, repeat: int = 50):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alerts", type=int, default=2_000_000)
+    parser.add_argument("--path", default=None, help="database file (default: temporary)")
+    args = parser.parse_args()
+    path = args.path or os.path.join(tempfile.mkdtemp(), "alerts.db")
+    store = AlertStore(path)
+    start = 1_700_000_000.0
+
+    batch = []
+    started = time.perf_counter()
+    for alert in make_alerts(args.alerts, start):
+        batch.append(AlertStore._row(alert))
+        if len(batch) == 500:
+            store.write_rows(batch)
+            batch = []
+    if batch:
+        store.write_rows(batch)
+    elapsed = time.perf_counter() - started
+    print(f"inserted {args.alerts:,} alerts in {elapsed:.1f} s ({args.alerts / elapsed:,.0f}/s), "
+          f"db {os.path.getsize(path) / 2**20:,.0f} MiB")
+
+    end = start + args.alerts * 0.01
+    deep = {"cursor": None}
+    for _ in range(100):
+        deep["cursor"] = store.query(limit=100, cursor=deep["cursor"])["next_cursor"]
+    queries = {
+        "newest 100": lambda: store.query(limit=100),
+        "src_ip": lambda: store.query(limit=100, src_ip="10.1.2.3"),
+        "rule + last hour": lambda: store.query(limit=100, rule="SYN flood", since=end - 3600),
+        "HIGH in 10 min window": lambda: store.query(limit=100, min_priority=3, since=start + 600, until=start + 1200),
+        "page 101 via cursor": lambda: store.query(limit=100, cursor=deep["cursor"]),
+    }
+    print(f"{'query':>24} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, query in queries.items():
+        p50, p99 = timed(query)
+        print(f"{name:>24} {p50:>8.2f} {p99:>8.2f}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
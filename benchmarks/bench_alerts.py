@@ -0,0 +1,99 @@
+# 📄 Plik: benchmarks/bench_alerts.py
+"""Przepustowość AlertCoordinator: dawna ścieżka pydantic + dataclass vs szybka ścieżka
+
+Uruchomienie: python -m benchmarks.bench_alerts [--alerts 100000]
+
+Limit szybkości i deduplikacja są wyłączone w porównaniu ścieżek - mierzymy
+samą walidację, tworzenie rekordu i wstawienie do kolejki. Osobny przebieg
+"flood" pokazuje, ile z zalewu identycznych alertów trafia do kolejki.
+"""
+import argparse
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertSchema, AlertType
+
+
+@dataclass(order=True)
+class LegacyQueuedAlert:
+    priority: int
+    timestamp: float = field(compare=False)
+    alert_type: AlertType = field(compare=False)
+    message: str = field(compare=False)
+    payload: Dict[str, Any] = field(compare=False)
+
+
+class LegacyCoordinator:
+    """Dawna implementacja add_alert (bez limitu szybkości)"""
+
+    def __init__(self, max_queue_size: int):
+        self.alert_queue = asyncio.PriorityQueue(maxsize=max_queue_size)
+        self.recent_alerts = deque(maxlen=1000)
+
+    async def add_alert(self, alert_type, message, priority, raw_payload) -> bool:
+        validated = AlertSchema(**raw_payload).dict()
+        alert = LegacyQueuedAlert(priority=priority.value, alert_type=alert_type, message=message[:255],
+                                  timestamp=time.time(), payload=validated)
+        await self.alert_queue.put(alert)
+        self.recent_alerts.append(alert)
+        return True
+
+
+def unlimited(max_queue_size: int) -> AlertCoordinator:
+    return AlertCoordinator(max_queue_size=max_queue_size, rate_limit=None, dedup_window=0)
+
+
+def make_alerts(count: int):
+    return [
+        (AlertType.WARNING, "Suspicious Port Activity", AlertPriority.MEDIUM,
+         {"src_ip": f"10.0.{i // 256 % 256}.{i % 256}", "dst_ip": "10.1.0.1", "protocol": "TCP",
+          "packet_size": 60, "src_port": 40000, "dst_port": 4444, "tcp_flags": 2, "timestamp": float(i)})
+        for i in range(count)
+    ]
+
+
+async def single(coordinator, alerts) -> float:
+    start = time.perf_counter()
+    for alert in alerts:
+        await coordinator.add_alert(*alert)
+    return len(alerts) / (time.perf_counter() - start)
+
+
+async def bulk(coordinator, alerts, batch: int = 64) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(alerts), batch):
+        await coordinator.add_alerts(alerts[i:i + batch])
+    return len(alerts) / (time.perf_counter() - start)
+
+
+async def run(count: int) -> None:
+    alerts = make_alerts(count)
+    legacy = await single(LegacyCoordinator(count), alerts)
+    fast = await single(unlimited(count), alerts)
+    batched = await bulk(unlimited(count), alerts)
+    print(f"{'path':>18} {'alerts/s':>12}")
+    print(f"{'legacy add_alert':>18} {legacy:>12,.0f}")
+    print(f"{'add_alert':>18} {fast:>12,.0f}  ({fast / legacy:.1f}x)")
+    print(f"{'add_alerts (64)':>18} {batched:>12,.0f}  ({batched / legacy:.1f}x)")
+
+    # Zalew: 50 źródeł powtarza ten sam alert - deduplikacja i kubełki żetonów
+    flood = [(t, m, p, {**payload, "src_ip": f"10.9.0.{i % 50}"}) for i, (t, m, p, payload) in enumerate(alerts)]
+    coordinator = AlertCoordinator(max_queue_size=count)
+    rate = await bulk(coordinator, flood)
+    queued = coordinator.alert_queue.qsize()
+    print(f"{'flood (dedup)':>18} {rate:>12,.0f}  {count:,} alerts -> {queued:,} queued "
+          f"({coordinator.deduplicator.suppressed:,} collapsed)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alerts", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.alerts))
+
+
+if __name__ == "__main__":
+    main()
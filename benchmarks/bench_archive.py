@@ -0,0 +1,84 @@
+# 📄 Plik: benchmarks/bench_archive.py
+"""Archiwum kolumnowe pakietów (core.packet_archive) w porównaniu z NDJSON
+
+Uruchomienie: python -m benchmarks.bench_archive [--packets 1000000] [--format parquet] [--compression zstd]
+
+Rekordy z ``benchmarks.traffic`` (mieszanka "mixed", 1000 pakietów/s czasu
+przechwytywania) trafiają do ``PacketArchive`` paczkami po 256, jak z
+``analyze_rows``. Wynik: koszt dopisania w pętli zdarzeń, przepustowość
+wątku zapisu, bajty na rekord względem NDJSON oraz czas odczytu całości
+i jednej minuty.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.traffic import traffic_mix
+from core.packet_archive import PacketArchive, iter_archive, read_archive
+from network.capture import parse_frame
+
+
+async def write(rows, directory: str, fmt: str, compression: str):
+    archive = PacketArchive(directory, fmt=fmt, compression=compression, max_pending=1024)
+    append = 0.0
+    started = time.perf_counter()
+    for i in range(0, len(rows), 256):
+        t0 = time.perf_counter()
+        archive.append_rows(rows[i:i + 256])
+        append += time.perf_counter() - t0
+        await asyncio.sleep(0)
+    await archive.close()
+    return archive, append, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=1_000_000)
+    parser.add_argument("--format", default="parquet", choices=["parquet", "arrow"])
+    parser.add_argument("--compression", default="zstd")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    start = 1_714_564_800.0
+    rows = []
+    for i, (frame, _) in enumerate(traffic_mix("mixed", args.packets)):
+        record = parse_frame(memoryview(frame), timestamp=start + i / 1000)
+        if record is not None:
+            rows.append(record.to_dict())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ndjson = Path(tmp) / "packets.ndjson"
+        started = time.perf_counter()
+        with open(ndjson, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+        ndjson_seconds = time.perf_counter() - started
+        ndjson_bytes = ndjson.stat().st_size
+
+        directory = str(Path(tmp) / "archive")
+        archive, append, elapsed = asyncio.run(write(rows, directory, args.format, args.compression))
+        started = time.perf_counter()
+        count = sum(len(batch) for batch in iter_archive(directory, fmt=args.format))
+        read_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        minute = read_archive(directory, since=start + 60, until=start + 120, fmt=args.format).num_rows
+        minute_ms = (time.perf_counter() - started) * 1000
+
+    print(f"records:          {len(rows):,} ({archive.written:,} written, {archive.dropped:,} dropped, "
+          f"{archive.segments} segments)")
+    print(f"append (loop):    {append / len(rows) * 1e9:,.0f} ns/record")
+    print(f"write:            {len(rows) / elapsed:,.0f} records/s "
+          f"(batch p50 {archive.write_latency.quantile(0.5) * 1000:.1f} ms)")
+    print(f"size:             {archive.bytes_written / len(rows):.1f} B/record "
+          f"vs NDJSON {ndjson_bytes / len(rows):.1f} B/record ({archive.bytes_written / ndjson_bytes:.1%})")
+    print(f"NDJSON write:     {len(rows) / ndjson_seconds:,.0f} records/s")
+    print(f"read all:         {count / read_seconds:,.0f} records/s (dicts for analyze_rows)")
+    print(f"read 1 minute:    {minute:,} records in {minute_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# 📄 Plik: benchmarks/bench_batch.py
+"""Potok pakiet po pakiecie vs tryb paczkowy NetworkMonitor
+
+Uruchomienie: python -m benchmarks.bench_batch [--packets 100000] [--rules 2] [--batch 256]
+
+Rekordy z ``benchmarks.traffic`` (mieszanka "mixed") trafiają do bufora
+``NetworkMonitor``; analiza to ``AdvancedTrafficMonitor`` z tablicą przepływów
+i regułami z ``config/rules.json`` albo ``--rules N`` wygenerowanymi przez
+``benchmarks.bench_rules.make_rules``. Osobno mierzymy samo dopasowanie reguł:
+``RuleSet.match`` na pakiet vs ``RuleSet.match_batch`` na paczkę.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_rules import make_rules
+from benchmarks.traffic import traffic_mix
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor, extract_packet_fields
+from core.flows import FlowTable
+from core.inference import InferenceExecutor
+from network.capture import parse_frame
+from network.monitoring import NetworkMonitor
+from tests.conftest import CountingCoordinator
+
+
+def make_analyzer(rules_path: str) -> AdvancedTrafficMonitor:
+    return AdvancedTrafficMonitor(
+        None, CountingCoordinator(), rules_path, "unused.onnx", None,
+        inference=InferenceExecutor("unused.onnx"), ai_enabled=False,
+        flow_table=FlowTable(idle_timeout=3600, active_timeout=3600)
+    )
+
+
+async def pipeline(records, rules_path: str, batch_size: int):
+    analyzer = make_analyzer(rules_path)
+    monitor = NetworkMonitor(interface="bench", buffer_size=len(records), batch_size=batch_size,
+                             batch_wait_us=0)
+    batched = batch_size > 1
+    consumer = asyncio.create_task(monitor._process_batches() if batched else monitor._process_buffer())
+    callback = analyzer.analyze_batch if batched else analyzer.analyze_packet
+    start = time.perf_counter()
+    for record in records:
+        monitor._buffer_packet(record, callback)
+    await monitor._packet_buffer.join()
+    elapsed = time.perf_counter() - start
+    consumer.cancel()
+    return len(records) / elapsed, analyzer.alert_coordinator.alerts, monitor.analysis_latency
+
+
+def match_rates(records, rules_path: str, batch_size: int):
+    rule_set = make_analyzer(rules_path).rule_set
+    rows = [extract_packet_fields(record) for record in records]
+    start = time.perf_counter()
+    single = sum(len(rule_set.match(row)) for row in rows)
+    scalar = len(rows) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    batched = sum(len(m) for i in range(0, len(rows), batch_size)
+                  for m in rule_set.match_batch(rows[i:i + batch_size]))
+    vector = len(rows) / (time.perf_counter() - start)
+    assert single == batched
+    return scalar, vector
+
+
+async def run(count: int, rules: int, batch_size: int) -> None:
+    logging.disable(logging.WARNING)
+    records = [parse_frame(memoryview(frame), timestamp=ts) for frame, ts in traffic_mix("mixed", count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_path = "config/rules.json"
+        if rules:
+            rules_path = str(Path(tmp) / "rules.json")
+            Path(rules_path).write_text(json.dumps(make_rules(rules)))
+        scalar, vector = match_rates(records, rules_path, batch_size)
+        print(f"rule matching: match {scalar:,.0f} pkt/s, match_batch({batch_size}) {vector:,.0f} pkt/s")
+        print(f"{'mode':>10} {'pkt/s':>12} {'alerts':>9} {'p99 µs/pkt':>11}")
+        for size in (1, batch_size):
+            pps, alerts, latency = await pipeline(records, rules_path, size)
+            mode = "packet" if size == 1 else f"batch {size}"
+            print(f"{mode:>10} {pps:>12,.0f} {alerts:>9,} {latency.quantile(0.99) * 1e6:>11.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=100_000)
+    parser.add_argument("--rules", type=int, default=0, help="generated rules instead of config/rules.json")
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+    asyncio.run(run(args.packets, args.rules, args.batch))
+
+
+if __name__ == "__main__":
+    main()
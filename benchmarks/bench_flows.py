@@ -0,0 +1,59 @@
+# 📄 Plik: benchmarks/bench_flows.py
+"""Pamięć i przepustowość tablicy przepływów dla N równoczesnych przepływów
+
+Uruchomienie: python -m benchmarks.bench_flows [--flows 1000000] [--packets-per-flow 2]
+
+Zapełnia ``FlowTable`` unikalnymi przepływami IPv4, mierzy przyrost pamięci
+(tracemalloc) w przeliczeniu na przepływ oraz czas aktualizacji na pakiet.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from core.flows import FlowTable
+
+
+def make_packets(flows: int, seed: int = 0):
+    rnd = random.Random(seed)
+    for i in range(flows):
+        yield {
+            'src_ip': f"10.{(i >> 16) & 0xff}.{(i >> 8) & 0xff}.{i & 0xff}",
+            'dst_ip': f"192.168.{rnd.randrange(256)}.{rnd.randrange(1, 255)}",
+            'protocol': 'TCP',
+            'src_port': 1024 + rnd.randrange(60000),
+            'dst_port': rnd.choice((80, 443, 22, 53)),
+            'packet_size': rnd.randrange(60, 1500),
+            'tcp_flags': 0x10,
+            'timestamp': i * 1e-6,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--flows", type=int, default=1_000_000)
+    parser.add_argument("--packets-per-flow", type=int, default=2)
+    args = parser.parse_args()
+
+    packets = list(make_packets(args.flows))
+    table = FlowTable(max_flows=args.flows, idle_timeout=3600, active_timeout=3600)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for _ in range(args.packets_per_flow):
+        for pkt in packets:
+            table.update(pkt)
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    updates = args.flows * args.packets_per_flow
+    print(f"flows:            {len(table):>12,}")
+    print(f"measured memory:  {used / 2**20:>12,.1f} MiB ({used / len(table):.0f} B/flow)")
+    print(f"estimated memory: {table.memory_bytes() / 2**20:>12,.1f} MiB")
+    print(f"update:           {elapsed / updates * 1e9:>12,.0f} ns/pkt ({updates / elapsed:,.0f} pkt/s)")
+
+
+if __name__ == "__main__":
+    main()
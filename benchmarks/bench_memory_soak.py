@@ -0,0 +1,151 @@
+# 📄 Plik: benchmarks/bench_memory_soak.py
+"""Długi test pamięci: RSS procesu pod syntetycznym ruchem z okresowymi zrywami
+
+Uruchomienie: python -m benchmarks.bench_memory_soak [--hours 2] [--rate 5000] [--budget-mb 48]
+                                                     [--burst-every 300] [--burst-seconds 30] [--output soak.csv]
+
+Potok jak w main.py: bufor ``NetworkMonitor`` w trybie paczkowym,
+``AdvancedTrafficMonitor`` z tablicą przepływów, ``AlertCoordinator`` z
+wolnym handlerem (opóźnienie ``--handler-ms`` - jak eksport do zatkanego ES)
+i ``MemoryBudget`` zarejestrowany przez ``main.register_memory``. Ruch to
+mieszanka "mixed" z domieszką dużych pakietów ICMP (alerty HIGH); co cykl
+puli zmieniają się porty źródłowe, więc przepływy stale powstają i wygasają.
+Co ``--burst-every`` s ruch rośnie ``--burst-factor`` razy na
+``--burst-seconds`` s - bufory się zapełniają, a budżet usuwa nadmiar.
+
+Co ``--sample-seconds`` s wypisywany jest RSS, suma rozliczona przez budżet
+i usunięte elementy. Podsumowanie: zakres RSS i nachylenie prostej
+dopasowanej do RSS (MiB/h) po rozgrzewce (pierwsze ``--warmup`` części
+czasu) - płaski przebieg to nachylenie bliskie zeru.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import time
+
+import numpy as np
+
+from benchmarks.traffic import build_frame, traffic_mix
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.AlertCoordinator import AlertCoordinator
+from core.flows import FlowTable
+from core.inference import InferenceExecutor
+from core.memory import MemoryBudget, process_rss
+from main import register_memory
+from network.capture import parse_frame
+from network.monitoring import NetworkMonitor
+
+
+def make_records(count: int):
+    icmp = build_frame("10.66.0.1", "192.168.0.1", 1, payload=1200)
+    # co 50. pakiet to duży ICMP (reguła "Large ICMP Packet", HIGH)
+    return [parse_frame(memoryview(icmp if i % 50 == 0 else frame), timestamp=ts)
+            for i, (frame, ts) in enumerate(traffic_mix("mixed", count))]
+
+
+async def soak(args) -> list:
+    coordinator = AlertCoordinator()
+
+    async def slow_export(alert) -> None:
+        await asyncio.sleep(args.handler_ms / 1000)
+
+    coordinator.register_handler(slow_export, name="slow_export", max_queue=10_000)
+    monitor = NetworkMonitor(interface="soak", buffer_size=10_000, instrument=False)
+    analyzer = AdvancedTrafficMonitor(monitor, coordinator, args.rules, "unused.onnx", None,
+                                      inference=InferenceExecutor("unused.onnx"), ai_enabled=False,
+                                      flow_table=FlowTable())
+    budget = MemoryBudget(limit_bytes=int(args.budget_mb * 2**20))
+    register_memory(budget, monitor, analyzer, coordinator, None, analyzer.inference)
+    tasks = [asyncio.create_task(coro) for coro in (
+        monitor._process_batches(), coordinator.process_alerts(), coordinator.run_suppression(), budget.run())]
+
+    records = make_records(args.pool)
+    ports = [record.src_port for record in records]
+    started = time.perf_counter()
+    deadline = started + args.hours * 3600
+    next_sample = started
+    samples = []
+    sent = 0
+    offered = 0.0
+    last = started
+    print(f"{'minutes':>8} {'RSS MiB':>8} {'tracked MiB':>12} {'buffer':>7} {'handler':>8} {'flows':>7} "
+          f"{'dropped':>9} {'shed':>9}")
+    while True:
+        now = time.perf_counter()
+        if now >= next_sample:
+            budget.measure()
+            handler = coordinator.dispatcher.queues[0]
+            row = {
+                "seconds": round(now - started, 1), "rss_mib": process_rss() / 2**20,
+                "tracked_mib": budget.used_bytes / 2**20, "buffer": monitor.buffered,
+                "handler_queue": len(handler), "flows": len(analyzer.flow_table), "packets": sent,
+                "dropped": monitor.dropped + handler.dropped,
+                "shed": sum(account.shed_items for account in budget.accounts),
+            }
+            samples.append(row)
+            print(f"{row['seconds'] / 60:>8.1f} {row['rss_mib']:>8.1f} {row['tracked_mib']:>12.1f} "
+                  f"{row['buffer']:>7,} {row['handler_queue']:>8,} {row['flows']:>7,} {row['dropped']:>9,} "
+                  f"{row['shed']:>9,}", flush=True)
+            next_sample += args.sample_seconds
+        if now >= deadline:
+            break
+        # Zryw: --burst-factor razy większy ruch przez --burst-seconds co --burst-every s
+        burst = args.burst_every and (now - started) % args.burst_every < args.burst_seconds
+        offered += (now - last) * args.rate * (args.burst_factor if burst else 1)
+        last = now
+        wall = time.time()
+        for _ in range(int(offered) - sent):
+            index = sent % len(records)
+            record = records[index]
+            record.timestamp = wall
+            if record.src_port is not None:
+                # Nowe porty źródłowe w każdym cyklu puli - przepływy powstają i wygasają
+                record.src_port = (ports[index] + sent // len(records)) % 65536
+            monitor._buffer_packet(record, analyzer.analyze_batch)
+            sent += 1
+        await asyncio.sleep(0.002)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--rate", type=float, default=5000.0, help="packets/s outside bursts")
+    parser.add_argument("--burst-every", type=float, default=300.0, help="seconds between bursts (0 = none)")
+    parser.add_argument("--burst-seconds", type=float, default=30.0)
+    parser.add_argument("--burst-factor", type=float, default=10.0)
+    parser.add_argument("--budget-mb", type=float, default=48.0, help="memory budget (0 = accounting only)")
+    parser.add_argument("--handler-ms", type=float, default=20.0, help="delay of the slow alert handler")
+    parser.add_argument("--pool", type=int, default=100_000, help="distinct synthetic packets per cycle")
+    parser.add_argument("--rules", default="config/rules.json")
+    parser.add_argument("--sample-seconds", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=0.1, help="fraction of the run excluded from the trend")
+    parser.add_argument("--output", help="CSV with all samples")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    samples = asyncio.run(soak(args))
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(samples[0]))
+            writer.writeheader()
+            writer.writerows(samples)
+    steady = [row for row in samples if row["seconds"] >= args.warmup * args.hours * 3600]
+    if len(steady) < 2:
+        print("run too short for a trend")
+        return
+    seconds = np.array([row["seconds"] for row in steady])
+    rss = np.array([row["rss_mib"] for row in steady])
+    slope = np.polyfit(seconds / 3600, rss, 1)[0]
+    print(f"packets: {samples[-1]['packets']:,}, dropped {samples[-1]['dropped']:,}, shed {samples[-1]['shed']:,}")
+    print(f"RSS after warm-up: {rss.min():.1f} - {rss.max():.1f} MiB, trend {slope:+.2f} MiB/h "
+          f"(peak tracked {max(row['tracked_mib'] for row in samples):.1f} MiB, budget {args.budget_mb:g} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# 📄 Plik: benchmarks/bench_overload.py
+"""Zalew pakietów ponad możliwości analizy: z kontrolerem przeciążenia i bez
+
+Uruchomienie: python -m benchmarks.bench_overload [--packets 200000] [--rate 2.0]
+
+Producent wstawia pakiety (mieszanka "mixed" z ``benchmarks.traffic`` z
+domieszką dużych pakietów ICMP, które dopasowują regułę HIGH) do bufora
+``NetworkMonitor`` ``--rate`` razy szybciej, niż analiza nadąża. Mierzymy
+odrzucone pakiety i ile alertów HIGH przetrwało zalew.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from benchmarks.traffic import build_frame, traffic_mix
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.AlertCoordinator import AlertPriority
+from core.flows import FlowTable
+from core.inference import InferenceExecutor
+from core.overload import OverloadController
+from network.capture import parse_frame
+from network.monitoring import NetworkMonitor
+from tests.conftest import RecordingCoordinator
+
+
+def make_records(count: int):
+    frames = traffic_mix("mixed", count)
+    icmp = build_frame("10.66.0.1", "192.168.0.1", 1, payload=1200)
+    # co 100. pakiet to duży ICMP (reguła "Large ICMP Packet", HIGH)
+    return [parse_frame(memoryview(icmp if i % 100 == 0 else frame), timestamp=ts)
+            for i, (frame, ts) in enumerate(frames)]
+
+
+async def consumer_rate(records) -> float:
+    monitor = make_analyzer(None)
+    start = time.perf_counter()
+    for record in records[:20_000]:
+        await monitor.analyze_packet(record)
+    return min(len(records), 20_000) / (time.perf_counter() - start)
+
+
+def make_analyzer(overload):
+    return AdvancedTrafficMonitor(
+        None, RecordingCoordinator(), "config/rules.json", "unused.onnx", None,
+        inference=InferenceExecutor("unused.onnx"), ai_enabled=False,
+        flow_table=FlowTable(idle_timeout=3600, active_timeout=3600), overload=overload
+    )
+
+
+async def flood(records, pps: float, controlled: bool):
+    overload = OverloadController() if controlled else None
+    analyzer = make_analyzer(overload)
+    monitor = NetworkMonitor(interface="bench", buffer_size=10_000, instrument=False, overload=overload)
+    consumer = asyncio.create_task(monitor._process_buffer())
+    # Producent nadrabia tyle pakietów, ile przy zadanym tempie przypada na czas,
+    # w którym pętla była zajęta analizą (jak wątek przechwytywania z NIC)
+    start = time.perf_counter()
+    sent = 0
+    while sent < len(records):
+        due = min(len(records), int((time.perf_counter() - start) * pps) + 1)
+        for record in records[sent:due]:
+            monitor._buffer_packet(record, analyzer.analyze_packet)
+        sent = due
+        await asyncio.sleep(0)
+    await monitor._packet_buffer.join()
+    consumer.cancel()
+    high = sum(1 for _, _, priority, _ in analyzer.alert_coordinator.alerts if priority >= AlertPriority.HIGH)
+    return monitor.dropped, high, overload
+
+
+async def run(count: int, rate: float) -> None:
+    logging.disable(logging.WARNING)
+    records = make_records(count)
+    capacity = await consumer_rate(records)
+    expected_high = sum(1 for r in records if r.protocol == "ICMP" and r.length > 1000)
+    print(f"analysis capacity ~{capacity:,.0f} pkt/s, offered {capacity * rate:,.0f} pkt/s, "
+          f"{expected_high} HIGH packets")
+    print(f"{'controller':>11} {'dropped':>9} {'HIGH alerts':>12} {'level':>13} {'sampled out':>12}")
+    for controlled in (False, True):
+        dropped, high, overload = await flood(records, capacity * rate, controlled)
+        level = overload.level.name.lower() if overload else "-"
+        sampled = f"{overload.sampled_out:,}" if overload else "-"
+        print(f"{'on' if controlled else 'off':>11} {dropped:>9,} {high:>12,} {level:>13} {sampled:>12}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=200_000)
+    parser.add_argument("--rate", type=float, default=2.0, help="offered load as a multiple of capacity")
+    args = parser.parse_args()
+    asyncio.run(run(args.packets, args.rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# 📄 Plik: benchmarks/bench_reload.py
+"""Podmiana reguł w trakcie przetwarzania ruchu (core.hot_reload)
+
+Uruchomienie: python -m benchmarks.bench_reload [--packets 200000] [--rules 200] [--reloads 20]
+
+Rekordy z ``benchmarks.traffic`` (mieszanka "mixed") płyną przez
+``NetworkMonitor`` w trybie paczkowym, a równolegle ``HotReloader`` co
+kilka milisekund podmienia zestaw ``--rules`` wygenerowanych reguł. Wynik:
+czas kompilacji w tle, czas samej podmiany w pętli, przepustowość i straty
+w porównaniu z przebiegiem bez przeładowań.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_batch import make_analyzer
+from benchmarks.bench_rules import make_rules
+from benchmarks.traffic import traffic_mix
+from core.hot_reload import HotReloader
+from network.capture import parse_frame
+from network.monitoring import NetworkMonitor
+
+
+async def pipeline(records, rules_path: str, rule_count: int, reloads: int):
+    analyzer = make_analyzer(rules_path)
+    reloader = HotReloader(rules_path, [analyzer])
+    monitor = NetworkMonitor(interface="bench", buffer_size=len(records), batch_size=256, batch_wait_us=0)
+    consumer = asyncio.create_task(monitor._process_batches())
+
+    async def reload_loop():
+        for i in range(reloads):
+            await reloader.reload_rules(make_rules(rule_count + i % 2))
+            await asyncio.sleep(0.005)
+
+    start = time.perf_counter()
+    reloading = asyncio.create_task(reload_loop())
+    for i, record in enumerate(records):
+        monitor._buffer_packet(record, analyzer.analyze_batch)
+        if i % 1024 == 0:
+            await asyncio.sleep(0)  # oddaj pętlę analizie i przeładowaniom, jak wątek przechwytywania
+    await monitor._packet_buffer.join()
+    elapsed = time.perf_counter() - start
+    await reloading
+    consumer.cancel()
+    return len(records) / elapsed, monitor.dropped, reloader
+
+
+async def run(count: int, rule_count: int, reloads: int) -> None:
+    logging.disable(logging.WARNING)
+    records = [parse_frame(memoryview(frame), timestamp=ts) for frame, ts in traffic_mix("mixed", count)]
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_path = str(Path(tmp) / "rules.json")
+        Path(rules_path).write_text(json.dumps(make_rules(rule_count)))
+        print(f"{'reloads':>8} {'pkt/s':>12} {'dropped':>8} {'build p50 ms':>13} {'swap p99 µs':>12} {'version':>8}")
+        for n in (0, reloads):
+            pps, dropped, reloader = await pipeline(records, rules_path, rule_count, n)
+            build = reloader.build_latency.quantile(0.5) * 1000 if n else 0.0
+            swap = reloader.swap_latency.quantile(0.99) * 1e6 if n else 0.0
+            print(f"{n:>8} {pps:>12,.0f} {dropped:>8,} {build:>13.2f} {swap:>12.1f} {reloader.rules_version:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=200_000)
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--reloads", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.packets, args.rules, args.reloads))
+
+
+if __name__ == "__main__":
+    main()
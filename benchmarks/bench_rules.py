@@ -0,0 +1,88 @@
+# 📄 Plik: benchmarks/bench_rules.py
+"""Mikrobenchmark: simpleeval per pakiet i regułę vs skompilowany RuleSet
+
+Ścieżka bazowa używa EvalWithCompoundTypes, bo zwykłe simple_eval nie obsługuje
+literałów list (``pkt['dst_port'] in [4444, 6667]``) i kończy się wyjątkiem.
+
+Uruchomienie: python -m benchmarks.bench_rules [--packets 2000]
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from simpleeval import EvalWithCompoundTypes
+
+from core.rules import RuleSet
+
+PROTOCOLS = ["TCP", "UDP", "ICMP"]
+
+
+def make_rules(count: int) -> List[Dict[str, Any]]:
+    """Generuj mieszankę reguł: porty, protokoły i progi rozmiaru"""
+    rules = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            condition = f"pkt['dst_port'] in [{1024 + i}, {20000 + i}]"
+        elif kind == 1:
+            condition = f"pkt['protocol'] == '{PROTOCOLS[i % 3]}' and pkt['packet_size'] > {1000 + i}"
+        else:
+            condition = f"pkt['packet_size'] > {1400 + i % 100} and pkt['dst_port'] == {30000 + i}"
+        rules.append({"name": f"rule-{i}", "condition": condition, "priority": "LOW", "type": "INFO"})
+    return rules
+
+
+def make_packets(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    return [
+        {
+            "src_ip": f"10.0.{rnd.randrange(256)}.{rnd.randrange(256)}",
+            "dst_ip": "192.168.1.10",
+            "protocol": rnd.choice(PROTOCOLS),
+            "packet_size": rnd.randrange(60, 1500),
+            "dst_port": rnd.randrange(1, 40000),
+        }
+        for _ in range(count)
+    ]
+
+
+def bench_simple_eval(rules: List[Dict[str, Any]], packets: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    for pkt in packets:
+        for rule in rules:
+            try:
+                EvalWithCompoundTypes(names={"pkt": pkt}).eval(rule["condition"])
+            except Exception:
+                pass
+    return time.perf_counter() - start
+
+
+def bench_rule_set(rules: List[Dict[str, Any]], packets: List[Dict[str, Any]]) -> float:
+    rule_set = RuleSet.from_rules(rules)
+    start = time.perf_counter()
+    for pkt in packets:
+        rule_set.match(pkt)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=2000)
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'rules':>6} {'simpleeval pkt/s':>18} {'RuleSet pkt/s':>15} {'speedup':>8}")
+    for count in args.rules:
+        rules = make_rules(count)
+        # simple_eval przy 1000 regułach jest bardzo wolny - ogranicz próbkę
+        packets = make_packets(max(50, args.packets * 10 // count))
+        baseline = bench_simple_eval(rules, packets)
+        compiled = bench_rule_set(rules, make_packets(args.packets))
+        baseline_pps = len(packets) / baseline
+        compiled_pps = args.packets / compiled
+        print(f"{count:>6} {baseline_pps:>18,.0f} {compiled_pps:>15,.0f} {compiled_pps / baseline_pps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# 📄 Plik: benchmarks/bench_sharding.py
+"""Skalowanie analizy wieloprocesowej: 1..N procesów na odtwarzanym pcap
+
+Uruchomienie: python -m benchmarks.bench_sharding [--packets 200000] [--workers 1 2 4]
+
+Domyślnie pola pakietów są wyodrębniane przed pomiarem (mierzy część
+roboczą); ``--scapy`` wlicza dysekcję Scapy w procesie głównym.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from scapy.utils import rdpcap
+
+from benchmarks.bench_rules import make_rules
+from benchmarks.traffic import write_synthetic_pcap
+from core.AdvancedTrafficMonitor import extract_packet_fields
+from core.sharding import ShardConfig, ShardedTrafficMonitor
+from tests.conftest import CountingCoordinator
+
+
+async def wait_processed(monitor: ShardedTrafficMonitor, target: int) -> None:
+    while monitor.processed < target:
+        await asyncio.sleep(0.005)
+
+
+async def run(workers: int, packets, rules_path: str, scapy: bool) -> float:
+    coordinator = CountingCoordinator()
+    monitor = ShardedTrafficMonitor(coordinator, ShardConfig(rules_path=rules_path), workers=workers)
+    monitor.start()
+    results = asyncio.create_task(monitor.process_results())
+    try:
+        # Rozgrzewka: procesy spawn importują moduły przed pierwszą paczką
+        for pkt in packets[:workers * 64]:
+            monitor.route(extract_packet_fields(pkt) if scapy else pkt)
+        monitor.flush()
+        await wait_processed(monitor, monitor.sent)
+
+        start = time.perf_counter()
+        target = monitor.sent + len(packets)
+        for i, pkt in enumerate(packets):
+            if scapy:
+                await monitor.analyze_packet(pkt)
+            else:
+                monitor.route(pkt)
+            if i % monitor.batch_size == 0:
+                await asyncio.sleep(0)
+        monitor.flush()
+        await wait_processed(monitor, target - monitor.dropped)
+        return len(packets) / (time.perf_counter() - start)
+    finally:
+        results.cancel()
+        monitor.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=100_000)
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 4])
+    parser.add_argument("--scapy", action="store_true", help="include Scapy dissection in the parent")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_path = os.path.join(tmp, "rules.json")
+        with open(rules_path, "w") as f:
+            json.dump(make_rules(args.rules), f)
+        pcap = write_synthetic_pcap(os.path.join(tmp, "synthetic.pcap"), args.packets)
+        packets = list(rdpcap(pcap))
+        if not args.scapy:
+            packets = [extract_packet_fields(pkt) for pkt in packets]
+
+        print(f"{'workers':>7} {'pkt/s':>12} {'scaling':>8}")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            pps = asyncio.run(run(workers, packets, rules_path, args.scapy))
+            baseline = baseline or pps
+            print(f"{workers:>7} {pps:>12,.0f} {pps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# 📄 Plik: benchmarks/bench_verdict_cache.py
+"""Inferencje AI oszczędzone przez pamięć wyników (core.verdict_cache)
+
+Uruchomienie: python -m benchmarks.bench_verdict_cache [--packets 200000] [--batch 64] [--model PATH]
+
+Rekordy z ``benchmarks.traffic`` przechodzą przez
+``AdvancedTrafficMonitor._analyze_ai_batch`` paczkami po ``--batch`` (jak z
+mikro-batchera AI), raz bez pamięci i raz z ``VerdictCache``. Bez ``--model``
+sesja ONNX jest symulowana: ``--call-us`` na wywołanie plus ``--row-us`` na
+wiersz, wynik zależny od cech.
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from benchmarks.traffic import TRAFFIC_MIXES, traffic_mix
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor, extract_packet_fields
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.inference import InferenceExecutor
+from core.verdict_cache import VerdictCache
+from network.capture import parse_frame
+from tests.conftest import CountingCoordinator
+
+
+class SimulatedSession:
+    def __init__(self, call_us: float, row_us: float):
+        self.call_us = call_us
+        self.row_us = row_us
+
+    def run(self, output_names, feeds):
+        features = feeds["input"]
+        deadline = time.perf_counter() + (self.call_us + self.row_us * len(features)) / 1e6
+        while time.perf_counter() < deadline:
+            pass
+        return [(features.sum(axis=1, keepdims=True) % 1).astype(np.float32)]
+
+
+def make_monitor(args, cache: bool) -> AdvancedTrafficMonitor:
+    if args.model:
+        analyzer = AIThreatAnalyzer(args.model, 1)
+    else:
+        analyzer = AIThreatAnalyzer.__new__(AIThreatAnalyzer)
+        analyzer.session = SimulatedSession(args.call_us, args.row_us)
+    inference = InferenceExecutor(args.model or "unused.onnx", mode="inline", analyzer=analyzer,
+                                  cache=VerdictCache(args.cache_size, args.ttl) if cache else None)
+    return AdvancedTrafficMonitor(None, CountingCoordinator(), "config/rules.json", "unused.onnx", None,
+                                  inference=inference)
+
+
+async def run_mix(rows, args, cache: bool):
+    monitor = make_monitor(args, cache)
+    start = time.perf_counter()
+    for i in range(0, len(rows), args.batch):
+        await monitor._analyze_ai_batch(rows[i:i + args.batch])
+    elapsed = time.perf_counter() - start
+    return len(rows) / elapsed, monitor.inference, monitor.alert_coordinator.alerts
+
+
+async def run(args) -> None:
+    logging.disable(logging.WARNING)
+    print(f"{'mix':>12} {'cache':>6} {'pkt/s':>11} {'model rows':>11} {'avoided':>8} {'calls':>7} {'alerts':>8}")
+    for mix in TRAFFIC_MIXES:
+        rows = [extract_packet_fields(parse_frame(memoryview(frame), timestamp=ts))
+                for frame, ts in traffic_mix(mix, args.packets)]
+        results = {}
+        for cache in (False, True):
+            pps, inference, alerts = await run_mix(rows, args, cache)
+            results[cache] = alerts
+            avoided = 1 - inference.inferred / len(rows)
+            print(f"{mix:>12} {'on' if cache else 'off':>6} {pps:>11,.0f} {inference.inferred:>11,} "
+                  f"{avoided:>8.1%} {inference.batches:>7,} {alerts:>8,}")
+        assert results[True] == results[False]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--model", default=None, help="ONNX model (default: simulated session)")
+    parser.add_argument("--call-us", type=float, default=100.0)
+    parser.add_argument("--row-us", type=float, default=2.0)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument("--ttl", type=float, default=300.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# 📄 Plik: benchmarks/bench_windows.py
+"""Koszt pakietu w agregatach okien w funkcji liczby kluczy
+
+Uruchomienie: python -m benchmarks.bench_windows [--packets 200000]
+
+Dla każdego typu okna i rosnącej liczby różnych ``src_ip`` mierzy czas
+``observe`` na pakiet oraz pamięć agregatu - oba powinny być stałe
+(``distinct`` rośnie do limitu ``max_keys``, potem też jest stały).
+"""
+import argparse
+import random
+import time
+
+from core.windows import WINDOW_CLASSES, WindowSpec
+
+SPECS = {
+    "rate": WindowSpec(type="rate", key="src_ip", seconds=10, threshold=500),
+    "distinct": WindowSpec(type="distinct", key="src_ip", field="dst_port", seconds=60, threshold=100,
+                           buckets=6, max_keys=100_000),
+    "top_k": WindowSpec(type="top_k", key="src_ip", seconds=60, threshold=10_000, weight="packet_size"),
+}
+
+
+def make_packets(count: int, keys: int, seed: int = 0):
+    rnd = random.Random(seed)
+    return [
+        {
+            'src_ip': f"10.{(k >> 16) & 0xff}.{(k >> 8) & 0xff}.{k & 0xff}",
+            'dst_port': rnd.randrange(1, 65536),
+            'packet_size': rnd.randrange(60, 1500),
+            'timestamp': i * 1e-4,
+        }
+        for i, k in enumerate(rnd.randrange(keys) for _ in range(count))
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--packets", type=int, default=200_000)
+    parser.add_argument("--keys", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'window':>9} {'keys':>10} {'ns/pkt':>10} {'memory MiB':>11}")
+    for keys in args.keys:
+        packets = make_packets(args.packets, keys)
+        for name, spec in SPECS.items():
+            window = WINDOW_CLASSES[name](spec)
+            observe = window.observe
+            start = time.perf_counter()
+            for pkt in packets:
+                observe(pkt, pkt['timestamp'])
+            elapsed = time.perf_counter() - start
+            print(f"{name:>9} {keys:>10,} {elapsed / len(packets) * 1e9:>10,.0f} "
+                  f"{window.memory_bytes() / 2**20:>11,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+# 📄 Plik: benchmarks/suite.py
+"""Powtarzalny benchmark etapów i całego potoku na syntetycznym ruchu
+
+Uruchomienie:
+  python -m benchmarks.suite [--packets 50000] [--mixes mixed port_scan] [--stages parse rules]
+                             [--output wyniki.json] [--baseline baseline.json] [--save-baseline baseline.json]
+
+Każda para (mieszanka ruchu, etap) działa w osobnym procesie (spawn), więc
+szczytowe RSS dotyczy tylko tego etapu. Etap jest uruchamiany dwa razy na
+świeżym stanie: przebieg bez pomiaru czasu daje pakiety/s, przebieg z
+``LatencyHistogram`` na element daje p50/p99 (narzut pomiaru nie zaniża
+przepustowości). Etapy:
+
+  - ``parse``     - ``parse_frame`` surowej ramki do słownika pól,
+  - ``rules``     - aktualizacja ``FlowTable`` i ``RuleSet.match``,
+  - ``inference`` - ``InferenceExecutor`` w paczkach po ``--ai-batch-size``
+                    (model z ``--model`` albo deterministyczna atrapa sesji;
+                    p50/p99 dotyczą całej paczki),
+  - ``alerts``    - ``AlertCoordinator.add_alert`` dla każdego pakietu i rozesłanie do pustego handlera,
+  - ``export``    - ``BulkElasticsearchExporter`` z atrapą klienta ES,
+  - ``pipeline``  - parsowanie + ``AdvancedTrafficMonitor`` + alerty + eksport.
+
+Tryb porównania (``--baseline``) oznacza regresje przekraczające tolerancje
+z ``TOLERANCES`` i kończy się kodem wyjścia 1.
+
+``--cold-start`` dodaje pomiar zimnego startu: ``main.py`` w świeżym
+interpreterze odtwarza krótki pcap (bez Elasticsearch, dashboardu i AI), a
+``startup_ms`` to mediana czasu od startu procesu do uruchomienia
+przechwytywania. Przekroczenie ``--cold-start-target-ms`` też jest regresją.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.traffic import TRAFFIC_MIXES, traffic_mix
+from core.metrics import LatencyHistogram
+
+STAGES = ("parse", "rules", "inference", "alerts", "export", "pipeline")
+DEFAULT_RULES = "config/rules.json"
+
+# Dopuszczalne pogorszenie względem bazy (ułamek); p99 jest z natury bardziej zaszumione
+TOLERANCES = {"packets_per_sec": 0.10, "p99_us": 0.25, "peak_rss_mb": 0.10, "startup_ms": 0.25}
+# Docelowy czas od startu procesu do uruchomienia przechwytywania
+COLD_START_TARGET_MS = 500.0
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubSession:
+    """Deterministyczna atrapa sesji ONNX: sigmoida z liniowej kombinacji cech"""
+    _weights = np.array([[0.8], [4.0], [-1.5]], dtype=np.float32)
+
+    def run(self, output_names, feeds):
+        return [1 / (1 + np.exp(-(feeds["input"] @ self._weights - 2.0)))]
+
+
+class StubElasticsearch:
+    """Atrapa AsyncElasticsearch: potwierdza każdy dokument bez wysyłki"""
+
+    async def bulk(self, operations: str, index: str) -> Dict[str, Any]:
+        return {"errors": False, "items": [{"index": {"status": 201}}] * (operations.count("\n") // 2)}
+
+    async def close(self) -> None:
+        pass
+
+
+# Etap: (elementy, liczba pakietów, krok, zakończenie)
+Step = Callable[[Any], Optional[Awaitable[Any]]]
+Stage = Tuple[List[Any], int, Step, Optional[Callable[[], Awaitable[None]]]]
+
+
+def _parsed(frames) -> List[Dict[str, Any]]:
+    from network.capture import parse_frame
+    return [parse_frame(memoryview(frame), len(frame), ts).to_dict() for frame, ts in frames]
+
+
+def _make_inference(options: Dict[str, Any]):
+    from core.AIThreatAnalyzer import AIThreatAnalyzer
+    from core.inference import InferenceExecutor
+    analyzer = None
+    if not options.get("model"):
+        analyzer = AIThreatAnalyzer.__new__(AIThreatAnalyzer)
+        analyzer.session = StubSession()
+    return InferenceExecutor(options.get("model") or "stub.onnx", mode="inline", analyzer=analyzer)
+
+
+def _load_rules(options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    with open(options.get("rules") or DEFAULT_RULES) as f:
+        return json.load(f)
+
+
+async def _stage_parse(frames, options) -> Stage:
+    from network.capture import parse_frame
+
+    def step(item):
+        frame, ts = item
+        parse_frame(memoryview(frame), len(frame), ts).to_dict()
+    return frames, len(frames), step, None
+
+
+async def _stage_rules(frames, options) -> Stage:
+    from core.flows import FlowTable
+    from core.rules import RuleSet
+    rule_set = RuleSet.from_rules(_load_rules(options))
+    flow_table = FlowTable(max_flows=len(frames), idle_timeout=3600, active_timeout=3600)
+
+    def step(pkt):
+        slot = flow_table.update(pkt)
+        rule_set.match(pkt, flow_table.view(slot) if rule_set.needs_flow else None)
+    return _parsed(frames), len(frames), step, None
+
+
+async def _stage_inference(frames, options) -> Stage:
+    from core.AIThreatAnalyzer import PROTOCOL_CODES
+    executor = _make_inference(options)
+    size = options["ai_batch_size"]
+    samples = [(pkt["src_ip"], pkt["dst_port"], PROTOCOL_CODES.get(pkt["protocol"], 3)) for pkt in _parsed(frames)]
+    batches = [samples[i:i + size] for i in range(0, len(samples), size)]
+    return batches, len(samples), executor.predict_batch, None
+
+
+async def _stage_alerts(frames, options) -> Stage:
+    from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertType
+    coordinator = AlertCoordinator(max_queue_size=10_000)
+    coordinator.register_handler(lambda alert: None, name="null", max_queue=10_000)
+    task = asyncio.create_task(coordinator.process_alerts())
+
+    def step(pkt):
+        return coordinator.add_alert(AlertType.WARNING, "benchmark", AlertPriority.MEDIUM, pkt)
+
+    async def finish():
+        await coordinator.join()
+        task.cancel()
+        await coordinator.close()
+    return _parsed(frames), len(frames), step, finish
+
+
+async def _stage_export(frames, options) -> Stage:
+    from core.exporters import BulkElasticsearchExporter
+    exporter = BulkElasticsearchExporter([], client=StubElasticsearch(), spill_dir=options["spill_dir"])
+    return _parsed(frames), len(frames), exporter.export_alert, exporter.close
+
+
+async def _stage_pipeline(frames, options) -> Stage:
+    from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+    from core.AlertCoordinator import AlertCoordinator
+    from core.exporters import BulkElasticsearchExporter
+    from core.flows import FlowTable
+    from network.capture import parse_frame
+    coordinator = AlertCoordinator(max_queue_size=10_000)
+    exporter = BulkElasticsearchExporter([], client=StubElasticsearch(), spill_dir=options["spill_dir"])
+    coordinator.register_handler(exporter.handle_alert, name="elasticsearch", max_queue=10_000)
+    monitor = AdvancedTrafficMonitor(
+        None, coordinator, options.get("rules") or DEFAULT_RULES, "stub.onnx", exporter,
+        ai_batch_size=options["ai_batch_size"], inference=_make_inference(options),
+        flow_table=FlowTable(max_flows=len(frames), idle_timeout=3600, active_timeout=3600)
+    )
+    tasks = [asyncio.create_task(coordinator.process_alerts()), asyncio.create_task(monitor.process_inference())]
+
+    def step(item):
+        frame, ts = item
+        return monitor.analyze_fields(parse_frame(memoryview(frame), len(frame), ts).to_dict())
+
+    async def finish():
+        await monitor.ai_batcher.drain()
+        await coordinator.join()
+        for task in tasks:
+            task.cancel()
+        await coordinator.close()
+        await exporter.close()
+    return frames, len(frames), step, finish
+
+
+STAGE_BUILDERS = {
+    "parse": _stage_parse,
+    "rules": _stage_rules,
+    "inference": _stage_inference,
+    "alerts": _stage_alerts,
+    "export": _stage_export,
+    "pipeline": _stage_pipeline,
+}
+
+
+async def _drive(stage: str, frames, options, histogram: Optional[LatencyHistogram]) -> Tuple[int, float]:
+    """Przepuść wszystkie elementy przez etap; zwraca (pakiety, sekundy)"""
+    items, packets, step, finish = await STAGE_BUILDERS[stage](frames, options)
+    clock = time.perf_counter
+    start = clock()
+    for i, item in enumerate(items):
+        if not i & 255:
+            # Oddaj pętlę, żeby zadania w tle (alerty, inferencja) nadążały
+            await asyncio.sleep(0)
+        if histogram is not None:
+            started = clock()
+        result = step(item)
+        if result is not None:
+            await result
+        if histogram is not None:
+            histogram.record(clock() - started)
+    if finish is not None:
+        await finish()
+    return packets, clock() - start
+
+
+def run_stage(stage: str, mix: str, packets: int, seed: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Uruchom jeden etap na jednej mieszance (w bieżącym procesie)"""
+    frames = traffic_mix(mix, packets, seed)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        options = {**options, "spill_dir": spill_dir}
+        count, elapsed = asyncio.run(_drive(stage, frames, options, None))
+        histogram = LatencyHistogram()
+        asyncio.run(_drive(stage, frames, options, histogram))
+    # ru_maxrss: KiB na Linuksie, bajty na macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "mix": mix,
+        "stage": stage,
+        "packets": count,
+        "packets_per_sec": count / elapsed if elapsed else 0.0,
+        "p50_us": histogram.quantile(0.5) * 1e6,
+        "p99_us": histogram.quantile(0.99) * 1e6,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def run_suite(mixes: List[str], stages: List[str], packets: int, seed: int = 1,
+              options: Optional[Dict[str, Any]] = None, isolate: bool = True) -> Dict[str, Any]:
+    options = {"ai_batch_size": 64, **(options or {})}
+    results = []
+    for mix in mixes:
+        for stage in stages:
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+                    result = pool.submit(run_stage, stage, mix, packets, seed, options).result()
+            else:
+                result = run_stage(stage, mix, packets, seed, options)
+            results.append(result)
+            print(f"{mix:>12} {stage:>10} {result['packets_per_sec']:>12,.0f} {result['p50_us']:>9.1f} "
+                  f"{result['p99_us']:>9.1f} {result['peak_rss_mb']:>8.1f}", file=sys.stderr)
+    return {
+        "meta": {
+            "packets": packets,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": options.get("model") or "stub",
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def measure_cold_start(repeat: int = 3, packets: int = 100) -> Dict[str, Any]:
+    """Mediana etapów startu ``main.py`` z ``repeat`` uruchomień w świeżych interpreterach"""
+    from benchmarks.traffic import write_synthetic_pcap
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "config"))
+        config = ConfigParser()
+        config.read(os.path.join(ROOT, "config", "config.ini"))
+        overrides = {
+            "general": {"startup_report": os.path.join(tmp, "startup.json")},
+            "api": {"host": "127.0.0.1", "port": "0"},
+            "network": {"source": "pcap", "pcap_path": write_synthetic_pcap(os.path.join(tmp, "cold.pcap"), packets)},
+            "export": {"elasticsearch_enabled": "false"},
+            "dashboard": {"enabled": "false"},
+            "alert_store": {"path": os.path.join(tmp, "alerts.db")},
+            "ai": {"enabled": "false"},
+        }
+        for section, values in overrides.items():
+            if not config.has_section(section):
+                config.add_section(section)
+            config[section].update(values)
+        with open(os.path.join(tmp, "config", "config.ini"), "w") as f:
+            config.write(f)
+        with open(os.path.join(ROOT, "config", "rules.json")) as src, \
+                open(os.path.join(tmp, "config", "rules.json"), "w") as dst:
+            dst.write(src.read())
+
+        runs = []
+        env = {**os.environ, "PYTHONPATH": ROOT, "PYTHONDONTWRITEBYTECODE": "1"}
+        for _ in range(repeat):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(ROOT, "main.py")], cwd=tmp, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120)
+            with open(os.path.join(tmp, "startup.json")) as f:
+                runs.append({**json.load(f), "wall": (time.perf_counter() - started) * 1000})
+            os.unlink(os.path.join(tmp, "startup.json"))
+
+    def median(key: str) -> float:
+        return float(np.median([run.get(key, 0.0) for run in runs]))
+
+    return {
+        "mix": "-",
+        "stage": "cold_start",
+        "packets": packets,
+        "startup_ms": median("capture"),
+        "imports_ms": median("imports"),
+        "api_ms": median("api"),
+        "wall_ms": median("wall"),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            tolerances: Optional[Dict[str, float]] = None) -> List[str]:
+    """Lista regresji względem bazy (pusta, gdy brak)
+
+    Porównywane są tylko pary (mieszanka, etap) obecne w obu wynikach.
+    """
+    tolerances = {**TOLERANCES, **(tolerances or {})}
+    previous = {(r["mix"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        base = previous.get((result["mix"], result["stage"]))
+        if base is None:
+            continue
+        name = f"{result['mix']}/{result['stage']}"
+        for metric, tolerance in tolerances.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            # Przepustowość: mniej = gorzej; opóźnienie i pamięć: więcej = gorzej
+            change = (old - new) / old if metric == "packets_per_sec" else (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{name} {metric}: {old:,.1f} -> {new:,.1f} ({change:+.0%} worse, "
+                                   f"tolerance {tolerance:.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mixes", nargs="+", choices=TRAFFIC_MIXES, default=list(TRAFFIC_MIXES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--rules", default=DEFAULT_RULES)
+    parser.add_argument("--model", help="ONNX model for the inference stages (default: stub session)")
+    parser.add_argument("--ai-batch-size", type=int, default=64)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against a saved results JSON")
+    parser.add_argument("--save-baseline", help="also write results JSON as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCES["packets_per_sec"],
+                        help="allowed throughput drop before flagging a regression")
+    parser.add_argument("--no-isolate", action="store_true", help="run all stages in this process")
+    parser.add_argument("--cold-start", action="store_true", help="also measure main.py cold start")
+    parser.add_argument("--cold-start-target-ms", type=float, default=COLD_START_TARGET_MS)
+    args = parser.parse_args()
+
+    print(f"{'mix':>12} {'stage':>10} {'pkt/s':>12} {'p50 µs':>9} {'p99 µs':>9} {'RSS MB':>8}", file=sys.stderr)
+    results = run_suite(args.mixes, args.stages, args.packets, args.seed,
+                        {"rules": args.rules, "model": args.model, "ai_batch_size": args.ai_batch_size},
+                        isolate=not args.no_isolate)
+    regressions = []
+    if args.cold_start:
+        cold = measure_cold_start()
+        results["results"].append(cold)
+        print(f"cold start: capture {cold['startup_ms']:.0f} ms (target {args.cold_start_target_ms:.0f} ms), "
+              f"imports {cold['imports_ms']:.0f} ms, API {cold['api_ms']:.0f} ms", file=sys.stderr)
+        if cold["startup_ms"] > args.cold_start_target_ms:
+            regressions.append(f"cold start {cold['startup_ms']:.0f} ms exceeds target "
+                               f"{args.cold_start_target_ms:.0f} ms")
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions += compare(results, json.load(f), {"packets_per_sec": args.tolerance})
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+    if args.baseline:
+        print("No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# 📄 Plik: benchmarks/traffic.py
+"""Syntetyczny ruch do benchmarków
+
+``synthetic_packets`` buduje pakiety Scapy (do zapisu pcap), ``traffic_mix``
+składa surowe ramki Ethernet/IPv4 bezpośrednio przez ``struct`` - wielokrotnie
+szybciej, więc nadaje się do generowania setek tysięcy pakietów w pamięci.
+"""
+import random
+import socket
+import struct
+from typing import Iterator, List, Tuple
+
+from scapy.layers.inet import ICMP, IP, TCP, UDP
+from scapy.layers.l2 import Ether
+from scapy.packet import Packet
+from scapy.utils import wrpcap
+
+
+def synthetic_packets(count: int, flows: int = 1000, seed: int = 1) -> List[Packet]:
+    """Mieszanka TCP/UDP/ICMP rozłożona na ``flows`` przepływów, oba kierunki"""
+    rnd = random.Random(seed)
+    endpoints = [
+        (f"10.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(1, 255)}",
+         f"192.168.{rnd.randrange(256)}.{rnd.randrange(1, 255)}",
+         rnd.randrange(1024, 65535),
+         rnd.choice([22, 53, 80, 443, 4444, 6667, 8080]),
+         rnd.choice(["TCP", "TCP", "UDP", "ICMP"]))
+        for _ in range(flows)
+    ]
+    packets = []
+    for i in range(count):
+        src, dst, sport, dport, proto = endpoints[rnd.randrange(flows)]
+        if rnd.random() < 0.5:
+            src, dst, sport, dport = dst, src, dport, sport
+        size = rnd.choice([0, 64, 512, 1200])
+        if proto == "TCP":
+            l4 = TCP(sport=sport, dport=dport, flags="A")
+        elif proto == "UDP":
+            l4 = UDP(sport=sport, dport=dport)
+        else:
+            l4 = ICMP()
+        pkt = Ether() / IP(src=src, dst=dst) / l4 / (b"x" * size)
+        pkt.time = 1_700_000_000 + i * 0.0001
+        packets.append(pkt)
+    return packets
+
+
+def write_synthetic_pcap(path: str, count: int, flows: int = 1000, seed: int = 1) -> str:
+    wrpcap(path, synthetic_packets(count, flows, seed))
+    return path
+
+
+TRAFFIC_MIXES = ("small_flows", "elephants", "port_scan", "icmp_flood", "mixed")
+
+# (src, dst, proto, sport, dport, tcp_flags, payload)
+Header = Tuple[str, str, int, int, int, int, int]
+
+_ETHER = bytes(6) + bytes.fromhex("020000000001") + b"\x08\x00"
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+_TCP = struct.Struct("!HHIIBBHHH")
+_UDP = struct.Struct("!HHHH")
+_ICMP = struct.Struct("!BBHHH")
+SYN, ACK = 0x02, 0x10
+
+
+def build_frame(src: str, dst: str, proto: int, sport: int = 0, dport: int = 0,
+                flags: int = ACK, payload: int = 0) -> bytes:
+    """Ramka Ethernet/IPv4 z nagłówkiem TCP/UDP/ICMP (sumy kontrolne zerowe)"""
+    if proto == 6:
+        l4 = _TCP.pack(sport, dport, 0, 0, 5 << 4, flags, 65535, 0, 0)
+    elif proto == 17:
+        l4 = _UDP.pack(sport, dport, 8 + payload, 0)
+    else:
+        l4 = _ICMP.pack(8, 0, 0, 0, 0)
+    total = 20 + len(l4) + payload
+    ip = _IPV4.pack(0x45, 0, total, 0, 0, 64, proto, 0, socket.inet_aton(src), socket.inet_aton(dst))
+    return _ETHER + ip + l4 + bytes(payload)
+
+
+def _ip(rnd: random.Random, prefix: str = "10") -> str:
+    return f"{prefix}.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(1, 255)}"
+
+
+def _small_flows(rnd: random.Random) -> Iterator[Header]:
+    """Wiele krótkich przepływów TCP/UDP (1-4 pakiety), jak ruch klientów"""
+    while True:
+        src, dst = _ip(rnd), _ip(rnd, "192")
+        sport, dport = rnd.randrange(1024, 65535), rnd.choice((53, 80, 443, 8080))
+        proto = 17 if dport == 53 else 6
+        for i in range(rnd.randint(1, 4)):
+            yield src, dst, proto, sport, dport, SYN if proto == 6 and i == 0 else ACK, rnd.randrange(0, 200)
+
+
+def _elephants(rnd: random.Random, flows: int = 8) -> Iterator[Header]:
+    """Kilka długich przepływów pełnych segmentów w obu kierunkach"""
+    endpoints = [(_ip(rnd), _ip(rnd, "192"), rnd.randrange(1024, 65535), rnd.choice((22, 443, 873)))
+                 for _ in range(flows)]
+    while True:
+        src, dst, sport, dport = endpoints[rnd.randrange(flows)]
+        if rnd.random() < 0.2:
+            yield dst, src, 6, dport, sport, ACK, 0
+        else:
+            yield src, dst, 6, sport, dport, ACK, 1460
+
+
+def _port_scan(rnd: random.Random, scanners: int = 4) -> Iterator[Header]:
+    """Skanery SYN przechodzące kolejno po portach jednego celu"""
+    sources = [_ip(rnd, "172") for _ in range(scanners)]
+    target = _ip(rnd, "192")
+    port = 0
+    while True:
+        port = port % 65535 + 1
+        yield sources[port % scanners], target, 6, 40000 + port % 1000, port, SYN, 0
+
+
+def _icmp_flood(rnd: random.Random) -> Iterator[Header]:
+    """Echo ICMP z losowych źródeł do jednego celu, część z dużym ładunkiem"""
+    target = _ip(rnd, "192")
+    while True:
+        yield _ip(rnd), target, 1, 0, 0, 0, 1200 if rnd.random() < 0.3 else 56
+
+
+_GENERATORS = {
+    "small_flows": _small_flows,
+    "elephants": _elephants,
+    "port_scan": _port_scan,
+    "icmp_flood": _icmp_flood,
+}
+_MIXED_WEIGHTS = {"small_flows": 0.5, "elephants": 0.3, "port_scan": 0.1, "icmp_flood": 0.1}
+
+
+def traffic_mix(mix: str, count: int, seed: int = 1, rate: float = 100_000.0) -> List[Tuple[bytes, float]]:
+    """``count`` ramek (bajty, znacznik czasu) dla mieszanki z ``TRAFFIC_MIXES``
+
+    Wynik zależy wyłącznie od ``mix``, ``count`` i ``seed``; znaczniki czasu
+    rosną jednostajnie z szybkością ``rate`` pakietów/s.
+    """
+    if mix not in TRAFFIC_MIXES:
+        raise ValueError(f"Unknown traffic mix: {mix}")
+    rnd = random.Random(seed)
+    if mix == "mixed":
+        names = list(_MIXED_WEIGHTS)
+        sources = [_GENERATORS[name](random.Random(rnd.random())) for name in names]
+        weights = [_MIXED_WEIGHTS[name] for name in names]
+        headers = (next(rnd.choices(sources, weights)[0]) for _ in range(count))
+    else:
+        generator = _GENERATORS[mix](rnd)
+        headers = (next(generator) for _ in range(count))
+    start = 1_700_000_000.0
+    return [(build_frame(*header), start + i / rate) for i, header in enumerate(headers)]
@@ -1,15 +1,60 @@
-import onnxruntime as ort
 import numpy as np
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+PROTOCOL_CODES = {
+    "TCP": 0,
+    "UDP": 1,
+    "ICMP": 2,
+    "OTHER": 3
+}
+
+@lru_cache(maxsize=65536)
+def _ip_hash(ip: Optional[str]) -> float:
+    # Adresy w ruchu mocno się powtarzają - parsowanie raz na adres
+    try:
+        return sum(int(octet) for octet in ip.split('.')) / 1000
+    except (AttributeError, ValueError):
+        return 0.0  # brak warstwy IP lub adres nie-IPv4
 
 class AIThreatAnalyzer:
-    def __init__(self, model_path: str):
-        self.session = ort.InferenceSession(model_path)
+    def __init__(self, model_path: str, intra_op_num_threads: Optional[int] = None):
+        # onnxruntime dopiero przy tworzeniu sesji - z wyłączonym AI nie jest importowany
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if intra_op_num_threads:
+            options.intra_op_num_threads = intra_op_num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options)
 
-    def predict(self, ip: str, port: int, protocol: int) -> float:
-        ip_hash = sum(int(octet) for octet in ip.split('.')) / 1000
-        port_norm = port / 65535
+    @staticmethod
+    def features(ip: Optional[str], port: Optional[int], protocol: int) -> Tuple[float, float, float]:
+        """Znormalizowany wektor cech (ip_hash, port, protokół)"""
+        port_norm = (port or 0) / 65535
         protocol_norm = protocol / 3
-        
-        input_tensor = np.array([[ip_hash, port_norm, protocol_norm]], dtype=np.float32)
+        return _ip_hash(ip), port_norm, protocol_norm
+
+    @staticmethod
+    def features_batch(ips: Sequence[Optional[str]], ports: Sequence[Optional[int]],
+                       protocols: Sequence[int]) -> np.ndarray:
+        """Macierz cech (N, 3) dla kolumn paczki - to samo co ``features`` wiersz po wierszu"""
+        count = len(ips)
+        features = np.empty((count, 3), dtype=np.float64)
+        features[:, 0] = np.fromiter(map(_ip_hash, ips), dtype=np.float64, count=count)
+        features[:, 1] = np.fromiter((port or 0 for port in ports), dtype=np.float64, count=count) / 65535
+        features[:, 2] = np.asarray(protocols, dtype=np.float64) / 3
+        return features.astype(np.float32)
+
+    def predict(self, ip: str, port: int, protocol: int) -> float:
+        return float(self.predict_batch([(ip, port, protocol)])[0])
+
+    def predict_batch(self, samples: Sequence[Tuple[Optional[str], Optional[int], int]]) -> np.ndarray:
+        """Oceń N próbek jednym wywołaniem session.run (oś batch_size modelu jest dynamiczna)"""
+        ips, ports, protocols = zip(*samples) if samples else ((), (), ())
+        return self.predict_features(self.features_batch(ips, ports, protocols))
+
+    def predict_features(self, input_tensor: np.ndarray) -> np.ndarray:
+        """Oceń gotową macierz cech o kształcie (N, 3)"""
+        if len(input_tensor) == 0:
+            return np.empty(0, dtype=np.float32)
         results = self.session.run(None, {"input": input_tensor})
-        return results[0][0][0]
+        return results[0].reshape(-1)
@@ -1,61 +1,302 @@
 # core/AdvancedTrafficMonitor.py
 import json
-from typing import List, Dict
-from scapy.packet import Packet
+import time
+from typing import TYPE_CHECKING, Iterable, List, Dict, Optional, Tuple
 from core.AlertCoordinator import AlertCoordinator, AlertType, AlertPriority
-from core.AIThreatAnalyzer import AIThreatAnalyzer
-from simpleeval import simple_eval
+from core.AIThreatAnalyzer import AIThreatAnalyzer, PROTOCOL_CODES
+from core.batching import MicroBatcher
+from core.errors import InferenceBacklogFull
+from core.flows import FlowTable
+from core.inference import InferenceExecutor
+from core.metrics import LatencyHistogram
+from core.overload import OverloadController, OverloadLevel
+from core.rules import CompiledRule, RuleSet
+from core.traffic_stats import TrafficStats
+from core.windows import WindowEngine
+from network.capture import PROTOCOL_NAMES, PacketRecord
+
+if TYPE_CHECKING:
+    from scapy.packet import Packet
+    from core.packet_archive import PacketArchive
+
+# scapy.layers.inet.TCP, importowany przy pierwszym pakiecie Scapy - bez kosztu importu dla raw/pcap
+_TCP = None
+
+
+def extract_packet_fields(packet: "Packet") -> Dict:
+    """Wyodrębnij istotne informacje z pakietu (Scapy lub PacketRecord z backendu raw)"""
+    global _TCP
+    if isinstance(packet, PacketRecord):
+        return packet.to_dict()
+    if _TCP is None:
+        from scapy.layers.inet import TCP
+        _TCP = TCP
+    layer = packet[0][1]
+    tcp = packet.getlayer(_TCP)
+    return {
+        'src_ip': layer.src if hasattr(layer, 'src') else None,
+        'dst_ip': layer.dst if hasattr(layer, 'dst') else None,
+        'protocol': PROTOCOL_NAMES.get(layer.proto, 'OTHER') if hasattr(layer, 'proto') else None,
+        'packet_size': len(packet),
+        'src_port': getattr(layer, 'sport', None),
+        'dst_port': getattr(layer, 'dport', None),
+        'tcp_flags': int(tcp.flags) if tcp is not None else None,
+        'timestamp': float(packet.time)
+    }
+
+def extract_rows(packets: Iterable["Packet"]) -> Tuple[List[Dict], int]:
+    """Pola paczki pakietów; uszkodzony pakiet jest pomijany - zwraca (wiersze, liczba pominiętych)"""
+    rows = []
+    malformed = 0
+    for packet in packets:
+        try:
+            rows.append(extract_packet_fields(packet))
+        except Exception:
+            # Np. ramka Scapy bez warstwy sieciowej (IndexError) - reszta paczki idzie dalej
+            malformed += 1
+    return rows, malformed
+
 
 class AdvancedTrafficMonitor:
-    def __init__(self, network_monitor, alert_coordinator: AlertCoordinator, rules_path: str, ai_model_path: str, exporter):
+    def __init__(self, network_monitor, alert_coordinator: AlertCoordinator, rules_path: str, ai_model_path: str, exporter,
+                 ai_batch_size: int = 64, ai_batch_wait_ms: float = 5.0, ai_threshold: float = 0.5,
+                 inference: Optional[InferenceExecutor] = None, ai_enabled: bool = True,
+                 flow_table: Optional[FlowTable] = None, instrument: bool = False,
+                 instrument_every: int = 16, overload: Optional[OverloadController] = None,
+                 stats: Optional[TrafficStats] = None, archive: Optional["PacketArchive"] = None):
         self.network_monitor = network_monitor
         self.alert_coordinator = alert_coordinator
         self.rules = self.load_rules(rules_path)
-        self.ai_analyzer = AIThreatAnalyzer(ai_model_path)
+        self.rule_set = RuleSet.from_rules(self.rules)
+        self.windows = WindowEngine(self.rule_set.rules)
+        self.flow_table = flow_table
+        self.inference = inference or InferenceExecutor(ai_model_path)
+        self.ai_enabled = ai_enabled
+        self.ai_threshold = ai_threshold
+        self.ai_batcher = MicroBatcher(
+            self._analyze_ai_batch,
+            max_batch_size=ai_batch_size,
+            max_wait_ms=ai_batch_wait_ms
+        )
         self.exporter = exporter
+        # Czasy etapów - tylko gdy metryki są włączone, mierzony co instrument_every-ty pakiet
+        self.flow_latency = LatencyHistogram() if instrument and flow_table is not None else None
+        self.rule_latency = LatencyHistogram() if instrument else None
+        self.instrument_every = max(1, instrument_every) if instrument else 0
+        self._until_sample = self.instrument_every
+        # Poziom degradacji ustawiany przez NetworkMonitor przy przeciążeniu bufora
+        self.overload = overload
+        # Liczniki dla dashboardu (pakiety, bajty, trafienia reguł, najwięksi nadawcy)
+        self.stats = stats
+        # Kolumnowe archiwum metadanych wszystkich pakietów (core.packet_archive)
+        self.archive = archive
+        # Pakiety pominięte, bo nie udało się wyodrębnić ich pól
+        self.malformed = 0
 
     def load_rules(self, path: str) -> List[Dict]:
         with open(path, 'r') as f:
             rules = json.load(f)
         return rules
 
-    async def analyze_packet(self, packet: Packet):
-        # Wyodrębnij istotne informacje z pakietu
-        pkt_data = {
-            'src_ip': packet[0][1].src if hasattr(packet[0][1], 'src') else None,
-            'dst_ip': packet[0][1].dst if hasattr(packet[0][1], 'dst') else None,
-            'protocol': packet[0][1].proto if hasattr(packet[0][1], 'proto') else None,
-            'packet_size': len(packet),
-            'dst_port': getattr(packet[0][1], 'dport', None)
-        }
-        # Sprawdź reguły
-        for rule in self.rules:
-            if self._evaluate_rule(rule['condition'], pkt_data):
-                await self.alert_coordinator.add_alert(
-                    alert_type=AlertType(rule['type']),
-                    message=rule['name'],
-                    priority=AlertPriority[rule['priority']],
-                    raw_payload=pkt_data
-                )
+    def swap_rules(self, rules: List[Dict], rule_set: RuleSet, windows: Optional[WindowEngine] = None) -> None:
+        """Podmień skompilowane reguły między pakietami (synchronicznie, w pętli zdarzeń)
+
+        Bez ``windows`` silnik okien jest budowany tutaj, z przejęciem stanu
+        okien niezmienionych reguł.
+        """
+        if windows is None:
+            windows = WindowEngine(rule_set.rules, previous=self.windows)
+        self.rules, self.rule_set, self.windows = rules, rule_set, windows
+
+    async def analyze_packet(self, packet: "Packet"):
+        rows, malformed = extract_rows((packet,))
+        self.malformed += malformed
+        if rows:
+            await self.analyze_fields(rows[0])
 
-        # Opcjonalnie, użyj AI do analizy
+    async def analyze_batch(self, packets: List["Packet"]):
+        """Callback trybu paczkowego NetworkMonitor (``start_capture(..., batched=True)``)"""
+        rows, malformed = extract_rows(packets)
+        self.malformed += malformed
+        await self.analyze_rows(rows)
+
+    async def analyze_rows(self, rows: List[Dict]):
+        """Analiza paczki wyodrębnionych pakietów - te same alerty co ``analyze_fields`` dla każdego
+
+        Reguły są liczone ``RuleSet.match_batch`` na kolumnach całej paczki, cechy
+        AI - jedną operacją w mikro-batcherze. Przy próbkowaniu i wyżej paczka
+        przechodzi pakiet po pakiecie przez ``analyze_fields``.
+        """
+        level = self.overload.level if self.overload is not None else OverloadLevel.NORMAL
+        if level >= OverloadLevel.SAMPLING:
+            for pkt_data in rows:
+                await self.analyze_fields(pkt_data)
+            return
+        if self.archive is not None:
+            self.archive.append_rows(rows)
+        if self.stats is not None:
+            self.stats.observe_rows(rows)
+
+        # Pomiar całej paczki, zapisywany jako średni czas na pakiet
+        timed = False
+        if self.instrument_every and rows:
+            self._until_sample -= len(rows)
+            if self._until_sample <= 0:
+                self._until_sample = self.instrument_every
+                timed = True
+        flows = None
+        if self.flow_table is not None:
+            if timed:
+                started = time.perf_counter()
+            if self.rule_set.needs_flow:
+                # Widok zaraz po aktualizacji: reguła widzi stan przepływu z chwili swojego pakietu
+                flows = [self.flow_table.view(self.flow_table.update(pkt_data)) for pkt_data in rows]
+            else:
+                for pkt_data in rows:
+                    self.flow_table.update(pkt_data)
+            if timed:
+                self.flow_latency.record((time.perf_counter() - started) / len(rows))
+
+        if timed:
+            started = time.perf_counter()
+            matched = self.rule_set.match_batch(rows, flows)
+            self.rule_latency.record((time.perf_counter() - started) / len(rows))
+        else:
+            matched = self.rule_set.match_batch(rows, flows)
+        alerts = []
+        for pkt_data, rules in zip(rows, matched):
+            for rule in rules:
+                if self.stats is not None:
+                    self.stats.hit(rule.name)
+                payload = pkt_data
+                if rule.window is not None:
+                    window = self.windows.observe(rule, pkt_data)
+                    if window is None:
+                        continue
+                    payload = {**pkt_data, 'window': window}
+                alerts.append((rule.alert_type, rule.name, rule.priority, payload))
+        if alerts:
+            await self.alert_coordinator.add_alerts(alerts)
+
+        for pkt_data in rows:
+            if self._should_use_ai(pkt_data):
+                if level >= OverloadLevel.NO_AI:
+                    self.overload.ai_skipped += 1
+                else:
+                    self.ai_batcher.submit(pkt_data)
+
+    async def analyze_fields(self, pkt_data: Dict):
+        """Analiza wyodrębnionych pól pakietu (wspólna dla trybu jedno- i wieloprocesowego)"""
+        # Reguły i okna z chwili wejścia pakietu - podmiana w trakcie await add_alert ich nie rozdziela
+        rule_set, windows = self.rule_set, self.windows
+        if self.archive is not None:
+            self.archive.append(pkt_data)
+        if self.stats is not None:
+            self.stats.observe(pkt_data)
+        level = self.overload.level if self.overload is not None else OverloadLevel.NORMAL
+        header_matched: Optional[List[CompiledRule]] = None
+        if level >= OverloadLevel.SAMPLING:
+            if level >= OverloadLevel.HEADERS_ONLY:
+                await self._analyze_headers_only(pkt_data)
+                return
+            # Pakiet "łagodny" (żadna reguła nagłówkowa) spoza próbki przepływów - pomiń
+            if not self.overload.keep_flow(pkt_data):
+                header_matched = rule_set.match(pkt_data)
+                if not any(rule.window is None for rule in header_matched):
+                    self.overload.sampled_out += 1
+                    return
+
+        # Zaktualizuj stan przepływu; widok pól tylko, gdy któraś reguła go używa
+        timed = False
+        if self.instrument_every:
+            self._until_sample -= 1
+            if not self._until_sample:
+                self._until_sample = self.instrument_every
+                timed = True
+        flow = None
+        if self.flow_table is not None:
+            if timed:
+                started = time.perf_counter()
+            slot = self.flow_table.update(pkt_data)
+            if rule_set.needs_flow:
+                flow = self.flow_table.view(slot)
+            if timed:
+                self.flow_latency.record(time.perf_counter() - started)
+
+        # Sprawdź reguły (skompilowane przy ładowaniu, tylko kandydaci z indeksu)
+        if header_matched is not None and not rule_set.needs_flow:
+            matched = header_matched  # bez reguł przepływu wynik z decyzji o próbkowaniu jest pełny
+        elif timed:
+            started = time.perf_counter()
+            matched = rule_set.match(pkt_data, flow)
+            self.rule_latency.record(time.perf_counter() - started)
+        else:
+            matched = rule_set.match(pkt_data, flow)
+        for rule in matched:
+            if self.stats is not None:
+                self.stats.hit(rule.name)
+            payload = pkt_data
+            if rule.window is not None:
+                # Reguła okienkowa alarmuje dopiero po przekroczeniu progu agregatu
+                window = windows.observe(rule, pkt_data)
+                if window is None:
+                    continue
+                if level >= OverloadLevel.SAMPLING:
+                    # Okno widziało tylko próbkę łagodnych przepływów - podaj mnożnik
+                    window['sample_rate'] = self.overload.sample_rate
+                payload = {**pkt_data, 'window': window}
+            await self.alert_coordinator.add_alert(
+                alert_type=rule.alert_type,
+                message=rule.name,
+                priority=rule.priority,
+                raw_payload=payload
+            )
+
+        # Opcjonalnie, użyj AI do analizy - inferencja w paczkach, poza ścieżką pakietu
         if self._should_use_ai(pkt_data):
-            ai_result = await self.ai_analyzer.analyze(pkt_data)
-            if ai_result.get('threat_level', 0) > 0.5:  # Próg przykład
+            if level >= OverloadLevel.NO_AI:
+                self.overload.ai_skipped += 1
+            else:
+                self.ai_batcher.submit(pkt_data)
+
+    async def _analyze_headers_only(self, pkt_data: Dict) -> None:
+        """Najwyższy poziom degradacji: tylko reguły HIGH na polach nagłówka"""
+        alerted = False
+        for rule in self.rule_set.match(pkt_data):
+            if self.stats is not None:
+                self.stats.hit(rule.name)
+            if rule.priority >= AlertPriority.HIGH and rule.window is None:
+                alerted = True
                 await self.alert_coordinator.add_alert(
-                    alert_type=AlertType.CRITICAL,
-                    message="AI detected threat",
-                    priority=AlertPriority.HIGH,
-                    raw_payload={**pkt_data, 'ai_result': ai_result}
+                    alert_type=rule.alert_type,
+                    message=rule.name,
+                    priority=rule.priority,
+                    raw_payload=pkt_data
                 )
+        if not alerted:
+            self.overload.headers_only_dropped += 1
+
+    async def process_inference(self) -> None:
+        """Przetwarzaj paczki inferencji AI zebrane przez mikro-batcher"""
+        await self.ai_batcher.run()
 
-    def _evaluate_rule(self, condition: str, pkt_data: Dict) -> bool:
+    async def _analyze_ai_batch(self, batch: List[Dict]) -> None:
         try:
-            return simple_eval(condition, names={'pkt': pkt_data})
-        except Exception as e:
-            logging.error(f"Rule evaluation error: {e}")
-            return False
+            scores = await self.inference.predict_features(AIThreatAnalyzer.features_batch(
+                [pkt['src_ip'] for pkt in batch],
+                [pkt['dst_port'] for pkt in batch],
+                [PROTOCOL_CODES.get(pkt['protocol'], 3) for pkt in batch]
+            ))
+        except InferenceBacklogFull:
+            return  # paczka bez oceny, liczona w inference.rejected
+        alerts = [
+            (AlertType.CRITICAL, "AI detected threat", AlertPriority.HIGH,
+             {**pkt_data, 'ai_result': {'threat_score': float(score)}})
+            for pkt_data, score in zip(batch, scores) if score > self.ai_threshold
+        ]
+        if alerts:
+            await self.alert_coordinator.add_alerts(alerts)
 
     def _should_use_ai(self, pkt_data: Dict) -> bool:
         # Logika, kiedy używać AI
-        return True  # Dla przykładu
\ No newline at end of file
+        return self.ai_enabled
\ No newline at end of file
@@ -1,13 +1,30 @@
 # 📄 Plik: core/AlertCoordinator.py (ulepszona wersja)
-"""Asynchroniczny system alertów z kontrolą przepływu"""
+"""Asynchroniczny system alertów z kontrolą przepływu
+
+Ścieżka alertu jest lekka: ``QueuedAlert`` to klasa ze slotami, a walidacja
+według ``AlertSchema`` jest kompilowana raz dla każdego kształtu payloadu
+(krotki kluczy) - kolejne alerty o tym samym kształcie sprawdzają tylko typy.
+Pola spoza schematu (``dst_port``, ``ai_result``, ``window``...) są zachowywane.
+
+Przed kolejką alert przechodzi przez deduplikację (identyczne alerty w oknie
+``dedup_window`` zwijają się do jednego z licznikiem ``count``) i kubełki
+żetonów per klucz (``core.suppression``). Handlery dostają alerty przez
+własne kolejki z limitem współbieżności (``core.dispatch``).
+"""
 import asyncio
+import itertools
 import time
 import logging
-from dataclasses import dataclass, field
+import typing
 from enum import IntEnum, StrEnum
-from typing import Optional, Dict, Any, Callable, List
-from pydantic import BaseModel, ValidationError
+from typing import Optional, Dict, Any, Callable, Iterable, List, Tuple
+from pydantic import BaseModel
 from collections import deque
+from core.dispatch import AlertDispatcher, HandlerQueue
+from core.memory import queue_items
+from core.suppression import (
+    RATE_LIMIT_KEYS, AlertDeduplicator, TokenBucketLimiter, dedup_key, rate_limit_key
+)
 
 class AlertType(StrEnum):
     INFO = "INFO"
@@ -19,13 +36,29 @@ class AlertPriority(IntEnum):
     MEDIUM = 2
     HIGH = 3
 
-@dataclass(order=True)
 class QueuedAlert:
-    priority: int
-    timestamp: float = field(compare=False)
-    alert_type: AlertType = field(compare=False)
-    message: str = field(compare=False)
-    payload: Dict[str, Any] = field(compare=False)
+    """Rekord alertu przekazywany handlerom
+
+    ``count``, ``first_seen`` i ``last_seen`` opisują zwinięte duplikaty;
+    ``reported`` to wartość ``count`` w chwili przekazania do handlerów.
+    """
+    __slots__ = ("priority", "timestamp", "alert_type", "message", "payload",
+                 "count", "first_seen", "last_seen", "reported")
+
+    def __init__(self, priority: int, timestamp: float, alert_type: AlertType, message: str,
+                 payload: Dict[str, Any]):
+        self.priority = priority
+        self.timestamp = timestamp
+        self.alert_type = alert_type
+        self.message = message
+        self.payload = payload
+        self.count = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.reported = 0
+
+    def __repr__(self) -> str:
+        return f"QueuedAlert({self.alert_type}, {self.message!r}, priority={self.priority})"
 
 class AlertSchema(BaseModel):
     src_ip: Optional[str] = None
@@ -34,17 +67,147 @@ class AlertSchema(BaseModel):
     packet_size: Optional[int] = None
     metadata: Dict[str, Any] = {}
 
+# (typ, wiadomość, priorytet, payload) - wejście add_alerts
+AlertInput = Tuple[AlertType, str, AlertPriority, Dict[str, Any]]
+
+def _runtime_types(annotation: Any) -> Tuple[type, ...]:
+    """Typy dla isinstance z adnotacji pola schematu (Optional[str] -> (str, NoneType))"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return tuple(t for arg in typing.get_args(annotation) for t in _runtime_types(arg))
+    if annotation is None or annotation is type(None):
+        return (type(None),)
+    return (origin or annotation,)
+
+_SCHEMA_FIELDS = {
+    name: (_runtime_types(info.annotation), info.get_default(call_default_factory=True))
+    for name, info in AlertSchema.model_fields.items()
+}
+
+def _compile_shape(shape: Tuple[str, ...]) -> Tuple[Tuple[Tuple[str, Tuple[type, ...]], ...], Tuple[Tuple[str, Any], ...]]:
+    """Sprawdzenia typów i brakujące wartości domyślne dla danego zestawu kluczy"""
+    checks = tuple((key, _SCHEMA_FIELDS[key][0]) for key in shape if key in _SCHEMA_FIELDS)
+    defaults = tuple((key, default) for key, (_, default) in _SCHEMA_FIELDS.items() if key not in shape)
+    return checks, defaults
+
+DEFAULT_DEDUP_FIELDS = ("src_ip", "dst_ip", "dst_port", "protocol")
+
 class AlertCoordinator:
-    def __init__(self, mode: str = "LiveThreat", max_queue_size: int = 10000):
+    def __init__(self, mode: str = "LiveThreat", max_queue_size: int = 10000,
+                 rate_limit: Optional[float] = 100.0, rate_burst: float = 200.0,
+                 rate_limit_key: str = "rule_src_ip", dedup_window: float = 10.0,
+                 dedup_fields: Iterable[str] = DEFAULT_DEDUP_FIELDS, max_keys: int = 100_000):
         self.mode = mode
         self.alert_queue = asyncio.PriorityQueue(maxsize=max_queue_size)
         self.handlers: List[Callable[[QueuedAlert], None]] = []
-        self._rate_limiter = deque(maxlen=1000)
+        self.dispatcher = AlertDispatcher()
         self.recent_alerts = deque(maxlen=1000)
         self._modes = {"Silent", "Forensic", "LiveThreat"}
-        
+        self._shapes: Dict[Tuple[str, ...], Any] = {}
+        # Kolejność w kolejce: najwyższy priorytet pierwszy, w obrębie priorytetu FIFO
+        self._sequence = itertools.count()
+        self.rate_limit_key = rate_limit_key
+        self.limiter = TokenBucketLimiter(rate_limit, rate_burst, max_keys) if rate_limit else None
+        self.dedup_fields = tuple(dedup_fields)
+        self.deduplicator = AlertDeduplicator(
+            dedup_window, max_keys, on_summary=self._emit_summary
+        ) if dedup_window > 0 else None
+        self._last_limit_log = 0.0
+
         if mode not in self._modes:
             raise ValueError(f"Invalid mode: {mode}")
+        if rate_limit_key not in RATE_LIMIT_KEYS:
+            raise ValueError(f"Invalid rate limit key: {rate_limit_key}")
+
+    def _validate(self, raw_payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Walidacja payloadu skompilowaną funkcją dla jego kształtu"""
+        shape = tuple(raw_payload)
+        compiled = self._shapes.get(shape)
+        if compiled is None:
+            if len(self._shapes) >= 1024:
+                self._shapes.clear()
+            compiled = self._shapes[shape] = _compile_shape(shape)
+        checks, defaults = compiled
+        for key, types in checks:
+            if not isinstance(raw_payload[key], types):
+                logging.error(f"Invalid alert payload: field '{key}' has type {type(raw_payload[key]).__name__}")
+                return None
+        payload = dict(raw_payload)
+        for key, default in defaults:
+            payload[key] = default.copy() if isinstance(default, dict) else default
+        return payload
+
+    def _admit(self, alert_type: AlertType, message: str, raw_payload: Dict[str, Any],
+               timestamp: float, now: float) -> Tuple[bool, Optional[Tuple]]:
+        """Deduplikacja i limit szybkości; zwraca (przyjęty, klucz deduplikacji)"""
+        key = None
+        if self.deduplicator is not None:
+            key = dedup_key(alert_type, message, raw_payload, self.dedup_fields)
+            duplicate, _ = self.deduplicator.observe(key, timestamp)
+            if duplicate:
+                return False, None
+        if self.limiter is not None and not self.limiter.allow(
+                rate_limit_key(self.rate_limit_key, message, raw_payload), now):
+            if now - self._last_limit_log >= 1.0:
+                self._last_limit_log = now
+                logging.warning(f"Alert rate limit exceeded ({self.limiter.limited} limited so far)")
+            return False, None
+        return True, key
+
+    def _enqueue(self, alert: QueuedAlert):
+        return (-alert.priority, next(self._sequence), alert)
+
+    def _emit_summary(self, entry: QueuedAlert) -> None:
+        """Podsumowanie duplikatów, które dotarły po wysłaniu reprezentanta"""
+        if not 0 < entry.reported < entry.count:
+            return  # reprezentant jeszcze w kolejce - niesie pełny licznik
+        summary = QueuedAlert(entry.priority, entry.last_seen, entry.alert_type, entry.message, entry.payload)
+        summary.count = entry.count - entry.reported
+        summary.first_seen = entry.first_seen
+        summary.last_seen = entry.last_seen
+        entry.reported = entry.count
+        try:
+            self.alert_queue.put_nowait(self._enqueue(summary))
+            self.recent_alerts.append(summary)
+        except asyncio.QueueFull:
+            logging.warning(f"Alert queue full - dropping summary of {summary.count} '{summary.message}' alerts")
+
+    def shed_recent(self, count: int) -> int:
+        """Usuń ``count`` najstarszych alertów z historii w pamięci (budżet pamięci)"""
+        count = min(count, len(self.recent_alerts))
+        for _ in range(count):
+            self.recent_alerts.popleft()
+        return count
+
+    def queued(self) -> Iterable[Any]:
+        """Wpisy kolejki głównej (bez pobierania)"""
+        return queue_items(self.alert_queue)
+
+    def shed_queued(self, count: int) -> int:
+        """Usuń z kolejki głównej ``count`` alertów o najniższym priorytecie, od najnowszych"""
+        queue = self.alert_queue
+        count = min(count, queue.qsize())
+        if count <= 0:
+            return 0
+        entries = sorted(queue.get_nowait() for _ in range(queue.qsize()))
+        for entry in entries[:-count]:
+            queue.put_nowait(entry)
+        # task_done po ponownym wstawieniu - join nie może się obudzić przy chwilowo pustej kolejce
+        for _ in entries:
+            queue.task_done()
+        return count
+
+    def expire_suppressed(self, now: Optional[float] = None) -> int:
+        """Zamknij wygasłe okna deduplikacji (emituje podsumowania)"""
+        if self.deduplicator is None:
+            return 0
+        return self.deduplicator.expire(time.time() if now is None else now)
+
+    async def run_suppression(self, interval: float = 1.0) -> None:
+        """Okresowo zamykaj okna deduplikacji"""
+        while True:
+            await asyncio.sleep(interval)
+            self.expire_suppressed()
 
     async def add_alert(
         self,
@@ -54,53 +217,69 @@ class AlertCoordinator:
         raw_payload: Dict[str, Any]
     ) -> bool:
         """Dodaj alert z kontrolą przepustowości i walidacją"""
-        if time.monotonic() - self._rate_limiter[0] < 0.01 and len(self._rate_limiter) >= 1000:
-            logging.warning("Alert rate limit exceeded")
+        timestamp = time.time()
+        admitted, key = self._admit(alert_type, message, raw_payload, timestamp, time.monotonic())
+        if not admitted:
             return False
-            
-        try:
-            validated = AlertSchema(**raw_payload).dict()
-            alert = QueuedAlert(
-                priority=priority.value,
-                alert_type=alert_type,
-                message=message[:255],
-                timestamp=time.time(),
-                payload=validated
-            )
-            await self.alert_queue.put(alert)
-            self.recent_alerts.append(alert)
-            self._rate_limiter.append(time.monotonic())
-            return True
-        except ValidationError as e:
-            logging.error(f"Invalid alert payload: {e.errors()}")
+
+        payload = self._validate(raw_payload)
+        if payload is None:
             return False
+        alert = QueuedAlert(priority.value, timestamp, alert_type, message[:255], payload)
+        await self.alert_queue.put(self._enqueue(alert))
+        self.recent_alerts.append(alert)
+        if key is not None:
+            self.deduplicator.track(key, alert)
+        return True
+
+    async def add_alerts(self, alerts: Iterable[AlertInput]) -> int:
+        """Dodaj paczkę alertów (typ, wiadomość, priorytet, payload); zwraca liczbę przyjętych
+
+        Jeden znacznik czasu dla całej paczki; oczekiwanie tylko przy pełnej kolejce.
+        """
+        now = time.monotonic()
+        timestamp = time.time()
+        queue = self.alert_queue
+        accepted = 0
+        for alert_type, message, priority, raw_payload in alerts:
+            admitted, key = self._admit(alert_type, message, raw_payload, timestamp, now)
+            if not admitted:
+                continue
+            payload = self._validate(raw_payload)
+            if payload is None:
+                continue
+            alert = QueuedAlert(priority.value, timestamp, alert_type, message[:255], payload)
+            if queue.full():
+                await queue.put(self._enqueue(alert))
+            else:
+                queue.put_nowait(self._enqueue(alert))
+            self.recent_alerts.append(alert)
+            if key is not None:
+                self.deduplicator.track(key, alert)
+            accepted += 1
+        return accepted
 
     async def process_alerts(self) -> None:
         """Przetwarzaj alerty z uwzględnieniem trybu operacyjnego"""
+        self.dispatcher.start()
         while True:
-            alert = await self.alert_queue.get()
+            _, _, alert = await self.alert_queue.get()
+            alert.reported = alert.count
             try:
                 if self.mode == "Silent":
                     continue
-                
+
                 if self.mode == "Forensic":
                     self._log_forensic(alert)
-                
+
                 if self.mode == "LiveThreat":
                     await self._dispatch_alert(alert)
             finally:
                 self.alert_queue.task_done()
 
     async def _dispatch_alert(self, alert: QueuedAlert) -> None:
-        """Rozsyłaj alerty do zarejestrowanych handlerów"""
-        for handler in self.handlers:
-            try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(alert)
-                else:
-                    handler(alert)
-            except Exception as e:
-                logging.error(f"Handler failure: {str(e)}", exc_info=True)
+        """Rozsyłaj alerty do kolejek zarejestrowanych handlerów"""
+        await self.dispatcher.dispatch(alert)
 
     def _log_forensic(self, alert: QueuedAlert) -> None:
         """Pełne logowanie forenzyczne"""
@@ -110,6 +289,35 @@ class AlertCoordinator:
             f"Timestamp: {alert.timestamp}"
         )
 
-    def register_handler(self, handler: Callable[[QueuedAlert], None]) -> None:
-        """Rejestracja handlerów alertów"""
-        self.handlers.append(handler)
\ No newline at end of file
+    def register_handler(
+        self,
+        handler: Callable[[QueuedAlert], None],
+        name: Optional[str] = None,
+        max_queue: int = 1000,
+        concurrency: int = 1,
+        overflow: str = "drop_oldest",
+        batch_size: int = 1,
+        batch_wait_ms: float = 0.0
+    ) -> HandlerQueue:
+        """Rejestracja handlerów alertów
+
+        Przy ``batch_size > 1`` handler dostaje listę alertów (do ``batch_size``,
+        czekając na dopełnienie najwyżej ``batch_wait_ms``).
+        """
+        self.handlers.append(handler)
+        return self.dispatcher.add(HandlerQueue(
+            handler, name, max_queue, concurrency, overflow, batch_size, batch_wait_ms
+        ))
+
+    def handler_stats(self) -> List[Dict[str, Any]]:
+        """Metryki handlerów: długość kolejki, opóźnienie, dostarczone, odrzucone, błędy"""
+        return self.dispatcher.stats()
+
+    async def join(self) -> None:
+        """Poczekaj na obsłużenie wszystkich alertów z kolejki głównej i kolejek handlerów"""
+        await self.alert_queue.join()
+        await self.dispatcher.join()
+
+    async def close(self) -> None:
+        """Zatrzymaj zadania handlerów"""
+        await self.dispatcher.stop()
@@ -0,0 +1,263 @@
+# 📄 Plik: core/alert_store.py
+"""Lokalna, trwała historia alertów w SQLite (tryb WAL) dla ``/alerts``
+
+Alerty trafiają tu jak do eksportera - przez handler ``AlertCoordinator`` z
+własną kolejką i paczkami (``handle_alerts``); zapis paczki to jedna
+transakcja wykonywana w wątku, poza pętlą zdarzeń. WAL pozwala czytać
+(``query``) równolegle z zapisem.
+
+Tabela ma indeksy (ts), (src_ip, ts), (dst_ip, ts), (rule, ts) i
+(priority, ts); stronicowanie jest kluczowe - kursor to ``"<ts>:<id>"``
+ostatniego zwróconego alertu, więc kolejna strona to przejście indeksu od
+tego miejsca, niezależnie od liczby alertów w bazie.
+
+Retencja (``enforce_retention``, okresowo w ``run``) usuwa alerty starsze niż
+``max_age`` i najstarsze alerty ponad ``max_bytes``; zwolnione strony oddaje
+``PRAGMA incremental_vacuum``.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+MAX_PAGE = 1000
+# Przy przekroczeniu max_bytes retencja schodzi do (1 - RETENTION_SLACK) * max_bytes
+RETENTION_SLACK = 0.1
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        type TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        rule TEXT NOT NULL,
+        src_ip TEXT,
+        dst_ip TEXT,
+        src_port INTEGER,
+        dst_port INTEGER,
+        protocol TEXT,
+        count INTEGER NOT NULL,
+        first_seen REAL,
+        last_seen REAL,
+        payload TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS alerts_ts ON alerts (ts)",
+    "CREATE INDEX IF NOT EXISTS alerts_src_ip ON alerts (src_ip, ts)",
+    "CREATE INDEX IF NOT EXISTS alerts_dst_ip ON alerts (dst_ip, ts)",
+    "CREATE INDEX IF NOT EXISTS alerts_rule ON alerts (rule, ts)",
+    "CREATE INDEX IF NOT EXISTS alerts_priority ON alerts (priority, ts)",
+)
+
+_INSERT = """INSERT INTO alerts (ts, type, priority, rule, src_ip, dst_ip, src_port, dst_port, protocol,
+                                 count, first_seen, last_seen, payload)
+             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_COLUMNS = ("id", "ts", "type", "priority", "rule", "src_ip", "dst_ip", "src_port", "dst_port",
+            "protocol", "count", "first_seen", "last_seen", "payload")
+
+# Filtry równościowe /alerts -> kolumna
+FILTERS = ("src_ip", "dst_ip", "rule", "type", "protocol", "dst_port")
+
+
+def encode_cursor(ts: float, alert_id: int) -> str:
+    return f"{ts!r}:{alert_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        ts, alert_id = cursor.split(":")
+        return float(ts), int(alert_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+
+
+class AlertStore:
+    """Historia alertów: zapis paczkami w tle, zapytania z filtrami i kursorem"""
+
+    def __init__(self, path: str, max_age: float = 0.0, max_bytes: int = 0,
+                 retention_interval: float = 60.0, delete_chunk: int = 10_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.retention_interval = retention_interval
+        self.delete_chunk = delete_chunk
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        for statement in _SCHEMA:
+            self._writer.execute(statement)
+        self._writer.commit()
+        self._readers = threading.local()
+        self.written = 0
+        self.expired = 0
+        self.failed = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        # auto_vacuum działa tylko ustawione przed przejściem w WAL i przed pierwszą tabelą
+        # (dla istniejącej bazy to no-op)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Przy WAL utrata zasilania może cofnąć ostatnie transakcje, ale nie uszkodzi bazy
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        # Osobne połączenie na wątek puli: odczyty nie czekają na zapis (WAL)
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = self._connect()
+        return conn
+
+    # --------------- zapis -------------------
+
+    async def handle_alerts(self, alerts: Sequence[Any]) -> None:
+        """Handler paczkowy dla ``AlertCoordinator.register_handler(batch_size > 1)``"""
+        if not isinstance(alerts, (list, tuple)):
+            alerts = [alerts]
+        rows = [self._row(alert) for alert in alerts]
+        try:
+            await asyncio.to_thread(self.write_rows, rows)
+        except sqlite3.Error as e:
+            self.failed += len(rows)
+            logging.error(f"Alert store write failed: {e}")
+
+    @staticmethod
+    def _row(alert: Any) -> Tuple[Any, ...]:
+        payload = alert.payload
+        return (alert.timestamp, str(alert.alert_type), int(alert.priority), alert.message,
+                payload.get("src_ip"), payload.get("dst_ip"), payload.get("src_port"), payload.get("dst_port"),
+                payload.get("protocol"), alert.count, alert.first_seen, alert.last_seen, payload)
+
+    def write_rows(self, rows: Sequence[Tuple[Any, ...]]) -> None:
+        """Zapisz paczkę w jednej transakcji (serializacja payloadu też poza pętlą zdarzeń)"""
+        rows = [row[:-1] + (json.dumps(row[-1], default=str),) for row in rows]
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                self._writer.executemany(_INSERT, rows)
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+        self.written += len(rows)
+
+    # --------------- odczyt -------------------
+
+    def query(self, limit: int = 100, cursor: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, min_priority: Optional[int] = None,
+              **filters: Any) -> Dict[str, Any]:
+        """Najnowsze alerty spełniające filtry; ``next_cursor`` dla kolejnej strony
+
+        ``since`` włącznie, ``until`` wyłącznie (sekundy epoki). Filtry
+        równościowe: ``src_ip``, ``dst_ip``, ``rule``, ``type``, ``protocol``,
+        ``dst_port``.
+        """
+        limit = max(1, min(limit, MAX_PAGE))
+        where, params = [], []
+        for name, value in filters.items():
+            if name not in FILTERS:
+                raise ValueError(f"Unknown alert filter: {name}")
+            if value is not None:
+                where.append(f"{name} = ?")
+                params.append(value)
+        if min_priority is not None:
+            where.append("priority >= ?")
+            params.append(min_priority)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        if cursor:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM alerts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        rows = self._reader().execute(sql, (*params, limit + 1)).fetchall()
+        alerts = [self._alert(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = alerts[-1]
+            next_cursor = encode_cursor(last["timestamp"], last["id"])
+        return {"alerts": alerts, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _alert(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        record = dict(zip(_COLUMNS, row))
+        return {
+            "id": record["id"],
+            "timestamp": record["ts"],
+            "type": record["type"],
+            "priority": record["priority"],
+            "rule": record["rule"],
+            "count": record["count"],
+            "first_seen": record["first_seen"],
+            "last_seen": record["last_seen"],
+            "payload": json.loads(record["payload"]),
+        }
+
+    def _scalar(self, sql: str) -> int:
+        # fetchall zamyka polecenie - niedokończone trzymałoby starą migawkę WAL
+        return self._reader().execute(sql).fetchall()[0][0]
+
+    def count(self) -> int:
+        return self._scalar("SELECT count(*) FROM alerts")
+
+    def size_bytes(self) -> int:
+        """Zajęte strony bazy (bez wolnych stron czekających na vacuum i bez WAL)"""
+        pages = self._scalar("PRAGMA page_count") - self._scalar("PRAGMA freelist_count")
+        return pages * self._scalar("PRAGMA page_size")
+
+    # --------------- retencja -------------------
+
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        """Usuń alerty ponad limity wieku i rozmiaru; zwraca liczbę usuniętych"""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._write_lock:
+            if self.max_age > 0:
+                removed += self._writer.execute("DELETE FROM alerts WHERE ts < ?", (now - self.max_age,)).rowcount
+            size = self.size_bytes() if self.max_bytes > 0 else 0
+            if size > self.max_bytes > 0:
+                # Strona indeksu wraca na listę wolnych dopiero, gdy jest pusta, więc rozmiar
+                # nie spada proporcjonalnie do usuniętych wierszy: usuwamy nadmiarową część
+                # najstarszych (z zapasem RETENTION_SLACK), a miejsce w stronach zajmą kolejne zapisy
+                excess = int(self.count() * (1 - self.max_bytes / size * (1 - RETENTION_SLACK)))
+                while excess > 0:
+                    # Porcjami, żeby nie trzymać długiej transakcji
+                    deleted = self._writer.execute(
+                        "DELETE FROM alerts WHERE id IN (SELECT id FROM alerts ORDER BY ts, id LIMIT ?)",
+                        (min(excess, self.delete_chunk),)
+                    ).rowcount
+                    if not deleted:
+                        break
+                    removed += deleted
+                    excess -= deleted
+            if removed:
+                self._writer.execute("PRAGMA incremental_vacuum")
+                self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.expired += removed
+        if removed:
+            logging.info(f"Alert store retention removed {removed} alerts")
+        return removed
+
+    async def run(self) -> None:
+        """Okresowa retencja"""
+        while True:
+            await asyncio.sleep(self.retention_interval)
+            try:
+                await asyncio.to_thread(self.enforce_retention)
+            except sqlite3.Error as e:
+                logging.error(f"Alert store retention failed: {e}")
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._writer.close()
@@ -0,0 +1,94 @@
+# 📄 Plik: core/batching.py
+"""Asynchroniczny mikro-batcher z limitem rozmiaru i czasu oczekiwania"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Generic, Iterable, List, TypeVar, Union
+
+from core.memory import queue_items
+
+T = TypeVar("T")
+
+
+class MicroBatcher(Generic[T]):
+    """Zbieraj elementy i przekazuj je handlerowi paczkami
+
+    Paczka jest wysyłana po osiągnięciu ``max_batch_size`` albo po ``max_wait_ms``
+    od pierwszego elementu - zależnie od tego, co nastąpi wcześniej.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], Union[Awaitable[Any], Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_pending: int = 10000,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._is_coroutine = asyncio.iscoroutinefunction(handler)
+        self.submitted = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def queued(self) -> Iterable[T]:
+        """Elementy czekające na paczkę (bez pobierania)"""
+        return queue_items(self._queue)
+
+    def submit(self, item: T) -> bool:
+        """Dodaj element bez czekania; False gdy kolejka jest pełna"""
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    async def _collect(self) -> List[T]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _deliver(self, batch: List[T]) -> None:
+        self.batches += 1
+        try:
+            if self._is_coroutine:
+                await self.handler(batch)
+            else:
+                self.handler(batch)
+        except Exception as e:
+            logging.error(f"Batch handler failure: {e}", exc_info=True)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def run(self) -> None:
+        """Pętla zbierania i wysyłania paczek"""
+        while True:
+            await self._deliver(await self._collect())
+
+    async def drain(self) -> None:
+        """Wyślij wszystko, co czeka w kolejce (np. przy zamykaniu)"""
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait() for _ in range(min(self.max_batch_size, self._queue.qsize()))]
+            await self._deliver(batch)
@@ -0,0 +1,231 @@
+# 📄 Plik: core/dispatch.py
+"""Rozsyłanie alertów do handlerów przez osobne kolejki
+
+Każdy handler ma własną ograniczoną kolejkę, pulę ``concurrency`` zadań
+i politykę przepełnienia, więc wolny handler (np. eksport do ES) nie blokuje
+pozostałych ani kolejki głównej. Kolejka handlera to deque na każdy priorytet:
+wyższy priorytet jest zawsze wydawany pierwszy, w obrębie priorytetu FIFO.
+
+Polityki przepełnienia:
+  - ``drop_oldest`` - usuń najstarszy alert o najniższym priorytecie; gdy
+    nadchodzący alert ma priorytet niższy od wszystkich oczekujących, odrzuć go,
+  - ``drop_newest`` - odrzuć nadchodzący alert,
+  - ``block`` - czekaj na miejsce (przeciwciśnienie na kolejkę główną).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class HandlerQueue:
+    """Kolejka, pula wykonawców i metryki jednego handlera"""
+
+    def __init__(self, handler: Callable, name: Optional[str] = None, max_queue: int = 1000,
+                 concurrency: int = 1, overflow: str = "drop_oldest", batch_size: int = 1,
+                 batch_wait_ms: float = 0.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy: {overflow}")
+        if max_queue < 1 or concurrency < 1 or batch_size < 1:
+            raise ValueError("max_queue, concurrency and batch_size must be >= 1")
+        self.handler = handler
+        self.name = name or getattr(handler, "__qualname__", repr(handler))
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._is_async = asyncio.iscoroutinefunction(handler)
+        # priorytet -> deque[(czas wstawienia, alert)], priorytety malejąco
+        self._levels: Dict[int, Deque[Tuple[float, Any]]] = {}
+        self._order: List[int] = []
+        self._size = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def queued(self) -> Iterable[Any]:
+        """Oczekujące alerty, od najwyższego priorytetu (bez pobierania)"""
+        return (alert for priority in self._order for _, alert in self._levels[priority])
+
+    def _level(self, priority: int) -> Deque[Tuple[float, Any]]:
+        level = self._levels.get(priority)
+        if level is None:
+            level = self._levels[priority] = deque()
+            self._order = sorted(self._levels, reverse=True)
+        return level
+
+    def _lowest_priority(self) -> Optional[int]:
+        return next((priority for priority in reversed(self._order) if self._levels[priority]), None)
+
+    def _drop_oldest(self) -> None:
+        for priority in reversed(self._order):
+            if self._levels[priority]:
+                self._levels[priority].popleft()
+                self._size -= 1
+                self.dropped += 1
+                return
+
+    def shed(self, count: int) -> int:
+        """Usuń ``count`` najstarszych alertów o najniższym priorytecie (budżet pamięci)"""
+        removed = min(count, self._size)
+        for _ in range(removed):
+            self._drop_oldest()
+        if not self._size:
+            self._not_empty.clear()
+            if not self.in_flight:
+                self._idle.set()
+        if self._size < self.max_queue:
+            self._not_full.set()
+        return removed
+
+    def _push(self, alert: Any) -> None:
+        self._level(alert.priority).append((time.monotonic(), alert))
+        self._size += 1
+        self._idle.clear()
+        self._not_empty.set()
+        if self._size >= self.max_queue:
+            self._not_full.clear()
+
+    async def put(self, alert: Any) -> bool:
+        """Wstaw alert zgodnie z polityką przepełnienia; False, gdy go odrzucono"""
+        if self._size >= self.max_queue:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.overflow == "drop_oldest":
+                lowest = self._lowest_priority()
+                if lowest is not None and alert.priority < lowest:
+                    # Niższy priorytet nie wypiera oczekujących alertów
+                    self.dropped += 1
+                    return False
+                self._drop_oldest()
+            else:
+                while self._size >= self.max_queue:
+                    await self._not_full.wait()
+        self._push(alert)
+        return True
+
+    def _take(self, limit: int) -> List[Any]:
+        taken = []
+        for priority in self._order:
+            level = self._levels[priority]
+            while level and len(taken) < limit:
+                taken.append(level.popleft()[1])
+        self._size -= len(taken)
+        self.in_flight += len(taken)
+        if not self._size:
+            self._not_empty.clear()
+        if self._size < self.max_queue:
+            self._not_full.set()
+        return taken
+
+    async def _next_batch(self) -> List[Any]:
+        while not self._size:
+            await self._not_empty.wait()
+        batch = self._take(self.batch_size)
+        if len(batch) < self.batch_size and self.batch_wait > 0:
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if not self._size:
+                    try:
+                        await asyncio.wait_for(self._not_empty.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch.extend(self._take(self.batch_size - len(batch)))
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                # batch_size > 1: handler dostaje listę alertów
+                arg = batch if self.batch_size > 1 else batch[0]
+                if self._is_async:
+                    await self.handler(arg)
+                else:
+                    self.handler(arg)
+                self.delivered += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logging.error(f"Handler failure in {self.name}: {str(e)}", exc_info=True)
+            finally:
+                self.in_flight -= len(batch)
+                if not self._size and not self.in_flight:
+                    self._idle.set()
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def join(self) -> None:
+        """Poczekaj, aż kolejka się opróżni i wszystkie wywołania się zakończą"""
+        await self._idle.wait()
+
+    def lag(self) -> float:
+        """Wiek najstarszego oczekującego alertu w sekundach"""
+        oldest = min((level[0][0] for level in self._levels.values() if level), default=None)
+        return 0.0 if oldest is None else time.monotonic() - oldest
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "handler": self.name,
+            "queued": self._size,
+            "lag_seconds": self.lag(),
+            "in_flight": self.in_flight,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+class AlertDispatcher:
+    """Zbiór kolejek handlerów zasilany z kolejki głównej AlertCoordinator"""
+
+    def __init__(self):
+        self.queues: List[HandlerQueue] = []
+
+    def add(self, handler_queue: HandlerQueue) -> HandlerQueue:
+        self.queues.append(handler_queue)
+        return handler_queue
+
+    def start(self) -> None:
+        for handler_queue in self.queues:
+            handler_queue.start()
+
+    async def dispatch(self, alert: Any) -> None:
+        for handler_queue in self.queues:
+            await handler_queue.put(alert)
+
+    async def join(self) -> None:
+        for handler_queue in self.queues:
+            await handler_queue.join()
+
+    async def stop(self) -> None:
+        for handler_queue in self.queues:
+            await handler_queue.stop()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [handler_queue.stats() for handler_queue in self.queues]
@@ -1,3 +1,13 @@
 # core/errors.py
 class ConfigurationError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class RuleCompilationError(ConfigurationError):
+    """Błąd kompilacji warunku reguły z rules.json"""
+    pass
+
+
+class InferenceBacklogFull(Exception):
+    """Kolejka zadań inferencji osiągnęła ``max_pending`` - nowa paczka odrzucona"""
+    pass
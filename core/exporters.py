@@ -1,42 +1,231 @@
 # 📄 Plik: core/exporters.py (ulepszona wersja)
 """Asynchroniczny eksport danych z fallbackiem"""
 import aiofiles
+import asyncio
 import json
-from elasticsearch import AsyncElasticsearch, TransportError
-from typing import Optional
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from elasticsearch import ApiError, AsyncElasticsearch, TransportError
+from typing import Deque, List, Optional, Tuple
+from core.metrics import LatencyHistogram
 
-class ElasticsearchExporter:
-    def __init__(self, hosts: list, index: str = "cyberwitness-alerts"):
-        self.client = AsyncElasticsearch(hosts)
+_BULK_ACTION = '{"index":{}}'
+
+
+def es_time(timestamp: float) -> str:
+    """Czas epoki (s) jako ISO-8601 UTC - dynamiczne mapowanie ES rozpozna typ ``date``"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(timespec="milliseconds")
+
+
+class SpillQueue:
+    """Segmentowana kolejka dyskowa paczek alertów (jeden plik NDJSON na paczkę)
+
+    Segmenty są zapisywane atomowo (plik tymczasowy + rename) i odczytywane
+    w kolejności zapisu. Przy przekroczeniu ``max_bytes`` usuwane są najstarsze.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._segments: Deque[Path] = deque(sorted(self.directory.glob("segment-*.ndjson")))
+        self._sizes = {path: path.stat().st_size for path in self._segments}
+        self._next_seq = int(self._segments[-1].stem.split("-")[1]) + 1 if self._segments else 0
+        self.dropped_segments = 0
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    async def push(self, body: str) -> None:
+        """Zapisz paczkę (gotowe linie NDJSON dokumentów) jako nowy segment"""
+        path = self.directory / f"segment-{self._next_seq:012d}.ndjson"
+        self._next_seq += 1
+        tmp = path.with_suffix(".tmp")
+        async with aiofiles.open(tmp, "w") as f:
+            await f.write(body)
+        os.replace(tmp, path)
+        self._segments.append(path)
+        self._sizes[path] = len(body)
+        while self.size_bytes > self.max_bytes and len(self._segments) > 1:
+            oldest = self._segments.popleft()
+            self._sizes.pop(oldest, None)
+            oldest.unlink(missing_ok=True)
+            self.dropped_segments += 1
+            logging.warning(f"Spill queue over {self.max_bytes} bytes - dropped segment {oldest.name}")
+
+    async def peek(self) -> Optional[Tuple[Path, str]]:
+        """Najstarszy segment i jego zawartość"""
+        if not self._segments:
+            return None
+        path = self._segments[0]
+        async with aiofiles.open(path, "r") as f:
+            return path, await f.read()
+
+    def remove(self, path: Path) -> None:
+        if self._segments and self._segments[0] == path:
+            self._segments.popleft()
+        self._sizes.pop(path, None)
+        path.unlink(missing_ok=True)
+
+
+class BulkElasticsearchExporter:
+    """Buforowany eksport przez API _bulk z przeciwciśnieniem i kolejką zrzutu na dysk
+
+    Alerty są serializowane raz i zbierane w pamięci; paczka jest wysyłana po
+    osiągnięciu ``max_batch_size`` dokumentów, ``max_batch_bytes`` bajtów albo
+    po ``flush_interval`` sekundach. Liczba równoległych żądań jest ograniczona
+    przez ``max_in_flight`` - gdy wszystkie są zajęte, ``export_alert`` czeka.
+    Gdy ES jest niedostępny, paczki trafiają do ``SpillQueue`` i są odtwarzane
+    automatycznie po powrocie klastra (w kolejności zapisu).
+    """
+
+    def __init__(self, hosts: list, index: str = "cyberwitness-alerts", max_batch_size: int = 500,
+                 max_batch_bytes: int = 5 * 1024 * 1024, flush_interval: float = 1.0, max_in_flight: int = 2,
+                 spill_dir: str = "spill", spill_max_bytes: int = 512 * 1024 * 1024,
+                 request_timeout: float = 10.0, client: Optional[AsyncElasticsearch] = None):
+        self.client = client or AsyncElasticsearch(hosts, request_timeout=request_timeout, max_retries=0)
         self.index = index
-        self._fallback_file = "alerts_fallback.ndjson"
+        self.max_batch_size = max_batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self.spill = SpillQueue(spill_dir, spill_max_bytes)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._lines: List[str] = []
+        self._bytes = 0
+        self._in_flight_docs = 0
+        self._in_flight_bytes = 0
+        self._tasks: set = set()
+        self._retry_delay = flush_interval
+        self.exported = 0
+        self.spilled = 0
+        self.failed = 0
+        self.bulk_latency = LatencyHistogram()
+
+    @property
+    def buffered(self) -> int:
+        """Dokumenty w pamięci: bufor paczki i paczki w trakcie wysyłki"""
+        return len(self._lines) + self._in_flight_docs
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._bytes + self._in_flight_bytes
 
     async def export_alert(self, alert: dict) -> bool:
-        """Eksportuj z obsługą błędów i fallbackiem"""
+        """Dodaj alert do bufora; czeka tylko, gdy wszystkie żądania są w toku"""
+        line = json.dumps(alert, default=str)
+        self._lines.append(line)
+        self._bytes += len(line) + len(_BULK_ACTION) + 2
+        if len(self._lines) >= self.max_batch_size or self._bytes >= self.max_batch_bytes:
+            await self._flush_buffer()
+        return True
+
+    async def handle_alert(self, alert) -> None:
+        """Handler dla AlertCoordinator.register_handler"""
+        await self.export_alert({
+            "@timestamp": es_time(alert.timestamp),
+            "type": str(alert.alert_type),
+            "priority": alert.priority,
+            "message": alert.message,
+            "count": alert.count,
+            "first_seen": es_time(alert.first_seen),
+            "last_seen": es_time(alert.last_seen),
+            **alert.payload
+        })
+
+    async def _flush_buffer(self) -> None:
+        if not self._lines:
+            return
+        lines, size = self._lines, self._bytes
+        self._lines, self._bytes = [], 0
+        self._in_flight_docs += len(lines)
+        self._in_flight_bytes += size
+        # Przeciwciśnienie: czekaj na wolne miejsce, samo wysyłanie w tle
+        await self._in_flight.acquire()
+        task = asyncio.create_task(self._send_batch(lines, size))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, lines: List[str], size: int) -> None:
         try:
-            await self.client.index(
-                index=self.index,
-                document=alert,
-                timeout="500ms"
-            )
+            body = "".join(f"{_BULK_ACTION}\n{line}\n" for line in lines)
+            if len(self.spill):
+                # Zachowaj kolejność: dopóki zaległe segmenty nie zostaną odtworzone
+                await self._spill(body, len(lines))
+            elif not await self._bulk(body):
+                await self._spill(body, len(lines))
+        finally:
+            self._in_flight_docs -= len(lines)
+            self._in_flight_bytes -= size
+            self._in_flight.release()
+
+    async def _bulk(self, body: str) -> bool:
+        """Wyślij ciało _bulk; False, gdy błąd jest przejściowy i paczkę trzeba zachować"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.bulk(operations=body, index=self.index)
+        except ApiError as e:
+            if e.meta.status == 429 or e.meta.status >= 500:
+                logging.warning(f"ES bulk rejected ({e.meta.status}), spilling batch")
+                return False
+            logging.error(f"ES bulk request failed: {e}")
+            self.failed += body.count("\n") // 2
             return True
         except (TransportError, ConnectionError) as e:
-            logging.warning(f"ES export failed: {e}, using fallback")
-            return await self._write_to_fallback(alert)
-        except Exception as e:
-            logging.error(f"Unexpected export error: {e}")
+            logging.warning(f"ES bulk export failed: {e}, spilling batch")
             return False
+        finally:
+            self.bulk_latency.record(time.perf_counter() - started)
+        items = response.get("items", [])
+        errors = [item for item in items if next(iter(item.values())).get("error")] if response.get("errors") else []
+        self.failed += len(errors)
+        self.exported += len(items) - len(errors)
+        if errors:
+            logging.error(f"ES bulk partial failure: {len(errors)} documents rejected")
+        return True
 
-    async def _write_to_fallback(self, alert: dict) -> bool:
-        """Zapisz alert do pliku w formacie NDJSON"""
+    async def _spill(self, body: str, count: int) -> None:
         try:
-            async with aiofiles.open(self._fallback_file, "a") as f:
-                await f.write(f"{json.dumps(alert)}\n")
-            return True
-        except IOError as e:
-            logging.error(f"Fallback write failed: {e}")
-            return False
+            await self.spill.push(body)
+            self.spilled += count
+        except OSError as e:
+            self.failed += count
+            logging.error(f"Spill write failed: {e}")
+
+    async def _replay_spilled(self) -> None:
+        """Odtwórz zaległe segmenty; przy błędzie zwiększ odstęp ponowień"""
+        while len(self.spill):
+            segment = await self.spill.peek()
+            if segment is None:
+                return
+            path, body = segment
+            async with self._in_flight:
+                sent = await self._bulk(body)
+            if not sent:
+                self._retry_delay = min(self._retry_delay * 2, 30.0)
+                return
+            self.spill.remove(path)
+            self._retry_delay = self.flush_interval
+        logging.info("Spill queue drained")
+
+    async def run(self) -> None:
+        """Okresowy flush bufora i odtwarzanie kolejki zrzutu"""
+        while True:
+            await asyncio.sleep(self._retry_delay if len(self.spill) else self.flush_interval)
+            await self._flush_buffer()
+            if len(self.spill):
+                await self._replay_spilled()
 
     async def close(self) -> None:
-        """Zamknij połączenia"""
-        await self.client.close()
\ No newline at end of file
+        """Wyślij resztę bufora i zamknij połączenia"""
+        await self._flush_buffer()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.client.close()
@@ -0,0 +1,255 @@
+# 📄 Plik: core/flows.py
+"""Tablica stanu przepływów z kolumnowym przechowywaniem w slotach
+
+Każdy przepływ (dwukierunkowa 5-krotka) zajmuje jeden slot w równoległych
+kolumnach ``array.array``: szybki dostęp skalarny przy aktualizacji pakietu,
+a skany wygaszania idą wektorowo przez widoki NumPy bez kopiowania.
+Klucz 5-krotki jest pakowany do jednej liczby całkowitej.
+
+Budżet pamięci (CPython 3.11, 64 bit), na jeden przepływ:
+  - kolumny: 4 (pkts) + 8 (bytes) + 3 * 8 (first/last/iat_mean) + 8 (iat_m2)
+    + 6 * 4 (flagi TCP) + 1 (zajętość) + 8 (wskaźnik klucza) = 77 B
+  - klucz int: ~44 B (IPv4) / ~64 B (IPv6)
+  - wpis słownika indeksu (z zapasem tablicy haszującej): ~60-100 B
+Razem ~180-230 B na przepływ; ``python -m benchmarks.bench_flows`` mierzy ~207 B,
+czyli ~200 MiB dla 1M równoczesnych przepływów IPv4.
+"""
+import socket
+from array import array
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+TCP_FLAG_BITS = (("fin", 0x01), ("syn", 0x02), ("rst", 0x04), ("psh", 0x08), ("ack", 0x10), ("urg", 0x20))
+PROTOCOL_NUMBERS = {"ICMP": 1, "TCP": 6, "UDP": 17}
+
+_INITIAL_SLOTS = 4096
+# Pamięć przepływu poza kolumnami: klucz int (~44 B) i wpis indeksu (~80 B)
+FLOW_ENTRY_BYTES = 44 + 80
+
+
+def _ip_to_int(ip: Optional[str]) -> int:
+    if not ip:
+        return 0
+    try:
+        return int.from_bytes(socket.inet_aton(ip), "big")
+    except OSError:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big") | (1 << 128)
+
+
+def flow_key(pkt: Dict[str, Any]) -> Hashable:
+    """Dwukierunkowy klucz 5-krotki spakowany do jednej liczby całkowitej"""
+    a = (_ip_to_int(pkt.get('src_ip')), pkt.get('src_port') or 0)
+    b = (_ip_to_int(pkt.get('dst_ip')), pkt.get('dst_port') or 0)
+    (lo_ip, lo_port), (hi_ip, hi_port) = (a, b) if a <= b else (b, a)
+    proto = PROTOCOL_NUMBERS.get(pkt.get('protocol'), 255)
+    return (((((lo_ip << 16) | lo_port) << 129 | hi_ip) << 16 | hi_port) << 8) | proto
+
+
+class FlowTable:
+    """Tablica przepływów z wygaszaniem po bezczynności, czasie aktywności i twardym limitem"""
+
+    def __init__(self, max_flows: int = 1_000_000, idle_timeout: float = 60.0, active_timeout: float = 1800.0,
+                 expire_interval: float = 1.0, on_evict: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.max_flows = max_flows
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.expire_interval = expire_interval
+        self.on_evict = on_evict
+        self._index: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = []
+        self._free: List[int] = []
+        self.pkts = array("I")
+        self.bytes = array("Q")
+        self.first_seen = array("d")
+        self.last_seen = array("d")
+        self.iat_mean = array("d")
+        self.iat_m2 = array("d")
+        self.flags = [array("I") for _ in TCP_FLAG_BITS]
+        self._used = array("b")
+        self._last_expire = 0.0
+        self.evicted_idle = 0
+        self.evicted_active = 0
+        self.evicted_capacity = 0
+        self._grow(min(_INITIAL_SLOTS, max_flows))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def slots(self) -> int:
+        return len(self._used)
+
+    def _grow(self, slots: int) -> None:
+        start = self.slots
+        count = slots - start
+        if count <= 0:
+            return
+        for column in (self.pkts, self.bytes, self.first_seen, self.last_seen, self.iat_mean, self.iat_m2,
+                       *self.flags, self._used):
+            column.frombytes(bytes(count * column.itemsize))
+        self._keys.extend([None] * count)
+        self._free.extend(range(slots - 1, start - 1, -1))
+
+    def _allocate(self, now: float) -> int:
+        if not self._free:
+            if self.slots < self.max_flows:
+                self._grow(min(self.slots * 2, self.max_flows))
+            else:
+                self.expire(now)
+                if not self._free:
+                    self._evict_oldest()
+        return self._free.pop()
+
+    def update(self, pkt: Dict[str, Any], now: Optional[float] = None) -> int:
+        """Zaktualizuj przepływ pakietu i zwróć jego slot"""
+        if now is None:
+            now = pkt.get('timestamp') or 0.0
+        if now - self._last_expire >= self.expire_interval:
+            self.expire(now)
+
+        key = flow_key(pkt)
+        slot = self._index.get(key)
+        if slot is None:
+            slot = self._allocate(now)
+            self._index[key] = slot
+            self._keys[slot] = key
+            self._used[slot] = 1
+            self.pkts[slot] = 1
+            self.bytes[slot] = pkt.get('packet_size') or 0
+            self.first_seen[slot] = self.last_seen[slot] = now
+            self.iat_mean[slot] = self.iat_m2[slot] = 0.0
+            for column in self.flags:
+                column[slot] = 0
+        else:
+            # Algorytm Welforda dla średniej i wariancji odstępów między pakietami
+            iat = now - self.last_seen[slot]
+            n = self.pkts[slot]
+            delta = iat - self.iat_mean[slot]
+            mean = self.iat_mean[slot] + delta / n
+            self.iat_mean[slot] = mean
+            self.iat_m2[slot] += delta * (iat - mean)
+            self.pkts[slot] = n + 1
+            self.bytes[slot] += pkt.get('packet_size') or 0
+            self.last_seen[slot] = now
+
+        tcp_flags = pkt.get('tcp_flags')
+        if tcp_flags:
+            for column, (_, bit) in zip(self.flags, TCP_FLAG_BITS):
+                if tcp_flags & bit:
+                    column[slot] += 1
+        return slot
+
+    def view(self, slot: int) -> Dict[str, Any]:
+        """Pola przepływu dostępne w regułach jako ``flow['...']``"""
+        pkts = self.pkts[slot]
+        duration = self.last_seen[slot] - self.first_seen[slot]
+        record = {
+            'pkts': pkts,
+            'bytes': self.bytes[slot],
+            'first_seen': self.first_seen[slot],
+            'last_seen': self.last_seen[slot],
+            'duration': duration,
+            'bytes_per_s': self.bytes[slot] / duration if duration > 0 else 0.0,
+            'pkts_per_s': pkts / duration if duration > 0 else 0.0,
+            'iat_mean': self.iat_mean[slot],
+            'iat_std': (self.iat_m2[slot] / (pkts - 2)) ** 0.5 if pkts > 2 else 0.0,
+        }
+        for column, (name, _) in zip(self.flags, TCP_FLAG_BITS):
+            record[name] = column[slot]
+        return record
+
+    def get(self, pkt: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        slot = self._index.get(flow_key(pkt))
+        return None if slot is None else self.view(slot)
+
+    def _release(self, slot: int) -> None:
+        if self.on_evict is not None:
+            self.on_evict({'key': self._keys[slot], **self.view(slot)})
+        del self._index[self._keys[slot]]
+        self._keys[slot] = None
+        self._used[slot] = 0
+        self._free.append(slot)
+
+    def expire(self, now: float) -> int:
+        """Usuń przepływy bezczynne dłużej niż idle_timeout lub aktywne dłużej niż active_timeout"""
+        self._last_expire = now
+        if not self._index:
+            return 0
+        used = np.frombuffer(self._used, dtype=np.int8).astype(bool)
+        idle = used & (np.frombuffer(self.last_seen, dtype=np.float64) < now - self.idle_timeout)
+        active = used & ~idle & (np.frombuffer(self.first_seen, dtype=np.float64) < now - self.active_timeout)
+        for slot in np.flatnonzero(idle).tolist():
+            self._release(slot)
+        for slot in np.flatnonzero(active).tolist():
+            self._release(slot)
+        self.evicted_idle += int(idle.sum())
+        self.evicted_active += int(active.sum())
+        return int(idle.sum() + active.sum())
+
+    def _evict_oldest(self, fraction: float = 0.01) -> None:
+        """Twardy limit: usuń najdawniej aktywny ~1% przepływów naraz"""
+        count = max(1, int(self.slots * fraction))
+        last_seen = np.frombuffer(self.last_seen, dtype=np.float64)
+        oldest = np.argpartition(last_seen, count - 1)[:count]
+        for slot in oldest.tolist():
+            if self._used[slot]:
+                self._release(slot)
+        self.evicted_capacity += count
+
+    def shed(self, count: int) -> int:
+        """Usuń ``count`` najdawniej aktywnych przepływów (budżet pamięci), potem ``compact``"""
+        count = min(count, len(self._index))
+        if count <= 0:
+            return 0
+        used = np.frombuffer(self._used, dtype=np.int8).astype(bool)
+        last_seen = np.where(used, np.frombuffer(self.last_seen, dtype=np.float64), np.inf)
+        for slot in np.argpartition(last_seen, count - 1)[:count].tolist():
+            self._release(slot)
+        self.evicted_capacity += count
+        self.compact()
+        return count
+
+    def compact(self) -> int:
+        """Zmniejsz kolumny, gdy zajęta jest najwyżej połowa slotów; zwraca zwolnione sloty
+
+        Kolumny rosną z ruchem i same nie maleją - bez tego pamięć po zrywie
+        przepływów zostaje zajęta. Przepływy dostają nowe, zwarte numery slotów
+        (slot z ``update`` jest ważny tylko do następnej zmiany tablicy).
+        """
+        live = len(self._index)
+        slots = max(min(_INITIAL_SLOTS, self.max_flows), 1 << max(live - 1, 0).bit_length())
+        if live * 2 > self.slots or slots >= self.slots:
+            return 0
+        freed = self.slots - slots
+        order = np.flatnonzero(np.frombuffer(self._used, dtype=np.int8))
+        for column in (self.pkts, self.bytes, self.first_seen, self.last_seen, self.iat_mean, self.iat_m2,
+                       *self.flags, self._used):
+            values = np.zeros(slots, dtype=column.typecode)
+            values[:live] = np.frombuffer(column, dtype=column.typecode)[order]
+            column[:] = array(column.typecode, values.tobytes())
+        keys = [self._keys[slot] for slot in order.tolist()]
+        self._keys = keys + [None] * (slots - live)
+        self._index = {key: slot for slot, key in enumerate(keys)}
+        self._free = list(range(slots - 1, live - 1, -1))
+        return freed
+
+    def _slot_bytes(self) -> int:
+        return 8 + sum(c.itemsize for c in (self.pkts, self.bytes, self.first_seen, self.last_seen,
+                                            self.iat_mean, self.iat_m2, *self.flags, self._used))
+
+    def memory_bytes(self) -> int:
+        """Przybliżony rozmiar tablicy w bajtach (kolumny, klucze i indeks)"""
+        return self._slot_bytes() * self.slots + FLOW_ENTRY_BYTES * len(self._index)
+
+    def flow_bytes(self) -> float:
+        """Średnia pamięć zwalniana przez ``shed`` jednego przepływu
+
+        Wpis indeksu plus część kolumn ponad rozmiar początkowy - tyle, ile
+        ``compact`` może oddać po usunięciu przepływów.
+        """
+        live = len(self._index)
+        if not live:
+            return float(FLOW_ENTRY_BYTES)
+        spare = self.slots - min(_INITIAL_SLOTS, self.max_flows)
+        return FLOW_ENTRY_BYTES + max(spare, 0) * self._slot_bytes() / live
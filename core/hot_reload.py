@@ -0,0 +1,218 @@
+# 📄 Plik: core/hot_reload.py
+"""Podmiana reguł i modelu ONNX bez zatrzymywania przechwytywania
+
+Nowy zestaw reguł (z pliku albo z API) jest kompilowany i sprawdzany w wątku
+razem z silnikiem okien, który przejmuje stan okien niezmienionych reguł.
+Sama podmiana to przypisanie atrybutów w pętli zdarzeń - między dwoma
+pakietami, bez wstrzymywania bufora przechwytywania. Nowa sesja ONNX jest tak
+samo tworzona i sprawdzana próbną inferencją w tle. Błędna wersja jest
+odrzucana, a potok działa dalej na poprzedniej.
+
+Pliki są obserwowane przez porównanie (mtime, rozmiar) co ``interval`` s.
+Po podmianie reguł filtr przechwytywania (``network.capture_filter``) jest
+wyznaczany od nowa; jeśli nowe reguły go poszerzają, szerszy filtr działa już
+przed podmianą. Błąd filtra nie cofa przyjętych reguł.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.errors import ConfigurationError, RuleCompilationError
+from core.inference import InferenceExecutor
+from core.metrics import LatencyHistogram
+from core.rules import RuleSet
+from core.windows import WindowEngine
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class HotReloader:
+    def __init__(self, rules_path: str, monitors: Sequence[Any], inference: Optional[InferenceExecutor] = None,
+                 model_path: Optional[str] = None, shards: Any = None, interval: float = 2.0,
+                 capture: Any = None):
+        self.rules_path = str(rules_path)
+        self.monitors = list(monitors)
+        self.inference = inference
+        self.model_path = model_path
+        # core.sharding.ShardedTrafficMonitor - procesy robocze dostają nowe wersje kolejką
+        self.shards = shards
+        # network.monitoring.NetworkMonitor - filtr przechwytywania wyprowadzany z reguł
+        self.capture = capture
+        self.interval = interval
+        self.rules: List[Dict[str, Any]] = self.monitors[0].rules if self.monitors else []
+        self.rules_version = 1
+        self.failed = 0
+        # Kompilacja/ładowanie w tle i sama podmiana w pętli zdarzeń
+        self.build_latency = LatencyHistogram()
+        self.swap_latency = LatencyHistogram()
+        self._signatures = {path: _signature(path) for path in self._watched()}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def model_version(self) -> int:
+        return self.inference.model_version if self.inference is not None else 0
+
+    def _watched(self) -> List[str]:
+        paths = [self.rules_path]
+        if self.inference is not None and self.model_path:
+            paths.append(self.model_path)
+        return paths
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    # --------------- reguły -------------------
+
+    def _read_rules(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.rules_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigurationError(f"Cannot read rules from {self.rules_path}: {e}") from e
+
+    def _build(self, rules: Any) -> Tuple[RuleSet, List[WindowEngine]]:
+        if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+            raise RuleCompilationError("Rules must be a JSON list of objects")
+        rule_set = RuleSet.from_rules(rules)
+        return rule_set, [WindowEngine(rule_set.rules, previous=monitor.windows) for monitor in self.monitors]
+
+    def _write_rules(self, rules: List[Dict[str, Any]]) -> None:
+        """Zapis atomowy (plik tymczasowy + rename) - obserwator nie zobaczy połowy pliku"""
+        directory = os.path.dirname(os.path.abspath(self.rules_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".rules-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(rules, f, indent=2)
+            os.replace(tmp_path, self.rules_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def reload_rules(self, rules: Optional[List[Dict[str, Any]]] = None, persist: bool = False) -> int:
+        """Podmień reguły (domyślnie z ``rules_path``); zwraca nową wersję
+
+        ``persist`` zapisuje zaakceptowane reguły do ``rules_path``. Błąd
+        walidacji zgłasza ``ConfigurationError`` i zostawia bieżące reguły.
+        """
+        async with self._get_lock():
+            return await self._swap_rules(rules, persist)
+
+    async def add_rule(self, rule: Dict[str, Any], persist: bool = False) -> int:
+        """Dodaj regułę albo zastąp regułę o tej samej nazwie; zwraca nową wersję
+
+        Lista bazowa jest czytana pod blokadą - równoległe dodania nie gubią
+        się nawzajem.
+        """
+        async with self._get_lock():
+            rules = [existing for existing in self.rules if existing.get("name") != rule.get("name")]
+            return await self._swap_rules(rules + [rule], persist)
+
+    async def _swap_rules(self, rules: Optional[List[Dict[str, Any]]], persist: bool) -> int:
+        """``reload_rules`` bez blokady - wywołujący ją trzyma"""
+        started = time.perf_counter()
+        try:
+            if rules is None:
+                rules = await asyncio.to_thread(self._read_rules)
+            rule_set, engines = await asyncio.to_thread(self._build, rules)
+            if persist:
+                await asyncio.to_thread(self._write_rules, rules)
+        except ConfigurationError:
+            self.failed += 1
+            raise
+        except (OSError, TypeError) as e:
+            self.failed += 1
+            raise ConfigurationError(f"Invalid rules: {e}") from e
+        if persist:
+            self._signatures[self.rules_path] = _signature(self.rules_path)
+        self.build_latency.record(time.perf_counter() - started)
+
+        if self.capture is not None:
+            # Pierwsze pakiety nowych reguł nie mogą odpaść na starym filtrze
+            await self._update_filter(self.capture.widen_filter, rule_set)
+
+        started = time.perf_counter()
+        for monitor, engine in zip(self.monitors, engines):
+            monitor.swap_rules(rules, rule_set, engine)
+        self.rules = rules
+        self.rules_version += 1
+        self.swap_latency.record(time.perf_counter() - started)
+        if self.shards is not None:
+            await self.shards.reload_rules(rules)
+        if self.capture is not None:
+            # Poza pomiarem podmiany: backend Scapy otwiera gniazdo od nowa
+            await self._update_filter(self.capture.update_filter, rule_set)
+        logging.info(f"Rules reloaded: version {self.rules_version}, {len(rule_set)} rules")
+        return self.rules_version
+
+    async def _update_filter(self, update: Callable[[Any], Any], rule_set: RuleSet) -> None:
+        """Zmiana filtra przechwytywania; błąd zostaje w logu, reguły są już przyjęte"""
+        try:
+            await asyncio.to_thread(update, rule_set.rules)
+        except Exception as e:
+            logging.error(f"Capture filter update failed, rules are still applied: {e}")
+
+    # --------------- model -------------------
+
+    async def reload_model(self, model_path: Optional[str] = None) -> int:
+        """Załaduj, sprawdź i podmień model; zwraca nową wersję"""
+        if self.inference is None:
+            raise ConfigurationError("AI inference is disabled")
+        model_path = model_path or self.model_path or self.inference.model_path
+        async with self._get_lock():
+            started = time.perf_counter()
+            try:
+                analyzer = await self.inference.load_model(model_path)
+            except ConfigurationError:
+                self.failed += 1
+                raise
+            self.build_latency.record(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            self.inference.swap_model(analyzer, model_path)
+            self.swap_latency.record(time.perf_counter() - started)
+            if self.shards is not None:
+                await self.shards.reload_model(model_path)
+            logging.info(f"Model reloaded: version {self.model_version} from {model_path}")
+            return self.model_version
+
+    # --------------- obserwacja plików -------------------
+
+    def _changed(self, path: str) -> bool:
+        signature = _signature(path)
+        if signature == self._signatures.get(path):
+            return False
+        self._signatures[path] = signature
+        # Usunięty plik nie zmienia działającej wersji
+        return signature is not None
+
+    async def check(self) -> None:
+        """Przeładuj pliki zmienione od poprzedniego sprawdzenia"""
+        if self._get_lock().locked():
+            return  # trwa podmiana (np. z API, która sama zapisuje plik reguł)
+        if self._changed(self.rules_path):
+            try:
+                await self.reload_rules()
+            except ConfigurationError as e:
+                logging.error(f"Rules reload failed, keeping version {self.rules_version}: {e}")
+        if self.inference is not None and self.model_path and self._changed(self.model_path):
+            try:
+                await self.reload_model()
+            except ConfigurationError as e:
+                logging.error(f"Model reload failed, keeping version {self.model_version}: {e}")
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
@@ -0,0 +1,212 @@
+# 📄 Plik: core/inference.py
+"""Wykonawca inferencji ONNX poza pętlą zdarzeń
+
+Tryby:
+  - ``inline``  - wywołanie bezpośrednio w pętli (tylko testy/diagnostyka)
+  - ``thread``  - jedna sesja współdzielona przez pulę wątków; onnxruntime
+                  zwalnia GIL w ``session.run``, liczba wątków operatora jest
+                  ustawiana przez ``intra_op_num_threads``
+  - ``process`` - pula procesów, po jednej sesji na proces roboczy
+
+Z ``cache`` (``core.verdict_cache.VerdictCache``) do modelu trafiają tylko
+krotki cech bez ważnego wyniku w pamięci, każda raz na paczkę.
+
+Zadań czekających i wykonywanych jest najwyżej ``max_pending``; kolejne są
+odrzucane (``InferenceBacklogFull``, licznik ``rejected``), zamiast rosnąć
+bez ograniczenia, gdy ruch przewyższa przepustowość modelu.
+
+Nowy model jest ładowany i sprawdzany w tle (``load_model``), a podmieniany
+synchronicznie (``swap_model``) - zadania już wysłane kończą się na starej sesji.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.errors import ConfigurationError, InferenceBacklogFull
+from core.metrics import LatencyHistogram
+from core.verdict_cache import VerdictCache
+
+EXECUTOR_MODES = {"inline", "thread", "process"}
+
+# Sesja procesu roboczego w trybie "process"
+_worker_analyzer: Optional[AIThreatAnalyzer] = None
+
+
+def _init_worker(model_path: str, intra_op_num_threads: Optional[int]) -> None:
+    global _worker_analyzer
+    _worker_analyzer = AIThreatAnalyzer(model_path, intra_op_num_threads)
+
+
+def _worker_predict(features: np.ndarray) -> np.ndarray:
+    return _worker_analyzer.predict_features(features)
+
+
+class InferenceExecutor:
+    """Asynchroniczny interfejs do inferencji z ograniczoną kolejką zadań"""
+
+    def __init__(
+        self,
+        model_path: str,
+        mode: str = "thread",
+        workers: int = 2,
+        intra_op_num_threads: Optional[int] = 1,
+        max_pending: int = 64,
+        analyzer: Optional[AIThreatAnalyzer] = None,
+        cache: Optional[VerdictCache] = None,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ConfigurationError(f"Invalid inference executor mode: {mode}")
+        self.model_path = model_path
+        self.mode = mode
+        self.workers = workers
+        self.intra_op_num_threads = intra_op_num_threads
+        self.max_pending = max_pending
+        self._analyzer = analyzer
+        self._analyzer_lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self.cache = cache
+        self.pending = 0
+        self.rejected = 0
+        self.batches = 0
+        # Wiersze faktycznie ocenione przez model (bez trafień w cache)
+        self.inferred = 0
+        # Zwiększana przy każdej podmianie modelu
+        self.model_version = 1
+        # Czas paczki od wejścia do kolejki zadań do wyniku (z oczekiwaniem na slot)
+        self.latency = LatencyHistogram()
+
+    @property
+    def analyzer(self) -> AIThreatAnalyzer:
+        """Współdzielona sesja (inline/thread), tworzona przy pierwszym użyciu"""
+        if self._analyzer is None:
+            with self._analyzer_lock:
+                if self._analyzer is None:
+                    self._analyzer = AIThreatAnalyzer(self.model_path, self.intra_op_num_threads)
+        return self._analyzer
+
+    async def warm_up(self) -> None:
+        """Utwórz współdzieloną sesję w wątku, zanim przyjdzie pierwsza paczka
+
+        Brak lub błąd modelu jest tylko logowany - potok i API działają dalej,
+        a kolejna próba nastąpi przy pierwszej inferencji.
+        """
+        if self.mode == "process":
+            return  # sesje powstają w procesach roboczych przy pierwszej paczce
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(lambda: self.analyzer)
+        except Exception as e:
+            logging.error(f"Cannot load ONNX model {self.model_path}: {e}")
+            return
+        logging.info(f"ONNX session ready in {time.perf_counter() - started:.2f} s")
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.model_path, self.intra_op_num_threads),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._pool
+
+    def _load_analyzer(self, model_path: str) -> AIThreatAnalyzer:
+        try:
+            analyzer = AIThreatAnalyzer(model_path, self.intra_op_num_threads)
+            probe = analyzer.predict_features(np.zeros((1, 3), dtype=np.float32))
+        except Exception as e:
+            raise ConfigurationError(f"Cannot load ONNX model {model_path}: {e}") from e
+        if probe.shape != (1,) or not np.isfinite(probe).all():
+            raise ConfigurationError(f"ONNX model {model_path} returned invalid output {probe!r}")
+        return analyzer
+
+    async def load_model(self, model_path: Optional[str] = None) -> AIThreatAnalyzer:
+        """Utwórz i sprawdź sesję nowego modelu w wątku; nie zmienia bieżącej"""
+        return await asyncio.to_thread(self._load_analyzer, model_path or self.model_path)
+
+    def swap_model(self, analyzer: AIThreatAnalyzer, model_path: Optional[str] = None) -> None:
+        """Podmień sesję sprawdzoną przez ``load_model`` i unieważnij pamięć wyników
+
+        W trybie ``process`` nowa pula procesów powstaje przy następnej paczce;
+        stara kończy rozpoczęte zadania w tle.
+        """
+        if model_path is not None:
+            self.model_path = model_path
+        old_pool = None
+        if self.mode == "process":
+            old_pool, self._pool = self._pool, None
+        else:
+            self._analyzer = analyzer
+        self.model_version += 1
+        if self.cache is not None:
+            self.cache.model_path = self.model_path
+            self.cache.check_model(force=True)
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def _predict_sync(self, features: np.ndarray) -> np.ndarray:
+        return self.analyzer.predict_features(features)
+
+    async def predict_features(self, features: np.ndarray) -> np.ndarray:
+        """Oceń macierz cech (N, 3); ``InferenceBacklogFull``, gdy kolejka zadań jest pełna"""
+        if self.cache is None:
+            return await self._run(features)
+        cache = self.cache
+        now = time.monotonic()
+        cache.check_model(now)
+        generation = cache.generation
+        scores = np.empty(len(features), dtype=np.float32)
+        missing: Dict[Tuple[float, ...], List[int]] = {}
+        for i, key in enumerate(map(tuple, features.tolist())):
+            score = cache.get(key, now)
+            if score is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                scores[i] = score
+        if missing:
+            results = await self._run(np.array(list(missing), dtype=np.float32))
+            now = time.monotonic()
+            for (key, rows), score in zip(missing.items(), results.tolist()):
+                cache.put(key, score, now, generation)
+                scores[rows] = score
+        return scores
+
+    async def _run(self, features: np.ndarray) -> np.ndarray:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise InferenceBacklogFull(f"Inference backlog full ({self.pending} batches pending)")
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            if self.mode == "inline":
+                return self._predict_sync(features)
+            loop = asyncio.get_running_loop()
+            func = _worker_predict if self.mode == "process" else self._predict_sync
+            return await loop.run_in_executor(self._get_pool(), func, features)
+        finally:
+            self.pending -= 1
+            self.batches += 1
+            self.inferred += len(features)
+            self.latency.record(time.perf_counter() - started)
+
+    async def predict_batch(self, samples: Sequence[Tuple[Optional[str], Optional[int], int]]) -> np.ndarray:
+        ips, ports, protocols = zip(*samples) if samples else ((), (), ())
+        features = AIThreatAnalyzer.features_batch(ips, ports, protocols)
+        return await self.predict_features(features)
+
+    async def predict(self, ip: str, port: int, protocol: int) -> float:
+        return float((await self.predict_batch([(ip, port, protocol)]))[0])
+
+    def close(self) -> None:
+        """Zamknij pulę roboczą"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,169 @@
+# 📄 Plik: core/metrics.py
+"""Metryki potoku w formacie tekstowym Prometheusa
+
+``LatencyHistogram`` to histogram w stylu HDR: kubełki logarytmiczne (potęgi
+dwójki) podzielone liniowo na ``SUB_BUCKETS`` części, więc błąd względny
+kwantyli to ~6%, a zapis to kilka operacji arytmetycznych na prealokowanej
+tablicy - bez alokacji na pakiet. Liczniki, które komponenty już mają
+(``captured``, ``dropped``, ``exported``...), są czytane dopiero przy
+pobieraniu ``/metrics`` przez funkcje zwrotne, więc nie kosztują nic na
+ścieżce pakietu.
+"""
+import math
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+SUB_BUCKETS = 16
+MIN_EXPONENT = -23  # 2**-24 s ~ 60 ns
+MAX_EXPONENT = 8    # 2**8 s = 256 s
+_BUCKETS = (MAX_EXPONENT - MIN_EXPONENT + 1) * SUB_BUCKETS
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class LatencyHistogram:
+    """Histogram opóźnień (sekundy) z licznikiem, sumą i maksimum"""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * _BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds <= 0.0:
+            self.counts[0] += 1
+            return
+        mantissa, exponent = math.frexp(seconds)  # seconds = mantissa * 2**exponent, mantissa w [0.5, 1)
+        if exponent < MIN_EXPONENT:
+            index = 0
+        elif exponent > MAX_EXPONENT:
+            return  # powyżej ostatniej granicy - liczy się tylko w count (le="+Inf")
+        else:
+            index = (exponent - MIN_EXPONENT) * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+        self.counts[index] += 1
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return math.ldexp(0.5 + (sub + 1) / (2 * SUB_BUCKETS), exponent + MIN_EXPONENT)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count * 1e6,
+            "p50_us": self.quantile(0.5) * 1e6,
+            "p99_us": self.quantile(0.99) * 1e6,
+            "max_us": self.max * 1e6,
+        }
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Skumulowane liczności dla granic ``le`` = potęgi dwójki (dokładne dla HDR)"""
+        points = []
+        seen = 0
+        for exponent in range(MAX_EXPONENT - MIN_EXPONENT + 1):
+            start = exponent * SUB_BUCKETS
+            seen += sum(self.counts[start:start + SUB_BUCKETS])
+            points.append((math.ldexp(1.0, exponent + MIN_EXPONENT), seen))
+        return points
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Rejestr metryk renderowany na żądanie dla ``/metrics``"""
+
+    def __init__(self, namespace: str = "cyberwitness"):
+        self.namespace = namespace
+        # nazwa -> (typ, opis, [(etykiety, źródło)])
+        self._metrics: Dict[str, Tuple[str, str, List[Tuple[Labels, object]]]] = {}
+
+    def _add(self, kind: str, name: str, help_text: str, source: object,
+             labels: Optional[Dict[str, str]]) -> None:
+        full_name = f"{self.namespace}_{name}"
+        entry = self._metrics.setdefault(full_name, (kind, help_text, []))
+        if entry[0] != kind:
+            raise ValueError(f"Metric {full_name} already registered as {entry[0]}")
+        entry[2].append((tuple(sorted((labels or {}).items())), source))
+
+    def counter(self, name: str, help_text: str, read: Callable[[], float],
+                labels: Optional[Dict[str, str]] = None) -> None:
+        """Licznik czytany przy pobraniu (np. ``lambda: monitor.captured``)"""
+        self._add("counter", name, help_text, read, labels)
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float],
+              labels: Optional[Dict[str, str]] = None) -> None:
+        self._add("gauge", name, help_text, read, labels)
+
+    def histogram(self, name: str, help_text: str, histogram: Optional[LatencyHistogram] = None,
+                  labels: Optional[Dict[str, str]] = None) -> LatencyHistogram:
+        """Zarejestruj (lub utwórz) histogram opóźnień etapu"""
+        histogram = histogram if histogram is not None else LatencyHistogram()
+        self._add("histogram", name, help_text, histogram, labels)
+        return histogram
+
+    def render(self) -> str:
+        """Format tekstowy Prometheusa 0.0.4"""
+        lines = []
+        for name, (kind, help_text, series) in self._metrics.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, source in series:
+                if kind == "histogram":
+                    for bound, count in source.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(labels, (('le', repr(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {source.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(source.total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {source.count}")
+                else:
+                    try:
+                        value = source()
+                    except Exception:
+                        continue
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> List[Tuple[str, Dict[str, float]]]:
+        """Skrót dla dashboardu: kwantyle histogramów i bieżące wartości liczników"""
+        rows = []
+        for name, (kind, _, series) in self._metrics.items():
+            short = name[len(self.namespace) + 1:]
+            for labels, source in series:
+                label = short + _format_labels(labels)
+                if kind == "histogram":
+                    rows.append((label, source.summary()))
+                else:
+                    try:
+                        rows.append((label, {"value": source()}))
+                    except Exception:
+                        continue
+        return rows
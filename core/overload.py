@@ -0,0 +1,116 @@
+# 📄 Plik: core/overload.py
+"""Stopniowa degradacja analizy przy zbliżającym się nasyceniu bufora pakietów
+
+``OverloadController`` obserwuje zapełnienie bufora ``NetworkMonitor`` i czas
+oczekiwania pakietu w kolejce, i wybiera poziom degradacji:
+
+  - ``NORMAL``       - pełna analiza,
+  - ``NO_AI``        - bez inferencji AI,
+  - ``SAMPLING``     - pakiety bez dopasowanej reguły nagłówkowej ("łagodne")
+                       są analizowane tylko dla co ``sample_rate``-tego
+                       przepływu (próbkowanie spójne w obrębie przepływu),
+  - ``HEADERS_ONLY`` - tylko reguły o priorytecie HIGH na polach nagłówka,
+                       bez stanu przepływów i okien.
+
+Poziom rośnie od razu po przekroczeniu progu, a spada o jeden dopiero, gdy
+obciążenie utrzyma się poniżej ``recover_ratio`` progu przez ``hold_seconds``
+- bez tego poziom migotałby przy obciążeniu blisko progu.
+
+Liczniki (``ai_skipped``, ``sampled_out``, ``headers_only_dropped``) i
+bieżąca częstość próbkowania są w ``status()``: liczby z próbkowanych
+przepływów mnoży się przez ``sample_rate``, żeby oszacować pełny ruch.
+"""
+import logging
+import time
+from enum import IntEnum
+from typing import Any, Dict, Optional, Sequence
+
+from core.flows import flow_key
+
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+class OverloadLevel(IntEnum):
+    NORMAL = 0
+    NO_AI = 1
+    SAMPLING = 2
+    HEADERS_ONLY = 3
+
+
+class OverloadController:
+    """Wybór poziomu degradacji z zapełnienia kolejki i opóźnienia przetwarzania"""
+
+    def __init__(self, depth_thresholds: Sequence[float] = (0.5, 0.7, 0.9),
+                 lag_thresholds: Sequence[float] = (0.05, 0.2, 0.5), sample_rate: int = 10,
+                 recover_ratio: float = 0.5, hold_seconds: float = 2.0):
+        if len(depth_thresholds) != 3 or len(lag_thresholds) != 3:
+            raise ValueError("depth_thresholds and lag_thresholds need one value per degraded level")
+        if sample_rate < 1:
+            raise ValueError("sample_rate must be >= 1")
+        self.depth_thresholds = tuple(depth_thresholds)
+        self.lag_thresholds = tuple(lag_thresholds)
+        self.sample_rate = sample_rate
+        self.recover_ratio = recover_ratio
+        self.hold_seconds = hold_seconds
+        self.level = OverloadLevel.NORMAL
+        self.depth = 0.0
+        self.lag = 0.0
+        self._calm_since: Optional[float] = None
+        self.transitions = 0
+        self.ai_skipped = 0
+        self.sampled_out = 0
+        self.headers_only_dropped = 0
+
+    def _target(self, depth: float, lag: float, ratio: float = 1.0) -> OverloadLevel:
+        level = OverloadLevel.NORMAL
+        for candidate, (depth_limit, lag_limit) in enumerate(zip(self.depth_thresholds, self.lag_thresholds), 1):
+            if depth >= depth_limit * ratio or lag >= lag_limit * ratio:
+                level = OverloadLevel(candidate)
+        return level
+
+    def update(self, depth: float, lag: float, now: Optional[float] = None) -> OverloadLevel:
+        """Nowy pomiar: ``depth`` - zapełnienie bufora 0..1, ``lag`` - oczekiwanie w kolejce (s)"""
+        now = time.monotonic() if now is None else now
+        self.depth = depth
+        self.lag = lag
+        target = self._target(depth, lag)
+        if target > self.level:
+            self._set_level(target)
+            self._calm_since = None
+        elif self._target(depth, lag, self.recover_ratio) < self.level:
+            # Zejście o jeden poziom po utrzymaniu niskiego obciążenia przez hold_seconds
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.hold_seconds:
+                self._set_level(OverloadLevel(self.level - 1))
+                self._calm_since = now
+        else:
+            self._calm_since = None
+        return self.level
+
+    def _set_level(self, level: OverloadLevel) -> None:
+        logging.warning(f"Overload level {self.level.name} -> {level.name} "
+                        f"(buffer {self.depth:.0%}, lag {self.lag * 1000:.1f} ms)")
+        self.level = level
+        self.transitions += 1
+
+    def keep_flow(self, pkt_data: Dict[str, Any]) -> bool:
+        """Czy przepływ pakietu należy do próbki (ta sama decyzja dla obu kierunków)"""
+        if self.sample_rate == 1:
+            return True
+        # hash() inta to reszta mod 2**61-1 (obejmuje wszystkie bity klucza), mnożenie miesza bity
+        return ((hash(flow_key(pkt_data)) * _MIX) & _MASK64) >> 32 < (1 << 32) // self.sample_rate
+
+    def status(self) -> Dict[str, Any]:
+        """Bieżący tryb dla API i dashboardu"""
+        return {
+            "level": self.level.name.lower(),
+            "buffer_fill": self.depth,
+            "lag_seconds": self.lag,
+            "sample_rate": self.sample_rate if self.level >= OverloadLevel.SAMPLING else 1,
+            "transitions": self.transitions,
+            "ai_skipped": self.ai_skipped,
+            "sampled_out": self.sampled_out,
+            "headers_only_dropped": self.headers_only_dropped,
+        }
@@ -0,0 +1,299 @@
+# 📄 Plik: core/packet_archive.py
+"""Kolumnowe archiwum metadanych pakietów (Parquet / Arrow IPC)
+
+Pola pakietów (te same słowniki, które dostaje ``AdvancedTrafficMonitor``)
+są zbierane w pamięci i co ``batch_rows`` wierszy przekazywane do jednego
+wątku zapisu - konwersja do ``RecordBatch``, kompresja i zapis nie blokują
+pętli zdarzeń, a kolejność paczek jest zachowana. Gdy zapis nie nadąża
+(``max_pending`` paczek w kolejce), nowe paczki są odrzucane i liczone
+w ``dropped`` - archiwum nie spowalnia przechwytywania.
+
+Segmenty są partycjonowane czasem pakietów (UTC) w układzie Hive::
+
+    <directory>/date=2024-05-01/hour=13/packets-20240501T130000-000000.parquet
+
+Nowy segment zaczyna się po ``rotate_bytes`` bajtach, po ``rotate_seconds``
+(czas pakietów albo wiek otwartego segmentu) i na granicy godziny. Otwarty
+segment ma nazwę z kropką na początku (pomijaną przez ``pyarrow.dataset``)
+i dostaje właściwą nazwę dopiero po zapisaniu stopki - czytelnik nie widzi
+niedokończonych plików.
+
+Odczyt do ponownej analizy::
+
+    for rows in iter_archive("archive", since=t0, until=t1):
+        await monitor.analyze_rows(rows)
+
+pyarrow jest zależnością opcjonalną - importowany dopiero przy tworzeniu
+archiwum lub odczycie.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from core.errors import ConfigurationError
+from core.metrics import LatencyHistogram
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Kolumny = klucze słownika z extract_packet_fields / PacketRecord.to_dict
+PACKET_FIELDS = ("timestamp", "src_ip", "dst_ip", "protocol", "packet_size", "src_port", "dst_port", "tcp_flags")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ConfigurationError("Packet archive requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def packet_schema():
+    pa = _require_pyarrow()
+    return pa.schema([
+        ("timestamp", pa.float64()),
+        ("src_ip", pa.string()),
+        ("dst_ip", pa.string()),
+        ("protocol", pa.string()),
+        ("packet_size", pa.uint32()),
+        ("src_port", pa.uint16()),
+        ("dst_port", pa.uint16()),
+        ("tcp_flags", pa.uint16()),
+    ])
+
+
+def _partition(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class PacketArchive:
+    """Strumieniowy zapis pakietów do rotowanych, skompresowanych segmentów kolumnowych"""
+
+    def __init__(self, directory: str, fmt: str = "parquet", compression: str = "zstd", batch_rows: int = 65536,
+                 rotate_bytes: int = 256 * 1024 * 1024, rotate_seconds: float = 300.0,
+                 flush_interval: float = 1.0, max_pending: int = 8):
+        if fmt not in FORMATS:
+            raise ConfigurationError(f"Unknown archive format: {fmt} (expected one of {', '.join(FORMATS)})")
+        self._pa = _require_pyarrow()
+        self.schema = packet_schema()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.format = fmt
+        self.compression = None if compression in ("", "none") else compression
+        self.batch_rows = max(1, batch_rows)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self._rows: List[Dict[str, Any]] = []
+        # Jeden wątek: zapisy do otwartego segmentu idą po kolei
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="packet-archive")
+        self._pending = 0
+        self._pending_rows = 0
+        # Stan otwartego segmentu - używany tylko w wątku zapisu
+        self._writer = None
+        self._sink = None
+        self._segment: Optional[Path] = None
+        self._segment_start = 0.0
+        self._segment_hour: Optional[datetime] = None
+        self._segment_opened = 0.0
+        self._segment_bytes = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.segments = 0
+        self.bytes_written = 0
+        self.write_latency = LatencyHistogram()
+
+    # --------------- wejście z pętli zdarzeń -------------------
+
+    @property
+    def pending_rows(self) -> int:
+        """Rekordy w pamięci: bufor i paczki czekające na wątek zapisu"""
+        return len(self._rows) + self._pending_rows
+
+    def buffered_rows(self) -> Iterable[Dict[str, Any]]:
+        """Rekordy bufora od najnowszych (paczki przekazane do zapisu są poza zasięgiem)"""
+        return reversed(self._rows)
+
+    def append(self, pkt_data: Dict[str, Any]) -> None:
+        self._rows.append(pkt_data)
+        if len(self._rows) >= self.batch_rows:
+            self._submit()
+
+    def append_rows(self, rows: Sequence[Dict[str, Any]]) -> None:
+        self._rows.extend(rows)
+        if len(self._rows) >= self.batch_rows:
+            self._submit()
+
+    def _submit(self) -> None:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        if self._pending >= self.max_pending:
+            self.dropped += len(rows)
+            logging.warning(f"Packet archive writer lagging - dropped {len(rows)} records")
+            return
+        self._pending += 1
+        self._pending_rows += len(rows)
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._write_rows, rows)
+        future.add_done_callback(lambda done: self._written(done, len(rows)))
+
+    def _written(self, future: "asyncio.Future", rows: int) -> None:
+        self._pending -= 1
+        self._pending_rows -= rows
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"Packet archive write failed: {future.exception()}")
+
+    async def flush(self) -> None:
+        """Przekaż bufor do zapisu i poczekaj na wszystkie zlecone paczki"""
+        self._submit()
+        await asyncio.get_running_loop().run_in_executor(self._executor, lambda: None)
+
+    async def run(self) -> None:
+        """Okresowy zapis bufora i zamykanie segmentów starszych niż ``rotate_seconds``"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._submit()
+            if self.rotate_seconds:
+                await loop.run_in_executor(self._executor, self._close_if_stale)
+
+    async def close(self) -> None:
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_segment)
+        self._executor.shutdown(wait=True)
+
+    # --------------- wątek zapisu -------------------
+
+    def _write_rows(self, rows: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            batch = self._pa.RecordBatch.from_pylist(rows, schema=self.schema)
+            # Paczka z pcap albo po przestoju może przekroczyć granicę godziny - dzielimy po partycjach
+            hours = batch.column(0).to_numpy(zero_copy_only=False) // 3600
+            boundaries = [0, *(np.flatnonzero(np.diff(hours)) + 1).tolist(), len(rows)]
+            for lo, hi in zip(boundaries, boundaries[1:]):
+                self._write_batch(batch.slice(lo, hi - lo))
+        except (OSError, self._pa.ArrowException) as e:
+            self.failed += len(rows)
+            logging.error(f"Packet archive write failed, {len(rows)} records lost: {e}")
+            self._abort_segment()
+            return
+        self.written += len(rows)
+        self.write_latency.record(time.perf_counter() - started)
+
+    def _write_batch(self, batch) -> None:
+        first = batch.column(0)[0].as_py() or time.time()
+        if self._writer is not None and (
+                _partition(first) != self._segment_hour
+                or self._segment_bytes >= self.rotate_bytes
+                or (self.rotate_seconds and first - self._segment_start >= self.rotate_seconds)):
+            self._close_segment()
+        if self._writer is None:
+            self._open_segment(first)
+        self._writer.write_batch(batch)
+        size = self._sink.tell() if self._sink is not None else os.path.getsize(self._tmp_path())
+        self.bytes_written += size - self._segment_bytes
+        self._segment_bytes = size
+
+    def _tmp_path(self) -> Path:
+        return self._segment.with_name(f".{self._segment.name}.tmp")
+
+    def _open_segment(self, timestamp: float) -> None:
+        hour = _partition(timestamp)
+        folder = self.directory / f"date={hour:%Y-%m-%d}" / f"hour={hour:%H}"
+        folder.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        seq = 0
+        while True:
+            path = folder / f"packets-{stamp:%Y%m%dT%H%M%S}-{seq:06d}{FORMATS[self.format]}"
+            if not path.exists() and not path.with_name(f".{path.name}.tmp").exists():
+                break
+            seq += 1
+        self._segment = path
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self._tmp_path(), self.schema, compression=self.compression or "none")
+        else:
+            self._sink = self._pa.OSFile(str(self._tmp_path()), "wb")
+            options = self._pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = self._pa.ipc.new_file(self._sink, self.schema, options=options)
+        self._segment_start = timestamp
+        self._segment_hour = hour
+        self._segment_opened = time.monotonic()
+        self._segment_bytes = 0
+
+    def _close_segment(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        size = os.path.getsize(self._tmp_path())
+        self.bytes_written += size - self._segment_bytes
+        os.replace(self._tmp_path(), self._segment)
+        self.segments += 1
+        logging.debug(f"Packet archive segment closed: {self._segment} ({size} bytes)")
+        self._writer = self._sink = self._segment = None
+
+    def _close_if_stale(self) -> None:
+        if self._writer is not None and time.monotonic() - self._segment_opened >= self.rotate_seconds:
+            self._close_segment()
+
+    def _abort_segment(self) -> None:
+        """Po błędzie zapisu segment może nie mieć poprawnej stopki - zamknij go, jeśli się da"""
+        if self._writer is None:
+            return
+        try:
+            self._close_segment()
+        except (OSError, self._pa.ArrowException) as e:
+            logging.error(f"Dropping broken archive segment {self._segment}: {e}")
+            self._writer = self._sink = self._segment = None
+
+
+# --------------- odczyt -------------------
+
+def _dataset(directory: str, fmt: str):
+    import pyarrow.dataset as ds
+    _require_pyarrow()
+    files = sorted(str(path) for path in Path(directory).glob(f"date=*/hour=*/packets-*{FORMATS[fmt]}"))
+    return ds.dataset(files, schema=packet_schema(), format="parquet" if fmt == "parquet" else "ipc")
+
+
+def _time_filter(since: Optional[float], until: Optional[float]):
+    import pyarrow.dataset as ds
+    expression = None
+    if since is not None:
+        expression = ds.field("timestamp") >= since
+    if until is not None:
+        upper = ds.field("timestamp") < until
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def read_archive(directory: str, since: Optional[float] = None, until: Optional[float] = None,
+                 columns: Optional[Sequence[str]] = None, fmt: str = "parquet"):
+    """Pakiety z archiwum jako ``pyarrow.Table`` (``since`` włącznie, ``until`` wyłącznie)
+
+    Statystyki min/max grup wierszy Parquet pozwalają pominąć dane spoza
+    zakresu bez dekompresji.
+    """
+    return _dataset(directory, fmt).to_table(columns=list(columns) if columns else None,
+                                              filter=_time_filter(since, until))
+
+
+def iter_archive(directory: str, since: Optional[float] = None, until: Optional[float] = None,
+                 batch_size: int = 65536, fmt: str = "parquet") -> Iterator[List[Dict[str, Any]]]:
+    """Paczki słowników pakietów w kolejności zapisu - wejście dla ``analyze_rows``"""
+    scanner = _dataset(directory, fmt).scanner(filter=_time_filter(since, until), batch_size=batch_size,
+                                              use_threads=False)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pylist()
@@ -0,0 +1,575 @@
+# 📄 Plik: core/rules.py
+"""Kompilator reguł z rules.json do wielokrotnego użytku
+
+Każdy warunek jest parsowany raz przy ładowaniu, sprawdzany względem białej
+listy węzłów AST i kompilowany do funkcji ``lambda pkt, flow=None: ...``.
+Warunki mogą odwoływać się do pól pakietu (``pkt['dst_port']``) oraz stanu
+przepływu z ``core.flows.FlowTable`` (``flow['pkts']``, ``flow['bytes_per_s']``).
+
+Reguły z prostym predykatem równości/przynależności (``pkt['dst_port'] in
+[4444, 6667]``, ``pkt['protocol'] == 'ICMP'``) trafiają do indeksu, więc pakiet
+sprawdza tylko reguły, które w ogóle mogą go dopasować.
+
+Reguły z sekcją ``window`` (``core.windows``) dopasowują się tak samo, ale
+alarmują dopiero po przekroczeniu progu agregatu w oknie czasowym.
+
+Warunki bez ``flow`` i operatorów bitowych są dodatkowo kompilowane do wersji
+wektorowej (``RuleSet.match_batch``): ``pkt['pole']`` to kolumna NumPy całej
+paczki, ``and``/``or``/``not`` to ``&``/``|``/``~``, ``in [...]`` to ``isin``.
+Wiersze z brakującą wartością (None) w polu porównywanym ``<``/``>`` lub
+użytym arytmetycznie są sprawdzane skalarnie - wtedy wynik jest identyczny
+z ``match`` (tam takie porównanie kończy się wyjątkiem i brakiem dopasowania).
+"""
+import ast
+import copy
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from core.AlertCoordinator import AlertPriority, AlertType
+from core.errors import RuleCompilationError
+from core.windows import WindowSpec
+
+RULE_NAMES = ("pkt", "flow")
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.BitAnd, ast.BitOr,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+    ast.IfExp, ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple, ast.Set, ast.Subscript,
+)
+
+
+class CompiledRule:
+    """Reguła ze skompilowanym predykatem i rozwiązanym typem/priorytetem"""
+    __slots__ = (
+        "name", "condition", "priority", "alert_type", "position",
+        "predicate", "index_field", "index_values", "uses_flow", "window",
+        "vector", "vector_fields", "strict_fields",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        condition: str,
+        priority: AlertPriority,
+        alert_type: AlertType,
+        position: int,
+        predicate: Callable[..., Any],
+        index_field: Optional[str] = None,
+        index_values: FrozenSet[Any] = frozenset(),
+        uses_flow: bool = False,
+        window: Optional[WindowSpec] = None,
+        vector: Optional[Callable[..., Any]] = None,
+        vector_fields: FrozenSet[str] = frozenset(),
+        strict_fields: FrozenSet[str] = frozenset(),
+    ):
+        self.name = name
+        self.condition = condition
+        self.priority = priority
+        self.alert_type = alert_type
+        self.position = position
+        self.predicate = predicate
+        self.index_field = index_field
+        self.index_values = index_values
+        self.uses_flow = uses_flow
+        self.window = window
+        # Wersja wektorowa (kolumny paczki -> maska) albo None, gdy warunek jej nie ma
+        self.vector = vector
+        self.vector_fields = vector_fields
+        self.strict_fields = strict_fields
+
+    def __repr__(self) -> str:
+        return f"CompiledRule({self.name!r}, index={self.index_field!r})"
+
+
+def _validate(tree: ast.AST, condition: str) -> None:
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise RuleCompilationError(f"Unsupported syntax {type(node).__name__} in condition: {condition}")
+        if isinstance(node, ast.Name) and node.id not in RULE_NAMES:
+            raise RuleCompilationError(f"Unknown name '{node.id}' in condition: {condition}")
+        if isinstance(node, ast.Subscript) and not isinstance(node.slice, ast.Constant):
+            raise RuleCompilationError(f"Only constant keys are allowed in condition: {condition}")
+
+
+def _constant_values(node: ast.AST) -> Optional[Tuple[Any, ...]]:
+    """Zwróć wartości literału listy/krotki/zbioru stałych albo None"""
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)) and all(isinstance(e, ast.Constant) for e in node.elts):
+        return tuple(e.value for e in node.elts)
+    return None
+
+
+def _field_name(node: ast.AST) -> Optional[str]:
+    """Nazwa pola dla wyrażenia ``pkt['pole']``"""
+    if (
+        isinstance(node, ast.Subscript)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "pkt"
+        and isinstance(node.slice.value, str)
+    ):
+        return node.slice.value
+    return None
+
+
+class _MembershipOptimizer(ast.NodeTransformer):
+    """Zamień literały list w ``x in [...]`` na stałe frozenset"""
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        for i, (op, comparator) in enumerate(zip(node.ops, node.comparators)):
+            values = _constant_values(comparator) if isinstance(op, (ast.In, ast.NotIn)) else None
+            if values is not None:
+                try:
+                    node.comparators[i] = ast.copy_location(ast.Constant(frozenset(values)), comparator)
+                except TypeError:
+                    pass  # niehaszowalne elementy - zostaw listę
+        return node
+
+
+def _index_predicate(body: ast.AST) -> Tuple[Optional[str], FrozenSet[Any]]:
+    """Znajdź w koniunkcji pierwszy predykat ``pkt[pole] == stała`` lub ``pkt[pole] in [...]``"""
+    terms = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    for term in terms:
+        if not isinstance(term, ast.Compare) or len(term.ops) != 1:
+            continue
+        op, left, right = term.ops[0], term.left, term.comparators[0]
+        if isinstance(op, ast.Eq):
+            if _field_name(right) and isinstance(left, ast.Constant):
+                left, right = right, left
+            if _field_name(left) and isinstance(right, ast.Constant):
+                values: Optional[Tuple[Any, ...]] = (right.value,)
+            else:
+                continue
+        elif isinstance(op, ast.In) and _field_name(left):
+            values = _constant_values(right)
+            if values is None:
+                continue
+        else:
+            continue
+        try:
+            return _field_name(left), frozenset(values)
+        except TypeError:
+            continue
+    return None, frozenset()
+
+
+def compile_condition(condition: str, name: str = "<rule>") -> Callable[..., Any]:
+    """Skompiluj warunek do funkcji ``predicate(pkt, flow=None)``"""
+    try:
+        tree = ast.parse(condition.strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleCompilationError(f"Invalid condition for rule '{name}': {e}") from e
+    _validate(tree, condition)
+    tree = _MembershipOptimizer().visit(tree)
+    func = ast.Expression(
+        body=ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=arg) for arg in RULE_NAMES],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[ast.Constant(None)],
+            ),
+            body=tree.body,
+        )
+    )
+    ast.fix_missing_locations(func)
+    return eval(compile(func, f"<rule:{name}>", "eval"), {"__builtins__": {}})
+
+
+_ORDERING = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+# Poniżej tylu kandydatów reguła jest sprawdzana skalarnie (narzut NumPy > zysk)
+VECTOR_MIN_ROWS = 128
+
+
+def _as_mask(value: Any) -> np.ndarray:
+    return np.asarray(value, dtype=bool)
+
+
+def _isin(column: np.ndarray, values: FrozenSet[Any]) -> np.ndarray:
+    if column.dtype != object and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return np.isin(column, list(values))
+    return np.fromiter((value in values for value in column), dtype=bool, count=len(column))
+
+
+_VECTOR_HELPERS = {"_as_mask": _as_mask, "_isin": _isin}
+
+
+def _call(name: str, *args: ast.AST) -> ast.Call:
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+
+def _uses_field(node: ast.AST) -> bool:
+    return any(_field_name(sub) for sub in ast.walk(node))
+
+
+class _VectorUnsupported(Exception):
+    pass
+
+
+class _Vectorizer(ast.NodeTransformer):
+    """Przepisz warunek na operacje na kolumnach NumPy
+
+    Zbiera pola użyte w warunku i pola "ścisłe", dla których NaN w kolumnie
+    nie zachowuje się jak None: porównywane relacją porządku lub z innym
+    polem, użyte w arytmetyce albo jako wartość logiczna. Wiersze z brakującym
+    polem ścisłym są oceniane skalarnie. Dzielenie i potęgowanie (inf zamiast
+    wyjątku) oraz ``and``/``or`` jako wartość (nie maska) idą ścieżką skalarną.
+    """
+
+    def __init__(self):
+        self.fields: Set[str] = set()
+        self.strict: Set[str] = set()
+
+    def _strict(self, *nodes: ast.AST) -> None:
+        for node in nodes:
+            for sub in ast.walk(node):
+                field = _field_name(sub)
+                if field:
+                    self.strict.add(field)
+
+    def truth(self, node: ast.AST) -> ast.AST:
+        """Węzeł w kontekście logicznym: ``not``, ``and``/``or`` albo cały warunek"""
+        field = _field_name(node)
+        if field:
+            self.strict.add(field)
+        return self.visit(node)
+
+    def _value(self, node: ast.AST) -> ast.AST:
+        if isinstance(node, ast.BoolOp) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+            raise _VectorUnsupported("boolean value")  # Python zwraca operand, wektor - maskę
+        return self.visit(node)
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id != "pkt":
+            raise _VectorUnsupported(node.id)
+        return node
+
+    def visit_Subscript(self, node: ast.Subscript) -> ast.AST:
+        field = _field_name(node)
+        if field is None:
+            raise _VectorUnsupported("subscript")
+        self.fields.add(field)
+        return node
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [_call("_as_mask", self.truth(value)) for value in node.values]
+        result = values[0]
+        for value in values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=_call("_as_mask", self.truth(node.operand)))
+        self._strict(node.operand)
+        node.operand = self._value(node.operand)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        if isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+            raise _VectorUnsupported("bitwise")  # kolumny liczbowe są float64
+        if isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)):
+            raise _VectorUnsupported("division")  # dzielenie przez zero daje inf/NaN zamiast wyjątku
+        self._strict(node.left, node.right)
+        node.left, node.right = self._value(node.left), self._value(node.right)
+        return node
+
+    def visit_IfExp(self, node: ast.IfExp) -> ast.AST:
+        raise _VectorUnsupported("if")
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if node.value is None:
+            raise _VectorUnsupported("None")  # brak wartości to NaN w kolumnie, nie None
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        terms = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Is, ast.IsNot)):
+                raise _VectorUnsupported("is")
+            if isinstance(op, (ast.In, ast.NotIn)):
+                values = _constant_values(right)
+                if values is None or None in values or _field_name(left) is None:
+                    raise _VectorUnsupported("in")
+                try:
+                    constant = ast.Constant(frozenset(values))
+                except TypeError:
+                    raise _VectorUnsupported("in") from None
+                term = _call("_isin", self._value(left), constant)
+                if isinstance(op, ast.NotIn):
+                    term = ast.UnaryOp(op=ast.Invert(), operand=term)
+            else:
+                if isinstance(op, _ORDERING) or (_uses_field(left) and _uses_field(right)):
+                    # None == None jest prawdą, NaN == NaN nie
+                    self._strict(left, right)
+                term = _call("_as_mask", ast.Compare(left=self._value(left), ops=[op],
+                                                     comparators=[self._value(right)]))
+            terms.append(term)
+            left = right
+        result = terms[0]
+        for term in terms[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=term)
+        return result
+
+
+def compile_vector_condition(condition: str, name: str = "<rule>"
+                             ) -> Tuple[Optional[Callable[..., Any]], FrozenSet[str], FrozenSet[str]]:
+    """Wersja wektorowa warunku: (funkcja, pola, pola ścisłe); funkcja None, gdy nieobsługiwana"""
+    tree = ast.parse(condition.strip(), mode="eval")
+    vectorizer = _Vectorizer()
+    try:
+        body = vectorizer.truth(copy.deepcopy(tree.body))
+    except _VectorUnsupported:
+        return None, frozenset(), frozenset()
+    func = ast.Expression(
+        body=ast.Lambda(
+            args=ast.arguments(posonlyargs=[], args=[ast.arg(arg="pkt")], kwonlyargs=[],
+                               kw_defaults=[], defaults=[]),
+            body=body,
+        )
+    )
+    ast.fix_missing_locations(func)
+    vector = eval(compile(func, f"<rule-vector:{name}>", "eval"), {"__builtins__": {}, **_VECTOR_HELPERS})
+    return vector, frozenset(vectorizer.fields), frozenset(vectorizer.strict)
+
+
+def compile_rule(rule: Dict[str, Any], position: int = 0) -> CompiledRule:
+    """Skompiluj pojedynczą regułę z rules.json"""
+    try:
+        name = rule["name"]
+        # Reguła okienkowa bez warunku liczy wszystkie pakiety
+        condition = rule["condition"] if "window" not in rule else rule.get("condition", "True")
+        priority = AlertPriority[rule["priority"]]
+        alert_type = AlertType(rule["type"])
+    except (KeyError, ValueError) as e:
+        raise RuleCompilationError(f"Invalid rule definition at position {position}: {e}") from e
+
+    window = WindowSpec.from_dict(rule["window"], name) if "window" in rule else None
+    predicate = compile_condition(condition, name)
+    tree = ast.parse(condition.strip(), mode="eval")
+    index_field, index_values = _index_predicate(tree.body)
+    uses_flow = any(isinstance(node, ast.Name) and node.id == "flow" for node in ast.walk(tree))
+    vector, vector_fields, strict_fields = (None, frozenset(), frozenset()) if uses_flow \
+        else compile_vector_condition(condition, name)
+    return CompiledRule(
+        name, condition, priority, alert_type, position, predicate, index_field, index_values, uses_flow, window,
+        vector, vector_fields, strict_fields
+    )
+
+
+class RuleSet:
+    """Skompilowany i zindeksowany zestaw reguł"""
+
+    def __init__(self, rules: Iterable[CompiledRule]):
+        self.rules: List[CompiledRule] = list(rules)
+        self._unindexed: List[CompiledRule] = []
+        self._index: Dict[str, Dict[Any, List[CompiledRule]]] = {}
+        for rule in self.rules:
+            if rule.index_field is None:
+                self._unindexed.append(rule)
+                continue
+            table = self._index.setdefault(rule.index_field, {})
+            for value in rule.index_values:
+                table.setdefault(value, []).append(rule)
+        self._index_items = tuple(self._index.items())
+        self.needs_flow = any(rule.uses_flow for rule in self.rules)
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[Dict[str, Any]]) -> "RuleSet":
+        return cls(compile_rule(rule, position) for position, rule in enumerate(rules))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def candidates(self, pkt: Dict[str, Any]) -> List[CompiledRule]:
+        """Reguły, które mogą dopasować pakiet (w kolejności z rules.json)"""
+        selected = self._unindexed
+        merged = False
+        for field, table in self._index_items:
+            try:
+                hit = table.get(pkt.get(field))
+            except TypeError:
+                continue
+            if not hit:
+                continue
+            if not selected:
+                selected = hit
+            else:
+                selected = selected + hit
+                merged = True
+        if merged:
+            selected.sort(key=_position)
+        return selected
+
+    def match(self, pkt: Dict[str, Any], flow: Optional[Dict[str, Any]] = None) -> List[CompiledRule]:
+        """Zwróć reguły dopasowane przez pakiet (i opcjonalnie stan jego przepływu)"""
+        matched = []
+        for rule in self.candidates(pkt):
+            if rule.uses_flow and flow is None:
+                continue
+            try:
+                if rule.predicate(pkt, flow):
+                    matched.append(rule)
+            except Exception as e:
+                logging.error(f"Rule evaluation error in '{rule.name}': {e}")
+        return matched
+
+    def match_batch(self, rows: Sequence[Dict[str, Any]],
+                    flows: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> List[List[CompiledRule]]:
+        """``match`` dla całej paczki: dla każdego pakietu lista dopasowanych reguł
+
+        Wiersze są grupowane według wartości pól indeksu, więc reguły z tą samą
+        wartością indeksu dzielą jeden wycinek kolumn. Reguła z wersją wektorową
+        i co najmniej ``VECTOR_MIN_ROWS`` kandydatami jest liczona jedną
+        operacją NumPy, pozostałe - skalarnie jak w ``match``.
+        """
+        batch = _BatchColumns(rows)
+        selected: Dict[CompiledRule, List[Tuple[str, Any]]] = {}
+        for field, table in self._index_items:
+            by_value: Dict[Any, List[int]] = {}
+            for i, row in enumerate(rows):
+                value = row.get(field)
+                try:
+                    if value in table:
+                        by_value.setdefault(value, []).append(i)
+                except TypeError:
+                    continue
+            for value, group in by_value.items():
+                batch.groups[(field, value)] = group
+                for rule in table[value]:
+                    selected.setdefault(rule, []).append((field, value))
+
+        matched: List[List[CompiledRule]] = [[] for _ in range(len(rows))]
+        for rule in self.rules:
+            if rule.index_field is None:
+                hits = self._rule_hits(rule, None, batch, rows, flows)
+            elif rule in selected:
+                hits = self._rule_hits(rule, selected[rule], batch, rows, flows)
+            else:
+                continue
+            for i in hits:
+                matched[i].append(rule)
+        return matched
+
+    @staticmethod
+    def _rule_hits(rule: CompiledRule, groups: Optional[List[Tuple[str, Any]]], batch: "_BatchColumns",
+                   rows: Sequence[Dict[str, Any]], flows: Optional[Sequence[Optional[Dict[str, Any]]]]
+                   ) -> Sequence[int]:
+        if groups is None:
+            candidates: Sequence[int] = range(len(rows))
+        elif len(groups) == 1:
+            candidates = batch.groups[groups[0]]
+        else:
+            candidates = sorted(i for group in groups for i in batch.groups[group])
+        if rule.vector is None or len(candidates) < VECTOR_MIN_ROWS:
+            return _scalar_hits(rule, candidates, rows, flows)
+
+        key = groups[0] if groups is not None and len(groups) == 1 else None
+        index, sub = batch.select(rule.vector_fields, candidates, key)
+        try:
+            with np.errstate(all="ignore"):
+                mask = rule.vector(sub)
+                if not isinstance(mask, np.ndarray) or mask.shape != (len(candidates),):
+                    mask = np.broadcast_to(_as_mask(mask), (len(candidates),))
+                extra: List[int] = []
+                if rule.strict_fields:
+                    missing = batch.missing(rule.strict_fields, sub)
+                    if missing is not None:
+                        mask = mask & ~missing
+                        extra = [candidates[j] for j in np.flatnonzero(missing)
+                                 if _matches(rule, rows[candidates[j]], None)]
+        except Exception:
+            # Np. porównanie kolumny tekstowej z liczbą - ocena skalarna zgłosi błąd jak match()
+            return [i for i in candidates if _matches(rule, rows[i], None)]
+        positions = np.flatnonzero(mask)
+        hits = (positions if index is None else index[positions]).tolist()
+        return sorted(hits + extra) if extra else hits
+
+
+class _BatchColumns:
+    """Leniwie budowane kolumny paczki i ich wycinki dla grup indeksu"""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]]):
+        self.rows = rows
+        self.groups: Dict[Tuple[str, Any], List[int]] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._slices: Dict[Tuple[str, Any], Tuple[np.ndarray, Dict[str, np.ndarray]]] = {}
+
+    def column(self, field: str) -> np.ndarray:
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = packet_columns(self.rows, (field,))[field]
+        return column
+
+    def select(self, fields: Iterable[str], candidates: Sequence[int],
+               key: Optional[Tuple[str, Any]]) -> Tuple[Optional[np.ndarray], Dict[str, np.ndarray]]:
+        if isinstance(candidates, range):
+            return None, {field: self.column(field) for field in fields}
+        cached = self._slices.get(key) if key is not None else None
+        if cached is None:
+            cached = (np.asarray(candidates), {})
+            if key is not None:
+                self._slices[key] = cached
+        index, sub = cached
+        for field in fields:
+            if field not in sub:
+                sub[field] = self.column(field)[index]
+        return index, sub
+
+    @staticmethod
+    def missing(fields: Iterable[str], sub: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        """Maska wierszy z None w którymś z pól (None, gdy takich nie ma)"""
+        missing = None
+        for field in fields:
+            column = sub[field]
+            mask = np.equal(column, None) if column.dtype == object else np.isnan(column)
+            missing = mask if missing is None else missing | mask
+        return missing if missing is not None and missing.any() else None
+
+
+def packet_columns(rows: Sequence[Dict[str, Any]], fields: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Kolumny pól paczki: liczby jako float64 (None -> NaN), pozostałe jako tablice object"""
+    columns = {}
+    for field in fields:
+        values = [row.get(field) for row in rows]
+        if all(value is None or (type(value) in (int, float)) for value in values):
+            columns[field] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            column = np.empty(len(values), dtype=object)
+            column[:] = values
+            columns[field] = column
+    return columns
+
+
+def _scalar_hits(rule: CompiledRule, candidates: Sequence[int], rows: Sequence[Dict[str, Any]],
+                 flows: Optional[Sequence[Optional[Dict[str, Any]]]]) -> List[int]:
+    predicate = rule.predicate
+    try:
+        if rule.uses_flow:
+            if not flows:
+                return []
+            return [i for i in candidates if flows[i] is not None and predicate(rows[i], flows[i])]
+        return [i for i in candidates if predicate(rows[i], None)]
+    except Exception:
+        # Błąd w którymś wierszu: powtórka wiersz po wierszu, z logiem jak w match()
+        return [i for i in candidates if _matches(rule, rows[i], flows[i] if flows else None)]
+
+
+def _matches(rule: CompiledRule, pkt: Dict[str, Any], flow: Optional[Dict[str, Any]]) -> bool:
+    if rule.uses_flow and flow is None:
+        return False
+    try:
+        return bool(rule.predicate(pkt, flow))
+    except Exception as e:
+        logging.error(f"Rule evaluation error in '{rule.name}': {e}")
+        return False
+
+
+def _position(rule: CompiledRule) -> int:
+    return rule.position
@@ -0,0 +1,267 @@
+# 📄 Plik: core/sharding.py
+"""Wieloprocesowa analiza ruchu z podziałem przepływów między procesy robocze
+
+Proces główny wyodrębnia pola pakietu i kieruje je symetrycznym haszem
+5-krotki, więc oba kierunki przepływu trafiają zawsze do tego samego procesu.
+Każdy proces roboczy uruchamia własny ``AdvancedTrafficMonitor`` (reguły, przepływy,
+inferencja), a alerty wracają do jednego ``AlertCoordinator`` w procesie głównym.
+Okna reguł progowych (``core.windows``) są liczone osobno w każdym procesie, więc
+klucz inny niż przepływ (np. ``src_ip``) widzi tylko swoją część ruchu.
+"""
+import asyncio
+import logging
+import multiprocessing as mp
+import queue
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from core.AdvancedTrafficMonitor import extract_rows
+from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertType
+from core.errors import ConfigurationError
+
+if TYPE_CHECKING:
+    from scapy.packet import Packet
+    from core.packet_archive import PacketArchive
+
+# (typ, wiadomość, priorytet, payload) - proste typy, tanie w serializacji
+AlertTuple = Tuple[str, str, int, Dict[str, Any]]
+
+
+def flow_hash(pkt_data: Dict[str, Any]) -> int:
+    """Symetryczny hasz 5-krotki: A->B i B->A dają ten sam wynik"""
+    a = (pkt_data.get('src_ip') or '', pkt_data.get('src_port') or 0)
+    b = (pkt_data.get('dst_ip') or '', pkt_data.get('dst_port') or 0)
+    lo, hi = (a, b) if a <= b else (b, a)
+    key = f"{lo[0]}|{lo[1]}|{hi[0]}|{hi[1]}|{pkt_data.get('protocol')}"
+    return zlib.crc32(key.encode())
+
+
+@dataclass
+class ShardConfig:
+    rules_path: str
+    ai_model_path: Optional[str] = None
+    ai_batch_size: int = 64
+    ai_batch_wait_ms: float = 5.0
+    ai_threshold: float = 0.5
+    # Argumenty VerdictCache; każdy proces roboczy ma własną pamięć wyników
+    ai_cache_options: Optional[Dict[str, Any]] = None
+    flow_options: Optional[Dict[str, Any]] = None
+
+
+class _ShardAlertSink:
+    """Zastępuje AlertCoordinator w procesie roboczym - zbiera alerty do odesłania"""
+
+    def __init__(self):
+        self.alerts: List[AlertTuple] = []
+
+    async def add_alert(self, alert_type: AlertType, message: str, priority: AlertPriority,
+                        raw_payload: Dict[str, Any]) -> bool:
+        self.alerts.append((alert_type.value, message, priority.value, raw_payload))
+        return True
+
+    async def add_alerts(self, alerts) -> int:
+        alerts = list(alerts)
+        self.alerts.extend((t.value, message, p.value, payload) for t, message, p, payload in alerts)
+        return len(alerts)
+
+    def take(self) -> List[AlertTuple]:
+        alerts, self.alerts = self.alerts, []
+        return alerts
+
+
+async def _flush_alerts(shard_id: int, sink: _ShardAlertSink, out_queue: mp.Queue, interval: float) -> None:
+    """Odsyłaj alerty zebrane między paczkami wejściowymi (AI kończy paczkę po ``ai_batch_wait_ms``)"""
+    while True:
+        await asyncio.sleep(interval)
+        if sink.alerts:
+            out_queue.put((shard_id, 0, sink.take()))
+
+
+def _shard_worker(shard_id: int, config: ShardConfig, in_queue: mp.Queue, out_queue: mp.Queue) -> None:
+    asyncio.run(_shard_main(shard_id, config, in_queue, out_queue))
+
+
+async def _shard_main(shard_id: int, config: ShardConfig, in_queue: mp.Queue, out_queue: mp.Queue) -> None:
+    from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+    from core.flows import FlowTable
+    from core.inference import InferenceExecutor
+    from core.verdict_cache import VerdictCache
+
+    sink = _ShardAlertSink()
+    ai_enabled = config.ai_model_path is not None
+    monitor = AdvancedTrafficMonitor(
+        network_monitor=None,
+        alert_coordinator=sink,
+        rules_path=config.rules_path,
+        ai_model_path=config.ai_model_path,
+        exporter=None,
+        ai_batch_size=config.ai_batch_size,
+        ai_batch_wait_ms=config.ai_batch_wait_ms,
+        ai_threshold=config.ai_threshold,
+        # Proces roboczy ma własną pętlę - inferencja może ją blokować
+        inference=InferenceExecutor(
+            config.ai_model_path, mode="inline",
+            cache=VerdictCache(**config.ai_cache_options) if config.ai_cache_options is not None else None
+        ) if ai_enabled else None,
+        ai_enabled=ai_enabled,
+        # Symetryczny hasz trzyma oba kierunki przepływu w jednym procesie
+        flow_table=FlowTable(**config.flow_options) if config.flow_options else None
+    )
+    inference_task = asyncio.create_task(monitor.process_inference())
+    # Bez tego alerty AI czekałyby w cichym procesie na następną paczkę wejściową
+    flush_task = asyncio.create_task(
+        _flush_alerts(shard_id, sink, out_queue, max(config.ai_batch_wait_ms, 1.0) / 1000)
+    ) if ai_enabled else None
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, in_queue.get)
+            if batch is None:
+                break
+            if isinstance(batch, tuple):
+                await _shard_command(monitor, *batch)
+                continue
+            await monitor.analyze_rows(batch)
+            out_queue.put((shard_id, len(batch), sink.take()))
+        await monitor.ai_batcher.drain()
+        if sink.alerts:
+            out_queue.put((shard_id, 0, sink.take()))
+    finally:
+        inference_task.cancel()
+        if flush_task is not None:
+            flush_task.cancel()
+
+
+async def _shard_command(monitor, command: str, argument: Any) -> None:
+    """Polecenie podmiany z procesu głównego - wykonywane między paczkami"""
+    from core.rules import RuleSet
+
+    try:
+        if command == "rules":
+            monitor.swap_rules(argument, RuleSet.from_rules(argument))
+        elif command == "model" and monitor.ai_enabled:
+            monitor.inference.swap_model(await monitor.inference.load_model(argument), argument)
+    except ConfigurationError as e:
+        logging.error(f"Shard {command} reload failed: {e}")
+
+
+class ShardedTrafficMonitor:
+    """Rozdziela pakiety na N procesów roboczych według hasza przepływu"""
+
+    def __init__(self, alert_coordinator: AlertCoordinator, config: ShardConfig, workers: int = 2,
+                 batch_size: int = 256, flush_interval_ms: float = 10.0, max_queued_batches: int = 1024,
+                 archive: Optional["PacketArchive"] = None):
+        if workers < 1:
+            raise ValueError("workers must be >= 1")
+        self.alert_coordinator = alert_coordinator
+        self.config = config
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._ctx = mp.get_context("spawn")
+        self._in_queues = [self._ctx.Queue(maxsize=max_queued_batches) for _ in range(workers)]
+        self._out_queue = self._ctx.Queue()
+        self._pending: List[List[Dict[str, Any]]] = [[] for _ in range(workers)]
+        self._processes: List[mp.Process] = []
+        # Archiwum zapisuje proces główny - pola pakietu są już wyodrębnione do routingu
+        self.archive = archive
+        self.sent = 0
+        self.processed = 0
+        self.dropped = 0
+        self.malformed = 0
+
+    def start(self) -> None:
+        """Uruchom procesy robocze"""
+        for shard_id, in_queue in enumerate(self._in_queues):
+            process = self._ctx.Process(
+                target=_shard_worker,
+                args=(shard_id, self.config, in_queue, self._out_queue),
+                name=f"shard-{shard_id}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    async def analyze_packet(self, packet: "Packet") -> None:
+        """Callback zgodny z NetworkMonitor.start_capture"""
+        await self.analyze_batch([packet])
+
+    async def analyze_batch(self, packets: List["Packet"]) -> None:
+        """Callback trybu paczkowego NetworkMonitor (``batched=True``)"""
+        rows, malformed = extract_rows(packets)
+        self.malformed += malformed
+        for pkt_data in rows:
+            self.route(pkt_data)
+
+    def route(self, pkt_data: Dict[str, Any]) -> None:
+        if self.archive is not None:
+            self.archive.append(pkt_data)
+        shard = flow_hash(pkt_data) % self.workers
+        pending = self._pending[shard]
+        pending.append(pkt_data)
+        if len(pending) >= self.batch_size:
+            self._send(shard)
+
+    def _send(self, shard: int) -> None:
+        batch, self._pending[shard] = self._pending[shard], []
+        try:
+            self._in_queues[shard].put_nowait(batch)
+            self.sent += len(batch)
+        except queue.Full:
+            self.dropped += len(batch)
+            logging.warning(f"Shard {shard} backlog full - dropping {len(batch)} packets")
+
+    async def reload_rules(self, rules: List[Dict[str, Any]]) -> None:
+        """Przekaż nowe reguły procesom roboczym - w kolejce za wysłanymi już pakietami"""
+        await self._broadcast(("rules", rules))
+
+    async def reload_model(self, model_path: str) -> None:
+        await self._broadcast(("model", model_path))
+
+    async def _broadcast(self, command: Tuple[str, Any]) -> None:
+        self.flush()
+        loop = asyncio.get_running_loop()
+        for in_queue in self._in_queues:
+            await loop.run_in_executor(None, in_queue.put, command)
+
+    def flush(self) -> None:
+        """Wyślij niepełne paczki do procesów roboczych"""
+        for shard, pending in enumerate(self._pending):
+            if pending:
+                self._send(shard)
+
+    def _collect_results(self) -> List[Tuple[int, int, List[AlertTuple]]]:
+        try:
+            results = [self._out_queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                results.append(self._out_queue.get_nowait())
+            except queue.Empty:
+                return results
+
+    async def process_results(self) -> None:
+        """Okresowo wysyłaj niepełne paczki i przekazuj alerty do AlertCoordinator"""
+        loop = asyncio.get_running_loop()
+        while True:
+            self.flush()
+            for _, count, alerts in await loop.run_in_executor(None, self._collect_results):
+                self.processed += count
+                if alerts:
+                    await self.alert_coordinator.add_alerts(
+                        (AlertType(alert_type), message, AlertPriority(priority), payload)
+                        for alert_type, message, priority, payload in alerts
+                    )
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Zatrzymaj procesy robocze"""
+        self.flush()
+        for in_queue in self._in_queues:
+            in_queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
@@ -0,0 +1,28 @@
+# 📄 Plik: core/startup.py
+"""Profil uruchamiania aplikacji
+
+``mark(etap)`` zapisuje czas od punktu odniesienia (w main.py - przed
+importami modułów aplikacji) do końca etapu. Wynik trafia do logu
+startowego i metryki ``startup_seconds{phase=...}``.
+"""
+import time
+from typing import Dict, Optional
+
+
+class StartupProfile:
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        # etap -> sekundy od punktu odniesienia, w kolejności oznaczania
+        self.marks: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> float:
+        elapsed = time.perf_counter() - self.started
+        self.marks[phase] = elapsed
+        return elapsed
+
+    def as_dict(self) -> Dict[str, float]:
+        """Etap -> milisekundy od punktu odniesienia"""
+        return {phase: seconds * 1000 for phase, seconds in self.marks.items()}
+
+    def summary(self) -> str:
+        return ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.marks.items())
@@ -0,0 +1,123 @@
+# 📄 Plik: core/suppression.py
+"""Ograniczanie szybkości i deduplikacja alertów
+
+``TokenBucketLimiter`` trzyma osobny kubełek żetonów dla każdego klucza
+(np. reguła + src_ip), więc jedna hałaśliwa reguła nie zagłusza pozostałych.
+``AlertDeduplicator`` zwija identyczne alerty w oknie czasowym do jednego
+reprezentanta z licznikiem oraz czasami pierwszego i ostatniego wystąpienia.
+Oba mają ograniczoną liczbę kluczy z usuwaniem najdawniej używanych (LRU).
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
+
+RATE_LIMIT_KEYS = ("global", "rule", "src_ip", "rule_src_ip")
+
+
+class TokenBucketLimiter:
+    """Kubełki żetonów per klucz: ``rate`` żetonów/s, pojemność ``burst``"""
+
+    def __init__(self, rate: float = 100.0, burst: float = 200.0, max_keys: int = 100_000):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # klucz -> [żetony, czas ostatniego uzupełnienia]
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self.limited = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, key: Hashable, now: float) -> bool:
+        """Pobierz żeton dla klucza; False, gdy kubełek jest pusty"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+            bucket = self._buckets[key] = [self.burst, now]
+        else:
+            self._buckets.move_to_end(key)
+            tokens = bucket[0] + (now - bucket[1]) * self.rate
+            bucket[0] = tokens if tokens < self.burst else self.burst
+            bucket[1] = now
+        if bucket[0] < 1.0:
+            self.limited += 1
+            return False
+        bucket[0] -= 1.0
+        return True
+
+
+class AlertDeduplicator:
+    """Okno deduplikacji: klucz -> reprezentant z licznikiem wystąpień
+
+    Reprezentant to dowolny obiekt z polami ``count``, ``first_seen``,
+    ``last_seen`` i ``reported`` (QueuedAlert). Duplikaty, które dotarły już
+    po wysłaniu reprezentanta do handlerów, wracają przez ``on_summary``
+    jako jeden alert podsumowujący po zamknięciu okna.
+    """
+
+    def __init__(self, window: float = 10.0, max_keys: int = 100_000,
+                 on_summary: Optional[Callable[[Any], None]] = None):
+        self.window = window
+        self.max_keys = max_keys
+        self.on_summary = on_summary
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.suppressed = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _close(self, entry: Any) -> None:
+        if entry.count > entry.reported and self.on_summary is not None:
+            self.on_summary(entry)
+
+    def observe(self, key: Hashable, now: float) -> Tuple[bool, Optional[Any]]:
+        """Zwróć (czy duplikat, reprezentant); duplikat jest od razu doliczany"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry.first_seen < self.window:
+                entry.count += 1
+                entry.last_seen = now
+                self.suppressed += 1
+                return True, entry
+            del self._entries[key]
+            self._close(entry)
+        return False, None
+
+    def track(self, key: Hashable, alert: Any) -> None:
+        """Zapamiętaj nowy alert jako reprezentanta klucza"""
+        if len(self._entries) >= self.max_keys:
+            _, oldest = self._entries.popitem(last=False)
+            self._close(oldest)
+            self.evicted += 1
+        self._entries[key] = alert
+
+    def expire(self, now: float) -> int:
+        """Zamknij okna starsze niż ``window`` (najstarsze są na początku)"""
+        expired: List[Tuple[Hashable, Any]] = []
+        for key, entry in self._entries.items():
+            if now - entry.first_seen < self.window:
+                break
+            expired.append((key, entry))
+        for key, entry in expired:
+            del self._entries[key]
+            self._close(entry)
+        return len(expired)
+
+
+def rate_limit_key(mode: str, message: str, payload: dict) -> Hashable:
+    if mode == "rule":
+        return message
+    if mode == "src_ip":
+        return payload.get('src_ip')
+    if mode == "rule_src_ip":
+        return message, payload.get('src_ip')
+    return None
+
+
+def dedup_key(alert_type: Any, message: str, payload: dict, fields: Iterable[str]) -> Hashable:
+    return (alert_type, message, *(payload.get(field) for field in fields))
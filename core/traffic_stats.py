@@ -0,0 +1,59 @@
+# 📄 Plik: core/traffic_stats.py
+"""Wstępnie zagregowane liczniki ruchu dla dashboardu
+
+Aktualizowane na ścieżce pakietu możliwie tanio: liczniki pakietów i bajtów
+oraz trafień reguł zawsze, najwięksi nadawcy (``TopKWindow`` po bajtach w
+oknie ``window`` sekund) z co ``sample_every``-tego pakietu z wagą
+przemnożoną przez ``sample_every``. Dashboard tylko czyta te liczniki - nie
+przegląda historii alertów ani tablicy przepływów.
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+from core.windows import TopKWindow, WindowSpec
+
+
+class TrafficStats:
+    def __init__(self, talkers: int = 10, window: float = 60.0, sample_every: int = 64):
+        self.packets = 0
+        self.bytes = 0
+        self.rule_hits: Dict[str, int] = {}
+        self.hits = 0
+        self.sample_every = max(1, sample_every)
+        self._until_sample = self.sample_every
+        self.samples = 0
+        self.talkers = TopKWindow(WindowSpec(type="top_k", key="src_ip", weight="bytes", seconds=window,
+                                             threshold=0, k=talkers))
+
+    def observe(self, pkt: Dict[str, Any]) -> None:
+        self.packets += 1
+        size = pkt.get('packet_size') or 0
+        self.bytes += size
+        self._until_sample -= 1
+        if not self._until_sample:
+            self._until_sample = self.sample_every
+            self._sample(pkt, size)
+
+    def observe_rows(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """``observe`` dla paczki: te same próbki co pakiet po pakiecie"""
+        self.packets += len(rows)
+        self.bytes += sum(pkt.get('packet_size') or 0 for pkt in rows)
+        first = self._until_sample - 1
+        for pkt in rows[first::self.sample_every]:
+            self._sample(pkt, pkt.get('packet_size') or 0)
+        if len(rows) > first:
+            self._until_sample = self.sample_every - (len(rows) - 1 - first) % self.sample_every
+        else:
+            self._until_sample -= len(rows)
+
+    def _sample(self, pkt: Dict[str, Any], size: int) -> None:
+        self.samples += 1
+        self.talkers.observe({'src_ip': pkt.get('src_ip'), 'bytes': size * self.sample_every},
+                             pkt.get('timestamp') or 0.0)
+
+    def hit(self, rule_name: str) -> None:
+        self.hits += 1
+        self.rule_hits[rule_name] = self.rule_hits.get(rule_name, 0) + 1
+
+    def top_talkers(self, k: int = 10) -> List[Tuple[Any, int]]:
+        """(src_ip, szacowane bajty w oknie), malejąco"""
+        return self.talkers.top(k)
@@ -0,0 +1,113 @@
+# 📄 Plik: core/verdict_cache.py
+"""Pamięć podręczna wyników modelu AI
+
+Model dostaje tylko trzy znormalizowane cechy (hash IP, port, protokół), więc
+ta sama krotka cech daje zawsze ten sam wynik. Kluczem jest krotka cech po
+normalizacji (wiersz macierzy z ``AIThreatAnalyzer.features_batch``), a nie
+surowy pakiet - różne adresy o tym samym hashu trafiają w ten sam wpis.
+
+Wpisy wygasają po ``ttl`` s, przy przekroczeniu ``max_entries`` usuwany jest
+najdawniej używany. Zmiana pliku modelu (mtime/rozmiar, sprawdzane najwyżej
+co ``check_interval`` s) czyści całą pamięć i zwiększa ``generation`` - wyniki
+policzone dla poprzedniej generacji nie są już zapisywane.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+# Pamięć wpisu: klucz (krotka 3 floatów, ~136 B), wartość i węzeł OrderedDict (~185 B)
+ENTRY_BYTES = 320
+
+
+class VerdictCache:
+    def __init__(self, max_entries: int = 100_000, ttl: float = 300.0, model_path: Optional[str] = None,
+                 check_interval: float = 1.0):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.model_path = model_path
+        self.check_interval = check_interval
+        # klucz -> (wynik, czas wygaśnięcia); kolejność = od najdawniej użytego
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self.generation = 0
+        self._model_signature = self._stat_model()
+        self._next_check = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Optional[float]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = time.monotonic() if now is None else now
+        if self.ttl and entry[1] <= now:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, score: float, now: Optional[float] = None,
+            generation: Optional[int] = None) -> None:
+        """Zapisz wynik; pomijany, gdy policzono go dla innej generacji modelu"""
+        if generation is not None and generation != self.generation:
+            return
+        now = time.monotonic() if now is None else now
+        self._entries[key] = (score, now + self.ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def shed(self, count: int) -> int:
+        """Usuń ``count`` najdawniej używanych wpisów (budżet pamięci)"""
+        count = min(count, len(self._entries))
+        for _ in range(count):
+            self._entries.popitem(last=False)
+        self.evictions += count
+        return count
+
+    def clear(self) -> None:
+        """Unieważnij wszystkie wpisy (nowa generacja modelu)"""
+        self._entries.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def check_model(self, now: Optional[float] = None, force: bool = False) -> bool:
+        """Wyczyść pamięć, jeśli plik modelu się zmienił (``force`` - bezwarunkowo,
+        po podmianie sesji); True po unieważnieniu"""
+        if self.model_path is None and not force:
+            return False
+        now = time.monotonic() if now is None else now
+        if now < self._next_check and not force:
+            return False
+        self._next_check = now + self.check_interval
+        signature = self._stat_model()
+        if signature == self._model_signature and not force:
+            return False
+        self._model_signature = signature
+        self.clear()
+        return True
+
+    def _stat_model(self) -> Optional[Tuple[int, int]]:
+        if self.model_path is None:
+            return None
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
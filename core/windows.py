@@ -0,0 +1,352 @@
+# 📄 Plik: core/windows.py
+"""Agregacje w oknach przesuwnych dla reguł progowych
+
+Reguła z sekcją ``window`` w rules.json nie alarmuje przy każdym dopasowaniu
+warunku - pakiety spełniające warunek zasilają agregat liczony w oknie
+``seconds`` podzielonym na ``buckets`` kubełków czasowych:
+
+  - ``rate`` - liczba pakietów (lub suma pola ``weight``) na klucz;
+    pierścień szkiców count-min, stała pamięć niezależnie od liczby kluczy,
+  - ``distinct`` - liczba różnych wartości pola ``field`` na klucz;
+    HyperLogLog na kubełek, co najwyżej ``max_keys`` kluczy,
+  - ``top_k`` - najwięksi nadawcy (heavy hitters); szkic count-min
+    i ograniczony zbiór kandydatów, alert tylko dla kluczy z pierwszej ``k``.
+
+Alert pada raz, gdy agregat klucza przekracza ``threshold``; po spadku
+poniżej progu (przesunięcie okna) może paść ponownie. Przykład::
+
+    {"name": "SYN flood", "condition": "pkt['protocol'] == 'TCP' and pkt['tcp_flags'] & 0x12 == 0x02",
+     "window": {"type": "rate", "key": "src_ip", "seconds": 10, "threshold": 500},
+     "priority": "HIGH", "type": "CRITICAL"}
+    {"name": "Port scan", "condition": "pkt['protocol'] == 'TCP'",
+     "window": {"type": "distinct", "key": "src_ip", "field": "dst_port", "seconds": 60, "threshold": 100},
+     "priority": "MEDIUM", "type": "WARNING"}
+
+Szkice przeszacowują: count-min o ``e / width`` sumy okna z prawdopodobieństwem
+``exp(-depth)``, HyperLogLog ma błąd względny ~``1.04 / sqrt(2 ** precision)``.
+"""
+import math
+import time
+from array import array
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.errors import RuleCompilationError
+
+WINDOW_TYPES = ("rate", "distinct", "top_k")
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value: Any) -> int:
+    """splitmix64 na hash() - w CPython hash(int) to tożsamość, trzeba go wymieszać"""
+    z = (hash(value) + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+@dataclass(frozen=True)
+class WindowSpec:
+    type: str
+    key: str
+    seconds: float
+    threshold: float
+    buckets: int = 10
+    field: Optional[str] = None
+    weight: Optional[str] = None
+    k: int = 10
+    width: int = 2048
+    depth: int = 4
+    precision: int = 6
+    max_keys: int = 100_000
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any], name: str = "<rule>") -> "WindowSpec":
+        """Zweryfikuj sekcję ``window`` reguły"""
+        if not isinstance(spec, dict):
+            raise RuleCompilationError(f"Window of rule '{name}' must be an object")
+        unknown = set(spec) - {f.name for f in fields(cls)}
+        if unknown:
+            raise RuleCompilationError(f"Unknown window options {sorted(unknown)} in rule '{name}'")
+        try:
+            window = cls(**spec)
+        except TypeError as e:
+            raise RuleCompilationError(f"Invalid window in rule '{name}': {e}") from e
+        if window.type not in WINDOW_TYPES:
+            raise RuleCompilationError(f"Unknown window type '{window.type}' in rule '{name}'")
+        if window.type == "distinct" and not window.field:
+            raise RuleCompilationError(f"Distinct window in rule '{name}' requires 'field'")
+        if window.seconds <= 0 or window.buckets < 1 or window.width < 1 or window.depth < 1 or window.k < 1:
+            raise RuleCompilationError(f"Window sizes in rule '{name}' must be positive")
+        if not 4 <= window.precision <= 16:
+            raise RuleCompilationError(f"Window precision in rule '{name}' must be between 4 and 16")
+        return window
+
+
+class CountMinRing:
+    """Pierścień szkiców count-min - po jednym na kubełek czasu, plus bieżąca suma okna"""
+
+    def __init__(self, spec: WindowSpec):
+        self.buckets = spec.buckets
+        self.width = spec.width
+        self.depth = spec.depth
+        self.bucket_width = spec.seconds / spec.buckets
+        self._cells = spec.depth * spec.width
+        self.counts = array("q", bytes(8 * self.buckets * self._cells))
+        self.totals = array("q", bytes(8 * self._cells))
+        self.epoch: Optional[int] = None
+        self._base = 0
+
+    def _advance(self, now: float) -> None:
+        epoch = int(now // self.bucket_width)
+        if self.epoch is not None and epoch <= self.epoch:
+            return  # ten sam kubełek albo pakiet spóźniony - liczymy do bieżącego
+        if self.epoch is not None:
+            counts = np.frombuffer(self.counts, dtype=np.int64).reshape(self.buckets, self._cells)
+            totals = np.frombuffer(self.totals, dtype=np.int64)
+            if epoch - self.epoch >= self.buckets:
+                counts[:] = 0
+                totals[:] = 0
+            else:
+                for expired in range(self.epoch + 1, epoch + 1):
+                    bucket = counts[expired % self.buckets]
+                    totals -= bucket
+                    bucket[:] = 0
+        self.epoch = epoch
+        self._base = (epoch % self.buckets) * self._cells
+
+    def _positions(self, key: Any) -> List[int]:
+        h = _mix64(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, key: Any, weight: int, now: float) -> Tuple[int, int]:
+        """Dodaj wagę klucza; zwróć oszacowanie sumy okna przed i po"""
+        self._advance(now)
+        base = self._base
+        counts, totals = self.counts, self.totals
+        estimate = None
+        for cell in self._positions(key):
+            counts[base + cell] += weight
+            total = totals[cell] + weight
+            totals[cell] = total
+            if estimate is None or total < estimate:
+                estimate = total
+        return estimate - weight, estimate
+
+    def estimate(self, key: Any) -> int:
+        totals = self.totals
+        return min(totals[cell] for cell in self._positions(key))
+
+    def memory_bytes(self) -> int:
+        return self.counts.itemsize * len(self.counts) + self.totals.itemsize * len(self.totals)
+
+
+class RateWindow:
+    """Liczba (lub suma wagi) pakietów na klucz w oknie"""
+
+    def __init__(self, spec: WindowSpec):
+        self.spec = spec
+        self.sketch = CountMinRing(spec)
+
+    def observe(self, pkt: Dict[str, Any], now: float) -> Optional[Tuple[Any, float]]:
+        key = pkt.get(self.spec.key)
+        weight = (pkt.get(self.spec.weight) or 0) if self.spec.weight else 1
+        if key is None or not weight:
+            return None
+        before, after = self.sketch.add(key, weight, now)
+        if before <= self.spec.threshold < after:
+            return key, after
+        return None
+
+    def memory_bytes(self) -> int:
+        return self.sketch.memory_bytes()
+
+
+class _HllEntry:
+    __slots__ = ("registers", "merged", "epoch", "estimate")
+
+    def __init__(self, buckets: int, m: int, epoch: int):
+        self.registers = bytearray(buckets * m)
+        self.merged = bytearray(m)
+        self.epoch = epoch
+        self.estimate = 0.0
+
+
+class DistinctWindow:
+    """Liczba różnych wartości pola na klucz - HyperLogLog z rejestrami na kubełek czasu"""
+
+    def __init__(self, spec: WindowSpec):
+        self.spec = spec
+        self.buckets = spec.buckets
+        self.bucket_width = spec.seconds / spec.buckets
+        self.m = 1 << spec.precision
+        self._rho_bits = 64 - spec.precision
+        self._alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(self.m, 0.7213 / (1 + 1.079 / self.m))
+        self._powers = [2.0 ** -r for r in range(self._rho_bits + 2)]
+        # Kolejność wstawiania = kolejność ostatniej rotacji, więc najstarsze wpisy są na początku
+        self._entries: Dict[Any, _HllEntry] = {}
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _estimate(self, registers: bytearray) -> float:
+        m = self.m
+        estimate = self._alpha * m * m / sum(self._powers[r] for r in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # korekta małych liczności (linear counting)
+        return estimate
+
+    def _rotate(self, key: Any, entry: _HllEntry, epoch: int) -> None:
+        m = self.m
+        if epoch - entry.epoch >= self.buckets:
+            entry.registers = bytearray(self.buckets * m)
+        else:
+            for expired in range(entry.epoch + 1, epoch + 1):
+                start = (expired % self.buckets) * m
+                entry.registers[start:start + m] = bytes(m)
+        entry.merged = bytearray(np.frombuffer(entry.registers, dtype=np.uint8).reshape(self.buckets, m).max(axis=0))
+        entry.estimate = self._estimate(entry.merged)
+        entry.epoch = epoch
+        del self._entries[key]
+        self._entries[key] = entry
+
+    def _evict(self, epoch: int) -> None:
+        """Usuń wygasłe wpisy z początku słownika, a w razie potrzeby ~1% najstarszych"""
+        stale = []
+        budget = max(1, self.spec.max_keys // 100)
+        for key, entry in self._entries.items():
+            if entry.epoch > epoch - self.buckets and len(stale) >= budget:
+                break
+            stale.append(key)
+        for key in stale:
+            del self._entries[key]
+        self.evicted += len(stale)
+
+    def observe(self, pkt: Dict[str, Any], now: float) -> Optional[Tuple[Any, float]]:
+        key = pkt.get(self.spec.key)
+        value = pkt.get(self.spec.field)
+        if key is None or value is None:
+            return None
+        epoch = int(now // self.bucket_width)
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.spec.max_keys:
+                self._evict(epoch)
+            entry = self._entries[key] = _HllEntry(self.buckets, self.m, epoch)
+        elif epoch > entry.epoch:
+            self._rotate(key, entry, epoch)
+
+        h = _mix64(value)
+        register = h & (self.m - 1)
+        rho = self._rho_bits - (h >> self.spec.precision).bit_length() + 1
+        offset = (entry.epoch % self.buckets) * self.m + register
+        if rho > entry.registers[offset]:
+            entry.registers[offset] = rho
+        if rho <= entry.merged[register]:
+            return None  # oszacowanie zmienia się tylko, gdy rośnie rejestr
+        entry.merged[register] = rho
+        before, entry.estimate = entry.estimate, self._estimate(entry.merged)
+        if before <= self.spec.threshold < entry.estimate:
+            return key, round(entry.estimate)
+        return None
+
+    def memory_bytes(self) -> int:
+        # rejestry + scalone rejestry + obiekt wpisu i miejsce w słowniku
+        return len(self._entries) * ((self.buckets + 1) * self.m + 200)
+
+
+class TopKWindow:
+    """Najwięksi nadawcy w oknie: count-min do liczenia i ograniczony zbiór kandydatów"""
+
+    def __init__(self, spec: WindowSpec):
+        self.spec = spec
+        self.sketch = CountMinRing(spec)
+        self.capacity = 4 * spec.k
+        # kandydat -> ostatnie oszacowanie; odświeżane przy zmianie kubełka
+        self.candidates: Dict[Any, int] = {}
+        self._floor = 0
+        self._epoch: Optional[int] = None
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[Any, int]]:
+        """Klucze powyżej progu uszeregowane malejąco według sumy okna"""
+        ranked = sorted(((key, self.sketch.estimate(key)) for key in self.candidates), key=lambda item: -item[1])
+        return [item for item in ranked[:k or self.spec.k] if item[1] > self.spec.threshold]
+
+    def observe(self, pkt: Dict[str, Any], now: float) -> Optional[Tuple[Any, float]]:
+        key = pkt.get(self.spec.key)
+        weight = (pkt.get(self.spec.weight) or 0) if self.spec.weight else 1
+        if key is None or not weight:
+            return None
+        before, after = self.sketch.add(key, weight, now)
+        candidates = self.candidates
+        if self.sketch.epoch != self._epoch:
+            self._epoch = self.sketch.epoch
+            for candidate in candidates:
+                candidates[candidate] = self.sketch.estimate(candidate)
+            self._floor = 0
+        if after <= self.spec.threshold:
+            return None
+        if key not in candidates and len(candidates) >= self.capacity:
+            if after <= self._floor:
+                return None
+            weakest = min(candidates, key=candidates.__getitem__)
+            if candidates[weakest] >= after:
+                self._floor = candidates[weakest]
+                return None
+            del candidates[weakest]
+        candidates[key] = after
+        if before <= self.spec.threshold and sum(1 for value in candidates.values() if value > after) < self.spec.k:
+            return key, after
+        return None
+
+    def memory_bytes(self) -> int:
+        return self.sketch.memory_bytes()
+
+
+WINDOW_CLASSES = {"rate": RateWindow, "distinct": DistinctWindow, "top_k": TopKWindow}
+
+
+class WindowEngine:
+    """Agregatory okien dla reguł z sekcją ``window`` (po jednym na regułę)"""
+
+    def __init__(self, rules: Iterable[Any], previous: Optional["WindowEngine"] = None):
+        """``previous`` - silnik zastępowanego zestawu reguł: okna reguł o tej samej
+        nazwie i niezmienionej specyfikacji są przejmowane razem ze stanem"""
+        windowed = [rule for rule in rules if rule.window is not None]
+        kept = {name: previous._windows[position] for name, position in previous._names.items()} \
+            if previous is not None else {}
+        self._windows = {}
+        for rule in windowed:
+            window = kept.get(rule.name)
+            if window is None or window.spec != rule.window:
+                window = WINDOW_CLASSES[rule.window.type](rule.window)
+            self._windows[rule.position] = window
+        self._names = {rule.name: rule.position for rule in windowed}
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def observe(self, rule: Any, pkt: Dict[str, Any], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Zasil okno reguły pakietem; zwróć opis przekroczenia progu albo None"""
+        if now is None:
+            now = pkt.get('timestamp') or time.time()
+        hit = self._windows[rule.position].observe(pkt, now)
+        if hit is None:
+            return None
+        key, value = hit
+        return {'type': rule.window.type, 'key': key, 'value': value, 'seconds': rule.window.seconds}
+
+    def top(self, rule_name: str, k: Optional[int] = None) -> List[Tuple[Any, int]]:
+        """Bieżąca pierwsza ``k`` dla reguły typu top_k"""
+        window = self._windows[self._names[rule_name]]
+        return window.top(k) if isinstance(window, TopKWindow) else []
+
+    def memory_bytes(self) -> int:
+        return sum(window.memory_bytes() for window in self._windows.values())
@@ -1,32 +1,126 @@
 #!/usr/bin/env python3
-"""Cyber Witness: Network Sniffer – N0va Edition"""
+"""Cyber Witness: Network Sniffer – N0va Edition
+
+Moduły ciężkie albo zależne od konfiguracji (Elasticsearch, dashboard, API
+z FastAPI/uvicorn, procesy robocze, onnxruntime, Scapy) są importowane
+dopiero, gdy są potrzebne. API i dashboard są ładowane w tle po
+uruchomieniu przechwytywania.
+"""
+import time
+
+from core.startup import StartupProfile
+
+# Punkt odniesienia profilu startu - przed importami modułów aplikacji
+startup = StartupProfile(time.perf_counter())
+
 import asyncio
+import importlib
+import json
 import logging
 from configparser import ConfigParser
 from pathlib import Path
-from typing import List, Optional
+from types import ModuleType
+from typing import TYPE_CHECKING, List, Optional
 
 # Third-party imports
-from fastapi import FastAPI
 from rich.logging import RichHandler
-import uvicorn
 
 # Local imports
-from core.AlertCoordinator import AlertCoordinator
+from core.AlertCoordinator import DEFAULT_DEDUP_FIELDS, AlertCoordinator
 from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
 from core.errors import ConfigurationError
-from core.exporters import ElasticsearchExporter
+from core.flows import FlowTable
+from core.hot_reload import HotReloader
+from core.inference import InferenceExecutor
+from core.memory import MemoryBudget, process_rss
+from core.verdict_cache import ENTRY_BYTES as VERDICT_ENTRY_BYTES, VerdictCache
+from core.metrics import MetricsRegistry
+from core.overload import OverloadController
+from core.traffic_stats import TrafficStats
+from network.capture_filter import CAPTURE_AUTO, CaptureFilterPolicy
 from network.monitoring import NetworkMonitor
-from ui.dashboard import Dashboard
-from api.server import create_app, RuleCommandHandler
+
+if TYPE_CHECKING:
+    from core.alert_store import AlertStore
+    from core.exporters import BulkElasticsearchExporter
+    from core.packet_archive import PacketArchive
+    from core.sharding import ShardedTrafficMonitor
+
+startup.mark("imports")
 
 # Constants
 CONFIG_PATH = Path("config/config.ini")
 RULES_PATH = Path("config/rules.json")
 DEFAULT_INTERFACE = "eth0"
+DEFAULT_CAPTURE_BACKEND = "scapy"
+DEFAULT_SNAPLEN = 128
+DEFAULT_SOURCE = "interface"
+DEFAULT_REPLAY_SPEED = 0.0
+DEFAULT_REPLAY_PARSER = "raw"
+DEFAULT_CAPTURE_FILTER = "all"
 DEFAULT_ES_URL = "http://localhost:9200"
+DEFAULT_BULK_MAX_DOCS = 500
+DEFAULT_BULK_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_IN_FLIGHT = 2
+DEFAULT_SPILL_DIR = "spill"
+DEFAULT_SPILL_MAX_MB = 512
+DEFAULT_EXPORT_HANDLER_QUEUE = 10000
+DEFAULT_EXPORT_HANDLER_CONCURRENCY = 1
+DEFAULT_EXPORT_HANDLER_OVERFLOW = "drop_oldest"
+DEFAULT_ALERT_STORE_PATH = "data/alerts.db"
+DEFAULT_ALERT_STORE_BATCH = 500
+DEFAULT_ALERT_STORE_FLUSH_INTERVAL = 1.0
+DEFAULT_ALERT_STORE_QUEUE = 50000
+DEFAULT_ALERT_STORE_MAX_AGE_DAYS = 30.0
+DEFAULT_ALERT_STORE_MAX_SIZE_MB = 2048
+DEFAULT_ARCHIVE_DIR = "archive"
+DEFAULT_ARCHIVE_FORMAT = "parquet"
+DEFAULT_ARCHIVE_COMPRESSION = "zstd"
+DEFAULT_ARCHIVE_BATCH_ROWS = 65536
+DEFAULT_ARCHIVE_ROTATE_MB = 256
+DEFAULT_ARCHIVE_ROTATE_SECONDS = 300.0
+DEFAULT_ARCHIVE_FLUSH_INTERVAL = 1.0
+DEFAULT_ARCHIVE_MAX_PENDING = 8
+DEFAULT_DASHBOARD_REFRESH = 2.0
+DEFAULT_RELOAD_INTERVAL = 2.0
+DEFAULT_TOP_TALKERS_WINDOW = 60.0
+DEFAULT_TOP_TALKERS_SAMPLE_EVERY = 64
 DEFAULT_MODEL_PATH = "models/deepseek.onnx"
 DEFAULT_MODE = "LiveThreat"
+DEFAULT_METRICS_SAMPLE_EVERY = 16
+DEFAULT_OVERLOAD_DEPTH = "0.5, 0.7, 0.9"
+DEFAULT_OVERLOAD_LAG_MS = "50, 200, 500"
+DEFAULT_OVERLOAD_SAMPLE_RATE = 10
+DEFAULT_OVERLOAD_HOLD_SECONDS = 2.0
+DEFAULT_ALERT_RATE_LIMIT = 100.0
+DEFAULT_ALERT_RATE_BURST = 200.0
+DEFAULT_ALERT_RATE_LIMIT_KEY = "rule_src_ip"
+DEFAULT_ALERT_DEDUP_WINDOW = 10.0
+DEFAULT_ALERT_MAX_KEYS = 100_000
+DEFAULT_AI_BATCH_SIZE = 64
+DEFAULT_AI_BATCH_WAIT_MS = 5.0
+DEFAULT_AI_THRESHOLD = 0.5
+DEFAULT_AI_EXECUTOR = "thread"
+DEFAULT_AI_WORKERS = 2
+DEFAULT_AI_INTRA_OP_THREADS = 1
+DEFAULT_AI_MAX_PENDING = 64
+DEFAULT_AI_CACHE_SIZE = 100_000
+DEFAULT_AI_CACHE_TTL = 300.0
+DEFAULT_AI_CACHE_CHECK_INTERVAL = 1.0
+DEFAULT_MAX_FLOWS = 1_000_000
+DEFAULT_FLOW_IDLE_TIMEOUT = 60.0
+DEFAULT_FLOW_ACTIVE_TIMEOUT = 1800.0
+DEFAULT_MEMORY_BUDGET_MB = 0
+DEFAULT_MEMORY_LOW_WATERMARK = 0.9
+DEFAULT_MEMORY_CHECK_INTERVAL = 1.0
+DEFAULT_MEMORY_SAMPLE_SIZE = 16
+DEFAULT_PIPELINE_WORKERS = 1
+DEFAULT_PIPELINE_BATCH_SIZE = 256
+DEFAULT_CAPTURE_BATCH_SIZE = 256
+DEFAULT_CAPTURE_BATCH_WAIT_US = 200.0
+# Etapy startu w kolejności (StartupProfile.mark)
+STARTUP_PHASES = ("imports", "config", "pipeline", "capture", "dashboard", "api")
 API_HOST = "0.0.0.0"
 API_PORT = 8000
 
@@ -69,20 +163,199 @@ def load_config(path: Path) -> ConfigParser:
     return config
 
 
-async def shutdown_tasks(tasks: List[asyncio.Task], exporter: ElasticsearchExporter, 
+def register_metrics(metrics: MetricsRegistry, network_monitor: NetworkMonitor,
+                     traffic_monitor: AdvancedTrafficMonitor, alert_coordinator: AlertCoordinator,
+                     exporter: Optional["BulkElasticsearchExporter"], inference: InferenceExecutor,
+                     sharded_monitor: Optional["ShardedTrafficMonitor"] = None,
+                     alert_store: Optional["AlertStore"] = None,
+                     reloader: Optional[HotReloader] = None,
+                     startup: Optional[StartupProfile] = None,
+                     archive: Optional["PacketArchive"] = None,
+                     memory: Optional[MemoryBudget] = None) -> None:
+    """Register pipeline counters and stage histograms for /metrics.
+    
+    Counters are read from the components only when metrics are scraped.
+    """
+    metrics.counter("packets_captured_total", "Packets accepted into the capture buffer",
+                    lambda: network_monitor.captured)
+    metrics.counter("packets_dropped_total", "Packets dropped on capture buffer overflow",
+                    lambda: network_monitor.dropped)
+    metrics.counter("capture_filtered_total", "Packets rejected by the capture filter after header parsing",
+                    lambda: network_monitor.filtered)
+    metrics.counter("capture_batches_total", "Packet batches delivered to the analysis callback",
+                    lambda: network_monitor.batches)
+    metrics.gauge("capture_buffer_depth", "Packets waiting in the capture buffer",
+                  lambda: network_monitor.buffered)
+    metrics.histogram("capture_queue_seconds", "Time a packet waits in the capture buffer",
+                      network_monitor.queue_latency)
+    metrics.histogram("analysis_seconds", "Per-packet analysis callback latency (batch mean in batched mode)",
+                      network_monitor.analysis_latency)
+    metrics.counter("packets_malformed_total", "Packets skipped because their fields could not be extracted",
+                    lambda: traffic_monitor.malformed + (sharded_monitor.malformed if sharded_monitor else 0))
+    if traffic_monitor.flow_latency is not None:
+        metrics.histogram("flow_update_seconds", "Flow table update latency (sampled)", traffic_monitor.flow_latency)
+    metrics.histogram("rule_match_seconds", "Rule matching latency (sampled)", traffic_monitor.rule_latency)
+    overload = traffic_monitor.overload
+    if overload is not None:
+        metrics.gauge("overload_level", "Degradation level (0 normal, 1 no AI, 2 sampling, 3 headers only)",
+                      lambda: int(overload.level))
+        metrics.counter("overload_ai_skipped_total", "Packets not sent to AI because of overload",
+                        lambda: overload.ai_skipped)
+        metrics.counter("overload_sampled_out_total", "Benign packets skipped by flow sampling",
+                        lambda: overload.sampled_out)
+        metrics.counter("overload_headers_only_dropped_total", "Packets skipped in headers-only mode",
+                        lambda: overload.headers_only_dropped)
+    metrics.counter("ai_submitted_total", "Packets submitted for AI inference",
+                    lambda: traffic_monitor.ai_batcher.submitted)
+    metrics.counter("ai_dropped_total", "Packets dropped by the AI micro-batcher",
+                    lambda: traffic_monitor.ai_batcher.dropped)
+    metrics.counter("inference_batches_total", "ONNX inference batches", lambda: inference.batches)
+    metrics.histogram("inference_batch_seconds", "ONNX inference latency per batch", inference.latency)
+    metrics.counter("inference_rows_total", "Feature rows scored by the ONNX model", lambda: inference.inferred)
+    metrics.counter("inference_rejected_total", "Inference batches rejected because the backlog was full",
+                    lambda: inference.rejected)
+    cache = inference.cache
+    if cache is not None:
+        metrics.counter("verdict_cache_hits_total", "AI scores served from the verdict cache", lambda: cache.hits)
+        metrics.counter("verdict_cache_misses_total", "AI score lookups missing the verdict cache",
+                        lambda: cache.misses)
+        metrics.counter("verdict_cache_evictions_total", "Verdict cache entries evicted by LRU",
+                        lambda: cache.evictions)
+        metrics.counter("verdict_cache_expired_total", "Verdict cache entries expired by TTL", lambda: cache.expired)
+        metrics.counter("verdict_cache_invalidations_total", "Verdict cache flushes after a model file change",
+                        lambda: cache.invalidations)
+        metrics.gauge("verdict_cache_entries", "Entries in the verdict cache", lambda: len(cache))
+    metrics.gauge("alert_queue_depth", "Alerts waiting in the coordinator queue",
+                  lambda: alert_coordinator.alert_queue.qsize())
+    if alert_coordinator.deduplicator is not None:
+        metrics.counter("alerts_suppressed_total", "Duplicate alerts collapsed",
+                        lambda: alert_coordinator.deduplicator.suppressed)
+    if alert_coordinator.limiter is not None:
+        metrics.counter("alerts_rate_limited_total", "Alerts rejected by token buckets",
+                        lambda: alert_coordinator.limiter.limited)
+    for handler_queue in alert_coordinator.dispatcher.queues:
+        labels = {"handler": handler_queue.name}
+        metrics.gauge("handler_queue_depth", "Alerts queued per handler", lambda q=handler_queue: len(q), labels)
+        metrics.gauge("handler_lag_seconds", "Age of the oldest queued alert per handler",
+                      handler_queue.lag, labels)
+        metrics.counter("handler_dropped_total", "Alerts dropped per handler",
+                        lambda q=handler_queue: q.dropped, labels)
+        metrics.counter("handler_failed_total", "Handler invocations that raised",
+                        lambda q=handler_queue: q.failed, labels)
+    if exporter is not None:
+        metrics.counter("exported_total", "Alerts indexed in Elasticsearch", lambda: exporter.exported)
+        metrics.counter("export_spilled_total", "Alerts spilled to disk", lambda: exporter.spilled)
+        metrics.counter("export_failed_total", "Alerts rejected by Elasticsearch", lambda: exporter.failed)
+        metrics.histogram("export_bulk_seconds", "Elasticsearch _bulk request latency", exporter.bulk_latency)
+    if alert_store is not None:
+        metrics.counter("alert_store_written_total", "Alerts written to the local alert store",
+                        lambda: alert_store.written)
+        metrics.counter("alert_store_expired_total", "Alerts removed by alert store retention",
+                        lambda: alert_store.expired)
+        metrics.counter("alert_store_failed_total", "Alerts lost on alert store write errors",
+                        lambda: alert_store.failed)
+    if archive is not None:
+        metrics.counter("archive_records_total", "Packet records written to the columnar archive",
+                        lambda: archive.written)
+        metrics.counter("archive_dropped_total", "Packet records dropped while the archive writer lagged",
+                        lambda: archive.dropped)
+        metrics.counter("archive_failed_total", "Packet records lost on archive write errors",
+                        lambda: archive.failed)
+        metrics.counter("archive_bytes_total", "Compressed bytes written to archive segments",
+                        lambda: archive.bytes_written)
+        metrics.counter("archive_segments_total", "Closed archive segment files", lambda: archive.segments)
+        metrics.histogram("archive_write_seconds", "Conversion and write time of one archive batch",
+                          archive.write_latency)
+    if reloader is not None:
+        metrics.gauge("rules_version", "Version of the active rule set (incremented on each swap)",
+                      lambda: reloader.rules_version)
+        metrics.gauge("model_version", "Version of the active ONNX model (incremented on each swap)",
+                      lambda: reloader.model_version)
+        metrics.histogram("reload_build_seconds", "Background compile/load time of a rule set or model",
+                          reloader.build_latency)
+        metrics.histogram("reload_swap_seconds", "In-loop swap time of a rule set or model", reloader.swap_latency)
+        metrics.counter("reload_failed_total", "Rejected rule set or model reloads", lambda: reloader.failed)
+    if startup is not None:
+        for phase in STARTUP_PHASES:
+            metrics.gauge("startup_seconds", "Time from process start to the end of a startup phase",
+                          lambda phase=phase: startup.marks.get(phase, 0.0), {"phase": phase})
+    if memory is not None:
+        metrics.gauge("memory_budget_bytes", "Configured memory budget (0 = accounting only)",
+                      lambda: memory.limit_bytes)
+        metrics.gauge("process_resident_memory_bytes", "Resident set size of the main process", process_rss)
+        for account in memory.accounts:
+            labels = {"subsystem": account.name}
+            metrics.gauge("memory_used_bytes", "Estimated memory per subsystem",
+                          lambda a=account: a.bytes, labels)
+            metrics.gauge("memory_peak_bytes", "Peak estimated memory per subsystem",
+                          lambda a=account: a.peak_bytes, labels)
+            metrics.counter("memory_shed_total", "Items removed per subsystem to stay within the memory budget",
+                            lambda a=account: a.shed_items, labels)
+    if sharded_monitor is not None:
+        metrics.counter("shard_packets_processed_total", "Packets analysed by shard workers",
+                        lambda: sharded_monitor.processed)
+        metrics.counter("shard_packets_dropped_total", "Packets dropped on full shard queues",
+                        lambda: sharded_monitor.dropped)
+
+
+def register_memory(memory: MemoryBudget, network_monitor: NetworkMonitor,
+                    traffic_monitor: AdvancedTrafficMonitor, alert_coordinator: AlertCoordinator,
+                    exporter: Optional["BulkElasticsearchExporter"], inference: InferenceExecutor,
+                    archive: Optional["PacketArchive"] = None) -> None:
+    """Register queues, caches and tables with the memory budget.
+    
+    Registration order is the shedding order: state that is cheapest to lose
+    or rebuild first, unprocessed packets and alerts last. Accounts without
+    ``shed`` have their own hard limits and are only reported. Alerts shared
+    by several queues are counted in each of them (an upper bound).
+    """
+    memory.track("recent_alerts", lambda: len(alert_coordinator.recent_alerts),
+                 sample=lambda: reversed(alert_coordinator.recent_alerts), shed=alert_coordinator.shed_recent)
+    cache = inference.cache
+    if cache is not None:
+        memory.track("verdict_cache", lambda: len(cache), item_bytes=VERDICT_ENTRY_BYTES, shed=cache.shed)
+    flow_table = traffic_monitor.flow_table
+    if flow_table is not None:
+        # Usunięty przepływ zwalnia wpis indeksu i - po FlowTable.compact - część kolumn
+        memory.track("flows", lambda: len(flow_table), item_bytes=flow_table.flow_bytes,
+                     usage=flow_table.memory_bytes, shed=flow_table.shed)
+    memory.track("capture_buffer", lambda: network_monitor.buffered, sample=network_monitor.buffered_packets,
+                 shed=network_monitor.shed_buffer)
+    for handler_queue in alert_coordinator.dispatcher.queues:
+        memory.track(f"handler_queue:{handler_queue.name}", lambda q=handler_queue: len(q),
+                     sample=handler_queue.queued, shed=handler_queue.shed)
+    memory.track("alert_queue", alert_coordinator.alert_queue.qsize, sample=alert_coordinator.queued,
+                 shed=alert_coordinator.shed_queued)
+    batcher = traffic_monitor.ai_batcher
+    memory.track("ai_batcher", lambda: batcher.pending, sample=batcher.queued)
+    memory.track("rule_windows", lambda: len(traffic_monitor.windows),
+                 usage=lambda: traffic_monitor.windows.memory_bytes())
+    if exporter is not None:
+        memory.track("export_buffer", lambda: exporter.buffered, usage=lambda: exporter.buffered_bytes)
+    if archive is not None:
+        memory.track("archive_buffer", lambda: archive.pending_rows, sample=archive.buffered_rows)
+
+
+async def import_deferred(name: str) -> ModuleType:
+    """Import a heavy module in a worker thread so the event loop keeps processing packets."""
+    return await asyncio.to_thread(importlib.import_module, name)
+
+
+async def shutdown_tasks(tasks: List[asyncio.Task], exporter: Optional["BulkElasticsearchExporter"], 
                          network_monitor: NetworkMonitor) -> None:
     """Properly shutdown all running tasks and resources.
     
     Args:
         tasks: List of running tasks to cancel
-        exporter: Elasticsearch exporter to close
+        exporter: Elasticsearch exporter to close (None when export is disabled)
         network_monitor: Network monitor to stop
     """
     for task in tasks:
         if not task.done():
             task.cancel()
     
-    await exporter.close()
+    if exporter is not None:
+        await exporter.close()
     await network_monitor.stop_capture()
     
     # Wait for all tasks to complete their cancellation
@@ -96,59 +369,354 @@ async def main() -> None:
     
     try:
         config = load_config(CONFIG_PATH)
+        startup.mark("config")
         
         # Network configuration
         interface = config["network"].get("interface", DEFAULT_INTERFACE)
         promiscuous = config["network"].getboolean("promiscuous", True)
+        capture_backend = config["network"].get("backend", DEFAULT_CAPTURE_BACKEND)
+        snaplen = config["network"].getint("snaplen", DEFAULT_SNAPLEN)
+        source = config["network"].get("source", DEFAULT_SOURCE)
+        backend_options = {"snaplen": snaplen} if capture_backend == "raw" else None
+        capture_filter = config["network"].get("capture_filter", DEFAULT_CAPTURE_FILTER)
+        if source == "pcap":
+            # Odtwarzanie offline: interfejs zastępuje ścieżka pliku pcap/pcapng
+            capture_backend = "pcap"
+            interface = config["network"].get("pcap_path")
+            if not interface:
+                raise ConfigurationError("source = pcap requires pcap_path in [network]")
+            backend_options = {
+                "speed": config["network"].getfloat("replay_speed", DEFAULT_REPLAY_SPEED),
+                "parser": config["network"].get("replay_parser", DEFAULT_REPLAY_PARSER)
+            }
+        elif source != "interface":
+            raise ConfigurationError(f"Unknown network source: {source}")
+        try:
+            # Własne wyrażenie BPF działa tylko w jądrze - błąd albo brak libpcap zatrzymuje start
+            CaptureFilterPolicy(capture_filter).validate(kernel_filter=source != "pcap")
+        except ValueError as e:
+            raise ConfigurationError(str(e)) from e
         
         # Export configuration
         es_url = config["export"].get("elasticsearch_url", DEFAULT_ES_URL)
+        export_config = config["export"]
+        es_enabled = export_config.getboolean("elasticsearch_enabled", True)
+        
+        # Alert store configuration
+        store_config = config["alert_store"] if config.has_section("alert_store") else None
+        
+        # Packet archive configuration
+        archive_config = config["archive"] if config.has_section("archive") else None
         
         # AI configuration
         model_path = config["ai"].get("onnx_model_path", DEFAULT_MODEL_PATH)
+        ai_batch_size = config["ai"].getint("batch_size", DEFAULT_AI_BATCH_SIZE)
+        ai_batch_wait_ms = config["ai"].getfloat("batch_max_wait_ms", DEFAULT_AI_BATCH_WAIT_MS)
+        ai_threshold = config["ai"].getfloat("threat_threshold", DEFAULT_AI_THRESHOLD)
+        ai_enabled = config["ai"].getboolean("enabled", True)
+        # Pamięć wyników modelu wspólna dla potoku i /analyze; cache_size = 0 wyłącza
+        ai_cache_size = config["ai"].getint("cache_size", DEFAULT_AI_CACHE_SIZE)
+        ai_cache_options = {
+            "max_entries": ai_cache_size,
+            "ttl": config["ai"].getfloat("cache_ttl_seconds", DEFAULT_AI_CACHE_TTL),
+            "model_path": model_path,
+            "check_interval": config["ai"].getfloat("cache_check_interval", DEFAULT_AI_CACHE_CHECK_INTERVAL)
+        } if ai_cache_size > 0 else None
+        inference = InferenceExecutor(
+            model_path,
+            mode=config["ai"].get("executor", DEFAULT_AI_EXECUTOR),
+            workers=config["ai"].getint("workers", DEFAULT_AI_WORKERS),
+            intra_op_num_threads=config["ai"].getint("intra_op_num_threads", DEFAULT_AI_INTRA_OP_THREADS),
+            max_pending=config["ai"].getint("max_pending", DEFAULT_AI_MAX_PENDING),
+            cache=VerdictCache(**ai_cache_options) if ai_cache_options is not None else None
+        )
         
         # General configuration
         mode = config["general"].get("mode", DEFAULT_MODE)
+        api_host = config.get("api", "host", fallback=API_HOST)
+        api_port = config.getint("api", "port", fallback=API_PORT)
+        
+        # Pipeline configuration
+        workers = config.getint("pipeline", "workers", fallback=DEFAULT_PIPELINE_WORKERS)
+        pipeline_batch_size = config.getint("pipeline", "batch_size", fallback=DEFAULT_PIPELINE_BATCH_SIZE)
+        capture_batch_size = config.getint("pipeline", "capture_batch_size", fallback=DEFAULT_CAPTURE_BATCH_SIZE)
+        capture_batch_wait_us = config.getfloat("pipeline", "capture_batch_wait_us",
+                                                fallback=DEFAULT_CAPTURE_BATCH_WAIT_US)
+        batched = capture_batch_size > 1
+        
+        # Flow table configuration
+        flow_options = None
+        if config.getboolean("flows", "enabled", fallback=True):
+            flow_options = {
+                "max_flows": config.getint("flows", "max_flows", fallback=DEFAULT_MAX_FLOWS),
+                "idle_timeout": config.getfloat("flows", "idle_timeout", fallback=DEFAULT_FLOW_IDLE_TIMEOUT),
+                "active_timeout": config.getfloat("flows", "active_timeout", fallback=DEFAULT_FLOW_ACTIVE_TIMEOUT)
+            }
+        
+        # Metrics configuration
+        metrics_enabled = config.getboolean("metrics", "enabled", fallback=True)
+        metrics = MetricsRegistry() if metrics_enabled else None
+        metrics_sample_every = config.getint("metrics", "sample_every", fallback=DEFAULT_METRICS_SAMPLE_EVERY)
+        
+        # Overload controller configuration
+        overload = None
+        if config.getboolean("overload", "enabled", fallback=True):
+            try:
+                overload = OverloadController(
+                    depth_thresholds=[float(v) for v in config.get(
+                        "overload", "depth_thresholds", fallback=DEFAULT_OVERLOAD_DEPTH).split(",")],
+                    lag_thresholds=[float(v) / 1000 for v in config.get(
+                        "overload", "lag_thresholds_ms", fallback=DEFAULT_OVERLOAD_LAG_MS).split(",")],
+                    sample_rate=config.getint("overload", "sample_rate", fallback=DEFAULT_OVERLOAD_SAMPLE_RATE),
+                    hold_seconds=config.getfloat("overload", "hold_seconds", fallback=DEFAULT_OVERLOAD_HOLD_SECONDS)
+                )
+            except ValueError as e:
+                raise ConfigurationError(f"Invalid [overload] configuration: {e}") from e
+        
+        # Memory budget configuration
+        memory = None
+        if config.getboolean("memory", "enabled", fallback=True):
+            try:
+                memory = MemoryBudget(
+                    limit_bytes=config.getint("memory", "budget_mb", fallback=DEFAULT_MEMORY_BUDGET_MB) * 1024 * 1024,
+                    low_watermark=config.getfloat("memory", "low_watermark", fallback=DEFAULT_MEMORY_LOW_WATERMARK),
+                    interval=config.getfloat("memory", "check_interval", fallback=DEFAULT_MEMORY_CHECK_INTERVAL),
+                    sample_size=config.getint("memory", "sample_size", fallback=DEFAULT_MEMORY_SAMPLE_SIZE)
+                )
+            except ValueError as e:
+                raise ConfigurationError(f"Invalid [memory] configuration: {e}") from e
+        
+        # Dashboard configuration
+        dashboard_enabled = config.getboolean("dashboard", "enabled", fallback=True)
+        dashboard_refresh = config.getfloat("dashboard", "refresh_per_second", fallback=DEFAULT_DASHBOARD_REFRESH)
+        reload_enabled = config.getboolean("reload", "enabled", fallback=True)
+        reload_interval = config.getfloat("reload", "watch_interval_seconds", fallback=DEFAULT_RELOAD_INTERVAL)
+        traffic_stats = TrafficStats(
+            window=config.getfloat("dashboard", "top_talkers_window", fallback=DEFAULT_TOP_TALKERS_WINDOW),
+            sample_every=config.getint("dashboard", "top_talkers_sample_every",
+                                       fallback=DEFAULT_TOP_TALKERS_SAMPLE_EVERY)
+        ) if dashboard_enabled else None
+        
+        # Alert suppression configuration
+        dedup_fields = config.get("alerts", "dedup_fields", fallback=None)
         
         # Initialize components
-        alert_coordinator = AlertCoordinator(mode=mode)
-        exporter = ElasticsearchExporter([es_url])
-        network_monitor = NetworkMonitor(interface=interface, promiscuous=promiscuous)
+        try:
+            alert_coordinator = AlertCoordinator(
+                mode=mode,
+                rate_limit=config.getfloat("alerts", "rate_limit", fallback=DEFAULT_ALERT_RATE_LIMIT),
+                rate_burst=config.getfloat("alerts", "rate_burst", fallback=DEFAULT_ALERT_RATE_BURST),
+                rate_limit_key=config.get("alerts", "rate_limit_key", fallback=DEFAULT_ALERT_RATE_LIMIT_KEY),
+                dedup_window=config.getfloat("alerts", "dedup_window", fallback=DEFAULT_ALERT_DEDUP_WINDOW),
+                dedup_fields=[f.strip() for f in dedup_fields.split(",")] if dedup_fields else DEFAULT_DEDUP_FIELDS,
+                max_keys=config.getint("alerts", "max_keys", fallback=DEFAULT_ALERT_MAX_KEYS)
+            )
+        except ValueError as e:
+            raise ConfigurationError(str(e)) from e
+        exporter = None
+        if es_enabled:
+            from core.exporters import BulkElasticsearchExporter
+            exporter = BulkElasticsearchExporter(
+                [es_url],
+                max_batch_size=export_config.getint("bulk_max_docs", DEFAULT_BULK_MAX_DOCS),
+                max_batch_bytes=export_config.getint("bulk_max_bytes", DEFAULT_BULK_MAX_BYTES),
+                flush_interval=export_config.getfloat("flush_interval", DEFAULT_FLUSH_INTERVAL),
+                max_in_flight=export_config.getint("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+                spill_dir=export_config.get("spill_dir", DEFAULT_SPILL_DIR),
+                spill_max_bytes=export_config.getint("spill_max_mb", DEFAULT_SPILL_MAX_MB) * 1024 * 1024
+            )
+        alert_store = None
+        if store_config is not None and store_config.getboolean("enabled", True):
+            from core.alert_store import AlertStore
+            alert_store = AlertStore(
+                store_config.get("path", DEFAULT_ALERT_STORE_PATH),
+                max_age=store_config.getfloat("max_age_days", DEFAULT_ALERT_STORE_MAX_AGE_DAYS) * 86400,
+                max_bytes=store_config.getint("max_size_mb", DEFAULT_ALERT_STORE_MAX_SIZE_MB) * 1024 * 1024
+            )
+        archive = None
+        if archive_config is not None and archive_config.getboolean("enabled", False):
+            from core.packet_archive import PacketArchive
+            archive = PacketArchive(
+                archive_config.get("directory", DEFAULT_ARCHIVE_DIR),
+                fmt=archive_config.get("format", DEFAULT_ARCHIVE_FORMAT),
+                compression=archive_config.get("compression", DEFAULT_ARCHIVE_COMPRESSION),
+                batch_rows=archive_config.getint("batch_rows", DEFAULT_ARCHIVE_BATCH_ROWS),
+                rotate_bytes=archive_config.getint("rotate_mb", DEFAULT_ARCHIVE_ROTATE_MB) * 1024 * 1024,
+                rotate_seconds=archive_config.getfloat("rotate_seconds", DEFAULT_ARCHIVE_ROTATE_SECONDS),
+                flush_interval=archive_config.getfloat("flush_interval", DEFAULT_ARCHIVE_FLUSH_INTERVAL),
+                max_pending=archive_config.getint("max_pending_batches", DEFAULT_ARCHIVE_MAX_PENDING)
+            )
+        try:
+            if exporter is not None:
+                # Własna kolejka eksportera: wolny ES nie blokuje pozostałych handlerów
+                alert_coordinator.register_handler(
+                    exporter.handle_alert,
+                    name="elasticsearch",
+                    max_queue=export_config.getint("handler_queue", DEFAULT_EXPORT_HANDLER_QUEUE),
+                    concurrency=export_config.getint("handler_concurrency", DEFAULT_EXPORT_HANDLER_CONCURRENCY),
+                    overflow=export_config.get("handler_overflow", DEFAULT_EXPORT_HANDLER_OVERFLOW)
+                )
+            if alert_store is not None:
+                # Zapis paczkami: jedna transakcja SQLite na batch_size alertów
+                alert_coordinator.register_handler(
+                    alert_store.handle_alerts,
+                    name="alert_store",
+                    max_queue=store_config.getint("handler_queue", DEFAULT_ALERT_STORE_QUEUE),
+                    batch_size=store_config.getint("batch_size", DEFAULT_ALERT_STORE_BATCH),
+                    batch_wait_ms=store_config.getfloat(
+                        "flush_interval", DEFAULT_ALERT_STORE_FLUSH_INTERVAL) * 1000
+                )
+        except ValueError as e:
+            raise ConfigurationError(str(e)) from e
+        # Tryb auto: filtr z reguł, o ile nic poza regułami nie potrzebuje całego ruchu
+        filter_policy = CaptureFilterPolicy(capture_filter, needs_all=[
+            reason for reason, needed in (("AI inference", ai_enabled), ("packet archive", archive is not None),
+                                          ("traffic stats", traffic_stats is not None))
+            if needed
+        ])
+        network_monitor = NetworkMonitor(
+            interface=interface,
+            promiscuous=promiscuous,
+            backend=capture_backend,
+            backend_options=backend_options,
+            instrument=metrics_enabled,
+            overload=overload,
+            batch_size=capture_batch_size,
+            batch_wait_us=capture_batch_wait_us,
+            filter_policy=filter_policy
+        )
         
         traffic_monitor = AdvancedTrafficMonitor(
             network_monitor=network_monitor,
             alert_coordinator=alert_coordinator,
             rules_path=RULES_PATH,
             ai_model_path=model_path,
-            exporter=exporter
+            exporter=exporter,
+            ai_batch_size=ai_batch_size,
+            ai_batch_wait_ms=ai_batch_wait_ms,
+            ai_threshold=ai_threshold,
+            inference=inference,
+            ai_enabled=ai_enabled,
+            flow_table=FlowTable(**flow_options) if flow_options and workers <= 1 else None,
+            instrument=metrics_enabled,
+            instrument_every=metrics_sample_every,
+            overload=overload,
+            stats=traffic_stats,
+            archive=archive if workers <= 1 else None
         )
         
-        dashboard = Dashboard(alert_coordinator)
-        api_app: FastAPI = create_app(
-            alert_coordinator, 
-            RuleCommandHandler(traffic_monitor)
-        )
+        # Podmiana reguł i modelu w działającym potoku (obserwacja plików i /rules)
+        reloader = HotReloader(RULES_PATH, [traffic_monitor], inference if ai_enabled else None,
+                               model_path, interval=reload_interval, capture=network_monitor)
+        capture_filter = network_monitor.update_filter(traffic_monitor.rule_set.rules)
+        if filter_policy.mode == CAPTURE_AUTO and capture_filter.captures_all:
+            logger.info(f"Capture filter: {capture_filter.describe()}")
+        if memory is not None:
+            register_memory(memory, network_monitor, traffic_monitor, alert_coordinator, exporter, inference,
+                            archive)
+        startup.mark("pipeline")
 
         # Create and start tasks
         tasks = [
-            asyncio.create_task(network_monitor.start_capture(traffic_monitor.analyze_packet)),
             asyncio.create_task(alert_coordinator.process_alerts()),
-            asyncio.create_task(dashboard.run()),
+            asyncio.create_task(alert_coordinator.run_suppression()),
         ]
+        if exporter is not None:
+            tasks.append(asyncio.create_task(exporter.run()))
+        if alert_store is not None:
+            tasks.append(asyncio.create_task(alert_store.run()))
+        if archive is not None:
+            tasks.append(asyncio.create_task(archive.run()))
+        if memory is not None:
+            tasks.append(asyncio.create_task(memory.run()))
+        if workers > 1:
+            # Tryb wieloprocesowy: przepływy rozdzielane symetrycznym haszem 5-krotki
+            from core.sharding import ShardConfig, ShardedTrafficMonitor
+            sharded_monitor = ShardedTrafficMonitor(
+                alert_coordinator,
+                ShardConfig(
+                    rules_path=str(RULES_PATH),
+                    ai_model_path=model_path if ai_enabled else None,
+                    ai_batch_size=ai_batch_size,
+                    ai_batch_wait_ms=ai_batch_wait_ms,
+                    ai_threshold=ai_threshold,
+                    ai_cache_options=ai_cache_options,
+                    flow_options=flow_options
+                ),
+                workers=workers,
+                batch_size=pipeline_batch_size,
+                archive=archive
+            )
+            sharded_monitor.start()
+            reloader.shards = sharded_monitor
+            tasks.append(asyncio.create_task(sharded_monitor.process_results()))
+            tasks.append(asyncio.create_task(network_monitor.start_capture(
+                sharded_monitor.analyze_batch if batched else sharded_monitor.analyze_packet, batched)))
+            logger.info(f"Sharded analysis across {workers} worker processes")
+        else:
+            tasks.append(asyncio.create_task(traffic_monitor.process_inference()))
+            tasks.append(asyncio.create_task(network_monitor.start_capture(
+                traffic_monitor.analyze_batch if batched else traffic_monitor.analyze_packet, batched)))
+        await asyncio.sleep(0)  # przechwytywanie startuje przed ładowaniem API i dashboardu
+        startup.mark("capture")
+        if ai_enabled:
+            # Jedna sesja ONNX (potok i /analyze), tworzona w tle zamiast przy pierwszej paczce
+            tasks.append(asyncio.create_task(inference.warm_up()))
+
+        if reload_enabled:
+            tasks.append(asyncio.create_task(reloader.run()))
+
+        if metrics is not None:
+            register_metrics(metrics, network_monitor, traffic_monitor, alert_coordinator, exporter, inference,
+                             sharded_monitor if workers > 1 else None, alert_store, reloader, startup, archive,
+                             memory)
+
+        # Dashboard i API ładowane w wątku, gdy przechwytywanie już działa
+        if dashboard_enabled:
+            dashboard_module = await import_deferred("ui.dashboard")
+            dashboard = dashboard_module.Dashboard(alert_coordinator, metrics, overload, network_monitor,
+                                                   traffic_stats, refresh_per_second=dashboard_refresh)
+            tasks.append(asyncio.create_task(dashboard.run()))
+            startup.mark("dashboard")
 
         # Configure and start API server
+        server_module = await import_deferred("api.server")
+        uvicorn = await import_deferred("uvicorn")
+        api_app = server_module.create_app(
+            alert_coordinator, 
+            server_module.RuleCommandHandler(reloader) if reload_enabled else None,
+            alert_store,
+            inference
+        )
+        api_app.state.metrics = metrics
+        api_app.state.overload = overload
+        api_app.state.memory = memory
         uvicorn_config = uvicorn.Config(
             api_app, 
-            host=API_HOST, 
-            port=API_PORT, 
+            host=api_host, 
+            port=api_port, 
             log_level="info"
         )
         server = uvicorn.Server(uvicorn_config)
         api_task = asyncio.create_task(server.serve())
         tasks.append(api_task)
+        startup.mark("api")
 
-        logger.info(f"API server running at http://{API_HOST}:{API_PORT}")
-        logger.info(f"Monitoring network on interface: {interface}")
+        logger.info(f"API server running at http://{api_host}:{api_port}")
+        logger.info(f"Startup: {startup.summary()}")
+        startup_report = config["general"].get("startup_report")
+        if startup_report:
+            Path(startup_report).write_text(json.dumps(startup.as_dict(), indent=2))
+        logger.info(f"Monitoring network on {'pcap file' if source == 'pcap' else 'interface'}: {interface}")
+        
+        if source == "pcap":
+            # Raport odtwarzania: pakiety/s, straty i opóźnienia etapów
+            report = await network_monitor.wait_replay()
+            logger.info(f"Replay finished: {json.dumps(report.as_dict())}")
+            report_path = config["network"].get("replay_report")
+            if report_path:
+                Path(report_path).write_text(json.dumps(report.as_dict(), indent=2))
+            return
         
         # Wait for all tasks to complete
         await asyncio.gather(*tasks)
@@ -164,6 +732,16 @@ async def main() -> None:
         # Ensure proper cleanup of resources
         if 'tasks' in locals() and 'exporter' in locals() and 'network_monitor' in locals():
             await shutdown_tasks(tasks, exporter, network_monitor)
+        if 'alert_coordinator' in locals():
+            await alert_coordinator.close()
+        if 'alert_store' in locals() and alert_store is not None:
+            alert_store.close()
+        if 'archive' in locals() and archive is not None:
+            await archive.close()
+        if 'inference' in locals():
+            inference.close()
+        if 'sharded_monitor' in locals():
+            sharded_monitor.stop()
         
         logger.info("Cyber Witness Network Sniffer shutdown complete")
 
@@ -0,0 +1,338 @@
+# 📄 Plik: network/capture.py
+"""Wymienne backendy przechwytywania pakietów
+
+``ScapyBackend`` buduje pełne drzewo obiektów Scapy dla każdej ramki.
+``RawSocketBackend`` czyta ramki z gniazda AF_PACKET do wstępnie
+zaalokowanego bufora i parsuje tylko potrzebne pola L2/L3/L4 przez
+``memoryview``/``struct`` do zwartego ``PacketRecord``. Pełna dysekcja Scapy
+pozostaje dostępna na żądanie przez ``PacketRecord.to_scapy()``.
+
+Backendy przyjmują filtr przechwytywania (``network.capture_filter``) przez
+``set_filter`` - także w trakcie działania, po podmianie reguł. Gdy libpcap
+nie skompiluje filtra (brak biblioteki), backend przechwytuje wszystko i
+odrzuca pakiety predykatem filtra po parsowaniu nagłówków.
+"""
+import logging
+import socket
+from abc import ABC, abstractmethod
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from network.capture_filter import CaptureFilter, compile_bpf
+
+PROTOCOL_NAMES = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "ICMP"}
+
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+ETH_P_IPV6 = 0x86DD
+VLAN_TYPES = (0x8100, 0x88A8)
+SOL_PACKET = 263
+SO_ATTACH_FILTER = 26
+SO_DETACH_FILTER = 27
+PACKET_ADD_MEMBERSHIP = 1
+PACKET_MR_PROMISC = 1
+
+_U16 = struct.Struct("!H")
+_PORTS = struct.Struct("!HH")
+
+
+class PacketRecord:
+    """Zwarty rekord nagłówków pakietu"""
+    __slots__ = (
+        "timestamp", "length", "src_ip", "dst_ip", "protocol",
+        "src_port", "dst_port", "tcp_flags", "raw",
+    )
+
+    def __init__(self, timestamp: float, length: int, src_ip: Optional[str] = None, dst_ip: Optional[str] = None,
+                 protocol: Optional[str] = None, src_port: Optional[int] = None, dst_port: Optional[int] = None,
+                 tcp_flags: Optional[int] = None, raw: Optional[bytes] = None):
+        self.timestamp = timestamp
+        self.length = length
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.protocol = protocol
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.tcp_flags = tcp_flags
+        self.raw = raw
+
+    def __len__(self) -> int:
+        return self.length
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'src_ip': self.src_ip,
+            'dst_ip': self.dst_ip,
+            'protocol': self.protocol,
+            'packet_size': self.length,
+            'src_port': self.src_port,
+            'dst_port': self.dst_port,
+            'tcp_flags': self.tcp_flags,
+            'timestamp': self.timestamp,
+        }
+
+    def to_scapy(self):
+        """Pełna dysekcja Scapy (wymaga zachowanej ramki, ``keep_raw=True``)"""
+        if self.raw is None:
+            raise ValueError("Raw frame was not kept for this record")
+        from scapy.layers.l2 import Ether
+        return Ether(self.raw)
+
+
+def parse_frame(frame: memoryview, length: Optional[int] = None, timestamp: float = 0.0,
+                keep_raw: bool = False) -> Optional[PacketRecord]:
+    """Parsuj ramkę Ethernet do ``PacketRecord``; None dla ramek spoza IPv4/IPv6"""
+    captured = len(frame)
+    if captured < 14:
+        return None
+    offset = 12
+    ethertype = _U16.unpack_from(frame, offset)[0]
+    while ethertype in VLAN_TYPES and captured >= offset + 6:
+        offset += 4
+        ethertype = _U16.unpack_from(frame, offset)[0]
+    offset += 2
+
+    if ethertype == ETH_P_IP:
+        if captured < offset + 20:
+            return None
+        header_len = (frame[offset] & 0x0F) * 4
+        proto = frame[offset + 9]
+        src_ip = socket.inet_ntop(socket.AF_INET, frame[offset + 12:offset + 16])
+        dst_ip = socket.inet_ntop(socket.AF_INET, frame[offset + 16:offset + 20])
+        offset += header_len
+    elif ethertype == ETH_P_IPV6:
+        if captured < offset + 40:
+            return None
+        proto = frame[offset + 6]
+        src_ip = socket.inet_ntop(socket.AF_INET6, frame[offset + 8:offset + 24])
+        dst_ip = socket.inet_ntop(socket.AF_INET6, frame[offset + 24:offset + 40])
+        offset += 40
+    else:
+        return None
+
+    src_port = dst_port = tcp_flags = None
+    if proto in (6, 17) and captured >= offset + 4:
+        src_port, dst_port = _PORTS.unpack_from(frame, offset)
+        if proto == 6 and captured >= offset + 14:
+            tcp_flags = frame[offset + 13]
+
+    return PacketRecord(
+        timestamp,
+        length if length is not None else captured,
+        src_ip,
+        dst_ip,
+        PROTOCOL_NAMES.get(proto, "OTHER"),
+        src_port,
+        dst_port,
+        tcp_flags,
+        bytes(frame) if keep_raw else None,
+    )
+
+
+class CaptureBackend(ABC):
+    """Wspólny interfejs backendów: ``start(on_packet)`` / ``stop()``
+
+    Backendy z ``is_async = True`` działają w pętli zdarzeń i zamiast ``start``
+    udostępniają korutynę ``run(deliver)``.
+    """
+    is_async = False
+
+    def __init__(self, interface: str, promiscuous: bool = True):
+        self.interface = interface
+        self.promiscuous = promiscuous
+        self.capture_filter = CaptureFilter()
+        # Pakiety odrzucone przez filtr w przestrzeni użytkownika (bez filtra w jądrze)
+        self.filtered = 0
+
+    def set_filter(self, capture_filter: CaptureFilter) -> None:
+        """Ustaw filtr przed ``start`` albo podmień go w działającym przechwytywaniu"""
+        self.capture_filter = capture_filter
+
+    def _kernel_filter_failed(self, error: Exception) -> None:
+        """Filtr nie działa w jądrze: predykat na nagłówkach albo - dla własnego wyrażenia - cały ruch"""
+        if self.capture_filter.custom:
+            logging.warning(f"Custom capture filter '{self.capture_filter.expression}' cannot be applied "
+                            f"({error}), capturing all traffic")
+        else:
+            logging.warning(f"Cannot apply BPF filter in kernel ({error}), filtering parsed headers instead")
+
+    @abstractmethod
+    def start(self, on_packet: Callable[[Any], None]) -> None:
+        """Uruchom przechwytywanie; ``on_packet`` jest wołany w wątku backendu"""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Zatrzymaj przechwytywanie"""
+
+
+class ScapyBackend(CaptureBackend):
+    """AsyncSniffer Scapy - pełna dysekcja każdej ramki"""
+
+    def __init__(self, interface: str, promiscuous: bool = True):
+        super().__init__(interface, promiscuous)
+        self.sniffer = None
+        self._on_packet: Optional[Callable[[Any], None]] = None
+        # Wyrażenie przekazane do AsyncSniffer; None - filtr (jeśli jest) działa w _deliver
+        self._sniffer_filter: Optional[str] = None
+
+    def _kernel_expression(self) -> Optional[str]:
+        """Wyrażenie dla gniazda albo None, gdy libpcap go nie skompiluje
+
+        AsyncSniffer kompiluje filtr dopiero w swoim wątku - błąd kończyłby
+        wątek bez śladu w logu, więc sprawdzamy go wcześniej.
+        """
+        expression = self.capture_filter.expression
+        if expression is None:
+            return None
+        try:
+            compile_bpf(expression, self.interface)
+        except (ImportError, OSError, ValueError) as e:
+            self._kernel_filter_failed(e)
+            return None
+        return expression
+
+    def start(self, on_packet: Callable[[Any], None]) -> None:
+        self._on_packet = on_packet
+        self._start_sniffer(self._kernel_expression())
+
+    def _start_sniffer(self, expression: Optional[str]) -> None:
+        from scapy.all import AsyncSniffer
+        self._sniffer_filter = expression
+        self.sniffer = AsyncSniffer(
+            iface=self.interface,
+            prn=self._deliver,
+            promisc=self.promiscuous,
+            filter=expression,
+            store=False
+        )
+        self.sniffer.start()
+
+    def _deliver(self, packet: Any) -> None:
+        if self._sniffer_filter is None and self.capture_filter.terms is not None:
+            # Bez filtra w gnieździe: predykat filtra na nagłówkach ramki
+            record = parse_frame(memoryview(packet.original or bytes(packet)))
+            if record is None or not self.capture_filter.match(record):
+                self.filtered += 1
+                return
+        self._on_packet(packet)
+
+    def set_filter(self, capture_filter: CaptureFilter) -> None:
+        super().set_filter(capture_filter)
+        if self.sniffer is None or not self.sniffer.running:
+            return
+        expression = self._kernel_expression()
+        if expression != self._sniffer_filter:
+            # AsyncSniffer nie zmienia filtra w locie - krótka przerwa na ponowne otwarcie gniazda
+            self.sniffer.stop()
+            self._start_sniffer(expression)
+
+    def stop(self) -> None:
+        if self.sniffer and self.sniffer.running:
+            self.sniffer.stop()
+
+
+class RawSocketBackend(CaptureBackend):
+    """Gniazdo AF_PACKET, wstępnie zaalokowany bufor, parsowanie tylko nagłówków"""
+
+    def __init__(self, interface: str, promiscuous: bool = True, snaplen: int = 128, keep_raw: bool = False,
+                 poll_timeout: float = 0.2):
+        super().__init__(interface, promiscuous)
+        self.snaplen = snaplen
+        self.keep_raw = keep_raw
+        self.poll_timeout = poll_timeout
+        self._buffer = bytearray(snaplen)
+        self._view = memoryview(self._buffer)
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = threading.Event()
+        # True, gdy filtr działa w jądrze (SO_ATTACH_FILTER) - wtedy bez sprawdzania w _run
+        self._kernel_filter = False
+        self.received = 0
+        self.skipped = 0
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+        sock.bind((self.interface, 0))
+        if self.promiscuous:
+            mreq = struct.pack("iHH8s", socket.if_nametoindex(self.interface), PACKET_MR_PROMISC, 0, b"")
+            sock.setsockopt(SOL_PACKET, PACKET_ADD_MEMBERSHIP, mreq)
+        sock.settimeout(self.poll_timeout)
+        return sock
+
+    def set_filter(self, capture_filter: CaptureFilter) -> None:
+        super().set_filter(capture_filter)
+        if self._socket is not None:
+            self._attach_filter(self._socket)
+
+    def _attach_filter(self, sock: socket.socket) -> None:
+        """Dołącz (lub zdejmij) program BPF; bez libpcap filtr działa w przestrzeni użytkownika"""
+        expression = self.capture_filter.expression
+        if expression is None:
+            if self._kernel_filter:
+                sock.setsockopt(socket.SOL_SOCKET, SO_DETACH_FILTER, 0)
+            self._kernel_filter = False
+            return
+        from scapy.error import Scapy_Exception
+        try:
+            # Nowy program zastępuje poprzedni atomowo - bez ponownego otwierania gniazda
+            from scapy.arch.linux import attach_filter
+            attach_filter(sock, expression, self.interface)
+            self._kernel_filter = True
+        except (ImportError, OSError, Scapy_Exception) as e:
+            if self._kernel_filter:
+                sock.setsockopt(socket.SOL_SOCKET, SO_DETACH_FILTER, 0)
+            self._kernel_filter = False
+            self._kernel_filter_failed(e)
+
+    def start(self, on_packet: Callable[[Any], None]) -> None:
+        self._socket = self._open_socket()
+        self._attach_filter(self._socket)
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, args=(on_packet,), name="raw-capture", daemon=True)
+        self._thread.start()
+
+    def _run(self, on_packet: Callable[[Any], None]) -> None:
+        sock, view, snaplen, keep_raw = self._socket, self._view, self.snaplen, self.keep_raw
+        while self._running.is_set():
+            try:
+                # MSG_TRUNC: zwraca rzeczywistą długość ramki, kopiuje co najwyżej snaplen bajtów
+                length = sock.recv_into(view, snaplen, socket.MSG_TRUNC)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self._running.is_set():
+                    logging.error(f"Raw capture error: {e}")
+                break
+            self.received += 1
+            record = parse_frame(view[:min(length, snaplen)], length, time.time(), keep_raw)
+            if record is None:
+                self.skipped += 1
+                continue
+            if not self._kernel_filter and not self.capture_filter.match(record):
+                self.filtered += 1
+                continue
+            on_packet(record)
+
+    def stop(self) -> None:
+        self._running.clear()
+        if self._thread:
+            self._thread.join(self.poll_timeout * 5)
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+
+CAPTURE_BACKENDS = {
+    "scapy": ScapyBackend,
+    "raw": RawSocketBackend,
+}
+
+
+def create_backend(name: str, interface: str, promiscuous: bool = True, **options) -> CaptureBackend:
+    try:
+        backend_cls = CAPTURE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown capture backend: {name}") from None
+    return backend_cls(interface, promiscuous, **options)
@@ -0,0 +1,194 @@
+# 📄 Plik: network/capture_filter.py
+"""Filtr BPF przechwytywania wyprowadzony z aktywnych reguł
+
+Reguła trafiająca do indeksu (``CompiledRule.index_field``) ma w koniunkcji
+predykat ``pkt[pole] == stała`` / ``pkt[pole] in [...]`` - warunek konieczny
+dopasowania. Alternatywa takich predykatów wszystkich reguł jest więc
+nadzbiorem ruchu, który może wywołać alert, i da się ją zapisać w BPF, np.::
+
+    pkt['dst_port'] in [4444, 6667]  +  pkt['protocol'] == 'ICMP'
+    -> dst port 4444 or dst port 6667 or icmp or icmp6
+
+Filtr nie powstaje (przechwytywany jest cały ruch), gdy któraś reguła nie ma
+takiego predykatu albo jego pola nie da się wyrazić w BPF, gdy reguły
+korzystają ze stanu przepływów oraz gdy cały ruch jest potrzebny poza regułami
+(AI ocenia każdy pakiet, archiwum pakietów) - ``CaptureFilterPolicy``.
+
+Ten sam filtr jest dostępny jako predykat na ``PacketRecord`` (``match``):
+backendy bez filtra w jądrze (odtwarzanie pcap, brak libpcap) odrzucają
+pakiety zaraz po parsowaniu nagłówków, przed buforem analizy. Własne
+wyrażenie z konfiguracji nie ma takiego predykatu - działa tylko w jądrze
+(libpcap), dlatego ``CaptureFilterPolicy.validate`` sprawdza je przy starcie.
+"""
+import ipaddress
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# Tryby ``[network] capture_filter``; każda inna wartość to własne wyrażenie BPF
+CAPTURE_ALL = "all"
+CAPTURE_AUTO = "auto"
+
+# Typ łącza dla kompilacji bez interfejsu (Ethernet, jak parser ``parse_frame``)
+DLT_EN10MB = 1
+
+_PROTOCOLS = {"TCP": ("tcp",), "UDP": ("udp",), "ICMP": ("icmp", "icmp6")}
+_PORT_FIELDS = {"src_port": "src port", "dst_port": "dst port"}
+_HOST_FIELDS = {"src_ip": "src host", "dst_ip": "dst host"}
+
+
+class CaptureFilter:
+    """Wyrażenie BPF i równoważny predykat na polach nagłówka
+
+    ``terms`` - alternatywa par (pole, dozwolone wartości); None = cały ruch.
+    Własne wyrażenie z konfiguracji nie ma predykatu (``terms`` = None).
+    """
+
+    def __init__(self, expression: Optional[str] = None,
+                 terms: Optional[Sequence[Tuple[str, FrozenSet[Any]]]] = None, reason: str = ""):
+        self.expression = expression
+        self.terms = tuple(terms) if terms is not None else None
+        # Dlaczego przechwytywany jest cały ruch (do logu)
+        self.reason = reason
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CaptureFilter) and self.expression == other.expression
+
+    def __repr__(self) -> str:
+        return f"CaptureFilter({self.expression!r})"
+
+    @property
+    def captures_all(self) -> bool:
+        return self.expression is None
+
+    def match(self, record: Any) -> bool:
+        """Czy pakiet (``PacketRecord``) przechodzi przez filtr"""
+        if self.terms is None:
+            return True
+        for field, values in self.terms:
+            if getattr(record, field) in values:
+                return True
+        return False
+
+    @property
+    def custom(self) -> bool:
+        """Własne wyrażenie bez predykatu - bez libpcap nie da się go zastosować"""
+        return self.expression is not None and self.terms is None
+
+    def describe(self) -> str:
+        return self.expression if self.expression is not None else f"all traffic ({self.reason})"
+
+
+def compile_bpf(expression: str, interface: Optional[str] = None) -> None:
+    """Sprawdź, czy libpcap skompiluje wyrażenie (dla ``interface`` albo dla Ethernetu)
+
+    ``ImportError`` - brak libpcap, ``ValueError`` - błędne wyrażenie,
+    ``OSError`` - libpcap nie otworzył interfejsu.
+    """
+    from scapy.arch.common import compile_filter, free_filter
+    from scapy.error import Scapy_Exception
+    try:
+        program = compile_filter(expression, iface=interface, linktype=None if interface else DLT_EN10MB)
+    except Scapy_Exception as e:
+        raise ValueError(str(e)) from None
+    free_filter(program)
+
+
+def _term(field: str, values: FrozenSet[Any]) -> Optional[List[str]]:
+    """Prymitywy BPF dla ``pkt[field] in values`` albo None, gdy nie da się ich wyrazić"""
+    if field in _PORT_FIELDS:
+        if not all(isinstance(v, int) and not isinstance(v, bool) and 0 <= v <= 65535 for v in values):
+            return None
+        return [f"{_PORT_FIELDS[field]} {port}" for port in sorted(values)]
+    if field in _HOST_FIELDS:
+        try:
+            hosts = sorted(str(ipaddress.ip_address(v)) for v in values)
+        except ValueError:
+            return None
+        # Reguła porównuje tekst adresu z parsera - inna zapisana forma i tak by nie pasowała
+        if set(hosts) != set(values):
+            return None
+        return [f"{_HOST_FIELDS[field]} {host}" for host in hosts]
+    if field == "protocol":
+        if not all(v in _PROTOCOLS for v in values):
+            return None
+        return [primitive for v in sorted(values) for primitive in _PROTOCOLS[v]]
+    return None
+
+
+def rules_filter(rules: Iterable[Any]) -> CaptureFilter:
+    """Filtr przepuszczający każdy pakiet, który może dopasować którąś z reguł (``CompiledRule``)"""
+    terms: Dict[str, set] = {}
+    for rule in rules:
+        if rule.uses_flow:
+            return CaptureFilter(reason=f"rule '{rule.name}' uses flow state")
+        if rule.index_field is None:
+            return CaptureFilter(reason=f"rule '{rule.name}' has no indexable predicate")
+        if _term(rule.index_field, rule.index_values) is None:
+            return CaptureFilter(reason=f"rule '{rule.name}' tests {rule.index_field}, not expressible in BPF")
+        terms.setdefault(rule.index_field, set()).update(rule.index_values)
+    if not terms:
+        return CaptureFilter(reason="no rules")
+    return _terms_filter(terms)
+
+
+def _terms_filter(terms: Dict[str, set]) -> CaptureFilter:
+    ordered = sorted((field, frozenset(values)) for field, values in terms.items())
+    primitives = " or ".join(p for field, values in ordered for p in _term(field, values))
+    # Ramki z tagiem VLAN: parser backendu raw je rozpakowuje, BPF wymaga jawnego "vlan"
+    return CaptureFilter(f"({primitives}) or (vlan and ({primitives}))", ordered)
+
+
+def widened(current: CaptureFilter, new: CaptureFilter) -> CaptureFilter:
+    """Filtr przepuszczający ruch obu filtrów - na czas podmiany reguł"""
+    if current.captures_all:
+        return current
+    if new.captures_all or current.terms is None or new.terms is None:
+        # Własnego wyrażenia nie da się złożyć z predykatami - do podmiany cały ruch
+        return new if new == current else CaptureFilter(reason=new.reason or "rules swap")
+    terms: Dict[str, set] = {}
+    for field, values in current.terms + new.terms:
+        terms.setdefault(field, set()).update(values)
+    return _terms_filter(terms)
+
+
+class CaptureFilterPolicy:
+    """Wybór filtra przechwytywania dla bieżących reguł
+
+    ``mode``: ``all`` - bez filtra, ``auto`` - z reguł (``rules_filter``),
+    inna wartość - stałe wyrażenie BPF. ``needs_all`` - powody, dla których
+    tryb ``auto`` musi przechwytywać cały ruch (np. ``"AI inference"``).
+    """
+
+    def __init__(self, mode: str = CAPTURE_ALL, needs_all: Sequence[str] = ()):
+        self.mode = mode.strip() or CAPTURE_ALL
+        self.needs_all = tuple(needs_all)
+
+    @property
+    def custom(self) -> bool:
+        return self.mode not in (CAPTURE_ALL, CAPTURE_AUTO)
+
+    def validate(self, kernel_filter: bool = True) -> None:
+        """Sprawdź własne wyrażenie przy starcie; ``ValueError``, gdy nie da się go zastosować
+
+        ``kernel_filter`` = False - źródło bez filtra w jądrze (odtwarzanie pcap),
+        gdzie działa tylko predykat na nagłówkach, a własne wyrażenie go nie ma.
+        """
+        if not self.custom:
+            return
+        if not kernel_filter:
+            raise ValueError(f"capture_filter '{self.mode}' cannot be applied without a kernel filter "
+                             f"(pcap replay); use auto or all")
+        try:
+            compile_bpf(self.mode)
+        except ImportError as e:
+            raise ValueError(f"capture_filter '{self.mode}' requires libpcap: {e}") from None
+        except ValueError as e:
+            raise ValueError(f"Invalid capture_filter: {e}") from None
+
+    def resolve(self, rules: Iterable[Any]) -> CaptureFilter:
+        if self.mode == CAPTURE_ALL:
+            return CaptureFilter(reason="capture_filter = all")
+        if self.mode != CAPTURE_AUTO:
+            return CaptureFilter(self.mode, reason="custom filter")
+        if self.needs_all:
+            return CaptureFilter(reason=", ".join(self.needs_all))
+        return rules_filter(rules)
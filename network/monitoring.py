@@ -1,40 +1,214 @@
 # 📄 Plik: network/monitoring.py (ulepszona wersja)
 """Asynchroniczne przechwytywanie pakietów z kontrolą przepustowości"""
-from scapy.all import AsyncSniffer
-from scapy.packet import Packet
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
 import asyncio
+import logging
+import threading
+import time
+from itertools import chain
+from network.capture import CaptureBackend, create_backend
+from network.capture_filter import CaptureFilter, CaptureFilterPolicy, widened
+from core.memory import queue_items
+from core.metrics import LatencyHistogram
+from core.overload import OverloadController
+from network.replay import ReplayReport
+
+if TYPE_CHECKING:
+    # Scapy jest importowany dopiero przez backend "scapy"
+    from scapy.packet import Packet
+
+# Co ile sekund (najwyżej) przeliczać poziom przeciążenia
+OVERLOAD_CHECK_INTERVAL = 0.01
+
+def _no_clock() -> float:
+    return 0.0
 
 class NetworkMonitor:
-    def __init__(self, interface: str = "eth0", promiscuous: bool = True, buffer_size: int = 10000):
+    def __init__(self, interface: str = "eth0", promiscuous: bool = True, buffer_size: int = 10000,
+                 backend: str = "scapy", backend_options: Optional[Dict[str, Any]] = None,
+                 instrument: bool = True, overload: Optional[OverloadController] = None,
+                 batch_size: int = 256, batch_wait_us: float = 200.0,
+                 filter_policy: Optional[CaptureFilterPolicy] = None):
         self.interface = interface
         self.promiscuous = promiscuous
-        self.sniffer: Optional[AsyncSniffer] = None
+        self.backend_name = backend
+        self.backend_options = backend_options or {}
+        self.backend: Optional[CaptureBackend] = None
         self._packet_buffer = asyncio.Queue(maxsize=buffer_size)
         self._stop_event = asyncio.Event()
+        self.captured = 0
+        self.dropped = 0
+        # instrument=False wyłącza pomiar czasu na pakiet (histogramy są wtedy None)
+        self.queue_latency = LatencyHistogram() if instrument else None
+        self.analysis_latency = LatencyHistogram() if instrument else None
+        # Kontroler przeciążenia potrzebuje czasu wstawienia do bufora, nawet bez metryk
+        self.overload = overload
+        self._clock = time.perf_counter if instrument or overload is not None else _no_clock
+        self._next_overload_check = 0.0
+        self.replay_report: Optional[ReplayReport] = None
+        self._replay_done = asyncio.Event()
+        # Tryb paczkowy: callback dostaje do batch_size pakietów, czekając najwyżej
+        # batch_wait_us od pierwszego z nich
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_us / 1_000_000
+        self.batches = 0
+        # Przekazanie z wątku przechwytywania do pętli zdarzeń (asyncio.Queue nie jest wątkowo bezpieczna)
+        self._handoff_lock = threading.Lock()
+        self._pending: List[Tuple[Any, Callable, float]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Filtr przechwytywania wyprowadzany z reguł (update_filter), domyślnie cały ruch
+        self.filter_policy = filter_policy or CaptureFilterPolicy()
+        self.capture_filter = self.filter_policy.resolve(())
+
+    @property
+    def filtered(self) -> int:
+        """Pakiety odrzucone przez filtr w przestrzeni użytkownika (filtr w jądrze ich nie liczy)"""
+        return self.backend.filtered if self.backend is not None else 0
+
+    def update_filter(self, rules: Iterable[Any]) -> CaptureFilter:
+        """Wyznacz filtr dla reguł (``CompiledRule``) i podmień go w backendzie, jeśli się zmienił"""
+        return self._apply_filter(self.filter_policy.resolve(rules))
+
+    def widen_filter(self, rules: Iterable[Any]) -> CaptureFilter:
+        """Przed podmianą reguł: filtr przepuszcza ruch bieżących i nowych reguł"""
+        return self._apply_filter(widened(self.capture_filter, self.filter_policy.resolve(rules)))
+
+    def _apply_filter(self, capture_filter: CaptureFilter) -> CaptureFilter:
+        if capture_filter != self.capture_filter:
+            if self.backend is not None:
+                self.backend.set_filter(capture_filter)
+            self.capture_filter = capture_filter
+            logging.info(f"Capture filter: {capture_filter.describe()}")
+        return capture_filter
+
+    async def start_capture(self, callback: Callable[["Packet"], None], batched: bool = False) -> None:
+        """Rozpocznij przechwytywanie z buforowaniem
 
-    async def start_capture(self, callback: Callable[[Packet], None]) -> None:
-        """Rozpocznij przechwytywanie z buforowaniem"""
-        self.sniffer = AsyncSniffer(
-            iface=self.interface,
-            prn=lambda pkt: self._buffer_packet(pkt, callback),
-            promisc=self.promiscuous,
-            store=False
-        )
-        self.sniffer.start()
-        asyncio.create_task(self._process_buffer())
-
-    def _buffer_packet(self, packet: Packet, callback: Callable) -> None:
+        Callback dostaje ``scapy.packet.Packet`` (backend "scapy") albo
+        ``network.capture.PacketRecord`` (backendy "raw" i "pcap"); przy
+        ``batched=True`` - listę takich pakietów (do ``batch_size``).
+        """
+        self.backend = create_backend(self.backend_name, self.interface, self.promiscuous, **self.backend_options)
+        self.backend.set_filter(self.capture_filter)
+        asyncio.create_task(self._process_batches() if batched else self._process_buffer())
+        if self.backend.is_async:
+            asyncio.create_task(self._run_replay(callback))
+        else:
+            # Wątek przechwytywania zbiera pakiety, pętla odbiera je wektorem (w obu trybach)
+            self._loop = asyncio.get_running_loop()
+            self.backend.start(lambda pkt: self._handoff(pkt, callback))
+
+    def _buffer_packet(self, packet: "Packet", callback: Callable) -> bool:
         """Buforuj pakiety z kontrolą przeciążenia"""
+        return self._enqueue((packet, callback, self._clock()))
+
+    def _enqueue(self, entry: Tuple[Any, Callable, float]) -> bool:
         try:
-            self._packet_buffer.put_nowait((packet, callback))
+            self._packet_buffer.put_nowait(entry)
+            self.captured += 1
+            return True
         except asyncio.QueueFull:
+            self.dropped += 1
             logging.warning("Packet buffer overflow - dropping packets")
+            return False
+
+    @property
+    def buffered(self) -> int:
+        """Pakiety w pamięci: bufor analizy i wektor przekazania z wątku przechwytywania"""
+        return self._packet_buffer.qsize() + len(self._pending)
+
+    def buffered_packets(self) -> Iterable[Tuple[Any, Callable, float]]:
+        """Wpisy (pakiet, callback, czas) bufora i wektora przekazania, od najstarszych (bez pobierania)"""
+        return chain(queue_items(self._packet_buffer), self._pending)
+
+    def shed_buffer(self, count: int) -> int:
+        """Usuń ``count`` najstarszych pakietów (budżet pamięci); liczą się jako utracone"""
+        removed = 0
+        while removed < count and not self._packet_buffer.empty():
+            self._packet_buffer.get_nowait()
+            self._packet_buffer.task_done()
+            removed += 1
+        if removed < count and self._pending:
+            with self._handoff_lock:
+                dropped = min(count - removed, len(self._pending))
+                del self._pending[:dropped]
+            removed += dropped
+        self.dropped += removed
+        return removed
+
+    def _handoff(self, packet: Any, callback: Callable) -> None:
+        """Wywoływane w wątku backendu: pakiet trafia do wektora przekazywanego pętli"""
+        with self._handoff_lock:
+            self._pending.append((packet, callback, self._clock()))
+            first = len(self._pending) == 1
+        if first:
+            # Jedno wybudzenie pętli na wektor, nie na pakiet
+            self._loop.call_soon_threadsafe(self._drain_handoff)
+
+    def _drain_handoff(self) -> None:
+        with self._handoff_lock:
+            pending, self._pending = self._pending, []
+        for entry in pending:
+            self._enqueue(entry)
+
+    async def _run_replay(self, callback: Callable) -> None:
+        """Odtwórz plik pcap przez ten sam bufor i callback co przechwytywanie na żywo"""
+        async def deliver(packet: Any, wait: bool) -> bool:
+            if not wait:
+                return self._buffer_packet(packet, callback)
+            await self._packet_buffer.put((packet, callback, self._clock()))
+            self.captured += 1
+            return True
+
+        start = time.perf_counter()
+        try:
+            await self.backend.run(deliver)
+            await self._packet_buffer.join()
+        except Exception as e:
+            logging.error(f"Replay failed: {e}")
+        finally:
+            duration = time.perf_counter() - start
+            self.replay_report = ReplayReport(
+                path=self.backend.path,
+                speed=self.backend.speed,
+                packets=self.backend.packets,
+                skipped=self.backend.skipped,
+                filtered=self.backend.filtered,
+                dropped=self.dropped,
+                duration=duration,
+                packets_per_sec=self.backend.packets / duration if duration else 0.0,
+                stages={
+                    "read": self.backend.read_latency.summary(),
+                    **({
+                        "queue": self.queue_latency.summary(),
+                        "analysis": self.analysis_latency.summary(),
+                    } if self.queue_latency is not None else {})
+                }
+            )
+            self._replay_done.set()
+
+    async def wait_replay(self) -> ReplayReport:
+        """Poczekaj na koniec odtwarzania i zwróć raport"""
+        await self._replay_done.wait()
+        return self.replay_report
+
+    def _check_overload(self, started: float, enqueued: float) -> None:
+        if started >= self._next_overload_check:
+            self._next_overload_check = started + OVERLOAD_CHECK_INTERVAL
+            maxsize = self._packet_buffer.maxsize
+            self.overload.update(self._packet_buffer.qsize() / maxsize if maxsize else 0.0,
+                                 started - enqueued)
 
     async def _process_buffer(self) -> None:
         """Asynchroniczne przetwarzanie bufora pakietów"""
         while not self._stop_event.is_set():
-            packet, callback = await self._packet_buffer.get()
+            packet, callback, enqueued = await self._packet_buffer.get()
+            if self.queue_latency is not None or self.overload is not None:
+                started = time.perf_counter()
+                if self.queue_latency is not None:
+                    self.queue_latency.record(started - enqueued)
+                if self.overload is not None:
+                    self._check_overload(started, enqueued)
             try:
                 if asyncio.iscoroutinefunction(callback):
                     await callback(packet)
@@ -43,16 +217,60 @@ class NetworkMonitor:
             except Exception as e:
                 logging.error(f"Packet processing error: {e}")
             finally:
+                if self.analysis_latency is not None:
+                    self.analysis_latency.record(time.perf_counter() - started)
                 self._packet_buffer.task_done()
 
+    async def _process_batches(self) -> None:
+        """Przetwarzanie bufora paczkami: jedno wybudzenie i jedno wywołanie callbacku na paczkę
+
+        Paczka zamyka się po ``batch_size`` pakietach albo ``batch_wait_us`` od
+        odebrania pierwszego z nich. Callback jest wspólny dla bufora (jeden
+        ``start_capture`` na monitor), więc bierzemy go z pierwszego wpisu.
+        """
+        queue = self._packet_buffer
+        while not self._stop_event.is_set():
+            entries = [await queue.get()]
+            deadline = time.perf_counter() + self.batch_wait
+            while len(entries) < self.batch_size:
+                if not queue.empty():
+                    entries.append(queue.get_nowait())
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    entries.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            callback = entries[0][1]
+            if self.queue_latency is not None or self.overload is not None:
+                started = time.perf_counter()
+                if self.queue_latency is not None:
+                    for _, _, enqueued in entries:
+                        self.queue_latency.record(started - enqueued)
+                if self.overload is not None:
+                    self._check_overload(started, entries[0][2])
+            try:
+                packets = [packet for packet, _, _ in entries]
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(packets)
+                else:
+                    callback(packets)
+            except Exception as e:
+                logging.error(f"Packet batch processing error: {e}")
+            finally:
+                if self.analysis_latency is not None:
+                    # Średni czas analizy na pakiet w paczce
+                    self.analysis_latency.record((time.perf_counter() - started) / len(entries))
+                self.batches += 1
+                for _ in entries:
+                    queue.task_done()
+
     async def stop_capture(self) -> None:
         """Bezpieczne zatrzymanie przechwytywania"""
         self._stop_event.set()
-        if self.sniffer:
-            self.sniffer.stop()
-            await asyncio.wait_for(
-                self.sniffer.join(),
-                timeout=5,
-                loop=asyncio.get_event_loop()
-            )
-        await self._packet_buffer.join()
\ No newline at end of file
+        if self.backend:
+            await asyncio.wait_for(asyncio.to_thread(self.backend.stop), timeout=5)
+        await self._packet_buffer.join()
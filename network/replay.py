@@ -0,0 +1,130 @@
+# 📄 Plik: network/replay.py
+"""Odtwarzanie plików pcap/pcapng zamiast przechwytywania na żywo
+
+Plik jest czytany strumieniowo (``RawPcapReader`` rozpoznaje pcap i pcapng),
+więc duże zrzuty nie są ładowane do pamięci. Prędkość odtwarzania:
+``0`` - tak szybko jak to możliwe (bez strat, z przeciwciśnieniem na buforze),
+``1`` - czas rzeczywisty, ``N`` - N razy szybciej niż w oryginale.
+
+Filtr przechwytywania działa tu zamiast filtra w jądrze: pakiety spoza filtra
+są odrzucane po parsowaniu nagłówków, przed buforem analizy (``filtered``).
+"""
+import asyncio
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.metrics import LatencyHistogram
+from network.capture import CAPTURE_BACKENDS, CaptureBackend, parse_frame
+from network.capture_filter import CaptureFilter
+
+# Wynik _parse dla pakietu odrzuconego przez filtr przechwytywania
+_FILTERED = object()
+
+
+@dataclass
+class ReplayReport:
+    path: str
+    speed: float
+    packets: int = 0
+    skipped: int = 0
+    filtered: int = 0
+    dropped: int = 0
+    duration: float = 0.0
+    packets_per_sec: float = 0.0
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class PcapReplayBackend(CaptureBackend):
+    """Źródło pakietów z pliku pcap/pcapng działające w pętli zdarzeń"""
+    is_async = True
+
+    def __init__(self, interface: str, promiscuous: bool = True, speed: float = 0.0, parser: str = "raw",
+                 lossless: Optional[bool] = None):
+        # ``interface`` to ścieżka pliku - ten sam konstruktor co pozostałe backendy
+        super().__init__(interface, promiscuous)
+        if speed < 0:
+            raise ValueError("Replay speed must be >= 0")
+        if parser not in ("raw", "scapy"):
+            raise ValueError(f"Unknown replay parser: {parser}")
+        self.path = interface
+        self.speed = speed
+        self.parser = parser
+        self.lossless = speed == 0 if lossless is None else lossless
+        self.read_latency = LatencyHistogram()
+        self.packets = 0
+        self.skipped = 0
+        self._stopped = False
+
+    def set_filter(self, capture_filter: CaptureFilter) -> None:
+        super().set_filter(capture_filter)
+        if capture_filter.custom:
+            self._kernel_filter_failed(ValueError("pcap replay has no kernel filter"))
+
+    def _parse(self, frame: bytes, wirelen: int, timestamp: float):
+        if self.capture_filter.terms is not None:
+            record = parse_frame(memoryview(frame), wirelen, timestamp)
+            if record is not None and not self.capture_filter.match(record):
+                return _FILTERED
+            if self.parser == "raw":
+                return record
+        if self.parser == "scapy":
+            from scapy.layers.l2 import Ether
+            packet = Ether(frame)
+            packet.time = timestamp
+            return packet
+        return parse_frame(memoryview(frame), wirelen, timestamp)
+
+    def start(self, on_packet: Callable[[Any], None]) -> None:
+        raise TypeError("Pcap replay runs in the event loop - use run(deliver)")
+
+    async def run(self, deliver: Callable[[Any, bool], Awaitable[bool]]) -> None:
+        """Odtwórz plik; ``deliver(pakiet, czekaj)`` zwraca False, gdy pakiet odrzucono"""
+        from scapy.utils import RawPcapReader
+
+        reader = RawPcapReader(self.path)
+        divisor = 1e9 if getattr(reader, "nano", False) else 1e6
+        first_ts: Optional[float] = None
+        timestamp = 0.0
+        start = time.perf_counter()
+        try:
+            for frame, meta in reader:
+                if self._stopped:
+                    break
+                read_start = time.perf_counter()
+                if hasattr(meta, "sec"):
+                    timestamp = meta.sec + meta.usec / divisor
+                elif meta.tshigh is not None:
+                    timestamp = ((meta.tshigh << 32) | meta.tslow) / meta.tsresol
+                # Simple Packet Block (pcapng) nie ma znacznika czasu - zostaje czas poprzedniego pakietu
+                packet = self._parse(frame, meta.wirelen, timestamp)
+                self.read_latency.record(time.perf_counter() - read_start)
+                if packet is _FILTERED:
+                    self.filtered += 1
+                    continue
+                if packet is None:
+                    self.skipped += 1
+                    continue
+
+                if self.speed > 0:
+                    if first_ts is None:
+                        first_ts = timestamp
+                    delay = (timestamp - first_ts) / self.speed - (time.perf_counter() - start)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif self.packets % 256 == 0:
+                    await asyncio.sleep(0)  # oddaj pętlę konsumentom bufora
+
+                self.packets += 1
+                await deliver(packet, self.lossless)
+        finally:
+            reader.close()
+
+    def stop(self) -> None:
+        self._stopped = True
+
+
+CAPTURE_BACKENDS["pcap"] = PcapReplayBackend
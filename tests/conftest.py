@@ -0,0 +1,72 @@
+# 📄 Plik: tests/conftest.py
+"""Wspólne fixture i zamienniki komponentów dla testów (i benchmarków)"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pytest
+
+
+class RecordingCoordinator:
+    """Zamiast ``AlertCoordinator``: zapisuje każdy alert z ``add_alert`` i ``add_alerts``
+
+    ``alerts`` - krotki (typ, wiadomość, priorytet, payload) w kolejności
+    przyjęcia; ścieżka pojedyncza i paczkowa dają te same wpisy.
+    """
+
+    def __init__(self):
+        self.alerts: List[Tuple[Any, str, Any, Dict[str, Any]]] = []
+
+    async def add_alert(self, alert_type, message: str, priority, raw_payload: Dict[str, Any]) -> bool:
+        self.alerts.append((alert_type, message, priority, raw_payload))
+        return True
+
+    async def add_alerts(self, alerts: Iterable[Tuple[Any, str, Any, Dict[str, Any]]]) -> int:
+        before = len(self.alerts)
+        self.alerts.extend(tuple(alert) for alert in alerts)
+        return len(self.alerts) - before
+
+    @property
+    def messages(self) -> List[str]:
+        return [message for _, message, _, _ in self.alerts]
+
+
+class CountingCoordinator:
+    """Jak ``RecordingCoordinator``, ale tylko liczy alerty - bez pamięci na wpis (pomiary przepustowości)"""
+
+    def __init__(self):
+        self.alerts = 0
+
+    async def add_alert(self, alert_type, message: str, priority, raw_payload: Dict[str, Any]) -> bool:
+        self.alerts += 1
+        return True
+
+    async def add_alerts(self, alerts: Iterable[Tuple[Any, str, Any, Dict[str, Any]]]) -> int:
+        count = sum(1 for _ in alerts)
+        self.alerts += count
+        return count
+
+
+async def _asgi_request(app, method: str, path: str, body: bytes = b""):
+    """Minimalny klient ASGI: zwraca (status, body)"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.fixture
+def asgi_request():
+    """Klient ASGI dla testów endpointów: ``await asgi_request(app, metoda, ścieżka[, body])``"""
+    return _asgi_request
@@ -0,0 +1,102 @@
+# 📄 Plik: tests/test_alert_coordinator.py
+"""Testy szybkiej ścieżki AlertCoordinator"""
+import asyncio
+
+import pytest
+
+from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertType
+from core.suppression import TokenBucketLimiter
+
+
+def pkt(**extra):
+    return {"src_ip": "10.0.0.1", "dst_ip": "10.0.0.2", "protocol": "TCP", "packet_size": 60, **extra}
+
+
+@pytest.mark.asyncio
+async def test_payload_keeps_fields_outside_schema():
+    coordinator = AlertCoordinator()
+    assert await coordinator.add_alert(AlertType.CRITICAL, "AI detected threat", AlertPriority.HIGH,
+                                       pkt(dst_port=4444, ai_result={"threat_score": 0.9}))
+    payload = coordinator.recent_alerts[-1].payload
+    assert payload["dst_port"] == 4444 and payload["ai_result"] == {"threat_score": 0.9}
+    assert payload["metadata"] == {}
+
+
+@pytest.mark.asyncio
+async def test_invalid_payload_is_rejected():
+    coordinator = AlertCoordinator()
+    assert not await coordinator.add_alert(AlertType.INFO, "bad", AlertPriority.LOW, pkt(packet_size="big"))
+    assert not await coordinator.add_alert(AlertType.INFO, "bad", AlertPriority.LOW, pkt(src_ip=1234))
+    assert coordinator.alert_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_missing_schema_fields_get_defaults_and_fresh_metadata():
+    coordinator = AlertCoordinator()
+    await coordinator.add_alerts([(AlertType.INFO, "a", AlertPriority.LOW, {"dst_port": port}) for port in (1, 2)])
+    first, second = coordinator.recent_alerts
+    assert first.payload["src_ip"] is None and first.payload["dst_port"] == 1
+    assert first.payload["metadata"] is not second.payload["metadata"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_add_and_priority_order():
+    coordinator = AlertCoordinator()
+    received = []
+    coordinator.register_handler(lambda alert: received.append(alert.message))
+    accepted = await coordinator.add_alerts([
+        (AlertType.INFO, "low-1", AlertPriority.LOW, pkt()),
+        (AlertType.CRITICAL, "high", AlertPriority.HIGH, pkt()),
+        (AlertType.INFO, "low-2", AlertPriority.LOW, pkt()),
+        (AlertType.WARNING, "medium", AlertPriority.MEDIUM, pkt()),
+    ])
+    assert accepted == 4
+    task = asyncio.create_task(coordinator.process_alerts())
+    await coordinator.join()
+    task.cancel()
+    await coordinator.close()
+    assert received == ["high", "medium", "low-1", "low-2"]
+
+
+@pytest.mark.asyncio
+async def test_duplicates_collapse_into_one_alert_with_count():
+    coordinator = AlertCoordinator(dedup_window=10)
+    for _ in range(1000):
+        await coordinator.add_alert(AlertType.WARNING, "Port scan", AlertPriority.MEDIUM, pkt(dst_port=22))
+    await coordinator.add_alert(AlertType.WARNING, "Port scan", AlertPriority.MEDIUM, pkt(dst_port=23))
+    assert coordinator.alert_queue.qsize() == 2
+    _, _, alert = coordinator.alert_queue.get_nowait()
+    assert alert.count == 1000 and alert.first_seen <= alert.last_seen
+
+
+@pytest.mark.asyncio
+async def test_duplicates_after_dispatch_are_summarised_when_window_closes():
+    coordinator = AlertCoordinator(dedup_window=10)
+    await coordinator.add_alert(AlertType.WARNING, "Port scan", AlertPriority.MEDIUM, pkt())
+    _, _, first = coordinator.alert_queue.get_nowait()
+    first.reported = first.count  # jak w process_alerts
+    for _ in range(5):
+        await coordinator.add_alert(AlertType.WARNING, "Port scan", AlertPriority.MEDIUM, pkt())
+    assert coordinator.alert_queue.empty()
+    assert coordinator.expire_suppressed(first.first_seen + 11) == 1
+    _, _, summary = coordinator.alert_queue.get_nowait()
+    assert summary.count == 5 and summary.message == "Port scan"
+
+
+@pytest.mark.asyncio
+async def test_token_buckets_are_per_key():
+    coordinator = AlertCoordinator(rate_limit=1, rate_burst=10, rate_limit_key="rule", dedup_window=0)
+    noisy = [(AlertType.INFO, "noisy", AlertPriority.LOW, pkt(dst_port=i)) for i in range(100)]
+    assert await coordinator.add_alerts(noisy) == 10
+    assert await coordinator.add_alert(AlertType.CRITICAL, "quiet", AlertPriority.HIGH, pkt())
+    assert coordinator.limiter.limited == 90
+
+
+def test_token_bucket_refills_and_evicts_least_recently_used():
+    limiter = TokenBucketLimiter(rate=10, burst=2, max_keys=2)
+    assert limiter.allow("a", 0.0) and limiter.allow("a", 0.0) and not limiter.allow("a", 0.0)
+    assert limiter.allow("a", 0.1)
+    limiter.allow("b", 0.1)
+    limiter.allow("a", 0.2)
+    limiter.allow("c", 0.2)  # usuwa "b" - najdawniej używany
+    assert len(limiter) == 2 and limiter.evicted == 1 and "b" not in limiter._buckets
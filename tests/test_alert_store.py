@@ -0,0 +1,77 @@
+# 📄 Plik: tests/test_alert_store.py
+"""Lokalna historia alertów (SQLite) i endpoint /alerts"""
+import json
+
+import pytest
+
+from api import server
+from core.AlertCoordinator import AlertPriority, AlertType, QueuedAlert
+from core.alert_store import AlertStore
+
+
+def alert(i: int, ts: float, rule: str = "Ports", priority: AlertPriority = AlertPriority.MEDIUM) -> QueuedAlert:
+    return QueuedAlert(priority.value, ts, AlertType.WARNING, rule, {
+        "src_ip": f"10.0.0.{i % 4}", "dst_ip": "192.168.0.1", "protocol": "TCP", "dst_port": 4444,
+        "packet_size": 60, "metadata": {"seq": i}
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.db"))
+    yield store
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_all_matching_alerts(store):
+    # Po kilka alertów z tym samym ts - kursor musi rozstrzygać remisy po id
+    await store.handle_alerts([alert(i, 1000.0 + i // 3) for i in range(100)])
+    seen, cursor = [], None
+    while True:
+        page = store.query(limit=7, cursor=cursor, src_ip="10.0.0.1")
+        seen.extend(a["payload"]["metadata"]["seq"] for a in page["alerts"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted((i for i in range(100) if i % 4 == 1), key=lambda i: (i // 3, i), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_filters_and_time_range(store):
+    await store.handle_alerts([alert(i, 1000.0 + i) for i in range(50)])
+    await store.handle_alerts([alert(50, 1050.0, rule="Large ICMP", priority=AlertPriority.HIGH)])
+    assert [a["rule"] for a in store.query(min_priority=AlertPriority.HIGH)["alerts"]] == ["Large ICMP"]
+    window = store.query(since=1010.0, until=1020.0)["alerts"]
+    assert [a["timestamp"] for a in window] == [1000.0 + i for i in range(19, 9, -1)]
+    assert store.query(rule="Ports", dst_port=4444, limit=1000)["alerts"][-1]["payload"]["metadata"] == {"seq": 0}
+    with pytest.raises(ValueError):
+        store.query(cursor="bogus")
+
+
+def test_retention_by_age_and_size(tmp_path):
+    store = AlertStore(str(tmp_path / "alerts.db"), max_age=100.0, delete_chunk=500)
+    store.write_rows([AlertStore._row(alert(i, float(i))) for i in range(5000)])
+    assert store.enforce_retention(now=4100.0) == 4000
+    assert store.count() == 1000 and store.query(limit=1000)["alerts"][-1]["timestamp"] == 4000.0
+
+    store.max_age, store.max_bytes = 0.0, store.size_bytes() // 2
+    assert 500 <= store.enforce_retention() <= 600
+    # Zostają najnowsze; zwolnione miejsce przyjmuje nowe alerty bez wzrostu pliku ponad limit
+    assert store.query(limit=1000)["alerts"][-1]["timestamp"] > 4400.0
+    store.write_rows([AlertStore._row(alert(i, float(i))) for i in range(5000, 5400)])
+    store.enforce_retention()
+    assert store.size_bytes() <= store.max_bytes * 1.25
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_alerts_endpoint(store, monkeypatch, asgi_request):
+    await store.handle_alerts([alert(i, 1000.0 + i) for i in range(10)])
+    monkeypatch.setattr(server.app.state, "alert_store", store)
+    status, body = await asgi_request(server.app, "GET", "/alerts?limit=3&src_ip=10.0.0.2")
+    page = json.loads(body)
+    assert status == 200 and [a["timestamp"] for a in page["alerts"]] == [1006.0, 1002.0]
+    assert page["next_cursor"] is None
+    status, _ = await asgi_request(server.app, "GET", "/alerts?cursor=nope")
+    assert status == 400
@@ -0,0 +1,194 @@
+# 📄 Plik: tests/test_batch.py
+"""Tryb paczkowy: match_batch, analyze_rows i konsument paczek NetworkMonitor"""
+import asyncio
+import json
+import random
+import threading
+
+import numpy as np
+import pytest
+from scapy.layers.inet import IP, TCP
+from scapy.layers.l2 import Ether
+from scapy.packet import Raw
+
+from core import rules as rules_module
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.flows import FlowTable
+from core.inference import InferenceExecutor
+from core.rules import RuleSet
+from network import monitoring as monitoring_module
+from network.capture import CaptureBackend
+from network.monitoring import NetworkMonitor
+from tests.conftest import RecordingCoordinator
+
+RULES = [
+    {"name": "Large ICMP", "condition": "pkt['protocol'] == 'ICMP' and pkt['packet_size'] > 1000",
+     "priority": "HIGH", "type": "CRITICAL"},
+    {"name": "Ports", "condition": "pkt['dst_port'] in [4444, 6667]", "priority": "MEDIUM", "type": "WARNING"},
+    {"name": "Range", "condition": "1000 <= pkt['src_port'] < 1100 or not pkt['packet_size'] > 64",
+     "priority": "LOW", "type": "INFO"},
+    {"name": "Arithmetic", "condition": "pkt['packet_size'] - pkt['dst_port'] > 500",
+     "priority": "LOW", "type": "INFO"},
+    {"name": "Not in", "condition": "pkt['protocol'] == 'UDP' and pkt['dst_port'] not in (53, 123)",
+     "priority": "LOW", "type": "INFO"},
+    {"name": "Flags", "condition": "pkt['protocol'] == 'TCP' and pkt['tcp_flags'] & 0x12 == 0x02",
+     "priority": "LOW", "type": "INFO"},
+    {"name": "Missing port", "condition": "pkt['dst_port'] == None", "priority": "LOW", "type": "INFO"},
+    # Brak pola (None) jako wartość logiczna, porównanie dwóch pól i dzielenie przez zero
+    {"name": "No port", "condition": "not pkt['dst_port']", "priority": "LOW", "type": "INFO"},
+    {"name": "Same port", "condition": "pkt['dst_port'] == pkt['src_port']", "priority": "LOW", "type": "INFO"},
+    {"name": "Flagged", "condition": "pkt['tcp_flags'] and pkt['packet_size'] > 1000", "priority": "LOW",
+     "type": "INFO"},
+    {"name": "Any port", "condition": "pkt['src_port'] or pkt['dst_port']", "priority": "LOW", "type": "INFO"},
+    {"name": "Ratio", "condition": "pkt['packet_size'] / (pkt['src_port'] - 1000) > 5", "priority": "LOW",
+     "type": "INFO"},
+    {"name": "Long flow", "condition": "pkt['protocol'] == 'TCP' and flow['pkts'] >= 3",
+     "priority": "LOW", "type": "INFO"},
+    {"name": "SYN rate", "condition": "pkt['tcp_flags'] == 2",
+     "window": {"type": "rate", "key": "src_ip", "seconds": 10, "threshold": 5},
+     "priority": "HIGH", "type": "CRITICAL"},
+]
+
+
+def random_packets(count: int, seed: int = 3):
+    rng = random.Random(seed)
+    packets = []
+    for i in range(count):
+        protocol = rng.choice(["TCP", "UDP", "ICMP"])
+        ports = protocol != "ICMP"
+        packets.append({
+            "src_ip": f"10.0.0.{rng.randrange(8)}", "dst_ip": "10.0.1.1", "protocol": protocol,
+            "packet_size": rng.randrange(40, 1500),
+            "src_port": rng.choice([1000, 1150]) if ports else None,
+            "dst_port": rng.choice([53, 123, 443, 4444, 6667]) if ports else None,
+            "tcp_flags": rng.choice([2, 16, 18]) if protocol == "TCP" else None,
+            "timestamp": i * 0.01,
+        })
+    return packets
+
+
+@pytest.mark.parametrize("min_rows", [1, rules_module.VECTOR_MIN_ROWS])
+def test_match_batch_equals_match(monkeypatch, min_rows):
+    monkeypatch.setattr(rules_module, "VECTOR_MIN_ROWS", min_rows)
+    rule_set = RuleSet.from_rules(RULES)
+    rows = random_packets(600)
+    flows = [{"pkts": i % 5} if i % 7 else None for i in range(len(rows))]
+    expected = [[r.name for r in rule_set.match(pkt, flow)] for pkt, flow in zip(rows, flows)]
+    assert [[r.name for r in m] for m in rule_set.match_batch(rows, flows)] == expected
+    assert [[r.name for r in m] for m in rule_set.match_batch(rows)] == [
+        [r.name for r in rule_set.match(pkt)] for pkt in rows]
+
+
+def test_vector_compilation_falls_back_for_unsupported_syntax():
+    vectorized = {rule.name: rule.vector is not None for rule in RuleSet.from_rules(RULES).rules}
+    assert vectorized["Large ICMP"] and vectorized["Range"] and vectorized["Not in"] and vectorized["Same port"]
+    # Operator bitowy, porównanie z None, dzielenie i stan przepływu - ocena skalarna
+    assert not vectorized["Flags"] and not vectorized["Missing port"] and not vectorized["Long flow"]
+    assert not vectorized["Ratio"]
+
+
+def test_features_batch_equals_features():
+    samples = [("10.0.0.1", 80, 0), (None, None, 3), ("fe80::1", 443, 1), ("192.168.1.254", 65535, 2)]
+    expected = np.array([AIThreatAnalyzer.features(*s) for s in samples], dtype=np.float32)
+    np.testing.assert_array_equal(AIThreatAnalyzer.features_batch(*zip(*samples)), expected)
+
+
+def make_monitor(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps(RULES))
+    return AdvancedTrafficMonitor(
+        None, RecordingCoordinator(), str(rules_path), "unused.onnx", None,
+        inference=InferenceExecutor("unused.onnx"), ai_enabled=False, flow_table=FlowTable()
+    )
+
+
+@pytest.mark.asyncio
+async def test_analyze_rows_matches_per_packet_analysis(tmp_path):
+    rows = random_packets(500)
+    single, batched = make_monitor(tmp_path), make_monitor(tmp_path)
+    for pkt in rows:
+        await single.analyze_fields(pkt)
+    for start in range(0, len(rows), 64):
+        await batched.analyze_rows(rows[start:start + 64])
+    assert batched.alert_coordinator.alerts == single.alert_coordinator.alerts
+    assert set(single.alert_coordinator.messages) >= {"Long flow", "SYN rate", "Large ICMP"}
+
+
+@pytest.mark.asyncio
+async def test_analyze_batch_skips_malformed_packets(tmp_path):
+    monitor = make_monitor(tmp_path)
+    good = Ether() / IP(src="10.0.0.1", dst="10.0.1.1") / TCP(sport=1000, dport=4444)
+    good.time = 1.0
+    await monitor.analyze_batch([good, Raw(b"x"), good])
+    assert monitor.malformed == 1
+    assert monitor.alert_coordinator.messages.count("Ports") == 2
+    await monitor.analyze_packet(Raw(b"x"))
+    assert monitor.malformed == 2
+
+@pytest.mark.asyncio
+async def test_batched_consumer_delivers_lists():
+    monitor = NetworkMonitor(buffer_size=100, batch_size=4, batch_wait_us=50_000)
+    batches = []
+    consumer = asyncio.create_task(monitor._process_batches())
+    for i in range(10):
+        monitor._buffer_packet(i, batches.append)
+    await asyncio.wait_for(monitor._packet_buffer.join(), timeout=1)
+    consumer.cancel()
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert monitor.batches == 3
+    assert monitor.analysis_latency.count == 3 and monitor.queue_latency.count == 10
+
+
+@pytest.mark.asyncio
+async def test_handoff_from_capture_thread():
+    monitor = NetworkMonitor(buffer_size=10_000, batch_size=64, batch_wait_us=1000)
+    monitor._loop = asyncio.get_running_loop()
+    received = []
+
+    async def callback(packets):
+        received.extend(packets)
+
+    consumer = asyncio.create_task(monitor._process_batches())
+    thread = threading.Thread(target=lambda: [monitor._handoff(i, callback) for i in range(5000)])
+    thread.start()
+    await asyncio.to_thread(thread.join)
+    for _ in range(100):
+        if len(received) == 5000:
+            break
+        await asyncio.sleep(0.01)
+    consumer.cancel()
+    assert received == list(range(5000))
+    assert monitor.captured == 5000 and monitor.batches < 5000
+
+
+class ThreadBackend(CaptureBackend):
+    """Backend z własnym wątkiem przechwytywania, jak ScapyBackend i RawSocketBackend"""
+
+    def start(self, on_packet):
+        self.thread = threading.Thread(target=lambda: [on_packet(i) for i in range(2000)])
+        self.thread.start()
+
+    def stop(self):
+        self.thread.join()
+
+
+@pytest.mark.asyncio
+async def test_unbatched_capture_thread_enqueues_on_loop(monkeypatch):
+    monkeypatch.setattr(monitoring_module, "create_backend", lambda *args, **kwargs: ThreadBackend("test"))
+    monitor = NetworkMonitor(buffer_size=10_000, instrument=False)
+    enqueue, threads, received = monitor._enqueue, set(), []
+
+    def recording_enqueue(entry):
+        threads.add(threading.get_ident())
+        return enqueue(entry)
+
+    monitor._enqueue = recording_enqueue
+    await monitor.start_capture(received.append)
+    await asyncio.to_thread(monitor.backend.stop)
+    for _ in range(100):
+        if len(received) == 2000:
+            break
+        await asyncio.sleep(0.01)
+    assert received == list(range(2000)) and monitor.captured == 2000
+    assert threads == {threading.get_ident()}
@@ -0,0 +1,65 @@
+# 📄 Plik: tests/test_batching.py
+"""Testy mikro-batchera i wsadowej inferencji"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.batching import MicroBatcher
+
+
+class FakeSession:
+    """Zastępuje InferenceSession: wynik = suma cech, kształt (N, 1)"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def run(self, output_names, feeds):
+        self.calls += 1
+        return [feeds["input"].sum(axis=1, keepdims=True)]
+
+
+def make_analyzer() -> AIThreatAnalyzer:
+    analyzer = AIThreatAnalyzer.__new__(AIThreatAnalyzer)
+    analyzer.session = FakeSession()
+    return analyzer
+
+
+def test_predict_batch_single_session_run():
+    analyzer = make_analyzer()
+    scores = analyzer.predict_batch([("10.0.0.1", 80, 0), ("10.0.0.2", 443, 1), (None, None, 3)])
+    assert analyzer.session.calls == 1
+    assert scores.shape == (3,)
+    assert scores[0] == pytest.approx(analyzer.predict("10.0.0.1", 80, 0))
+    assert np.isclose(scores[2], 1.0)
+
+
+@pytest.mark.asyncio
+async def test_flush_on_max_batch_size():
+    batches = []
+    batcher = MicroBatcher(batches.append, max_batch_size=4, max_wait_ms=10_000)
+    for i in range(8):
+        batcher.submit(i)
+    task = asyncio.create_task(batcher.run())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+@pytest.mark.asyncio
+async def test_flush_on_max_wait():
+    batches = []
+    batcher = MicroBatcher(batches.append, max_batch_size=100, max_wait_ms=20)
+    task = asyncio.create_task(batcher.run())
+    batcher.submit("a")
+    batcher.submit("b")
+    await asyncio.sleep(0.1)
+    task.cancel()
+    assert batches == [["a", "b"]]
+
+
+def test_submit_drops_when_full():
+    batcher = MicroBatcher(lambda batch: None, max_pending=2)
+    assert [batcher.submit(i) for i in range(3)] == [True, True, False]
+    assert batcher.dropped == 1
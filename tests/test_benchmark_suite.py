@@ -0,0 +1,45 @@
+"""Syntetyczny ruch i porównanie wyników benchmarku z bazą"""
+import pytest
+
+from benchmarks.suite import compare, run_suite
+from benchmarks.traffic import TRAFFIC_MIXES, traffic_mix
+from network.capture import parse_frame
+
+
+@pytest.mark.parametrize("mix", TRAFFIC_MIXES)
+def test_traffic_mix_is_deterministic_and_parseable(mix):
+    frames = traffic_mix(mix, 200, seed=7)
+    assert frames == traffic_mix(mix, 200, seed=7)
+    records = [parse_frame(memoryview(frame), len(frame), ts) for frame, ts in frames]
+    assert all(record is not None for record in records)
+    assert len({record.protocol for record in records}) >= 1
+
+
+def test_port_scan_and_icmp_flood_shapes():
+    scan = [parse_frame(memoryview(f), len(f)) for f, _ in traffic_mix("port_scan", 500)]
+    assert len({r.dst_port for r in scan}) == 500 and len({r.dst_ip for r in scan}) == 1
+    assert all(r.tcp_flags == 0x02 for r in scan)
+    flood = [parse_frame(memoryview(f), len(f)) for f, _ in traffic_mix("icmp_flood", 500)]
+    assert all(r.protocol == "ICMP" for r in flood) and len({r.src_ip for r in flood}) > 400
+
+
+def result(pps, p99=10.0, rss=100.0, stage="rules"):
+    return {"mix": "mixed", "stage": stage, "packets_per_sec": pps, "p99_us": p99, "peak_rss_mb": rss}
+
+
+def test_compare_flags_regressions_only_beyond_tolerance():
+    baseline = {"results": [result(100_000), result(50_000, stage="parse")]}
+    assert compare({"results": [result(95_000)]}, baseline) == []
+    regressions = compare({"results": [result(80_000, p99=20.0), result(60_000, stage="parse")]}, baseline)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("mixed/rules packets_per_sec")
+    assert "p99_us" in regressions[1]
+    # Nowe pary bez odpowiednika w bazie są pomijane
+    assert compare({"results": [result(1.0, stage="export")]}, baseline) == []
+
+
+def test_run_suite_in_process():
+    report = run_suite(["mixed"], ["parse", "pipeline"], packets=300, isolate=False)
+    assert [r["stage"] for r in report["results"]] == ["parse", "pipeline"]
+    for r in report["results"]:
+        assert r["packets"] == 300 and r["packets_per_sec"] > 0 and r["p99_us"] >= r["p50_us"] > 0
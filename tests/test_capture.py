@@ -0,0 +1,49 @@
+# 📄 Plik: tests/test_capture.py
+"""Testy parsera nagłówków backendu raw"""
+import pytest
+from scapy.layers.inet import ICMP, IP, TCP, UDP
+from scapy.layers.inet6 import IPv6
+from scapy.layers.l2 import ARP, Dot1Q, Ether
+
+from core.AdvancedTrafficMonitor import extract_packet_fields
+from network.capture import PacketRecord, parse_frame
+
+FRAMES = [
+    Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1234, dport=4444, flags="S") / (b"x" * 100),
+    Ether() / IP(src="10.0.0.1", dst="10.0.0.2", options=b"\x01" * 4) / UDP(sport=53, dport=5353),
+    Ether() / IP(src="10.0.0.3", dst="10.0.0.4") / ICMP() / (b"x" * 1200),
+    Ether() / Dot1Q(vlan=10) / IP(src="10.0.0.5", dst="10.0.0.6") / TCP(sport=80, dport=6667),
+]
+
+
+@pytest.mark.parametrize("packet", FRAMES)
+def test_parse_frame_matches_scapy(packet):
+    frame = bytes(packet)
+    dissected = Ether(frame)
+    record = parse_frame(memoryview(frame), timestamp=float(dissected.time))
+    expected = extract_packet_fields(dissected)
+    if packet.haslayer(Dot1Q):
+        # Scapy widzi warstwę Dot1Q jako packet[0][1]; parser pomija tagi VLAN
+        expected.update(src_ip="10.0.0.5", dst_ip="10.0.0.6", protocol="TCP")
+    assert record.to_dict() == expected
+
+
+def test_parse_ipv6_and_tcp_flags():
+    frame = bytes(Ether() / IPv6(src="fe80::1", dst="fe80::2") / TCP(sport=1, dport=22, flags="SA"))
+    record = parse_frame(memoryview(frame))
+    assert (record.src_ip, record.dst_ip, record.protocol, record.dst_port) == ("fe80::1", "fe80::2", "TCP", 22)
+    assert record.tcp_flags == 0x12
+
+
+def test_non_ip_and_truncated_frames():
+    assert parse_frame(memoryview(bytes(Ether() / ARP()))) is None
+    frame = bytes(Ether() / IP() / TCP(dport=80))
+    record = parse_frame(memoryview(frame)[:34], length=len(frame))
+    assert record.length == len(frame) and record.dst_port is None
+
+
+def test_deep_inspection_fallback():
+    frame = bytes(FRAMES[0])
+    assert parse_frame(memoryview(frame), keep_raw=True).to_scapy()[TCP].dport == 4444
+    with pytest.raises(ValueError):
+        PacketRecord(0.0, 60).to_scapy()
@@ -0,0 +1,196 @@
+# 📄 Plik: tests/test_capture_filter.py
+"""Filtr BPF z reguł: wyprowadzenie, nadzbiór dopasowań, odtwarzanie i podmiana reguł"""
+import json
+import socket
+import time
+
+import pytest
+from scapy.utils import wrpcap
+
+from benchmarks.traffic import traffic_mix
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.hot_reload import HotReloader
+from core.inference import InferenceExecutor
+from core.rules import RuleSet
+from network import capture as capture_module
+from network.capture import CaptureBackend, ScapyBackend, parse_frame
+from network.capture_filter import CaptureFilter, CaptureFilterPolicy, rules_filter, widened
+from network.monitoring import NetworkMonitor
+from tests.conftest import RecordingCoordinator
+
+RULES = [
+    {"name": "Large ICMP", "condition": "pkt['protocol'] == 'ICMP' and pkt['packet_size'] > 1000",
+     "priority": "HIGH", "type": "CRITICAL"},
+    {"name": "Ports", "condition": "pkt['dst_port'] in [4444, 6667]", "priority": "MEDIUM", "type": "WARNING"},
+    {"name": "Scanner", "condition": "pkt['src_ip'] == '172.16.0.9'", "priority": "LOW", "type": "INFO"},
+]
+DNS_RULE = {"name": "DNS", "condition": "pkt['dst_port'] == 53", "priority": "LOW", "type": "INFO"}
+PORT_RULE = {"name": "Ports", "condition": "pkt['dst_port'] in [4444]", "priority": "MEDIUM", "type": "WARNING"}
+
+
+def test_filter_from_indexed_rules():
+    capture_filter = rules_filter(RuleSet.from_rules(RULES).rules)
+    primitives = "dst port 4444 or dst port 6667 or icmp or icmp6 or src host 172.16.0.9"
+    assert capture_filter.expression == f"({primitives}) or (vlan and ({primitives}))"
+
+
+@pytest.mark.parametrize("rule, reason", [
+    ({"name": "Big", "condition": "pkt['packet_size'] > 1000"}, "no indexable predicate"),
+    ({"name": "Flags", "condition": "pkt['tcp_flags'] == 2"}, "not expressible in BPF"),
+    ({"name": "Other", "condition": "pkt['protocol'] == 'OTHER'"}, "not expressible in BPF"),
+    ({"name": "Slow", "condition": "pkt['dst_port'] == 22 and flow['pkts'] > 100"}, "uses flow state"),
+    ({"name": "Rate", "window": {"type": "rate", "key": "src_ip", "seconds": 60, "threshold": 3}},
+     "no indexable predicate"),
+])
+def test_unfilterable_rule_captures_everything(rule, reason):
+    rule = {"priority": "LOW", "type": "INFO", **rule}
+    capture_filter = rules_filter(RuleSet.from_rules(RULES + [rule]).rules)
+    assert capture_filter.captures_all and reason in capture_filter.reason
+
+
+def test_policy_modes():
+    rules = RuleSet.from_rules(RULES).rules
+    assert CaptureFilterPolicy("all").resolve(rules).captures_all
+    assert CaptureFilterPolicy("auto", needs_all=["AI inference"]).resolve(rules).describe() == \
+        "all traffic (AI inference)"
+    custom = CaptureFilterPolicy("tcp port 22").resolve(rules)
+    assert custom.expression == "tcp port 22" and custom.terms is None
+
+
+def test_filter_passes_every_packet_a_rule_can_match():
+    rule_set = RuleSet.from_rules(RULES)
+    capture_filter = rules_filter(rule_set.rules)
+    records = [parse_frame(memoryview(frame), timestamp=ts) for frame, ts in traffic_mix("mixed", 5000)]
+    matched = [record for record in records if rule_set.match(record.to_dict())]
+    passed = [record for record in records if capture_filter.match(record)]
+    assert matched and all(capture_filter.match(record) for record in matched)
+    assert len(passed) < len(records) / 2
+
+
+@pytest.mark.asyncio
+async def test_replay_filters_before_buffer_and_follows_rule_reload(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps([DNS_RULE]))
+    pcap = str(tmp_path / "mixed.pcap")
+    frames = traffic_mix("mixed", 2000)
+    wrpcap(pcap, [frame for frame, _ in frames])
+    expected = sum(1 for frame, _ in frames if parse_frame(memoryview(frame)).dst_port == 53)
+
+    analyzer = AdvancedTrafficMonitor(None, RecordingCoordinator(), str(rules_file), "unused.onnx", None,
+                                      inference=InferenceExecutor("unused.onnx"), ai_enabled=False)
+    seen = []
+    monitor = NetworkMonitor(interface=pcap, backend="pcap", buffer_size=64, instrument=False,
+                             filter_policy=CaptureFilterPolicy("auto"))
+    reloader = HotReloader(rules_file, [analyzer], capture=monitor)
+    monitor.update_filter(analyzer.rule_set.rules)
+    await monitor.start_capture(seen.append)
+    report = await monitor.wait_replay()
+    assert 0 < len(seen) == report.packets == expected
+    assert all(record.dst_port == 53 for record in seen)
+    assert report.filtered == monitor.filtered == 2000 - expected and report.skipped == 0
+
+    await reloader.reload_rules([DNS_RULE, PORT_RULE])
+    assert "dst port 4444" in monitor.capture_filter.expression
+    assert monitor.backend.capture_filter is monitor.capture_filter
+    await reloader.reload_rules([{**DNS_RULE, "condition": "pkt['packet_size'] > 1000"}])
+    assert monitor.capture_filter.captures_all and monitor.backend.capture_filter.captures_all
+
+
+def test_custom_filter_validated_at_startup():
+    CaptureFilterPolicy("auto").validate(kernel_filter=False)
+    # Błędne wyrażenie (albo brak libpcap) zatrzymuje start zamiast przechwytywać wszystko
+    with pytest.raises(ValueError):
+        CaptureFilterPolicy("tcp port").validate()
+    with pytest.raises(ValueError, match="pcap replay"):
+        CaptureFilterPolicy("tcp port 22").validate(kernel_filter=False)
+
+
+def test_widened_filter_passes_both_rule_sets():
+    old = rules_filter(RuleSet.from_rules([DNS_RULE]).rules)
+    new = rules_filter(RuleSet.from_rules([PORT_RULE]).rules)
+    both = widened(old, new)
+    assert "dst port 53" in both.expression and "dst port 4444" in both.expression
+    assert widened(old, rules_filter(RuleSet.from_rules([DNS_RULE, PORT_RULE]).rules)) == both
+    assert widened(CaptureFilter(reason="all"), new).captures_all and widened(old, CaptureFilter()).captures_all
+
+
+def uncompilable(expression, interface=None):
+    raise ImportError("libpcap is not available")
+
+
+@pytest.mark.parametrize("capture_filter, delivered", [
+    (rules_filter(RuleSet.from_rules([{**DNS_RULE, "condition": "pkt['dst_port'] == 9999"}]).rules), {9999}),
+    (CaptureFilter("udp dst port 9999", reason="custom filter"), {9998, 9999}),
+], ids=["auto", "custom"])
+def test_scapy_backend_without_libpcap_keeps_capturing(monkeypatch, capture_filter, delivered):
+    monkeypatch.setattr(capture_module, "compile_bpf", uncompilable)
+    seen = set()
+    backend = ScapyBackend("lo", promiscuous=False)
+    backend.set_filter(capture_filter)
+    backend.start(lambda packet: seen.add(packet["UDP"].dport) if packet.haslayer("UDP") else None)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        deadline = time.monotonic() + 5
+        while seen != delivered and time.monotonic() < deadline:
+            for port in (9998, 9999):
+                sender.sendto(b"x", ("127.0.0.1", port))
+            time.sleep(0.05)
+        # Filtr nie trafił do gniazda (wątek AsyncSniffer by zginął), działa predykat w prn
+        assert backend.sniffer.thread.is_alive() and seen == delivered
+        assert backend.filtered > 0 if capture_filter.terms is not None else backend.filtered == 0
+    finally:
+        sender.close()
+        backend.stop()
+
+
+class RecordingBackend(CaptureBackend):
+    """Backend zapisujący filtry wraz z regułami aktywnymi w chwili zmiany"""
+
+    def __init__(self, analyzer, fail_after: int = 0):
+        super().__init__("unused")
+        self.analyzer = analyzer
+        self.fail_after = fail_after
+        self.changes = []
+
+    def set_filter(self, capture_filter: CaptureFilter) -> None:
+        if self.fail_after and len(self.changes) >= self.fail_after:
+            raise OSError("sniffer restart failed")
+        super().set_filter(capture_filter)
+        self.changes.append((capture_filter.expression, [rule.name for rule in self.analyzer.rule_set.rules]))
+
+    def start(self, on_packet) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+def make_reloader(tmp_path, fail_after: int = 0):
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps([DNS_RULE]))
+    analyzer = AdvancedTrafficMonitor(None, RecordingCoordinator(), str(rules_file), "unused.onnx", None,
+                                      inference=InferenceExecutor("unused.onnx"), ai_enabled=False)
+    monitor = NetworkMonitor(interface="unused", instrument=False, filter_policy=CaptureFilterPolicy("auto"))
+    monitor.update_filter(analyzer.rule_set.rules)
+    monitor.backend = RecordingBackend(analyzer, fail_after)
+    return HotReloader(rules_file, [analyzer], capture=monitor), analyzer, monitor
+
+
+@pytest.mark.asyncio
+async def test_wider_filter_applied_before_rules_swap(tmp_path):
+    reloader, analyzer, monitor = make_reloader(tmp_path)
+    await reloader.reload_rules([PORT_RULE])
+    (widened_expression, rules_before), (final_expression, rules_after) = monitor.backend.changes
+    # Przy starej regule filtr przepuszcza już porty 53 i 4444, po podmianie tylko 4444
+    assert rules_before == ["DNS"] and "dst port 53" in widened_expression and "dst port 4444" in widened_expression
+    assert rules_after == ["Ports"] and "dst port 53" not in final_expression and "dst port 4444" in final_expression
+
+
+@pytest.mark.asyncio
+async def test_filter_failure_keeps_reloaded_rules(tmp_path):
+    reloader, analyzer, monitor = make_reloader(tmp_path, fail_after=1)
+    version = await reloader.reload_rules([PORT_RULE], persist=True)
+    assert version == 2 and reloader.failed == 0 and analyzer.rule_set.rules[0].name == "Ports"
+    assert json.loads((tmp_path / "rules.json").read_text()) == [PORT_RULE]
+    # Nieudana zmiana nie udaje, że filtr działa - monitor zostaje przy filtrze z backendu
+    assert monitor.capture_filter.expression == monitor.backend.capture_filter.expression
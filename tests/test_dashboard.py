@@ -0,0 +1,59 @@
+# 📄 Plik: tests/test_dashboard.py
+"""Dashboard rich.Live i liczniki TrafficStats"""
+import io
+from datetime import datetime
+
+import pytest
+from rich.console import Console
+
+from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertType
+from core.traffic_stats import TrafficStats
+from network.monitoring import NetworkMonitor
+from ui.dashboard import Dashboard
+
+
+def packet(i: int, src: str = "10.0.0.1", size: int = 100):
+    return {"src_ip": src, "dst_ip": "10.0.1.1", "protocol": "TCP", "packet_size": size,
+            "src_port": 1000, "dst_port": 80, "tcp_flags": 16, "timestamp": i * 0.01}
+
+
+def render(dashboard: Dashboard) -> str:
+    console = Console(file=io.StringIO(), width=160, height=40, color_system=None)
+    console.print(dashboard.layout)
+    return console.file.getvalue()
+
+
+def test_observe_rows_samples_like_observe():
+    rows = [packet(i, src=f"10.0.0.{i % 3}", size=100 + i) for i in range(1000)]
+    single, batched = TrafficStats(sample_every=7), TrafficStats(sample_every=7)
+    for pkt in rows:
+        single.observe(pkt)
+    for start in range(0, len(rows), 33):
+        batched.observe_rows(rows[start:start + 33])
+    assert (batched.packets, batched.bytes, batched.samples) == (single.packets, single.bytes, single.samples)
+    assert batched.top_talkers() == single.top_talkers()
+
+
+@pytest.mark.asyncio
+async def test_regions_update_only_on_change():
+    coordinator = AlertCoordinator(rate_limit=None, dedup_window=0)
+    monitor = NetworkMonitor(interface="test")
+    stats = TrafficStats(sample_every=1)
+    dashboard = Dashboard(coordinator, network_monitor=monitor, stats=stats, console=Console(file=io.StringIO()))
+    assert dashboard.update(now=0.0)
+    assert not dashboard.update(now=0.5)
+
+    await coordinator.add_alert(AlertType.WARNING, "Suspicious Port Activity", AlertPriority.MEDIUM,
+                                {"src_ip": "10.0.0.9"})
+    for i in range(50):
+        stats.observe(packet(i, src="10.0.0.9", size=1000))
+        stats.hit("Suspicious Port Activity")
+    monitor.captured = 500
+    assert dashboard.update(now=1.5)
+    screen = render(dashboard)
+    alert = coordinator.recent_alerts[-1]
+    assert datetime.fromtimestamp(alert.timestamp).strftime("%H:%M:%S") in screen
+    assert "MEDIUM" in screen and "10.0.0.9" in screen and "49 KiB" in screen
+    assert "500 pkt/s" in screen and "captured 500" in screen
+    # Trafienia reguły: 50 od poprzedniej przebudowy regionu (1,5 s wcześniej)
+    assert "33.3" in screen
@@ -0,0 +1,106 @@
+# 📄 Plik: tests/test_dispatch.py
+"""Testy kolejek handlerów alertów"""
+import asyncio
+
+import pytest
+
+from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertType, QueuedAlert
+from core.dispatch import HandlerQueue
+
+
+def alert(message: str, priority: AlertPriority = AlertPriority.LOW) -> QueuedAlert:
+    return QueuedAlert(priority.value, 0.0, AlertType.INFO, message, {})
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_does_not_stall_others():
+    coordinator = AlertCoordinator(rate_limit=None, dedup_window=0)
+    fast, release = [], asyncio.Event()
+
+    async def slow(_):
+        await release.wait()
+
+    slow_queue = coordinator.register_handler(slow, name="slow", max_queue=10)
+    coordinator.register_handler(lambda a: fast.append(a.message), name="fast")
+    task = asyncio.create_task(coordinator.process_alerts())
+    await coordinator.add_alerts([(AlertType.INFO, f"a{i}", AlertPriority.LOW, {"dst_port": i}) for i in range(50)])
+    await asyncio.wait_for(coordinator.alert_queue.join(), 1)
+    await asyncio.sleep(0)
+    assert len(fast) == 50
+    stats = {s["handler"]: s for s in coordinator.handler_stats()}
+    slow_stats = stats["slow"]
+    assert slow_stats["queued"] <= 10 and slow_stats["in_flight"] == 1
+    assert slow_stats["queued"] + slow_stats["dropped"] + slow_stats["in_flight"] == 50
+    assert stats["slow"]["lag_seconds"] >= 0 and stats["fast"]["delivered"] == 50
+    release.set()
+    await asyncio.wait_for(slow_queue.join(), 1)
+    task.cancel()
+    await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_evicts_lowest_priority_first():
+    queue = HandlerQueue(lambda a: None, max_queue=3, overflow="drop_oldest")
+    for item in (alert("low-1"), alert("high", AlertPriority.HIGH), alert("low-2"), alert("medium", AlertPriority.MEDIUM)):
+        await queue.put(item)
+    assert [a.message for a in queue._take(10)] == ["high", "medium", "low-2"]
+    assert queue.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_rejects_lower_priority_incoming():
+    queue = HandlerQueue(lambda a: None, max_queue=2, overflow="drop_oldest")
+    for item in (alert("high-1", AlertPriority.HIGH), alert("high-2", AlertPriority.HIGH)):
+        await queue.put(item)
+    assert not await queue.put(alert("low")) and queue.dropped == 1
+    assert await queue.put(alert("high-3", AlertPriority.HIGH)) and queue.dropped == 2
+    assert [a.message for a in queue._take(10)] == ["high-2", "high-3"]
+
+
+@pytest.mark.asyncio
+async def test_drop_newest_rejects_incoming():
+    queue = HandlerQueue(lambda a: None, max_queue=2, overflow="drop_newest")
+    results = [await queue.put(alert(str(i))) for i in range(3)]
+    assert results == [True, True, False] and queue.dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_block_applies_backpressure_until_drained():
+    delivered = []
+    queue = HandlerQueue(delivered.append, max_queue=2, overflow="block")
+    await queue.put(alert("a"))
+    await queue.put(alert("b"))
+    blocked = asyncio.create_task(queue.put(alert("c")))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    queue.start()
+    await asyncio.wait_for(blocked, 1)
+    await queue.join()
+    await queue.stop()
+    assert [a.message for a in delivered] == ["a", "b", "c"] and queue.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_delivery_and_concurrency():
+    batches, running, peak = [], 0, 0
+
+    async def handler(items):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        batches.append(len(items))
+        running -= 1
+
+    queue = HandlerQueue(handler, max_queue=100, concurrency=2, batch_size=8, batch_wait_ms=5)
+    for i in range(20):
+        await queue.put(alert(str(i)))
+    queue.start()
+    await asyncio.wait_for(queue.join(), 1)
+    await queue.stop()
+    assert sum(batches) == 20 and max(batches) == 8 and peak == 2
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        HandlerQueue(lambda a: None, overflow="spill")
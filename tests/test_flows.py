@@ -0,0 +1,69 @@
+# 📄 Plik: tests/test_flows.py
+"""Testy tablicy przepływów i reguł odwołujących się do flow[...]"""
+import pytest
+
+from core.flows import FlowTable, flow_key
+from core.rules import RuleSet
+
+
+def packet(ts: float, sport: int = 5000, size: int = 100, flags: int = 0x10, reverse: bool = False):
+    pkt = {"src_ip": "10.0.0.1", "dst_ip": "10.0.0.2", "src_port": sport, "dst_port": 443,
+           "protocol": "TCP", "packet_size": size, "tcp_flags": flags, "timestamp": ts}
+    if reverse:
+        pkt.update(src_ip="10.0.0.2", dst_ip="10.0.0.1", src_port=443, dst_port=sport)
+    return pkt
+
+
+def test_counters_and_both_directions_share_a_flow():
+    table = FlowTable()
+    table.update(packet(0.0, flags=0x02))
+    table.update(packet(1.0, reverse=True, flags=0x12))
+    slot = table.update(packet(3.0, size=300))
+    flow = table.view(slot)
+    assert len(table) == 1
+    assert (flow["pkts"], flow["bytes"], flow["duration"]) == (3, 500, 3.0)
+    assert (flow["syn"], flow["ack"]) == (2, 2)
+    assert flow["iat_mean"] == pytest.approx(1.5)
+    assert flow["iat_std"] == pytest.approx(0.7071, abs=1e-3)
+    assert flow["bytes_per_s"] == pytest.approx(500 / 3)
+
+
+def test_ipv6_keys_do_not_collide_with_ipv4():
+    v4 = packet(0.0)
+    v6 = {**v4, "src_ip": "::a00:1", "dst_ip": "::a00:2"}
+    assert flow_key(v4) != flow_key(v6)
+
+
+def test_idle_and_active_timeouts():
+    evicted = []
+    table = FlowTable(idle_timeout=10, active_timeout=100, expire_interval=1, on_evict=evicted.append)
+    table.update(packet(0.0, sport=1))
+    for ts in range(0, 120, 5):
+        table.update(packet(float(ts), sport=2))
+    assert len(table) == 0 or table.get(packet(0.0, sport=1)) is None
+    assert table.evicted_idle == 1 and table.evicted_active == 1
+    assert {e["pkts"] for e in evicted} == {1, 21}
+
+
+def test_hard_capacity_evicts_least_recently_seen():
+    table = FlowTable(max_flows=100, idle_timeout=1e9, active_timeout=1e9)
+    for i in range(250):
+        table.update(packet(float(i), sport=i))
+    assert len(table) <= 100 and table.evicted_capacity > 0
+    assert table.get(packet(0.0, sport=249)) is not None
+    assert table.get(packet(0.0, sport=0)) is None
+
+
+def test_rules_can_reference_flow_fields():
+    rule_set = RuleSet.from_rules([
+        {"name": "Long flow", "condition": "pkt['protocol'] == 'TCP' and flow['pkts'] >= 3",
+         "priority": "LOW", "type": "INFO"},
+        {"name": "Big packet", "condition": "pkt['packet_size'] > 1000", "priority": "LOW", "type": "INFO"},
+    ])
+    table = FlowTable()
+    assert rule_set.needs_flow
+    for ts in range(3):
+        pkt = packet(float(ts))
+        flow = table.view(table.update(pkt))
+    assert [r.name for r in rule_set.match(pkt, flow)] == ["Long flow"]
+    assert rule_set.match(pkt) == []
@@ -0,0 +1,135 @@
+# 📄 Plik: tests/test_hot_reload.py
+"""Podmiana reguł i modelu w działającym potoku: pliki, /rules, stan okien, wersje"""
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from api import server
+from core import inference as inference_module
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.errors import ConfigurationError
+from core.hot_reload import HotReloader
+from core.inference import InferenceExecutor
+from core.verdict_cache import VerdictCache
+from tests.conftest import RecordingCoordinator
+
+PORT_RULE = {"name": "Ports", "condition": "pkt['dst_port'] in [4444]", "priority": "MEDIUM", "type": "WARNING"}
+RATE_RULE = {"name": "Rate", "window": {"type": "rate", "key": "src_ip", "seconds": 60, "threshold": 3},
+             "priority": "HIGH", "type": "CRITICAL"}
+
+
+def packet(port: int = 80, ts: float = 1000.0):
+    return {"src_ip": "10.0.0.1", "dst_ip": "10.0.1.1", "protocol": "TCP", "packet_size": 60,
+            "src_port": 1000, "dst_port": port, "tcp_flags": 16, "timestamp": ts}
+
+
+def write_rules(path, rules, mtime_ns: int) -> None:
+    path.write_text(json.dumps(rules))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, [RATE_RULE], 10**9)
+    return path
+
+
+def make_monitor(rules_file) -> AdvancedTrafficMonitor:
+    return AdvancedTrafficMonitor(None, RecordingCoordinator(), str(rules_file), "unused.onnx", None,
+                                  inference=InferenceExecutor("unused.onnx"), ai_enabled=False)
+
+
+@pytest.mark.asyncio
+async def test_file_change_swaps_rules_and_keeps_window_state(rules_file):
+    monitor = make_monitor(rules_file)
+    reloader = HotReloader(rules_file, [monitor])
+    for i in range(3):
+        await monitor.analyze_fields(packet(ts=1000.0 + i))
+    await reloader.check()
+    assert reloader.rules_version == 1
+
+    write_rules(rules_file, [RATE_RULE, PORT_RULE], 2 * 10**9)
+    await reloader.check()
+    assert reloader.rules_version == 2 and len(monitor.rule_set) == 2
+    assert reloader.swap_latency.count == 1
+    # Okno reguły "Rate" przejęło 3 pakiety - czwarty przekracza próg
+    await monitor.analyze_fields(packet(port=4444, ts=1003.0))
+    assert sorted(monitor.alert_coordinator.messages) == ["Ports", "Rate"]
+
+    write_rules(rules_file, [{"name": "Broken", "condition": "pkt['dst_port'] ==", "priority": "LOW",
+                              "type": "INFO"}], 3 * 10**9)
+    await reloader.check()
+    assert reloader.rules_version == 2 and reloader.failed == 1
+    assert [rule.name for rule in monitor.rule_set.rules] == ["Rate", "Ports"]
+
+
+@pytest.mark.asyncio
+async def test_rules_endpoint_validates_and_persists(rules_file, monkeypatch, asgi_request):
+    monitor = make_monitor(rules_file)
+    reloader = HotReloader(rules_file, [monitor])
+    monkeypatch.setattr(server.app.state, "rule_handler", server.RuleCommandHandler(reloader))
+
+    status, body = await asgi_request(server.app, "POST", "/rules", json.dumps(PORT_RULE).encode())
+    assert status == 200 and json.loads(body) == {"status": "rule added", "version": 2, "rules": 2}
+    assert json.loads(rules_file.read_text()) == [RATE_RULE, PORT_RULE]
+    # Zapis z API nie wywołuje drugiego przeładowania przez obserwatora pliku
+    await reloader.check()
+    assert reloader.rules_version == 2
+
+    status, _ = await asgi_request(server.app, "PUT", "/rules", json.dumps([{"name": "x"}]).encode())
+    assert status == 400 and reloader.rules_version == 2
+    status, body = await asgi_request(server.app, "GET", "/rules")
+    assert json.loads(body)["version"] == 2 and len(monitor.rule_set) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_rule_additions_are_all_kept(rules_file, monkeypatch, asgi_request):
+    reloader = HotReloader(rules_file, [make_monitor(rules_file)])
+    monkeypatch.setattr(server.app.state, "rule_handler", server.RuleCommandHandler(reloader))
+    added = [dict(PORT_RULE, name=f"Ports {i}") for i in range(3)]
+    results = await asyncio.gather(*(asgi_request(server.app, "POST", "/rules", json.dumps(rule).encode())
+                                     for rule in added))
+    assert [status for status, _ in results] == [200] * 3 and reloader.rules_version == 4
+    assert sorted(json.loads(body)["rules"] for _, body in results) == [2, 3, 4]
+    assert json.loads(rules_file.read_text()) == reloader.rules and len(reloader.rules) == 4
+    assert {rule["name"] for rule in reloader.rules} == {"Rate", "Ports 0", "Ports 1", "Ports 2"}
+
+
+class FakeAnalyzer(AIThreatAnalyzer):
+    """Zamiast sesji ONNX: wynik = liczba zapisana w pliku modelu"""
+
+    def __init__(self, model_path: str, intra_op_num_threads=None):
+        with open(model_path) as f:
+            self.score = float(f.read())
+
+    def predict_features(self, features: np.ndarray) -> np.ndarray:
+        return np.full(len(features), self.score, dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_model_swap_and_cache_invalidation(tmp_path, rules_file, monkeypatch):
+    monkeypatch.setattr(inference_module, "AIThreatAnalyzer", FakeAnalyzer)
+    model = tmp_path / "model.onnx"
+    model.write_text("0.25")
+    executor = InferenceExecutor(str(model), mode="inline", cache=VerdictCache(model_path=str(model)))
+    reloader = HotReloader(rules_file, [make_monitor(rules_file)], executor, str(model))
+    assert await executor.predict("10.0.0.1", 80, 0) == 0.25
+
+    model.write_text("0.75")
+    os.utime(model, ns=(5 * 10**9, 5 * 10**9))
+    await reloader.check()
+    assert reloader.model_version == 2
+    assert await executor.predict("10.0.0.1", 80, 0) == 0.75
+
+    model.write_text("not a model")
+    os.utime(model, ns=(6 * 10**9, 6 * 10**9))
+    await reloader.check()
+    assert reloader.model_version == 2 and reloader.failed == 1
+    with pytest.raises(ConfigurationError):
+        await reloader.reload_model(str(tmp_path / "missing.onnx"))
+    assert await executor.predict("10.0.0.1", 80, 0) == 0.75
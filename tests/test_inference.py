@@ -0,0 +1,91 @@
+# 📄 Plik: tests/test_inference.py
+"""Inferencja poza pętlą zdarzeń: opóźnienie API przy nasyceniu inferencją"""
+import asyncio
+import gc
+import json
+import time
+
+import numpy as np
+import pytest
+
+from api import server
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.errors import InferenceBacklogFull
+from core.inference import InferenceExecutor
+
+INFERENCE_TIME = 0.05
+
+
+class SlowSession:
+    """Blokujący session.run zwalniający GIL, jak onnxruntime"""
+
+    def run(self, output_names, feeds):
+        time.sleep(INFERENCE_TIME)
+        return [np.full((len(feeds["input"]), 1), 0.25, dtype=np.float32)]
+
+
+def make_executor(mode: str, max_pending: int = 4) -> InferenceExecutor:
+    analyzer = AIThreatAnalyzer.__new__(AIThreatAnalyzer)
+    analyzer.session = SlowSession()
+    return InferenceExecutor("unused.onnx", mode=mode, workers=2, max_pending=max_pending, analyzer=analyzer)
+
+
+async def health_p99(asgi_request, samples: int = 40, interval: float = 0.005) -> float:
+    """p99 opóźnienia /health liczone od planowanego momentu żądania (obejmuje blokady pętli)"""
+    latencies = []
+    for _ in range(samples):
+        scheduled = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        status, _ = await asgi_request(server.app, "GET", "/health")
+        latencies.append(time.perf_counter() - scheduled)
+        assert status == 200
+    return float(np.percentile(latencies, 99))
+
+
+@pytest.mark.asyncio
+async def test_api_latency_flat_under_inference_load(monkeypatch, asgi_request):
+    # Kolejka mieści cały strumień - mierzymy pętlę, nie odrzucanie
+    monkeypatch.setattr(server, "inference", make_executor("thread", max_pending=64))
+    # Pełne GC po wcześniejszych testach trwa dziesiątki ms - nie może wpaść w pomiar
+    gc.collect()
+    idle = await health_p99(asgi_request)
+
+    body = json.dumps({"ip": "10.0.0.1", "port": 443, "protocol": "TCP"}).encode()
+
+    async def generate_load():
+        """Ciągły strumień żądań /analyze szybszy niż przepustowość puli"""
+        load = []
+        for _ in range(40):
+            load.append(asyncio.create_task(asgi_request(server.app, "POST", "/analyze", body)))
+            await asyncio.sleep(0.005)
+        return await asyncio.gather(*load)
+
+    results, saturated = await asyncio.gather(generate_load(), health_p99(asgi_request))
+
+    assert all(status == 200 for status, _ in results)
+    assert json.loads(results[0][1]) == {"threat_score": 0.25}
+    # Pętla pozostaje wolna: p99 nie rośnie o czas pojedynczej inferencji
+    assert saturated < idle + INFERENCE_TIME / 2
+    server.inference.close()
+
+
+@pytest.mark.asyncio
+async def test_backlog_is_bounded():
+    executor = make_executor("thread")
+    tasks = [asyncio.create_task(executor.predict("10.0.0.1", 80, 0)) for _ in range(10)]
+    await asyncio.sleep(0.01)
+    assert executor.pending == 4 and executor.rejected == 6
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert results[:4] == [pytest.approx(0.25)] * 4
+    assert all(isinstance(result, InferenceBacklogFull) for result in results[4:])
+    assert executor.pending == 0 and await executor.predict("10.0.0.1", 80, 0) == pytest.approx(0.25)
+    executor.close()
+
+
+@pytest.mark.asyncio
+async def test_api_rejects_when_backlog_full(monkeypatch, asgi_request):
+    monkeypatch.setattr(server, "inference", make_executor("thread", max_pending=1))
+    body = json.dumps({"ip": "10.0.0.1", "port": 443, "protocol": "TCP"}).encode()
+    results = await asyncio.gather(*(asgi_request(server.app, "POST", "/analyze", body) for _ in range(3)))
+    assert sorted(status for status, _ in results) == [200, 503, 503]
+    server.inference.close()
@@ -0,0 +1,211 @@
+"""Budżet pamięci: szacowanie rozmiarów, kolejność usuwania, shed w komponentach i /memory"""
+import asyncio
+import json
+import tracemalloc
+
+import pytest
+from scapy.layers.l2 import Ether
+
+from api import server
+from benchmarks.traffic import traffic_mix
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.AlertCoordinator import AlertCoordinator, AlertPriority, AlertType
+from core.dispatch import HandlerQueue
+from core.flows import FLOW_ENTRY_BYTES, FlowTable
+from core.inference import InferenceExecutor
+from core.memory import MemoryBudget, deep_sizeof
+from core.verdict_cache import VerdictCache
+from main import register_memory
+from network.capture import parse_frame
+from network.monitoring import NetworkMonitor
+
+
+def pkt(i: int):
+    return {"src_ip": f"10.0.{i // 250}.{i % 250}", "dst_ip": "10.1.0.1", "protocol": "TCP",
+            "packet_size": 60, "src_port": 1024 + i, "dst_port": 443, "timestamp": 1000.0 + i / 100}
+
+
+@pytest.mark.parametrize("build", [
+    lambda frame: Ether(frame),
+    lambda frame: (parse_frame(memoryview(frame), timestamp=1.0), print, 1.0),
+], ids=["scapy", "record"])
+def test_deep_sizeof_close_to_allocated(build):
+    frames = [frame for frame, _ in traffic_mix("mixed", 2000)]
+    tracemalloc.start()
+    # Kopia ramki w pomiarze: pakiet Scapy ją przechowuje, więc należy do jego rozmiaru
+    items = [build(bytes(memoryview(frame))) for frame in frames]
+    allocated = tracemalloc.get_traced_memory()[0] / len(items)
+    tracemalloc.stop()
+    estimated = sum(deep_sizeof(item) for item in items) / len(items)
+    assert abs(estimated - allocated) < 0.05 * allocated
+
+
+def make_pipeline(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text('[{"name": "HTTPS", "condition": "pkt[\'dst_port\'] == 443", "priority": "LOW", "type": "INFO"}]')
+    coordinator = AlertCoordinator(rate_limit=None, dedup_window=0)
+    inference = InferenceExecutor("unused.onnx", cache=VerdictCache(max_entries=10_000))
+    capture = NetworkMonitor(interface="unused", instrument=False)
+    analyzer = AdvancedTrafficMonitor(capture, coordinator, str(rules), "unused.onnx", None, inference=inference,
+                                      ai_enabled=False, flow_table=FlowTable())
+    return capture, analyzer, coordinator, inference
+
+
+@pytest.mark.asyncio
+async def test_budget_sheds_cheapest_state_first(tmp_path):
+    capture, analyzer, coordinator, inference = make_pipeline(tmp_path)
+    for i in range(300):
+        await coordinator.add_alert(AlertType.INFO, "HTTPS", AlertPriority.LOW, pkt(i))
+    for i in range(1000):
+        inference.cache.put((i / 1000, 0.5, 0.3), 0.1)
+        analyzer.flow_table.update(pkt(i))
+    frames = traffic_mix("mixed", 500)
+    for frame, ts in frames:
+        capture._buffer_packet(parse_frame(memoryview(frame), timestamp=ts), print)
+
+    budget = MemoryBudget()
+    register_memory(budget, capture, analyzer, coordinator, None, inference)
+    assert [account.name for account in budget.accounts][:5] == [
+        "recent_alerts", "verdict_cache", "flows", "capture_buffer", "alert_queue"]
+    budget.check()
+    accounts = {account.name: account for account in budget.accounts}
+    assert not budget.exceeded and all(accounts[name].bytes > 0 for name in
+                                       ("recent_alerts", "verdict_cache", "flows", "capture_buffer", "alert_queue"))
+    assert 400 < accounts["alert_queue"].item_bytes < 2000
+
+    # Limit wymusza usunięcie historii alertów i około połowy pamięci wyników AI
+    recent, cache = accounts["recent_alerts"].bytes, accounts["verdict_cache"].bytes
+    budget.limit_bytes = int((budget.used_bytes - recent - cache // 2) / budget.low_watermark)
+    assert budget.check() >= recent + cache // 2 and budget.exceeded
+    assert len(coordinator.recent_alerts) == 0 and 0 < len(inference.cache) < 1000
+    assert len(analyzer.flow_table) == 1000 and capture._packet_buffer.qsize() == 500
+    assert coordinator.alert_queue.qsize() == 300
+    assert accounts["recent_alerts"].shed_items == 300 and accounts["recent_alerts"].peak_bytes == recent
+
+    budget.check()
+    assert not budget.exceeded and budget.used_bytes <= budget.limit_bytes
+
+    # Twardszy limit sięga po przepływy (kolumny zostają) i najstarsze pakiety, zanim ruszy alerty
+    budget.measure()
+    budget.limit_bytes = int((budget.used_bytes - accounts["verdict_cache"].bytes - FLOW_ENTRY_BYTES * 1000
+                              - accounts["capture_buffer"].bytes // 2) / budget.low_watermark)
+    budget.check()
+    assert len(inference.cache) == 0 and len(analyzer.flow_table) == 0 and 0 < capture._packet_buffer.qsize() < 500
+    assert capture.dropped == 500 - capture._packet_buffer.qsize() and coordinator.alert_queue.qsize() == 300
+    budget.check()
+    assert not budget.exceeded and accounts["flows"].peak_bytes > accounts["flows"].bytes
+
+
+@pytest.mark.asyncio
+async def test_budget_compacts_flows_after_burst(tmp_path):
+    capture, analyzer, coordinator, inference = make_pipeline(tmp_path)
+    table = analyzer.flow_table
+    for i in range(50_000):
+        table.update(pkt(i), now=1000.0 + i / 1000)
+    for frame, ts in traffic_mix("mixed", 500):
+        capture._buffer_packet(parse_frame(memoryview(frame), timestamp=ts), print)
+    budget = MemoryBudget()
+    register_memory(budget, capture, analyzer, coordinator, None, inference)
+    budget.measure()
+    flows = {account.name: account for account in budget.accounts}["flows"]
+    peak_slots = table.slots
+
+    # Cel osiągalny tylko po zmniejszeniu kolumn - same wpisy indeksu nie wystarczą
+    budget.limit_bytes = int((budget.used_bytes - flows.bytes * 3 // 4) / budget.low_watermark)
+    assert budget.check() >= flows.peak_bytes * 3 // 4
+    assert table.slots < peak_slots and 10_000 < len(table) < 50_000
+    assert budget.used_bytes <= budget.limit_bytes * budget.low_watermark
+    assert table.get(pkt(49_999)) is not None and table.get(pkt(0)) is None
+    assert capture.buffered == 500 and capture.dropped == 0
+    budget.check()
+    assert not budget.exceeded and capture.buffered == 500
+
+
+@pytest.mark.asyncio
+async def test_budget_keeps_queues_when_excess_not_sheddable(tmp_path):
+    capture, analyzer, coordinator, inference = make_pipeline(tmp_path)
+    for i in range(100):
+        await coordinator.add_alert(AlertType.INFO, "HTTPS", AlertPriority.LOW, pkt(i))
+    for frame, ts in traffic_mix("mixed", 200):
+        capture._buffer_packet(parse_frame(memoryview(frame), timestamp=ts), print)
+    budget = MemoryBudget()
+    register_memory(budget, capture, analyzer, coordinator, None, inference)
+    budget.track("export_buffer", lambda: 1, usage=lambda: 8 * 2**20)
+    budget.limit_bytes = 4 * 2**20
+    assert budget.check() == 0 and budget.exceeded
+    assert len(coordinator.recent_alerts) == 100 and coordinator.alert_queue.qsize() == 100
+    assert capture.buffered == 200 and capture.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_capture_buffer_counts_handoff_vector():
+    capture = NetworkMonitor(interface="unused", instrument=False)
+    capture._loop = asyncio.get_running_loop()
+    frames = traffic_mix("mixed", 10)
+    for frame, ts in frames[:4]:
+        capture._buffer_packet(parse_frame(memoryview(frame), timestamp=ts), print)
+    for frame, ts in frames[4:]:
+        capture._handoff(parse_frame(memoryview(frame), timestamp=ts), print)
+    assert capture.buffered == 10 and len(list(capture.buffered_packets())) == 10
+    assert capture.shed_buffer(7) == 7 and capture.buffered == 3 and capture.dropped == 7
+    await asyncio.sleep(0)
+    assert capture._packet_buffer.qsize() == 3 and capture.buffered == 3
+
+@pytest.mark.asyncio
+async def test_shed_queued_keeps_highest_priority_alerts():
+    coordinator = AlertCoordinator(mode="Silent", rate_limit=None, dedup_window=0)
+    for i, priority in enumerate([AlertPriority.LOW, AlertPriority.HIGH, AlertPriority.MEDIUM] * 4):
+        await coordinator.add_alert(AlertType.INFO, f"alert {i}", priority, pkt(i))
+    assert coordinator.shed_queued(5) == 5
+    kept = sorted(entry[2].priority for entry in coordinator.alert_queue._queue)
+    assert kept == [AlertPriority.MEDIUM] * 3 + [AlertPriority.HIGH] * 4
+    task = asyncio.create_task(coordinator.process_alerts())
+    await asyncio.wait_for(coordinator.join(), timeout=2)
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_handler_queue_shed_unblocks_and_idles():
+    queue = HandlerQueue(lambda alert: None, max_queue=4, overflow="block")
+    coordinator = AlertCoordinator(rate_limit=None, dedup_window=0)
+    for i in range(4):
+        await coordinator.add_alert(AlertType.INFO, f"alert {i}", AlertPriority.LOW, pkt(i))
+        await queue.put(coordinator.recent_alerts[-1])
+    blocked = asyncio.create_task(queue.put(coordinator.recent_alerts[0]))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    assert queue.shed(2) == 2 and queue.dropped == 2
+    assert await asyncio.wait_for(blocked, timeout=1) and len(queue) == 3
+    assert [alert.message for alert in queue.queued()] == ["alert 2", "alert 3", "alert 0"]
+    assert queue.shed(10) == 3 and len(queue) == 0
+    await asyncio.wait_for(queue.join(), timeout=1)
+
+
+def test_flow_table_shed_evicts_least_recently_active():
+    table = FlowTable()
+    for i in range(100):
+        table.update(pkt(i), now=1000.0 + i / 100)
+    memory = table.memory_bytes()
+    assert table.shed(30) == 30 and len(table) == 70
+    assert table.get(pkt(29)) is None and table.get(pkt(30)) is not None
+    assert table.memory_bytes() < memory and table.evicted_capacity == 30
+
+
+@pytest.mark.asyncio
+async def test_memory_endpoint(monkeypatch, tmp_path, asgi_request):
+    monkeypatch.setattr(server.app.state, "memory", None)
+    status, body = await asgi_request(server.app, "GET", "/memory")
+    assert status == 200 and json.loads(body) == {"enabled": False}
+
+    capture, analyzer, coordinator, inference = make_pipeline(tmp_path)
+    await coordinator.add_alert(AlertType.INFO, "HTTPS", AlertPriority.LOW, pkt(1))
+    budget = MemoryBudget(limit_bytes=64 * 2**20)
+    register_memory(budget, capture, analyzer, coordinator, None, inference)
+    budget.check()
+    monkeypatch.setattr(server.app.state, "memory", budget)
+    status, body = await asgi_request(server.app, "GET", "/memory")
+    data = json.loads(body)
+    assert data["enabled"] and data["limit_bytes"] == 64 * 2**20 and data["rss_bytes"] > 0
+    recent = data["subsystems"]["recent_alerts"]
+    assert recent["items"] == 1 and recent["bytes"] == recent["peak_bytes"] > 0 and recent["sheddable"]
+    assert not data["subsystems"]["rule_windows"]["sheddable"]
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from api import server
+from core.metrics import LatencyHistogram, MetricsRegistry
+from network.monitoring import NetworkMonitor
+
+
+def test_histogram_quantiles_within_relative_error():
+    rnd = random.Random(3)
+    samples = sorted(rnd.lognormvariate(-9, 1.0) for _ in range(20_000))
+    histogram = LatencyHistogram()
+    for value in samples:
+        histogram.record(value)
+    for q in (0.5, 0.9, 0.99):
+        exact = samples[int(q * len(samples)) - 1]
+        assert histogram.quantile(q) == pytest.approx(exact, rel=0.07)
+    assert histogram.count == len(samples)
+    assert histogram.max == samples[-1]
+
+
+def test_histogram_clamps_out_of_range_values():
+    histogram = LatencyHistogram()
+    for value in (0.0, 1e-12, 1e6):
+        histogram.record(value)
+    assert histogram.count == 3
+    assert histogram.cumulative()[-1][1] == 2  # 1e6 s leży powyżej ostatniej granicy
+    assert histogram.quantile(1.0) == 1e6
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_latency_seconds", "Stage latency", labels={"stage": "rules"})
+    histogram.record(0.0001)
+    registry.counter("packets_total", "Packets", lambda: 42)
+    registry.gauge("broken", "Raises on read", lambda: 1 / 0)
+
+    text = registry.render()
+    assert "# TYPE cyberwitness_stage_latency_seconds histogram" in text
+    assert 'cyberwitness_stage_latency_seconds_bucket{stage="rules",le="+Inf"} 1' in text
+    assert 'cyberwitness_stage_latency_seconds_count{stage="rules"} 1' in text
+    assert "cyberwitness_packets_total 42" in text
+    assert "\ncyberwitness_broken " not in text
+    with pytest.raises(ValueError):
+        registry.gauge("packets_total", "Wrong type", lambda: 0)
+
+
+def test_monitor_without_instrumentation_has_no_histograms():
+    monitor = NetworkMonitor(interface="lo", instrument=False)
+    assert monitor.queue_latency is None and monitor.analysis_latency is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(monkeypatch, asgi_request):
+    monkeypatch.setattr(server.app.state, "metrics", None)
+    status, _ = await asgi_request(server.app, "GET", "/metrics")
+    assert status == 404
+
+    registry = MetricsRegistry()
+    registry.counter("packets_total", "Packets", lambda: 7)
+    monkeypatch.setattr(server.app.state, "metrics", registry)
+    status, body = await asgi_request(server.app, "GET", "/metrics")
+    assert status == 200
+    assert b"cyberwitness_packets_total 7" in body
@@ -0,0 +1,136 @@
+"""Stopniowa degradacja analizy przy przeciążeniu bufora"""
+import asyncio
+import json
+import random
+
+import pytest
+
+from api import server
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.flows import FlowTable
+from core.inference import InferenceExecutor
+from core.overload import OverloadController, OverloadLevel
+from network.monitoring import NetworkMonitor
+from tests.conftest import RecordingCoordinator
+
+RULES = [
+    {"name": "Large ICMP Packet", "condition": "pkt['protocol'] == 'ICMP' and pkt['packet_size'] > 1000",
+     "priority": "HIGH", "type": "CRITICAL"},
+    {"name": "Suspicious Port Activity", "condition": "pkt['dst_port'] in [4444, 6667]",
+     "priority": "MEDIUM", "type": "WARNING"},
+]
+
+
+def make_monitor(tmp_path, overload):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps(RULES))
+    return AdvancedTrafficMonitor(
+        None, RecordingCoordinator(), str(rules_path), "unused.onnx", None,
+        inference=InferenceExecutor("unused.onnx"), flow_table=FlowTable(), overload=overload
+    )
+
+
+def packet(i, dst_port=443, protocol="TCP", size=100):
+    return {"src_ip": f"10.0.{i // 256 % 256}.{i % 256}", "dst_ip": "192.168.0.1", "protocol": protocol,
+            "packet_size": size, "src_port": 1024 + i % 50000, "dst_port": dst_port, "tcp_flags": 16,
+            "timestamp": i * 0.001}
+
+
+def test_levels_escalate_immediately_and_recover_with_hysteresis():
+    controller = OverloadController(hold_seconds=1.0)
+    assert controller.update(0.2, 0.0, now=0.0) is OverloadLevel.NORMAL
+    assert controller.update(0.75, 0.0, now=0.1) is OverloadLevel.SAMPLING
+    assert controller.update(0.1, 0.6, now=0.2) is OverloadLevel.HEADERS_ONLY
+    # Poniżej progu, ale powyżej recover_ratio * próg - bez zmiany
+    assert controller.update(0.6, 0.0, now=5.0) is OverloadLevel.HEADERS_ONLY
+    # Spokój: jeden poziom w dół na każde hold_seconds
+    assert controller.update(0.0, 0.0, now=6.0) is OverloadLevel.HEADERS_ONLY
+    assert controller.update(0.0, 0.0, now=7.0) is OverloadLevel.SAMPLING
+    assert controller.update(0.0, 0.0, now=8.0) is OverloadLevel.NO_AI
+    assert controller.update(0.0, 0.0, now=9.0) is OverloadLevel.NORMAL
+    assert controller.transitions == 5
+
+
+def test_flow_sampling_is_symmetric_and_close_to_rate():
+    controller = OverloadController(sample_rate=8)
+    rnd = random.Random(5)
+    flows = [packet(rnd.randrange(1 << 24)) for _ in range(20_000)]
+    kept = sum(controller.keep_flow(pkt) for pkt in flows)
+    assert kept / len(flows) == pytest.approx(1 / 8, rel=0.1)
+    for pkt in flows[:200]:
+        reverse = {**pkt, "src_ip": pkt["dst_ip"], "dst_ip": pkt["src_ip"],
+                   "src_port": pkt["dst_port"], "dst_port": pkt["src_port"]}
+        assert controller.keep_flow(pkt) == controller.keep_flow(reverse)
+
+
+@pytest.mark.asyncio
+async def test_degradation_levels_in_analyzer(tmp_path):
+    overload = OverloadController(sample_rate=4)
+    monitor = make_monitor(tmp_path, overload)
+
+    overload.level = OverloadLevel.NO_AI
+    await monitor.analyze_fields(packet(100_000))
+    assert monitor.ai_batcher.submitted == 0 and overload.ai_skipped == 1
+
+    overload.level = OverloadLevel.SAMPLING
+    for i in range(400):
+        await monitor.analyze_fields(packet(i))
+    await monitor.analyze_fields(packet(999, dst_port=4444))
+    assert 0 < overload.sampled_out < 400
+    # packet(100_000) z poziomu NO_AI i packet(999) są w tablicy niezależnie od próbki
+    assert len(monitor.flow_table) == 400 - overload.sampled_out + 2
+    # Pakiet pasujący do reguły nagłówkowej nie jest odrzucany przez próbkowanie
+    assert monitor.alert_coordinator.messages[-1] == "Suspicious Port Activity"
+
+    overload.level = OverloadLevel.HEADERS_ONLY
+    flows_before = len(monitor.flow_table)
+    await monitor.analyze_fields(packet(1000, dst_port=4444))
+    await monitor.analyze_fields(packet(1001, protocol="ICMP", size=1200))
+    assert len(monitor.flow_table) == flows_before
+    assert overload.headers_only_dropped == 1
+    assert monitor.alert_coordinator.messages[-1] == "Large ICMP Packet"
+
+
+@pytest.mark.asyncio
+async def test_network_monitor_raises_level_when_consumer_lags():
+    overload = OverloadController(lag_thresholds=(0.01, 0.02, 0.03), hold_seconds=60)
+    monitor = NetworkMonitor(interface="lo", buffer_size=100, instrument=False, overload=overload)
+
+    async def slow(pkt):
+        await asyncio.sleep(0.002)
+
+    for i in range(80):
+        monitor._buffer_packet(i, slow)
+    task = asyncio.create_task(monitor._process_buffer())
+    await asyncio.wait_for(monitor._packet_buffer.join(), timeout=5)
+    task.cancel()
+    assert overload.level is OverloadLevel.HEADERS_ONLY
+    assert overload.status()["level"] == "headers_only"
+
+
+@pytest.mark.asyncio
+async def test_overload_endpoint(monkeypatch, asgi_request):
+    monkeypatch.setattr(server.app.state, "overload", None)
+    status, body = await asgi_request(server.app, "GET", "/overload")
+    assert status == 200 and json.loads(body) == {"level": "normal", "enabled": False}
+
+    overload = OverloadController()
+    overload.update(0.8, 0.0)
+    monkeypatch.setattr(server.app.state, "overload", overload)
+    status, body = await asgi_request(server.app, "GET", "/overload")
+    data = json.loads(body)
+    assert data["level"] == "sampling" and data["sample_rate"] == 10 and data["enabled"]
+
+
+@pytest.mark.asyncio
+async def test_sampling_matches_rules_once_per_packet(tmp_path):
+    overload = OverloadController(sample_rate=4)
+    monitor = make_monitor(tmp_path, overload)
+    overload.level = OverloadLevel.SAMPLING
+    match, calls = monitor.rule_set.match, []
+    monitor.rule_set.match = lambda pkt, flow=None: calls.append(pkt) or match(pkt, flow)
+    packets = [packet(i, dst_port=4444 if i % 10 == 0 else 443) for i in range(200)]
+    for pkt in packets:
+        await monitor.analyze_fields(pkt)
+    assert len(calls) == len(packets)
+    assert monitor.alert_coordinator.messages == ["Suspicious Port Activity"] * 20
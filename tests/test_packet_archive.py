@@ -0,0 +1,86 @@
+# 📄 Plik: tests/test_packet_archive.py
+"""Archiwum kolumnowe pakietów: partycje, rotacja, odczyt i przeciwciśnienie zapisu"""
+import threading
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from core.AdvancedTrafficMonitor import AdvancedTrafficMonitor
+from core.inference import InferenceExecutor
+from core.packet_archive import PacketArchive, iter_archive, read_archive
+from tests.conftest import RecordingCoordinator
+
+HOUR = 1714564800.0  # 2024-05-01 12:00:00 UTC
+
+
+def packets(count: int, start: float = HOUR, step: float = 1.0):
+    return [{"src_ip": f"10.0.0.{i % 250}", "dst_ip": "10.0.1.1", "protocol": "UDP" if i % 3 else "TCP",
+             "packet_size": 60 + i % 1000, "src_port": 1024 + i, "dst_port": 53 if i % 3 else 443,
+             "tcp_flags": None if i % 3 else 18, "timestamp": start + i * step} for i in range(count)]
+
+
+def segment_files(directory):
+    return sorted(path.relative_to(directory).as_posix() for path in directory.rglob("*") if path.is_file())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+async def test_segments_are_partitioned_rotated_and_read_back(tmp_path, fmt):
+    archive = PacketArchive(str(tmp_path), fmt=fmt, batch_rows=1000, rotate_seconds=600)
+    rows = packets(5000)  # 12:00 - 13:23, paczki po 1000 s
+    for i in range(0, len(rows), 100):
+        archive.append_rows(rows[i:i + 100])
+    await archive.flush()
+    # Otwarty segment (ostatni, od 13:00) nie jest widoczny dla czytelnika
+    assert segment_files(tmp_path)[-1] == f"date=2024-05-01/hour=13/.packets-20240501T130000-000000.{fmt}.tmp"
+    await archive.close()
+
+    # Rotacja co paczkę (1000 s > rotate_seconds), paczka 12:50-13:06 podzielona na granicy godziny
+    assert segment_files(tmp_path) == [
+        f"date=2024-05-01/hour=12/packets-20240501T{stamp}-000000.{fmt}"
+        for stamp in ("120000", "121640", "123320", "125000")
+    ] + [f"date=2024-05-01/hour=13/packets-20240501T130000-000000.{fmt}"]
+    assert archive.segments == 5
+    assert archive.written == 5000 and archive.dropped == 0 and archive.bytes_written > 0
+
+    assert [row for batch in iter_archive(str(tmp_path), fmt=fmt) for row in batch] == rows
+    table = read_archive(str(tmp_path), since=HOUR + 3590, until=HOUR + 3610, columns=["timestamp"], fmt=fmt)
+    assert table.column("timestamp").to_pylist() == [HOUR + t for t in range(3590, 3610)]
+
+
+@pytest.mark.asyncio
+async def test_monitor_archives_rows_for_reanalysis(tmp_path):
+    rules = tmp_path / "rules.json"
+    rules.write_text('[{"name": "DNS", "condition": "pkt[\'dst_port\'] == 53", "priority": "LOW", "type": "INFO"}]')
+    archive = PacketArchive(str(tmp_path / "archive"), batch_rows=64)
+    monitor = AdvancedTrafficMonitor(None, RecordingCoordinator(), str(rules), "unused.onnx", None,
+                                     inference=InferenceExecutor("unused.onnx"), ai_enabled=False, archive=archive)
+    rows = packets(300)
+    await monitor.analyze_rows(rows[:200])
+    for pkt_data in rows[200:]:
+        await monitor.analyze_fields(pkt_data)
+    await archive.close()
+    live_alerts = len(monitor.alert_coordinator.alerts)
+
+    replay = AdvancedTrafficMonitor(None, RecordingCoordinator(), str(rules), "unused.onnx", None,
+                                    inference=InferenceExecutor("unused.onnx"), ai_enabled=False)
+    for batch in iter_archive(str(tmp_path / "archive"), batch_size=128):
+        await replay.analyze_rows(batch)
+    assert live_alerts == len(replay.alert_coordinator.alerts) == 200
+
+
+@pytest.mark.asyncio
+async def test_lagging_writer_drops_instead_of_blocking(tmp_path):
+    archive = PacketArchive(str(tmp_path), batch_rows=10, max_pending=2)
+    release = threading.Event()
+    write_rows = archive._write_rows
+    archive._write_rows = lambda rows: (release.wait(5), write_rows(rows))
+    archive.append_rows(packets(40))
+    for i in range(4):
+        archive.append_rows(packets(10, start=HOUR + 100 + 10 * i))
+    # Paczka 40 w zapisie, pierwsza dziesiątka w kolejce, kolejne trzy odrzucone
+    assert archive.dropped == 30
+    release.set()
+    await archive.close()
+    assert archive.written == 50 and len(read_archive(str(tmp_path))) == 50
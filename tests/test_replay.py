@@ -0,0 +1,65 @@
+# 📄 Plik: tests/test_replay.py
+"""Testy odtwarzania pcap/pcapng przez NetworkMonitor"""
+import struct
+
+import pytest
+from scapy.layers.inet import IP, TCP
+from scapy.layers.l2 import ARP, Ether
+from scapy.utils import wrpcap, wrpcapng
+
+from network.capture import PacketRecord
+from network.monitoring import NetworkMonitor
+
+
+def capture(tmp_path, writer, count: int = 100, spacing: float = 0.001) -> str:
+    packets = [Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(dport=4444) for _ in range(count)]
+    packets.append(Ether() / ARP())
+    for i, pkt in enumerate(packets):
+        pkt.time = 1_700_000_000 + i * spacing
+    path = str(tmp_path / f"capture.{writer.__name__[2:]}")
+    writer(path, packets)
+    return path
+
+
+async def replay(path: str, **options):
+    seen = []
+    monitor = NetworkMonitor(interface=path, backend="pcap", buffer_size=16, backend_options=options)
+    await monitor.start_capture(seen.append)
+    report = await monitor.wait_replay()
+    return seen, report
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("writer", [wrpcap, wrpcapng])
+async def test_replay_as_fast_as_possible_is_lossless(tmp_path, writer):
+    seen, report = await replay(capture(tmp_path, writer), speed=0)
+    assert len(seen) == report.packets == 100
+    assert report.skipped == 1 and report.dropped == 0
+    assert isinstance(seen[0], PacketRecord) and seen[0].dst_port == 4444
+    assert seen[1].timestamp - seen[0].timestamp == pytest.approx(0.001, abs=1e-6)
+    assert set(report.stages) == {"read", "queue", "analysis"}
+    assert report.stages["analysis"]["count"] == 100
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("speed", [0, 1])
+async def test_simple_packet_block_takes_previous_timestamp(tmp_path, speed):
+    path = capture(tmp_path, wrpcapng, count=2)
+    frame = bytes(Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(dport=53))
+    padded = frame + b"\0" * (-len(frame) % 4)
+    # Simple Packet Block: typ 3, bez znacznika czasu i numeru interfejsu
+    with open(path, "ab") as f:
+        f.write(struct.pack("<III", 3, 16 + len(padded), len(frame)) + padded + struct.pack("<I", 16 + len(padded)))
+    seen, report = await replay(path, speed=speed)
+    assert report.packets == 3 and report.skipped == 1
+    # Poprzedni pakiet w pliku to pominięty ARP
+    assert seen[2].dst_port == 53 and seen[2].timestamp == pytest.approx(1_700_000_000.002)
+
+
+@pytest.mark.asyncio
+async def test_replay_speed_scales_playback_time(tmp_path):
+    path = capture(tmp_path, wrpcap, count=20, spacing=0.01)
+    _, realtime = await replay(path, speed=1)
+    _, fast = await replay(path, speed=10)
+    assert realtime.duration >= 0.19
+    assert fast.duration < realtime.duration / 3
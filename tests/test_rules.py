@@ -0,0 +1,52 @@
+# 📄 Plik: tests/test_rules.py
+"""Testy kompilatora reguł"""
+import json
+from pathlib import Path
+
+import pytest
+from simpleeval import EvalWithCompoundTypes
+
+from core.errors import RuleCompilationError
+from core.rules import RuleSet, compile_condition, compile_rule
+
+with open(Path(__file__).parent.parent / "config" / "rules.json", encoding="utf-8") as f:
+    RULES = json.load(f)
+
+PACKETS = [
+    {"protocol": "ICMP", "packet_size": 1200, "dst_port": None},
+    {"protocol": "ICMP", "packet_size": 100, "dst_port": None},
+    {"protocol": "TCP", "packet_size": 60, "dst_port": 4444},
+    {"protocol": "UDP", "packet_size": 1400, "dst_port": 53},
+]
+
+
+@pytest.mark.parametrize("pkt", PACKETS)
+def test_matches_simpleeval(pkt):
+    """Skompilowany zestaw daje te same wyniki co simpleeval"""
+    rule_set = RuleSet.from_rules(RULES)
+    evaluator = EvalWithCompoundTypes(names={"pkt": pkt})
+    expected = [r["name"] for r in RULES if evaluator.eval(r["condition"])]
+    assert [r.name for r in rule_set.match(pkt)] == expected
+
+
+def test_index_predicates():
+    icmp, ports = (compile_rule(r) for r in RULES)
+    assert icmp.index_field == "protocol" and icmp.index_values == {"ICMP"}
+    assert ports.index_field == "dst_port" and ports.index_values == {4444, 6667}
+
+
+def test_candidates_skip_unrelated_rules():
+    rule_set = RuleSet.from_rules(RULES)
+    assert rule_set.candidates({"protocol": "UDP", "dst_port": 53}) == []
+
+
+@pytest.mark.parametrize("condition", [
+    "pkt.__class__",
+    "__import__('os')",
+    "pkt['a'] ** 999999",
+    "[x for x in pkt]",
+    "other['a'] == 1",
+])
+def test_rejects_unsafe_conditions(condition):
+    with pytest.raises(RuleCompilationError):
+        compile_condition(condition)
@@ -0,0 +1,102 @@
+# 📄 Plik: tests/test_sharding.py
+"""Testy podziału przepływów między procesy robocze"""
+import asyncio
+import queue
+
+import numpy as np
+import pytest
+
+from core import inference as inference_module
+from core.AlertCoordinator import AlertPriority, AlertType
+from core.sharding import ShardConfig, ShardedTrafficMonitor, _shard_main, flow_hash
+from tests.conftest import RecordingCoordinator
+
+
+def test_flow_hash_is_symmetric():
+    forward = {"src_ip": "10.0.0.1", "dst_ip": "10.0.0.2", "src_port": 5000, "dst_port": 443, "protocol": "TCP"}
+    reverse = {"src_ip": "10.0.0.2", "dst_ip": "10.0.0.1", "src_port": 443, "dst_port": 5000, "protocol": "TCP"}
+    assert flow_hash(forward) == flow_hash(reverse)
+    assert flow_hash(forward) != flow_hash({**forward, "protocol": "UDP"})
+
+
+@pytest.mark.asyncio
+async def test_alerts_return_to_single_coordinator():
+    coordinator = RecordingCoordinator()
+    monitor = ShardedTrafficMonitor(coordinator, ShardConfig(rules_path="config/rules.json"), workers=2, batch_size=4)
+    monitor.start()
+    results = asyncio.create_task(monitor.process_results())
+    try:
+        for port in range(4440, 4450):
+            monitor.route({"src_ip": f"10.0.0.{port % 7}", "dst_ip": "10.0.0.100", "src_port": port,
+                           "dst_port": 4444 if port % 2 else 80, "protocol": "TCP", "packet_size": 60})
+        for _ in range(600):
+            if monitor.processed == 10:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        results.cancel()
+        monitor.stop()
+
+    assert monitor.processed == 10
+    assert len(coordinator.alerts) == 5
+    assert {(t, m, p, pkt["dst_port"]) for t, m, p, pkt in coordinator.alerts} == {
+        (AlertType.WARNING, "Suspicious Port Activity", AlertPriority.MEDIUM, 4444)}
+
+
+@pytest.mark.asyncio
+async def test_rules_reload_reaches_workers():
+    coordinator = RecordingCoordinator()
+    monitor = ShardedTrafficMonitor(coordinator, ShardConfig(rules_path="config/rules.json"), workers=2, batch_size=4)
+    monitor.start()
+    results = asyncio.create_task(monitor.process_results())
+    try:
+        await monitor.reload_rules([{"name": "HTTP", "condition": "pkt['dst_port'] == 80",
+                                     "priority": "LOW", "type": "INFO"}])
+        for port in range(4440, 4450):
+            monitor.route({"src_ip": f"10.0.0.{port % 7}", "dst_ip": "10.0.0.100", "src_port": port,
+                           "dst_port": 4444 if port % 2 else 80, "protocol": "TCP", "packet_size": 60})
+        for _ in range(600):
+            if monitor.processed == 10:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        results.cancel()
+        monitor.stop()
+
+    assert monitor.processed == 10
+    assert {(t, m, p, pkt["dst_port"]) for t, m, p, pkt in coordinator.alerts} == {
+        (AlertType.INFO, "HTTP", AlertPriority.LOW, 80)}
+    assert len(coordinator.alerts) == 5
+
+
+class ThreatAnalyzer:
+    """Zamiast sesji ONNX: każdy pakiet jest zagrożeniem"""
+
+    def __init__(self, model_path: str, intra_op_num_threads=None):
+        pass
+
+    def predict_features(self, features: np.ndarray) -> np.ndarray:
+        return np.full(len(features), 0.9, dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_ai_alerts_without_further_input(monkeypatch):
+    monkeypatch.setattr(inference_module, "AIThreatAnalyzer", ThreatAnalyzer)
+    in_queue, out_queue = queue.Queue(), queue.Queue()
+    config = ShardConfig(rules_path="config/rules.json", ai_model_path="unused.onnx", ai_batch_wait_ms=20)
+    worker = asyncio.create_task(_shard_main(0, config, in_queue, out_queue))
+    in_queue.put([{"src_ip": "10.0.0.1", "dst_ip": "10.0.0.100", "src_port": 5000, "dst_port": 80,
+                   "protocol": "TCP", "packet_size": 60}])
+    ai_alerts = []
+    try:
+        for _ in range(100):
+            while not out_queue.empty():
+                _, _, alerts = out_queue.get_nowait()
+                ai_alerts += [message for _, message, _, _ in alerts if message == "AI detected threat"]
+            if ai_alerts:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        in_queue.put(None)
+        await asyncio.wait_for(worker, timeout=5)
+    assert ai_alerts == ["AI detected threat"]
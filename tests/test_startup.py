@@ -0,0 +1,23 @@
+# 📄 Plik: tests/test_startup.py
+"""Szybki start: leniwe importy podsystemów i pomiar zimnego startu"""
+import json
+import subprocess
+import sys
+
+from benchmarks.suite import ROOT, measure_cold_start
+
+HEAVY_MODULES = ("fastapi", "uvicorn", "elasticsearch", "onnxruntime", "scapy", "ui.dashboard", "core.sharding",
+                 "pyarrow")
+
+
+def test_main_import_skips_optional_subsystems():
+    probe = f"import json, sys, main; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert json.loads(output.stdout.strip().splitlines()[-1]) == []
+
+
+def test_capture_starts_before_api():
+    cold = measure_cold_start(repeat=1, packets=20)
+    assert cold["stage"] == "cold_start"
+    # Cel czasowy (COLD_START_TARGET_MS) sprawdza benchmarks.suite --cold-start - tu tylko kolejność etapów
+    assert cold["imports_ms"] <= cold["startup_ms"] < cold["api_ms"] <= cold["wall_ms"]
@@ -0,0 +1,86 @@
+# 📄 Plik: tests/test_verdict_cache.py
+"""Pamięć wyników modelu AI: LRU/TTL, unieważnianie po zmianie modelu, wspólna dla potoku i /analyze"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from api import server
+from core.AIThreatAnalyzer import AIThreatAnalyzer
+from core.inference import InferenceExecutor
+from core.verdict_cache import VerdictCache
+
+
+class CountingSession:
+    """Wynik zależny od cech; zapamiętuje rozmiary paczek przekazanych do modelu"""
+
+    def __init__(self):
+        self.calls = []
+
+    def run(self, output_names, feeds):
+        features = feeds["input"]
+        self.calls.append(len(features))
+        return [features.sum(axis=1, keepdims=True) + self.bias]
+
+    bias = 0.0
+
+
+def make_executor(cache: VerdictCache) -> InferenceExecutor:
+    analyzer = AIThreatAnalyzer.__new__(AIThreatAnalyzer)
+    analyzer.session = CountingSession()
+    return InferenceExecutor("unused.onnx", mode="inline", analyzer=analyzer, cache=cache)
+
+
+def test_lru_and_ttl_eviction():
+    cache = VerdictCache(max_entries=2, ttl=10.0)
+    cache.put("a", 0.1, now=0.0)
+    cache.put("b", 0.2, now=0.0)
+    assert cache.get("a", now=1.0) == 0.1
+    cache.put("c", 0.3, now=1.0)  # wypiera "b" - najdawniej użyty
+    assert cache.get("b", now=1.0) is None and cache.evictions == 1
+    assert cache.get("a", now=10.5) is None and cache.expired == 1
+    assert cache.get("c", now=10.5) == 0.3
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+@pytest.mark.asyncio
+async def test_only_unique_misses_reach_model():
+    executor = make_executor(VerdictCache())
+    session = executor.analyzer.session
+    samples = [("10.0.0.1", 80, 0), ("10.0.0.1", 80, 0), ("10.0.1.0", 80, 0), ("10.0.0.2", 443, 1)]
+    expected = AIThreatAnalyzer.features_batch(*zip(*samples)).sum(axis=1)
+    # 10.0.0.1 i 10.0.1.0 mają ten sam hash - jedna krotka cech
+    np.testing.assert_allclose(await executor.predict_batch(samples), expected, rtol=1e-6)
+    assert session.calls == [2]
+    np.testing.assert_allclose(await executor.predict_batch(samples[::-1]), expected[::-1], rtol=1e-6)
+    assert session.calls == [2] and executor.inferred == 2
+    assert executor.cache.hits == 4
+
+
+@pytest.mark.asyncio
+async def test_model_change_invalidates(tmp_path):
+    model = tmp_path / "model.onnx"
+    model.write_bytes(b"v1")
+    executor = make_executor(VerdictCache(model_path=str(model), check_interval=0.0))
+    session = executor.analyzer.session
+    first = await executor.predict("10.0.0.1", 80, 0)
+    assert await executor.predict("10.0.0.1", 80, 0) == first and session.calls == [1]
+
+    model.write_bytes(b"v2-longer")
+    os.utime(model, ns=(0, 10**9))
+    session.bias = 0.5
+    assert await executor.predict("10.0.0.1", 80, 0) == pytest.approx(first + 0.5)
+    assert session.calls == [1, 1] and executor.cache.invalidations == 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_endpoint_shares_pipeline_cache(monkeypatch, asgi_request):
+    executor = make_executor(VerdictCache())
+    monkeypatch.setattr(server.app.state, "inference", executor)
+    body = json.dumps({"ip": "10.0.0.1", "port": 443, "protocol": "TCP"}).encode()
+    status, _ = await asgi_request(server.app, "POST", "/analyze", body)
+    assert status == 200
+    # Ta sama krotka z potoku (macierz cech jak w AdvancedTrafficMonitor) nie trafia do modelu
+    await executor.predict_features(AIThreatAnalyzer.features_batch(["10.0.0.1"], [443], [0]))
+    assert executor.analyzer.session.calls == [1] and executor.cache.hits == 1
@@ -0,0 +1,92 @@
+# 📄 Plik: tests/test_windows.py
+"""Testy agregacji w oknach przesuwnych"""
+import pytest
+
+from core.errors import RuleCompilationError
+from core.rules import RuleSet, compile_rule
+from core.windows import DistinctWindow, RateWindow, TopKWindow, WindowEngine, WindowSpec
+
+
+def syn(ts: float, src: str = "10.0.0.1", dport: int = 80, size: int = 60):
+    return {"src_ip": src, "dst_ip": "10.0.0.2", "protocol": "TCP", "src_port": 40000, "dst_port": dport,
+            "packet_size": size, "tcp_flags": 0x02, "timestamp": ts}
+
+
+def test_rate_fires_once_per_crossing_and_slides():
+    window = RateWindow(WindowSpec(type="rate", key="src_ip", seconds=10, threshold=5, buckets=10))
+    hits = [window.observe(syn(i * 0.1), i * 0.1) for i in range(20)]
+    assert [h for h in hits if h] == [("10.0.0.1", 6)]
+    # Po przesunięciu okna licznik wraca do zera i próg można przekroczyć ponownie
+    hits = [window.observe(syn(100 + i * 0.1), 100 + i * 0.1) for i in range(6)]
+    assert hits[-1] == ("10.0.0.1", 6)
+
+
+def test_rate_keys_are_independent():
+    window = RateWindow(WindowSpec(type="rate", key="src_ip", seconds=10, threshold=3))
+    for i in range(1000):
+        assert window.observe(syn(1.0, src=f"10.1.{i // 256}.{i % 256}"), 1.0) is None
+    assert window.sketch.estimate("10.1.0.1") == 1
+
+
+def test_distinct_counts_ports_within_error():
+    window = DistinctWindow(WindowSpec(type="distinct", key="src_ip", field="dst_port", seconds=60,
+                                       threshold=100, precision=10))
+    hits = [window.observe(syn(1.0, dport=port), 1.0) for port in range(2000)]
+    fired = [h for h in hits if h]
+    assert len(fired) == 1 and 90 <= fired[0][1] <= 115
+    entry = window._entries["10.0.0.1"]
+    assert entry.estimate == pytest.approx(2000, rel=0.1)
+    # Powtórzone porty nie zwiększają liczności
+    for port in range(100):
+        assert window.observe(syn(2.0, dport=port), 2.0) is None
+
+
+def test_distinct_key_table_is_bounded():
+    window = DistinctWindow(WindowSpec(type="distinct", key="src_ip", field="dst_port", seconds=10,
+                                       threshold=100, max_keys=500))
+    for i in range(5000):
+        window.observe(syn(i * 0.001, src=f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}"), i * 0.001)
+    assert len(window) <= 500 and window.evicted >= 4500
+
+
+def test_top_k_reports_heavy_hitters():
+    window = TopKWindow(WindowSpec(type="top_k", key="src_ip", seconds=60, threshold=1000, k=2,
+                                   weight="packet_size"))
+    hits = []
+    for i in range(200):
+        for src, size in (("10.0.0.1", 100), ("10.0.0.2", 50), ("10.0.0.3", 1), ("10.0.0.4", 20)):
+            hit = window.observe(syn(1.0, src=src, size=size), 1.0)
+            if hit:
+                hits.append(hit[0])
+    assert window.top() == [("10.0.0.1", 20000), ("10.0.0.2", 10000)]
+    assert hits == ["10.0.0.1", "10.0.0.2"]  # 10.0.0.4 przekracza próg, ale nie jest w pierwszej dwójce
+
+
+@pytest.mark.parametrize("window", [
+    {"type": "sum", "key": "src_ip", "seconds": 10, "threshold": 1},
+    {"type": "distinct", "key": "src_ip", "seconds": 10, "threshold": 1},
+    {"type": "rate", "key": "src_ip", "seconds": 0, "threshold": 1},
+    {"type": "rate", "key": "src_ip", "seconds": 10, "threshold": 1, "bogus": 1},
+    {"type": "rate", "seconds": 10, "threshold": 1},
+])
+def test_invalid_windows_are_rejected(window):
+    with pytest.raises(RuleCompilationError):
+        compile_rule({"name": "w", "priority": "LOW", "type": "INFO", "window": window})
+
+
+def test_window_rules_through_engine():
+    rule_set = RuleSet.from_rules([
+        {"name": "SYN flood", "condition": "pkt['protocol'] == 'TCP' and pkt['tcp_flags'] & 0x12 == 0x02",
+         "window": {"type": "rate", "key": "src_ip", "seconds": 10, "threshold": 3},
+         "priority": "HIGH", "type": "CRITICAL"},
+    ])
+    engine = WindowEngine(rule_set.rules)
+    alerts = []
+    for i in range(10):
+        pkt = syn(float(i) / 10)
+        for rule in rule_set.match(pkt):
+            hit = engine.observe(rule, pkt)
+            if hit:
+                alerts.append(hit)
+    assert alerts == [{"type": "rate", "key": "10.0.0.1", "value": 4, "seconds": 10}]
+    assert rule_set.match({**syn(0.0), "tcp_flags": 0x12}) == []
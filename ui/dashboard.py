@@ -1,34 +1,242 @@
 # ui/dashboard.py
+"""Dashboard w terminalu oparty o rich.Live
+
+Ekran jest podzielony na regiony (status, alerty, kolejki, najwięksi nadawcy,
+trafienia reguł, metryki potoku). Co ``1 / refresh_per_second`` s każdy region
+porównuje sygnaturę swoich liczników z poprzednią klatką i jest przebudowywany
+tylko po zmianie; terminal jest odświeżany tylko, gdy zmienił się któryś
+region. Wszystkie dane pochodzą z liczników zbieranych na bieżąco
+(``TrafficStats``, ``NetworkMonitor``, kolejki) - klatka nie przegląda
+historii alertów.
+"""
 import asyncio
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional
 from rich.console import Console
+from rich.layout import Layout
+from rich.live import Live
+from rich.panel import Panel
 from rich.table import Table
-from core.AlertCoordinator import AlertCoordinator
+from core.AlertCoordinator import AlertCoordinator, AlertPriority
+from core.metrics import MetricsRegistry
+from core.overload import OverloadController, OverloadLevel
+from core.traffic_stats import TrafficStats
+
+ALERT_ROWS = 10
+TOP_TALKERS = 10
+TOP_RULES = 10
+# Tabela metryk potoku liczy kwantyle wszystkich histogramów - najwyżej raz na tyle sekund
+PIPELINE_INTERVAL = 1.0
+
+def format_timestamp(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3]
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:,.0f} {unit}"
+        value /= 1024
+    return f"{value:,.0f} TiB"
 
 class Dashboard:
-    def __init__(self, coordinator: AlertCoordinator):
+    def __init__(self, coordinator: AlertCoordinator, metrics: Optional[MetricsRegistry] = None,
+                 overload: Optional[OverloadController] = None, network_monitor: Any = None,
+                 stats: Optional[TrafficStats] = None, refresh_per_second: float = 2.0,
+                 console: Optional[Console] = None):
         self.coordinator = coordinator
-        self.console = Console()
+        self.metrics = metrics
+        self.overload = overload
+        self.network_monitor = network_monitor
+        self.stats = stats
+        self.refresh_per_second = refresh_per_second
+        self.console = console or Console()
+        self.layout = self._build_layout()
+        self._signatures: Dict[str, Hashable] = {}
+        # Poprzednie odczyty liczników do liczenia tempa (pakiety/s, trafienia/s)
+        self._last_time: Optional[float] = None
+        self._last_captured = 0
+        self._last_dropped = 0
+        self._rates = (0.0, 0.0)
+        self._last_hits: Dict[str, int] = {}
+        self._last_hits_time: Optional[float] = None
+
+    def _build_layout(self) -> Layout:
+        layout = Layout()
+        layout.split_column(Layout(name="status", size=3), Layout(name="body"))
+        layout["body"].split_row(Layout(name="main", ratio=2), Layout(name="side"))
+        if self.metrics is not None:
+            layout["main"].split_column(Layout(name="alerts"), Layout(name="pipeline"))
+        else:
+            layout["main"].split_column(Layout(name="alerts"))
+        layout["side"].split_column(Layout(name="queues", size=8), Layout(name="talkers"), Layout(name="rules"))
+        return layout
 
     async def run(self):
-        while True:
-            await asyncio.sleep(5)
-            self.display_alerts()
+        with Live(self.layout, console=self.console, auto_refresh=False, redirect_stderr=False) as live:
+            while True:
+                if self.update():
+                    live.refresh()
+                await asyncio.sleep(1 / self.refresh_per_second)
+
+    def update(self, now: Optional[float] = None) -> bool:
+        """Przebuduj regiony, których liczniki się zmieniły; True, gdy coś się zmieniło"""
+        now = time.monotonic() if now is None else now
+        self._update_rates(now)
+        changed = self._region("status", self._status_signature(), self.status_panel)
+        changed |= self._region("alerts", self._alerts_signature(), self.alerts_table)
+        changed |= self._region("queues", self._queue_signature(), self.queues_table)
+        if self.stats is not None:
+            changed |= self._region("talkers", self.stats.samples, self.talkers_table)
+            changed |= self._region("rules", self.stats.hits, lambda: self.rules_table(now))
+        if self.metrics is not None:
+            changed |= self._region("pipeline", int(now / PIPELINE_INTERVAL), self.metrics_table)
+        return changed
+
+    def _region(self, name: str, signature: Hashable, build: Callable[[], Any]) -> bool:
+        if name in self._signatures and self._signatures[name] == signature:
+            return False
+        self._signatures[name] = signature
+        self.layout[name].update(build())
+        return True
+
+    def _update_rates(self, now: float) -> None:
+        monitor = self.network_monitor
+        if monitor is None:
+            return
+        if self._last_time is not None and now > self._last_time:
+            elapsed = now - self._last_time
+            self._rates = ((monitor.captured - self._last_captured) / elapsed,
+                           (monitor.dropped - self._last_dropped) / elapsed)
+        self._last_time = now
+        self._last_captured = monitor.captured
+        self._last_dropped = monitor.dropped
+
+    # --------------- status -------------------
+
+    def _status_signature(self) -> Hashable:
+        overload = (self.overload.level, round(self.overload.depth, 2), round(self.overload.lag, 3)) \
+            if self.overload is not None else None
+        monitor = self.network_monitor
+        counters = (monitor.captured, monitor.dropped, round(self._rates[0])) if monitor is not None else None
+        return overload, counters
+
+    def status_panel(self) -> Panel:
+        parts = []
+        if self.overload is not None:
+            parts.append(self.overload_line())
+        monitor = self.network_monitor
+        if monitor is not None:
+            pps, drops = self._rates
+            parts.append(f"{pps:,.0f} pkt/s  captured {monitor.captured:,}  "
+                         f"dropped {monitor.dropped:,}" + (f" ([red]{drops:,.0f}/s[/red])" if drops else ""))
+        if self.stats is not None:
+            parts.append(f"{format_bytes(self.stats.bytes)} seen")
+        return Panel("  │  ".join(parts) or "Cyber Witness", title="Cyber Witness")
 
-    def display_alerts(self):
-        table = Table(title="Recent Alerts")
-        table.add_column("Time", style="dim")
+    def overload_line(self) -> str:
+        """Bieżący poziom degradacji; przy próbkowaniu z mnożnikiem do skalowania liczników"""
+        status = self.overload.status()
+        style = "green" if self.overload.level is OverloadLevel.NORMAL else "bold red"
+        line = (f"[{style}]Mode: {status['level']}[/{style}]  buffer {status['buffer_fill']:.0%}  "
+                f"lag {status['lag_seconds'] * 1000:.1f} ms")
+        if status["sample_rate"] > 1:
+            line += f"  sampling 1/{status['sample_rate']} benign flows"
+        return line
+
+    # --------------- alerty -------------------
+
+    def _alerts_signature(self) -> Hashable:
+        recent = self.coordinator.recent_alerts
+        if not recent:
+            return None
+        last = recent[-1]
+        # Zwinięte duplikaty zwiększają count ostatniego alertu bez dopisywania nowego
+        return len(recent), id(last), last.count
+
+    def alerts_table(self) -> Table:
+        table = Table(title="Recent Alerts", expand=True)
+        table.add_column("Time", style="dim", no_wrap=True)
         table.add_column("Type")
         table.add_column("Message")
         table.add_column("Priority")
-
-        # Wyświetl ostatnie 10 alertów
-        for alert in list(self.coordinator.recent_alerts)[-10:]:
+        table.add_column("Count", justify="right")
+        # Ostatnie ALERT_ROWS alertów bez kopiowania całej kolejki
+        for alert in islice(reversed(self.coordinator.recent_alerts), ALERT_ROWS):
             table.add_row(
-                str(alert.timestamp),
+                format_timestamp(alert.timestamp),
                 alert.alert_type.value,
                 alert.message,
-                str(alert.priority)
+                AlertPriority(alert.priority).name,
+                str(alert.count)
             )
+        return table
+
+    # --------------- kolejki -------------------
+
+    def _queue_depths(self) -> Dict[str, int]:
+        depths = {}
+        if self.network_monitor is not None:
+            depths["capture buffer"] = self.network_monitor._packet_buffer.qsize()
+        depths["alert queue"] = self.coordinator.alert_queue.qsize()
+        for handler_queue in self.coordinator.dispatcher.queues:
+            depths[f"handler {handler_queue.name}"] = len(handler_queue)
+        return depths
+
+    def _queue_signature(self) -> Hashable:
+        return tuple(self._queue_depths().values())
+
+    def queues_table(self) -> Table:
+        table = Table(title="Queues", expand=True)
+        table.add_column("Queue")
+        table.add_column("Depth", justify="right")
+        for name, depth in self._queue_depths().items():
+            table.add_row(name, f"{depth:,}")
+        return table
+
+    # --------------- ruch -------------------
+
+    def talkers_table(self) -> Table:
+        table = Table(title=f"Top talkers ({self.stats.talkers.spec.seconds:.0f} s)", expand=True)
+        table.add_column("Source")
+        table.add_column("Bytes", justify="right")
+        for source, volume in self.stats.top_talkers(TOP_TALKERS):
+            table.add_row(str(source), format_bytes(volume))
+        return table
+
+    def rules_table(self, now: float) -> Table:
+        """Trafienia reguł: łącznie i na sekundę od poprzedniej przebudowy regionu"""
+        elapsed = now - self._last_hits_time if self._last_hits_time is not None else 0.0
+        hits = self.stats.rule_hits
+        table = Table(title="Rule hits", expand=True)
+        table.add_column("Rule")
+        table.add_column("Total", justify="right")
+        table.add_column("/s", justify="right")
+        for name, total in sorted(hits.items(), key=lambda item: -item[1])[:TOP_RULES]:
+            rate = (total - self._last_hits.get(name, 0)) / elapsed if elapsed > 0 else 0.0
+            table.add_row(name, f"{total:,}", f"{rate:,.1f}")
+        self._last_hits = dict(hits)
+        self._last_hits_time = now
+        return table
 
-        self.console.clear()
-        self.console.print(table)
\ No newline at end of file
+    def metrics_table(self) -> Table:
+        """Skrót metryk potoku: kwantyle etapów i liczniki"""
+        table = Table(title="Pipeline", expand=True)
+        table.add_column("Metric")
+        table.add_column("Count / value", justify="right")
+        table.add_column("p50 µs", justify="right")
+        table.add_column("p99 µs", justify="right")
+        table.add_column("max µs", justify="right")
+        for name, values in self.metrics.summary():
+            if "value" in values:
+                table.add_row(name, f"{values['value']:,.0f}", "", "", "")
+            elif values["count"]:
+                table.add_row(
+                    name,
+                    f"{values['count']:,}",
+                    f"{values['p50_us']:,.1f}",
+                    f"{values['p99_us']:,.1f}",
+                    f"{values['max_us']:,.1f}"
+                )
+        return table